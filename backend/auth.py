@@ -9,7 +9,7 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from .config import settings
-from .database import get_db
+from .database import SessionLocal, get_db
 from .models import User
 
 # 密码加密上下文
@@ -56,11 +56,8 @@ def decode_token(token: str) -> dict:
         )
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """获取当前用户"""
+def _load_user(credentials: HTTPAuthorizationCredentials, db: Session) -> User:
+    """根据令牌查询用户"""
     token = credentials.credentials
     payload = decode_token(token)
     user_id = payload.get("sub")
@@ -89,10 +86,49 @@ async def get_current_user(
             detail="用户不存在",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
     return user
 
 
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    """获取当前用户"""
+    return _load_user(credentials, db)
+
+
+async def get_current_user_detached(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> User:
+    """
+    获取当前用户，使用独立的短会话，查询后立即归还数据库连接
+    
+    用于地图、语音等不访问数据库、但要长时间等待外部服务的接口，
+    避免请求期间一直占用连接池。返回的用户对象已脱离会话，只能读取已加载的字段。
+    """
+    db = SessionLocal()
+    try:
+        return _load_user(credentials, db)
+    finally:
+        db.close()
+
+
+async def get_current_admin_user(
+    current_user: User = Depends(get_current_user)
+) -> User:
+    """获取当前管理员用户（用户名需在 ADMIN_USERNAMES 中配置）"""
+    admin_usernames = {
+        name.strip() for name in settings.ADMIN_USERNAMES.split(",") if name.strip()
+    }
+    if current_user.username not in admin_usernames:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="需要管理员权限"
+        )
+    
+    return current_user
+
+
 def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
     """认证用户"""
     user = db.query(User).filter(User.username == username).first()
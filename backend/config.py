@@ -17,10 +17,74 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 天
     
+    # 管理员用户名（逗号分隔）
+    ADMIN_USERNAMES: str = ""
+    
     # 阿里云百炼配置
     ALIYUN_BAILIAN_API_KEY: str
     ALIYUN_BAILIAN_APP_ID: str = ""
     
+    # 大模型提供方：dashscope（DashScope SDK）或 openai（OpenAI 兼容接口）
+    LLM_PROVIDER: str = "dashscope"
+    LLM_BASE_URL: str = ""  # openai 模式必填；dashscope 模式不支持，使用 SDK 的默认地址
+    LLM_API_KEY: str = ""  # 为空时使用 ALIYUN_BAILIAN_API_KEY
+    LLM_TIMEOUT_SECONDS: float = 180
+    
+    # AI 调用线程池大小（同步的大模型调用在线程池中执行，避免阻塞事件循环）
+    AI_EXECUTOR_MAX_WORKERS: int = 8
+    
+    # 模型分档：max 用于完整行程，fast 用于信息提取和分析
+    AI_MODEL_MAX: str = "qwen-max"
+    AI_MODEL_FAST: str = "qwen-turbo"
+    
+    # 各类任务使用的档位（max / fast），另一个档位作为备用
+    AI_TIER_TRAVEL_PLAN: str = "max"
+    AI_TIER_PLAN_SKELETON: str = "max"
+    AI_TIER_DAY_ITINERARY: str = "max"
+    AI_TIER_MODIFY_ITINERARY: str = "max"
+    AI_TIER_EXPENSE_ANALYSIS: str = "fast"
+    AI_TIER_VOICE_QUERY: str = "fast"
+    
+    # 主模型失败时总是改用备用档位；开启对冲时，主模型超过延迟未返回也会同时请求备用档位
+    # 落后的请求无法取消，每次对冲都会多计费一次调用，因此默认关闭
+    AI_HEDGE_ENABLED: bool = False
+    AI_HEDGE_DELAY_MAX_SECONDS: float = 45  # 主模型为 max 档位时
+    AI_HEDGE_DELAY_FAST_SECONDS: float = 8  # 主模型为 fast 档位时
+    
+    # 大模型调用调度（全局并发上限、令牌桶限流、按优先级排队）
+    # 并发上限应小于 AI_EXECUTOR_MAX_WORKERS，排队的调用会占用线程池中的线程
+    LLM_MAX_CONCURRENCY: int = 6
+    LLM_REQUESTS_PER_MINUTE: float = 60  # 0 表示不限制
+    LLM_TOKENS_PER_MINUTE: float = 100000  # 估算的 Token 数，0 表示不限制
+    LLM_TOKENS_PER_CHAR: float = 1.0  # 估算提示词 Token 数时每个字符折算的 Token 数
+    LLM_MAX_QUEUE: int = 50  # 排队的调用数上限，超出时直接拒绝
+    LLM_QUEUE_TIMEOUT_INTERACTIVE: float = 30  # 交互式生成最长排队秒数
+    LLM_QUEUE_TIMEOUT_MODIFY: float = 20  # 行程修改最长排队秒数
+    LLM_QUEUE_TIMEOUT_BACKGROUND: float = 10  # 费用分析等后台调用最长排队秒数
+    
+    # 大模型调用遥测：滚动汇总保留最近多少次调用
+    LLM_TELEMETRY_WINDOW: int = 500
+    
+    # 并行生成配置（先生成行程骨架，再并发生成每一天）
+    AI_PARALLEL_MIN_DAYS: int = 5  # auto 模式下达到该天数才使用并行生成
+    AI_PARALLEL_DAY_CONCURRENCY: int = 4  # 每个计划同时生成的天数上限
+    
+    # 异步生成任务的 worker 数量（POST /travel/plan 使用 async_mode 时）
+    # 任务队列只支持单个服务进程：启动时会把所有 running 的任务当作中断的任务重新执行，
+    # 多进程部署（如 uvicorn --workers）时会重复执行其他进程正在处理的任务
+    PLAN_JOB_WORKERS: int = 2
+    
+    # 旅行计划缓存配置
+    PLAN_CACHE_ENABLED: bool = True
+    PLAN_CACHE_TTL_SECONDS: int = 60 * 60 * 6  # 6 小时
+    PLAN_CACHE_MAX_ENTRIES: int = 500
+    PLAN_CACHE_BUDGET_BUCKET: float = 500  # 预算按 500 元分档
+    
+    # 费用预算分析（后台执行，按计划缓存）
+    EXPENSE_ANALYSIS_CHANGE_RATIO: float = 0.05  # 花费变化超过预算的 5% 才重新分析
+    EXPENSE_ANALYSIS_MIN_CHANGE: float = 50  # 且变化不少于 50 元
+    EXPENSE_ANALYSIS_MAX_ENTRIES: int = 1000
+    
     # 阿里云语音识别配置
     ALIYUN_ASR_APP_KEY: str = ""
     ALIYUN_ASR_ACCESS_KEY_ID: str = ""
@@ -29,6 +93,47 @@ class Settings(BaseSettings):
     # 高德地图配置
     AMAP_API_KEY: str
     AMAP_WEB_SERVICE_KEY: str
+    AMAP_BASE_URL: str = "https://restapi.amap.com/v3"  # 离线压测时可指向本地替身
+    
+    # 出站 HTTP（高德地图、阿里云语音识别共用一个异步连接池）
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = 20
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30
+    HTTP2_ENABLED: bool = True  # 需要安装 h2（httpx[http2]），未安装时使用 HTTP/1.1
+    HTTP_RETRY_BACKOFF_SECONDS: float = 0.2  # 重试退避基数，第 n 次重试前随机等待 0 ~ 基数 * 2^(n-1) 秒
+    AMAP_TIMEOUT_SECONDS: float = 5
+    AMAP_MAX_RETRIES: int = 2
+    AMAP_BATCH_CONCURRENCY: int = 5  # 批量查询时同时发出的高德请求数
+    # 高德各接口（geocode、place、direction、weather）的熔断器：连续失败或过慢时直接失败，缓存返回过期的结果
+    AMAP_BREAKER_ENABLED: bool = True
+    AMAP_BREAKER_FAILURE_THRESHOLD: int = 5  # 连续失败次数
+    AMAP_BREAKER_RECOVERY_SECONDS: float = 30  # 打开后经过多久放行一次探测请求
+    AMAP_BREAKER_SLOW_CALL_SECONDS: float = 3  # 超过该耗时（含重试）的调用也记为失败
+    ASR_TIMEOUT_SECONDS: float = 30
+    ASR_MAX_RETRIES: int = 1  # 语音识别只在连接失败（请求未发出）时重试
+    NLS_TOKEN_TIMEOUT_SECONDS: float = 10
+    NLS_TOKEN_MAX_RETRIES: int = 2
+    
+    # 地理编码 / POI 搜索缓存（内存 LRU + 数据库）
+    GEO_CACHE_ENABLED: bool = True
+    GEO_CACHE_MAX_ENTRIES: int = 10000  # 内存中的条目数上限
+    GEO_CACHE_TTL_SECONDS: int = 60 * 60 * 24 * 30  # 30 天
+    GEO_CACHE_NEGATIVE_TTL_SECONDS: int = 60 * 60 * 24  # "未找到"的结果缓存 1 天
+    GEO_CACHE_STALE_SECONDS: int = 60 * 60 * 24 * 7  # 过期后仍保留 7 天，高德不可用时返回过期的结果
+    ROUTE_CACHE_TTL_SECONDS: int = 60 * 60 * 24  # 路径规划结果（距离、时长、折线）缓存 1 天
+    # 天气预报按发布时间（reporttime）缓存：发布后 WEATHER_REFRESH_SECONDS 内有效，限制在最短 / 最长有效期之间
+    WEATHER_REFRESH_SECONDS: int = 60 * 60 * 3
+    WEATHER_CACHE_MIN_TTL_SECONDS: int = 60 * 10
+    WEATHER_CACHE_MAX_TTL_SECONDS: int = 60 * 60 * 6
+    
+    # POI 空间索引：已经解析过的 POI 按网格分桶放在内存中，附近搜索优先在本地完成
+    POI_INDEX_ENABLED: bool = True
+    POI_INDEX_CELL_DEGREES: float = 0.005  # 网格大小（度），约 500 米
+    POI_INDEX_MAX_POIS: int = 2000000  # 索引中的 POI 数上限，每个 POI 约占 150 字节
+    POI_NEARBY_MIN_RESULTS: int = 5  # 本地结果少于该数量（且少于请求的数量）时才请求高德周边搜索
+    
+    # 生成或修改行程后解析所有地点的坐标并保存在行程中
+    ITINERARY_GEO_ENABLED: bool = True
     
     # 服务器配置
     HOST: str = "0.0.0.0"
@@ -1,11 +1,28 @@
 """
 FastAPI 主应用
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Query, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from .config import settings
 from .database import init_db
+from .auth import get_current_admin_user
+from .models import User
+from .services.ai_service import AIService
+from .services.plan_job_queue import plan_job_queue
+from .services.plan_cache import plan_cache
+from .services.plan_catalog import plan_catalog
+from .services.plan_salvage import plan_salvage
+from .services.single_flight import ai_single_flight
+from .services.llm_scheduler import llm_scheduler
+from .services.model_router import model_router
+from .services.llm_telemetry import llm_telemetry
+from .services.outbound_http import outbound_http
+from .services.geo_cache import geo_cache
+from .services.map_service import amap_breakers
+from .services.poi_index import poi_index
+from .services.itinerary_geo import itinerary_geo
+from .services.route_optimizer import route_optimizer
 from .routers import (
     auth_router,
     travel_router,
@@ -37,28 +54,75 @@ app.include_router(expense_router)
 app.include_router(voice_router)
 app.include_router(map_router)
 
-# 静态文件服务（前端）
-try:
-    app.mount("/", StaticFiles(directory="frontend", html=True), name="frontend")
-except RuntimeError:
-    pass  # 如果 frontend 目录不存在，跳过
-
-
 @app.on_event("startup")
 async def startup_event():
-    """应用启动时初始化数据库"""
+    """应用启动时初始化数据库，清理过期的地理缓存并在后台加载 POI 空间索引，创建出站 HTTP 连接池，并启动异步生成任务的 worker"""
     init_db()
+    removed = geo_cache.purge_expired()
+    if removed:
+        print(f"🧹 已清理 {removed} 条过期的地理缓存")
+    poi_index.start_warm()
+    await outbound_http.start()
+    await plan_job_queue.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭时停止任务 worker，释放 AI 线程池和出站 HTTP 连接"""
+    await plan_job_queue.stop()
+    AIService.shutdown()
+    await outbound_http.stop()
 
 
 @app.get("/api/health")
 async def health_check():
-    """健康检查"""
+    """健康检查（高德接口的熔断器打开时 status 为 degraded，服务本身仍然可用）"""
+    breakers = amap_breakers.states()
+    degraded = any(state != "closed" for state in breakers.values())
+    return {
+        "status": "degraded" if degraded else "healthy",
+        "message": "AI Travel Planner API is running",
+        "circuit_breakers": {"amap": breakers}
+    }
+
+
+@app.get("/api/metrics")
+async def metrics(admin_user: User = Depends(get_current_admin_user)):
+    """运行指标（管理员）：AI 调用调度、各方法的调用直方图、模型档位、请求合并统计、旅行计划缓存、预生成目录、行程补全、出站 HTTP、高德熔断器、地理缓存和 POI 空间索引统计"""
     return {
-        "status": "healthy",
-        "message": "AI Travel Planner API is running"
+        "llm_scheduler": llm_scheduler.stats(),
+        "llm_calls": llm_telemetry.histograms(),
+        "model_tiers": model_router.stats(),
+        "single_flight": ai_single_flight.stats(),
+        "plan_cache": plan_cache.stats(),
+        "plan_catalog": plan_catalog.stats(),
+        "plan_salvage": plan_salvage.stats(),
+        "outbound_http": outbound_http.stats(),
+        "circuit_breakers": {"amap": amap_breakers.stats()},
+        "geo_cache": geo_cache.stats(),
+        "poi_index": poi_index.stats(),
+        "itinerary_geo": itinerary_geo.stats(),
+        "route_optimizer": route_optimizer.stats()
     }
 
 
+@app.get("/api/metrics/llm")
+async def llm_metrics(
+    recent: int = Query(20, ge=0, le=200, description="返回的最近调用明细条数"),
+    admin_user: User = Depends(get_current_admin_user)
+):
+    """最近的大模型调用滚动汇总（管理员）：耗时分位数、Token 用量、JSON 修复和失败类别"""
+    return llm_telemetry.summary(recent)
+
+
+# 静态文件服务（前端）
+# 必须在所有 API 路由之后挂载，否则 "/" 会拦截 /api/* 请求
+try:
+    app.mount("/", StaticFiles(directory="frontend", html=True), name="frontend")
+except RuntimeError:
+    pass  # 如果 frontend 目录不存在，跳过
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
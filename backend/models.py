@@ -1,7 +1,7 @@
 """
 数据库模型定义
 """
-from sqlalchemy import Column, Integer, String, Text, Float, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Text, Float, Boolean, DateTime, ForeignKey, JSON, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -21,6 +21,7 @@ class User(Base):
     # 关系
     travel_plans = relationship("TravelPlan", back_populates="user", cascade="all, delete-orphan")
     expenses = relationship("Expense", back_populates="user", cascade="all, delete-orphan")
+    plan_jobs = relationship("PlanJob", back_populates="user", cascade="all, delete-orphan")
 
 
 class TravelPlan(Base):
@@ -69,3 +70,56 @@ class Expense(Base):
     user = relationship("User", back_populates="expenses")
     travel_plan = relationship("TravelPlan", back_populates="expenses")
 
+
+class PlanJob(Base):
+    """旅行计划生成任务表（异步模式下由后台 worker 处理）"""
+    __tablename__ = "plan_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    status = Column(String(20), nullable=False, default="queued", index=True)  # queued、running、succeeded、failed
+    request = Column(JSON, nullable=False)  # 原始的旅行需求（TravelPlanRequest）
+    travel_plan_id = Column(Integer, ForeignKey("travel_plans.id", ondelete="SET NULL"), nullable=True)
+    error = Column(Text)
+    attempts = Column(Integer, default=0)  # 已开始处理的次数（服务重启后会重新处理）
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # 关系
+    user = relationship("User", back_populates="plan_jobs")
+
+
+class DestinationPlan(Base):
+    """预生成的目的地行程目录（fast 模式按预算和人数缩放后直接返回）"""
+    __tablename__ = "destination_plans"
+    __table_args__ = (UniqueConstraint("destination", "days", name="uq_destination_plans_destination_days"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    destination = Column(String(200), nullable=False, index=True)  # 归一化后的目的地
+    days = Column(Integer, nullable=False)
+    budget = Column(Float, nullable=False)  # 生成时使用的预算
+    travelers_count = Column(Integer, nullable=False, default=1)  # 生成时使用的人数
+    itinerary = Column(JSON, nullable=False)
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class GeoCacheEntry(Base):
+    """高德地理编码和 POI 搜索结果缓存（包括"未找到"的结果）"""
+    __tablename__ = "geo_cache"
+    __table_args__ = (UniqueConstraint("kind", "key_hash", name="uq_geo_cache_kind_key_hash"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(20), nullable=False)  # geocode、poi、route、weather
+    key_hash = Column(String(40), nullable=False)  # 归一化缓存键的 SHA-1
+    cache_key = Column(String(500), nullable=False)  # 归一化的（地址或关键词，城市，类型）
+    found = Column(Boolean, nullable=False, default=True)
+    result = Column(JSON)  # 未找到时为空
+    expires_at = Column(DateTime, nullable=False, index=True)
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,7 +1,7 @@
 """
 费用记录相关的 API 路由
 """
-from typing import List, Optional
+from typing import List, Optional, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func
@@ -9,7 +9,7 @@ from ..database import get_db
 from ..models import User, Expense, TravelPlan
 from ..schemas import ExpenseCreate, ExpenseResponse
 from ..auth import get_current_user
-from ..services.ai_service import AIService
+from ..services.expense_analysis import expense_analysis_cache
 
 router = APIRouter(prefix="/expenses", tags=["费用管理"])
 
@@ -70,18 +70,36 @@ async def get_expenses(
     return expenses
 
 
+def _get_user_plan(db: Session, user_id: int, travel_plan_id: int) -> Optional[TravelPlan]:
+    """获取属于当前用户的旅行计划"""
+    return db.query(TravelPlan).filter(
+        TravelPlan.id == travel_plan_id,
+        TravelPlan.user_id == user_id
+    ).first()
+
+
+def _schedule_budget_analysis(plan: TravelPlan, total: float) -> Dict[str, Any]:
+    """获取计划的 AI 预算分析，缓存不适用时在后台重新分析"""
+    return expense_analysis_cache.get_or_schedule(
+        plan_id=plan.id,
+        plan_info=f"{plan.destination} {plan.days}天游",
+        total=total,
+        budget=plan.budget
+    )
+
+
 @router.get("/summary")
 async def get_expense_summary(
     travel_plan_id: Optional[int] = Query(None, description="旅行计划 ID"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """获取费用汇总"""
+    """
+    获取费用汇总
     
-    query = db.query(Expense).filter(Expense.user_id == current_user.id)
-    
-    if travel_plan_id:
-        query = query.filter(Expense.travel_plan_id == travel_plan_id)
+    AI 预算分析在后台执行，不阻塞汇总数据的返回：
+    ai_analysis_status 为 pending 时可通过 GET /expenses/analysis 查询结果
+    """
     
     # 按类别统计
     category_summary = db.query(
@@ -106,27 +124,50 @@ async def get_expense_summary(
     
     # 如果关联了旅行计划，添加预算分析
     if travel_plan_id:
-        plan = db.query(TravelPlan).filter(
-            TravelPlan.id == travel_plan_id,
-            TravelPlan.user_id == current_user.id
-        ).first()
+        plan = _get_user_plan(db, current_user.id, travel_plan_id)
         
         if plan:
             result["budget"] = plan.budget
             result["remaining"] = plan.budget - total
             result["usage_percentage"] = (total / plan.budget * 100) if plan.budget > 0 else 0
             
-            # 使用 AI 分析预算
-            analysis = AIService.analyze_expense(
-                travel_plan_info=f"{plan.destination} {plan.days}天游",
-                current_expenses=total,
-                budget=plan.budget
-            )
-            result["ai_analysis"] = analysis
+            analysis = _schedule_budget_analysis(plan, total)
+            result["ai_analysis_status"] = analysis["status"]
+            result["ai_analysis"] = analysis["analysis"]
     
     return result
 
 
+@router.get("/analysis")
+async def get_expense_analysis(
+    travel_plan_id: int = Query(..., description="旅行计划 ID"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    获取旅行计划的 AI 预算分析
+    
+    花费与上次分析时相比变化不大时直接返回缓存结果；
+    否则在后台重新分析并返回 pending 状态（附带上一次的分析结果）
+    """
+    
+    plan = _get_user_plan(db, current_user.id, travel_plan_id)
+    if not plan:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="旅行计划不存在"
+        )
+    
+    total = db.query(func.sum(Expense.amount)).filter(
+        Expense.user_id == current_user.id,
+        Expense.travel_plan_id == travel_plan_id
+    ).scalar() or 0
+    
+    analysis = _schedule_budget_analysis(plan, total)
+    analysis["total"] = total
+    return analysis
+
+
 @router.put("/{expense_id}", response_model=ExpenseResponse)
 async def update_expense(
     expense_id: int,
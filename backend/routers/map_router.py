@@ -4,8 +4,9 @@
 from typing import Optional
 from fastapi import APIRouter, Depends, Query
 from ..models import User
-from ..auth import get_current_user
+from ..auth import get_current_user_detached
 from ..services.map_service import MapService
+from ..schemas import GeocodeBatchRequest, POIBatchRequest, DayRouteRequest
 
 router = APIRouter(prefix="/map", tags=["地图服务"])
 
@@ -13,11 +14,12 @@ router = APIRouter(prefix="/map", tags=["地图服务"])
 @router.get("/geocode")
 async def geocode_address(
     address: str = Query(..., description="地址"),
-    current_user: User = Depends(get_current_user)
+    city: Optional[str] = Query(None, description="限定的城市"),
+    current_user: User = Depends(get_current_user_detached)
 ):
     """地理编码：地址转经纬度"""
     
-    result = MapService.geocode(address)
+    result = await MapService.geocode(address, city)
     
     if result is None:
         return {
@@ -36,11 +38,11 @@ async def search_poi(
     query: str = Query(..., description="搜索关键词"),
     city: Optional[str] = Query(None, description="城市名称"),
     types: Optional[str] = Query(None, description="POI 类型"),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_detached)
 ):
     """搜索兴趣点"""
     
-    pois = MapService.search_poi(query, city, types)
+    pois = await MapService.search_poi(query, city, types)
     
     return {
         "success": True,
@@ -49,16 +51,79 @@ async def search_poi(
     }
 
 
+@router.get("/nearby")
+async def search_nearby(
+    lon: float = Query(..., ge=-180, le=180, description="中心点经度"),
+    lat: float = Query(..., ge=-90, le=90, description="中心点纬度"),
+    radius: int = Query(1000, ge=1, le=50000, description="搜索半径（米）"),
+    types: Optional[str] = Query(None, description="POI 类型，多个用 | 分隔（类型名称或高德类型编码）"),
+    limit: int = Query(20, ge=1, le=50, description="返回的最大数量"),
+    current_user: User = Depends(get_current_user_detached)
+):
+    """
+    搜索附近的兴趣点，按距离由近到远排序
+    
+    优先在进程内的 POI 空间索引中搜索，本地结果太少时才请求高德周边搜索（source 为 "amap"）
+    """
+    
+    source, pois = await MapService.search_nearby(lon, lat, radius, types, limit)
+    
+    return {
+        "success": True,
+        "source": source,
+        "count": len(pois),
+        "data": pois
+    }
+
+
+@router.post("/geocode/batch")
+async def geocode_batch(
+    request: GeocodeBatchRequest,
+    current_user: User = Depends(get_current_user_detached)
+):
+    """批量地理编码，结果与请求中的地址顺序一致"""
+    
+    results = await MapService.geocode_batch(request.addresses, request.city)
+    
+    return {
+        "success": True,
+        "count": sum(1 for result in results if result is not None),
+        "data": [
+            {"address": address, "success": result is not None, "data": result}
+            for address, result in zip(request.addresses, results)
+        ]
+    }
+
+
+@router.post("/poi/batch")
+async def search_poi_batch(
+    request: POIBatchRequest,
+    current_user: User = Depends(get_current_user_detached)
+):
+    """批量搜索兴趣点，结果与请求中的关键词顺序一致，每个关键词返回前 limit 个 POI"""
+    
+    results = await MapService.search_poi_batch(request.queries, request.city, request.types)
+    
+    return {
+        "success": True,
+        "count": sum(1 for pois in results if pois),
+        "data": [
+            {"query": query, "count": len(pois), "data": pois[:request.limit]}
+            for query, pois in zip(request.queries, results)
+        ]
+    }
+
+
 @router.get("/route")
 async def get_route(
     origin: str = Query(..., description="起点经纬度（lon,lat）"),
     destination: str = Query(..., description="终点经纬度（lon,lat）"),
     mode: str = Query("driving", description="出行方式：driving, walking, transit"),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_detached)
 ):
     """路径规划"""
     
-    result = MapService.get_route(origin, destination, mode)
+    result = await MapService.get_route(origin, destination, mode)
     
     if result is None:
         return {
@@ -72,14 +137,45 @@ async def get_route(
     }
 
 
+@router.post("/routes/day")
+async def get_day_routes(
+    request: DayRouteRequest,
+    current_user: User = Depends(get_current_user_detached)
+):
+    """
+    一天行程的路线：相邻两点之间的各段并发规划，返回每段的距离、时长和编码折线
+    
+    折线使用 Google Encoded Polyline 格式（精度 1e-5 度），按 zoom 抽稀
+    """
+    
+    legs = await MapService.get_day_routes(
+        [(point.longitude, point.latitude) for point in request.points],
+        request.mode,
+        request.zoom,
+        request.city
+    )
+    
+    return {
+        "success": all(leg is not None for leg in legs),
+        "mode": request.mode,
+        "zoom": request.zoom,
+        "distance": sum(leg["distance"] for leg in legs if leg),
+        "duration": sum(leg["duration"] for leg in legs if leg),
+        "legs": [
+            {"index": index, "success": leg is not None, **(leg or {})}
+            for index, leg in enumerate(legs)
+        ]
+    }
+
+
 @router.get("/weather")
 async def get_weather(
     city: str = Query(..., description="城市名称"),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_detached)
 ):
     """获取天气信息"""
     
-    result = MapService.get_weather(city)
+    result = await MapService.get_weather(city)
     
     if result is None:
         return {
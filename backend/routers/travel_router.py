@@ -1,35 +1,44 @@
 """
 旅行计划相关的 API 路由
 """
-from typing import List
+import json
+import asyncio
+from typing import List, Dict, Any, Tuple, Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse, JSONResponse
 from sqlalchemy.orm import Session
-from ..database import get_db
-from ..models import User, TravelPlan
+from ..database import get_db, SessionLocal
+from ..models import User, TravelPlan, PlanJob
 from ..schemas import (
     TravelPlanRequest,
     TravelPlanCreate,
     TravelPlanUpdate,
     TravelPlanResponse,
     ItineraryResponse,
-    ItineraryModificationRequest
+    ItineraryModificationRequest,
+    RouteOptimizationRequest,
+    PlanJobResponse
 )
-from ..auth import get_current_user
+from ..auth import get_current_user, get_current_admin_user
+from ..config import settings
 from ..services.ai_service import AIService
+from ..services.plan_cache import plan_cache
+from ..services.plan_catalog import plan_catalog
+from ..services.expense_analysis import expense_analysis_cache
+from ..services.plan_job_queue import plan_job_queue
+from ..services.itinerary_stream import ItineraryStreamParser
+from ..services.itinerary_geo import itinerary_geo, ItineraryGeo
+from ..services.route_optimizer import route_optimizer
+from ..services.map_service import MapService
+from ..services.llm_scheduler import LLMOverloadedError
 
 router = APIRouter(prefix="/travel", tags=["旅行计划"])
 
 
-@router.post("/plan", response_model=ItineraryResponse, status_code=status.HTTP_201_CREATED)
-async def create_travel_plan(
-    request: TravelPlanRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """创建旅行计划（使用 AI 生成）"""
-    
-    # 解析日期
+def _parse_plan_dates(request: TravelPlanRequest) -> Tuple[datetime, datetime, int]:
+    """解析请求中的起止日期并计算天数"""
     try:
         start_date = datetime.strptime(request.start_date, "%Y-%m-%d")
         end_date = datetime.strptime(request.end_date, "%Y-%m-%d")
@@ -47,27 +56,22 @@ async def create_travel_plan(
             detail="结束日期必须晚于开始日期"
         )
     
-    # 使用 AI 生成旅行计划
-    try:
-        ai_result = AIService.generate_travel_plan(
-            destination=request.destination,
-            days=days,
-            budget=request.budget,
-            travelers_count=request.travelers_count,
-            preferences=request.preferences
-        )
-    except Exception as ai_error:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"AI 生成旅行计划失败: {str(ai_error)}"
-        )
-    
-    # 创建旅行计划
-    title = f"{request.destination} {days}天游"
-    
+    return start_date, end_date, days
+
+
+def _save_travel_plan(
+    db: Session,
+    user_id: int,
+    request: TravelPlanRequest,
+    start_date: datetime,
+    end_date: datetime,
+    days: int,
+    ai_result: Dict[str, Any]
+) -> TravelPlan:
+    """保存 AI 生成的旅行计划，并在后台预取行程期间的天气预报（须在事件循环中调用）"""
     travel_plan = TravelPlan(
-        user_id=current_user.id,
-        title=title,
+        user_id=user_id,
+        title=f"{request.destination} {days}天游",
         destination=request.destination,
         start_date=start_date,
         end_date=end_date,
@@ -83,6 +87,13 @@ async def create_travel_plan(
     db.commit()
     db.refresh(travel_plan)
     
+    MapService.prefetch_weather(ItineraryGeo.city_of(request.destination), start_date.date(), end_date.date())
+    
+    return travel_plan
+
+
+def _itinerary_response(travel_plan: TravelPlan) -> Dict[str, Any]:
+    """构建 ItineraryResponse 格式的返回数据"""
     return {
         "travel_plan_id": travel_plan.id,
         "title": travel_plan.title,
@@ -94,6 +105,306 @@ async def create_travel_plan(
     }
 
 
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """格式化一条 Server-Sent Events 消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _process_plan_job(job_id: int, user_id: int, payload: Dict[str, Any]) -> int:
+    """后台 worker 处理异步生成任务：生成行程并保存，返回旅行计划 ID"""
+    request = TravelPlanRequest(**payload)
+    start_date, end_date, days = _parse_plan_dates(request)
+    
+    ai_result, _ = await AIService.get_or_generate_travel_plan_async(
+        destination=request.destination,
+        days=days,
+        budget=request.budget,
+        travelers_count=request.travelers_count,
+        preferences=request.preferences,
+        use_cache=request.use_cache,
+        generation_mode=request.generation_mode
+    )
+    ai_result = await itinerary_geo.enrich(ai_result, request.destination)
+    
+    db = SessionLocal()
+    try:
+        travel_plan = _save_travel_plan(
+            db, user_id, request, start_date, end_date, days, ai_result
+        )
+        return travel_plan.id
+    finally:
+        db.close()
+
+
+plan_job_queue.set_handler(_process_plan_job)
+
+
+def _get_user_job(db: Session, job_id: int, user_id: int) -> PlanJob:
+    """获取属于当前用户的生成任务"""
+    job = db.query(PlanJob).filter(
+        PlanJob.id == job_id,
+        PlanJob.user_id == user_id
+    ).first()
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="任务不存在"
+        )
+    
+    return job
+
+
+@router.post("/plan", response_model=ItineraryResponse, status_code=status.HTTP_201_CREATED)
+async def create_travel_plan(
+    request: TravelPlanRequest,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    创建旅行计划（使用 AI 生成，相同需求优先复用缓存）
+    
+    async_mode 为 true 时只创建生成任务并返回 202，
+    通过 GET /travel/jobs/{id} 或 GET /travel/jobs/{id}/events 获取结果
+    
+    generation_mode 为 fast 时优先按预算和人数缩放预生成的目的地行程，
+    personalize 为 true 时再在后台按偏好个性化
+    """
+    
+    start_date, end_date, days = _parse_plan_dates(request)
+    
+    if request.generation_mode == "fast":
+        catalog_result = plan_catalog.plan_from_catalog(
+            db, request.destination, days, request.budget, request.travelers_count
+        )
+        if catalog_result is not None:
+            catalog_result = await itinerary_geo.enrich(catalog_result, request.destination)
+            travel_plan = _save_travel_plan(
+                db, current_user.id, request, start_date, end_date, days, catalog_result
+            )
+            response.headers["X-Plan-Cache"] = "CATALOG"
+            if request.personalize:
+                plan_catalog.schedule_personalization(travel_plan.id, request.preferences)
+                response.headers["X-Plan-Personalization"] = "scheduled"
+            return _itinerary_response(travel_plan)
+    
+    if request.async_mode:
+        job = plan_job_queue.enqueue(db, current_user.id, request.model_dump())
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=jsonable_encoder(PlanJobResponse.model_validate(job)),
+            headers={"Location": f"/travel/jobs/{job.id}"}
+        )
+    
+    # 使用 AI 生成旅行计划
+    try:
+        ai_result, cache_status = await AIService.get_or_generate_travel_plan_async(
+            destination=request.destination,
+            days=days,
+            budget=request.budget,
+            travelers_count=request.travelers_count,
+            preferences=request.preferences,
+            use_cache=request.use_cache,
+            generation_mode=request.generation_mode
+        )
+    except LLMOverloadedError as busy_error:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(busy_error)
+        )
+    except Exception as ai_error:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"AI 生成旅行计划失败: {str(ai_error)}"
+        )
+    
+    # 解析所有地点的坐标后创建旅行计划
+    ai_result = await itinerary_geo.enrich(ai_result, request.destination)
+    travel_plan = _save_travel_plan(
+        db, current_user.id, request, start_date, end_date, days, ai_result
+    )
+    
+    response.headers["X-Plan-Cache"] = cache_status
+    return _itinerary_response(travel_plan)
+
+
+@router.post("/plan/stream")
+async def create_travel_plan_stream(
+    request: TravelPlanRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    流式创建旅行计划（Server-Sent Events）
+    
+    每完成一天的行程就推送一个 day 事件，overview、budget_breakdown、tips 等字段
+    闭合时推送 section 事件，生成结束并保存后推送 done 事件。
+    """
+    
+    start_date, end_date, days = _parse_plan_dates(request)
+    user_id = current_user.id
+    
+    use_cache = request.use_cache and settings.PLAN_CACHE_ENABLED
+    cache_key = plan_cache.make_key(
+        request.destination, days, request.budget, request.travelers_count, request.preferences
+    )
+    cached = plan_cache.get(cache_key) if use_cache else None
+    if not use_cache:
+        cache_status = "BYPASS"
+    else:
+        cache_status = "HIT" if cached is not None else "MISS"
+    
+    async def event_stream():
+        if cached is not None:
+            # 缓存命中时直接按流式事件格式推送完整结果
+            ai_result = cached
+            for key, value in ai_result.items():
+                if key == ItineraryStreamParser.DAILY_KEY:
+                    for index, day in enumerate(value or []):
+                        yield _sse_event("day", {"index": index, "day": day})
+                else:
+                    yield _sse_event("section", {"key": key, "value": value})
+        else:
+            parser = ItineraryStreamParser()
+            try:
+                async for chunk in AIService.stream_travel_plan_async(
+                    destination=request.destination,
+                    days=days,
+                    budget=request.budget,
+                    travelers_count=request.travelers_count,
+                    preferences=request.preferences
+                ):
+                    for event, data in parser.feed(chunk):
+                        yield _sse_event(event, data)
+                
+                ai_result = parser.result()
+            except Exception as ai_error:
+                yield _sse_event("error", {"detail": f"AI 生成旅行计划失败: {str(ai_error)}"})
+                return
+            
+            if use_cache:
+                plan_cache.set(cache_key, ai_result)
+        
+        # 生成结束后解析坐标并保存计划（请求依赖的会话此时可能已关闭，单独创建会话）
+        ai_result = await itinerary_geo.enrich(ai_result, request.destination)
+        db = SessionLocal()
+        try:
+            travel_plan = _save_travel_plan(
+                db, user_id, request, start_date, end_date, days, ai_result
+            )
+            yield _sse_event("done", _itinerary_response(travel_plan))
+        finally:
+            db.close()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "X-Plan-Cache": cache_status
+        }
+    )
+
+
+@router.get("/jobs/{job_id}", response_model=PlanJobResponse)
+async def get_plan_job(
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """查询异步生成任务的状态，完成后 travel_plan_id 为生成的计划"""
+    
+    return _get_user_job(db, job_id, current_user.id)
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_plan_job(
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    订阅异步生成任务的状态（Server-Sent Events）
+    
+    状态变化时推送 status 事件；成功后推送 done 事件（数据同 POST /travel/plan 的响应），
+    失败时推送 error 事件。
+    """
+    
+    _get_user_job(db, job_id, current_user.id)
+    user_id = current_user.id
+    
+    async def event_stream():
+        last_status = None
+        while True:
+            # 每次轮询使用新的会话，读取 worker 写入的最新状态
+            session = SessionLocal()
+            try:
+                job = session.query(PlanJob).filter(
+                    PlanJob.id == job_id,
+                    PlanJob.user_id == user_id
+                ).first()
+                if not job:
+                    yield _sse_event("error", {"detail": "任务不存在"})
+                    return
+                
+                if job.status != last_status:
+                    last_status = job.status
+                    yield _sse_event(
+                        "status", jsonable_encoder(PlanJobResponse.model_validate(job))
+                    )
+                
+                if job.status == plan_job_queue.STATUS_FAILED:
+                    yield _sse_event("error", {"detail": f"AI 生成旅行计划失败: {job.error}"})
+                    return
+                if job.status == plan_job_queue.STATUS_SUCCEEDED:
+                    travel_plan = session.query(TravelPlan).filter(
+                        TravelPlan.id == job.travel_plan_id
+                    ).first()
+                    if travel_plan:
+                        yield _sse_event("done", _itinerary_response(travel_plan))
+                    else:
+                        yield _sse_event("error", {"detail": "旅行计划已被删除"})
+                    return
+            finally:
+                session.close()
+            
+            await asyncio.sleep(1)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+@router.get("/cache/stats")
+async def get_plan_cache_stats(
+    admin_user: User = Depends(get_current_admin_user)
+):
+    """查看旅行计划缓存统计（管理员）"""
+    
+    return plan_cache.stats()
+
+
+@router.delete("/cache")
+async def invalidate_plan_cache(
+    destination: Optional[str] = Query(None, description="只清除该目的地的缓存，不传则清空全部"),
+    admin_user: User = Depends(get_current_admin_user)
+):
+    """清除旅行计划缓存（管理员）"""
+    
+    removed = plan_cache.invalidate(destination)
+    
+    return {
+        "success": True,
+        "removed": removed
+    }
+
+
 @router.get("/plans", response_model=List[TravelPlanResponse])
 async def get_travel_plans(
     current_user: User = Depends(get_current_user),
@@ -150,8 +461,12 @@ async def update_travel_plan(
             detail="旅行计划不存在"
         )
     
-    # 更新字段
+    # 更新字段（手动编辑过的地点重新解析坐标）
     update_data = plan_update.dict(exclude_unset=True)
+    if update_data.get("itinerary"):
+        update_data["itinerary"] = await itinerary_geo.enrich(
+            update_data["itinerary"], update_data.get("destination") or plan.destination, previous=plan.itinerary
+        )
     for field, value in update_data.items():
         setattr(plan, field, value)
     
@@ -186,15 +501,19 @@ async def modify_plan_with_ai(
             detail="旅行计划不存在"
         )
     
-    # 使用 AI 根据反馈修改行程
+    # 使用 AI 根据反馈修改行程（交给模型的行程不带坐标，修改后未变化的地点沿用原坐标）
     try:
-        modified_itinerary = AIService.modify_itinerary_with_feedback(
-            current_itinerary=plan.itinerary,
+        modified_itinerary = await AIService.modify_itinerary_async(
+            current_itinerary=itinerary_geo.strip(plan.itinerary or {}),
             destination=plan.destination,
             days=plan.days,
             budget=plan.budget,
             travelers_count=plan.travelers_count,
-            user_feedback=request.feedback
+            user_feedback=request.feedback,
+            mode=request.mode
+        )
+        modified_itinerary = await itinerary_geo.enrich(
+            modified_itinerary, plan.destination, previous=plan.itinerary
         )
         
         # 更新行程数据
@@ -208,7 +527,12 @@ async def modify_plan_with_ai(
         db.refresh(plan)
         
         return plan
-        
+    
+    except LLMOverloadedError as busy_error:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(busy_error)
+        )
     except Exception as ai_error:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -216,6 +540,112 @@ async def modify_plan_with_ai(
         )
 
 
+@router.get("/plans/{plan_id}/weather")
+async def get_plan_weather(
+    plan_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    旅行计划每一天的天气预报
+    
+    高德只提供最近 4 天的预报，范围外的日期 weather 为 null；
+    创建计划时已在后台预取，通常直接从缓存返回。
+    """
+    
+    plan = db.query(TravelPlan).filter(
+        TravelPlan.id == plan_id,
+        TravelPlan.user_id == current_user.id
+    ).first()
+    
+    if not plan:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="旅行计划不存在"
+        )
+    
+    destination, start_date, end_date = plan.destination, plan.start_date.date(), plan.end_date.date()
+    # 等待高德期间不占用数据库连接
+    db.close()
+    
+    weather = await MapService.get_trip_weather(ItineraryGeo.city_of(destination), start_date, end_date)
+    for index, day in enumerate(weather["days"]):
+        day["day"] = index + 1
+    
+    return {
+        "travel_plan_id": plan_id,
+        "success": True,
+        **weather
+    }
+
+
+@router.post("/plans/{plan_id}/optimize-route")
+async def optimize_plan_route(
+    plan_id: int,
+    request: RouteOptimizationRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    按地理位置重新安排每天景点的游览顺序
+    
+    三餐和酒店位置固定，只在两个锚点之间调整景点顺序，各时间点保持不变。
+    使用行程中保存的坐标计算，不调用 AI；较早的计划没有坐标时先补全坐标，
+    补全的坐标不改变行程内容，无论是否 apply 都会保存，下次不必再请求高德。
+    """
+    
+    plan = db.query(TravelPlan).filter(
+        TravelPlan.id == plan_id,
+        TravelPlan.user_id == current_user.id
+    ).first()
+    
+    if not plan:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="旅行计划不存在"
+        )
+    
+    itinerary = plan.itinerary or {}
+    coordinates_saved = False
+    if not any(ItineraryGeo.COORDINATES_KEY in entry for entry, _, _ in ItineraryGeo.places(itinerary)):
+        itinerary = await itinerary_geo.enrich(itinerary, plan.destination)
+        coordinates_saved = itinerary != plan.itinerary
+    
+    optimized, reports = route_optimizer.optimize(itinerary, request.day)
+    if request.day is not None and not reports:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"行程中没有第 {request.day} 天"
+        )
+    
+    # 只有景点顺序变化才算优化；补全的坐标单独保存
+    changed = any(report["reordered"] for report in reports)
+    if request.apply and changed:
+        plan.itinerary = optimized
+    elif coordinates_saved:
+        plan.itinerary = itinerary
+    if (request.apply and changed) or coordinates_saved:
+        db.commit()
+    
+    return {
+        "travel_plan_id": plan.id,
+        "applied": request.apply and changed,
+        "coordinates_saved": coordinates_saved,
+        "distance_saved": sum(report["distance_saved"] for report in reports),
+        "days": [
+            {
+                "day": report["day"].get("day"),
+                "reordered": report["reordered"],
+                "distance_before": report["distance_before"],
+                "distance_after": report["distance_after"],
+                "distance_saved": report["distance_saved"],
+                "itinerary": report["day"]
+            }
+            for report in reports
+        ]
+    }
+
+
 @router.delete("/plans/{plan_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_travel_plan(
     plan_id: int,
@@ -237,6 +667,7 @@ async def delete_travel_plan(
     
     db.delete(plan)
     db.commit()
+    expense_analysis_cache.invalidate(plan_id)
     
     return None
 
@@ -4,7 +4,7 @@
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
 from pydantic import BaseModel
 from ..models import User
-from ..auth import get_current_user
+from ..auth import get_current_user_detached
 from ..services.voice_service import VoiceService
 from ..services.ai_service import AIService
 from ..schemas import VoiceRecognitionResponse
@@ -24,7 +24,7 @@ class VoiceQueryRequest(BaseModel):
 @router.post("/recognize", response_model=VoiceRecognitionResponse)
 async def recognize_voice(
     audio: UploadFile = File(...),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_detached)
 ):
     """
     语音识别（上传文件）
@@ -53,7 +53,7 @@ async def recognize_voice(
             print(f"📢 从文件名提取格式: {file_format}")
         
         # 进行语音识别
-        text = VoiceService.recognize_audio_file(audio_data, file_format)
+        text = await VoiceService.recognize_audio_file(audio_data, file_format)
         
         if not text:
             raise HTTPException(
@@ -92,7 +92,7 @@ async def recognize_voice(
 @router.post("/recognize-base64", response_model=VoiceRecognitionResponse)
 async def recognize_voice_base64(
     request: VoiceBase64Request,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_detached)
 ):
     """
     语音识别（Base64 编码）
@@ -100,7 +100,7 @@ async def recognize_voice_base64(
     """
     
     # 进行语音识别
-    text = VoiceService.recognize_from_base64(request.audio_data, request.format)
+    text = await VoiceService.recognize_from_base64(request.audio_data, request.format)
     
     if text is None:
         raise HTTPException(
@@ -117,7 +117,7 @@ async def recognize_voice_base64(
 @router.post("/parse-query")
 async def parse_voice_query(
     request: VoiceQueryRequest,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_detached)
 ):
     """
     解析语音查询
@@ -127,7 +127,7 @@ async def parse_voice_query(
     try:
         print(f"📢 解析语音查询: {request.text}")
         
-        result = AIService.parse_voice_query(request.text)
+        result = await AIService.parse_voice_query_async(request.text)
         
         print(f"✅ 语音查询解析成功: {result}")
         
@@ -42,6 +42,21 @@ class TravelPlanRequest(BaseModel):
     budget: float = Field(..., gt=0, description="预算（人民币）")
     travelers_count: int = Field(default=1, gt=0, description="同行人数")
     preferences: str = Field(default="", description="旅行偏好，如：喜欢美食、动漫、带孩子等")
+    use_cache: bool = Field(default=True, description="是否允许使用缓存的行程结果")
+    generation_mode: str = Field(
+        default="auto",
+        pattern="^(auto|single|parallel|fast)$",
+        description="生成模式：auto 自动选择、single 单次生成、parallel 骨架 + 每日并行生成、"
+                    "fast 按预算和人数缩放预生成的目的地行程（目录中没有时按 auto 生成）"
+    )
+    personalize: bool = Field(
+        default=False,
+        description="fast 模式命中预生成行程时，是否在后台按偏好调用 AI 个性化行程"
+    )
+    async_mode: bool = Field(
+        default=False,
+        description="是否异步生成：为 true 时立即返回任务，通过 /travel/jobs/{id} 查询结果"
+    )
 
 
 class TravelPlanCreate(BaseModel):
@@ -131,8 +146,62 @@ class ItineraryResponse(BaseModel):
     budget_breakdown: Dict[str, Any]
 
 
+# 异步生成任务
+class PlanJobResponse(BaseModel):
+    id: int
+    status: str = Field(..., description="任务状态：queued、running、succeeded、failed")
+    travel_plan_id: Optional[int] = None
+    error: Optional[str] = None
+    attempts: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+
 # AI 修改行程请求
 class ItineraryModificationRequest(BaseModel):
     """用户对行程的修改意见"""
     feedback: str = Field(..., description="用户的修改意见，如：我想多去几个博物馆、第二天想改成爬山等")
+    mode: str = Field(
+        default="auto",
+        pattern="^(auto|patch|full)$",
+        description="修改方式：auto/patch 增量修改（失败时回退到完整重新生成）、full 完整重新生成"
+    )
+
+
+class RouteOptimizationRequest(BaseModel):
+    """按地理位置优化景点游览顺序"""
+    day: Optional[int] = Field(default=None, ge=1, description="只优化第几天，不传则优化每一天")
+    apply: bool = Field(default=True, description="是否保存优化后的行程，false 时只返回结果")
+
+
+# 地图批量查询
+class GeocodeBatchRequest(BaseModel):
+    """批量地理编码"""
+    addresses: List[str] = Field(..., min_length=1, max_length=100, description="地址列表")
+    city: Optional[str] = Field(default=None, description="限定的城市")
+
+
+class POIBatchRequest(BaseModel):
+    """批量 POI 搜索"""
+    queries: List[str] = Field(..., min_length=1, max_length=100, description="POI 名称或关键词列表")
+    city: Optional[str] = Field(default=None, description="城市名称")
+    types: Optional[str] = Field(default=None, description="POI 类型")
+    limit: int = Field(default=1, ge=1, le=20, description="每个关键词返回的 POI 数")
+
+
+class RoutePoint(BaseModel):
+    """路线上的坐标点（与行程中保存的 coordinates 格式一致）"""
+    longitude: float = Field(..., ge=-180, le=180)
+    latitude: float = Field(..., ge=-90, le=90)
+
 
+class DayRouteRequest(BaseModel):
+    """一天行程的路线"""
+    points: List[RoutePoint] = Field(..., min_length=2, max_length=50, description="按游览顺序排列的坐标")
+    mode: str = Field(default="driving", pattern="^(driving|walking|transit)$", description="出行方式")
+    zoom: int = Field(default=14, ge=3, le=20, description="地图缩放级别，决定折线的精度")
+    city: Optional[str] = Field(default=None, description="城市（公交规划必填）")
@@ -2,81 +2,150 @@
 AI 服务 - 使用阿里云百炼进行行程规划和预算分析
 """
 import json
-from typing import Dict, Any
-import dashscope
-from dashscope import Generation
+import copy
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Iterator, AsyncIterator, Optional, Tuple
 from ..config import settings
+from .llm_provider import get_llm_provider
+from .plan_cache import plan_cache, PlanCache
+from .single_flight import ai_single_flight
+from .llm_scheduler import llm_scheduler, LLMScheduler, LLMOverloadedError
+from .model_router import model_router
+from .llm_telemetry import llm_telemetry, LLMTelemetry
+from .json_repair import loads_tolerant
+from .json_patch import apply_patch
+from .plan_salvage import plan_salvage, PlanSalvage
+from .voice_query_parser import VoiceQueryRuleParser
 
-# 设置阿里云百炼 API Key
-dashscope.api_key = settings.ALIYUN_BAILIAN_API_KEY
+# AI 调用专用线程池
+# 模型调用是同步阻塞调用，放到线程池中执行，避免一次生成阻塞整个事件循环
+_ai_executor = ThreadPoolExecutor(
+    max_workers=settings.AI_EXECUTOR_MAX_WORKERS,
+    thread_name_prefix="ai-worker"
+)
 
 
 class AIService:
     """AI 服务类"""
     
     @staticmethod
-    def _clean_json_string(json_str: str) -> str:
-        """
-        清理和修复 AI 返回的 JSON 字符串中的常见问题
+    async def _run_in_executor(func: Callable, *args, **kwargs):
+        """在 AI 线程池中执行同步函数，并异步等待结果"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _ai_executor,
+            functools.partial(func, *args, **kwargs)
+        )
+    
+    @staticmethod
+    def shutdown():
+        """关闭 AI 线程池（应用退出时调用）"""
+        _ai_executor.shutdown(wait=False)
+        model_router.shutdown()
+    
+    @staticmethod
+    def _call_llm(method: str, priority: int, expected_output_tokens: int, **kwargs):
         """
-        import re
+        经过调度器调用大模型（非流式），并记录调用遥测
         
-        # 修复无效的 estimated_cost 值
-        # 匹配 "estimated_cost": 后面跟着非数字的内容
-        # 例如: "estimated_cost": 交通+门票 约100  -> "estimated_cost": 100
-        json_str = re.sub(
-            r'"estimated_cost":\s*[^0-9"\[\{,\}]+(\d+)',
-            r'"estimated_cost": \1',
-            json_str
-        )
+        Args:
+            method: 发起调用的方法名，用于遥测统计
+            priority: LLMScheduler 的优先级（PRIORITY_INTERACTIVE / PRIORITY_MODIFY / PRIORITY_BACKGROUND）
+            expected_output_tokens: 预计输出的 Token 数，用于限流估算
+            **kwargs: 传给 LLMProvider.call 的参数（model、prompt 等）
         
-        # 修复纯中文的 estimated_cost
-        # 例如: "estimated_cost": 视个人消费而定  -> "estimated_cost": 0
-        json_str = re.sub(
-            r'"estimated_cost":\s*[^\d\",\[\{][^,\}]*(?=,|\})',
-            r'"estimated_cost": 0',
-            json_str
-        )
+        Raises:
+            LLMOverloadedError: 排队已满或等待超时
+        """
+        estimated = llm_scheduler.estimate_tokens(kwargs.get("prompt", ""), expected_output_tokens)
+        record = llm_telemetry.begin(method, kwargs.get("model", ""), kwargs.get("prompt", ""), estimated)
+        try:
+            with llm_scheduler.slot(priority, estimated) as ticket:
+                llm_telemetry.admitted(record)
+                response = get_llm_provider().call(**kwargs)
+        except LLMOverloadedError:
+            llm_telemetry.end_call(record, LLMTelemetry.OUTCOME_OVERLOADED)
+            raise
+        except Exception:
+            llm_telemetry.end_call(record, LLMTelemetry.OUTCOME_EXCEPTION)
+            raise
+        llm_telemetry.end_call(record, LLMTelemetry.classify(response), response)
         
-        # 修复数学表达式
-        # 例如: "estimated_cost": 1000 + 100 = 1100  -> "estimated_cost": 1100
-        json_str = re.sub(
-            r'"estimated_cost":\s*[\d\s\+\-\*\/=]+?(\d+)(?=\s*[,\}])',
-            r'"estimated_cost": \1',
-            json_str
-        )
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            actual = (getattr(usage, "input_tokens", 0) or 0) + (getattr(usage, "output_tokens", 0) or 0)
+            llm_scheduler.settle(ticket, actual)
+        return response
+    
+    @staticmethod
+    def _stream_llm(method: str, priority: int, expected_output_tokens: int, **kwargs) -> Iterator[Any]:
+        """经过调度器调用大模型（流式增量输出），整个流结束前一直占用并发名额"""
+        estimated = llm_scheduler.estimate_tokens(kwargs.get("prompt", ""), expected_output_tokens)
+        record = llm_telemetry.begin(method, kwargs.get("model", ""), kwargs.get("prompt", ""), estimated, streamed=True)
+        outcome = LLMTelemetry.OUTCOME_OK
+        last = None
+        try:
+            with llm_scheduler.slot(priority, estimated):
+                llm_telemetry.admitted(record)
+                for response in get_llm_provider().stream(**kwargs):
+                    llm_telemetry.first_token(record)
+                    if response.status_code != 200:
+                        outcome = LLMTelemetry.classify(response)
+                    if getattr(response, "usage", None) is not None:
+                        last = response
+                    yield response
+        except LLMOverloadedError:
+            outcome = LLMTelemetry.OUTCOME_OVERLOADED
+            raise
+        except Exception:
+            outcome = LLMTelemetry.OUTCOME_EXCEPTION
+            raise
+        finally:
+            llm_telemetry.end_call(record, outcome, last)
+    
+    @staticmethod
+    def _parse_json_content(content: str) -> Dict[str, Any]:
+        """
+        从 AI 返回的文本中提取 JSON 对象并解析，格式不规范时自动修复
         
-        # 移除 JSON 中的注释（如果有）
-        json_str = re.sub(r'//.*?\n', '\n', json_str)
-        json_str = re.sub(r'/\*.*?\*/', '', json_str, flags=re.DOTALL)
+        修复和 json.loads 的耗时、触发的修复规则记录到当前线程最近一次调用的遥测中。
         
-        # 修复结尾逗号问题（JSON 不允许尾随逗号）
-        json_str = re.sub(r',(\s*[}\]])', r'\1', json_str)
+        Raises:
+            ValueError: 文本中没有 JSON 对象
+            json.JSONDecodeError: 修复后仍无法解析
+        """
+        timings: Dict[str, float] = {}
+        try:
+            result, repairs = loads_tolerant(content, timings)
+        except ValueError as e:
+            outcome = (
+                LLMTelemetry.PARSE_INVALID if isinstance(e, json.JSONDecodeError) else LLMTelemetry.PARSE_NO_JSON
+            )
+            llm_telemetry.record_parse(outcome, timings.get("repair", 0.0), timings.get("loads", 0.0), {})
+            raise
         
-        return json_str
+        llm_telemetry.record_parse(
+            LLMTelemetry.PARSE_REPAIRED if repairs else LLMTelemetry.PARSE_CLEAN,
+            timings["repair"],
+            timings["loads"],
+            repairs
+        )
+        if repairs:
+            print(f"🧹 JSON 已修复: {repairs}")
+        return result
     
     @staticmethod
-    def generate_travel_plan(
+    def _build_travel_plan_prompt(
         destination: str,
         days: int,
         budget: float,
         travelers_count: int,
         preferences: str
-    ) -> Dict[str, Any]:
-        """
-        生成旅行计划
-        
-        Args:
-            destination: 目的地
-            days: 旅行天数
-            budget: 预算
-            travelers_count: 旅行人数
-            preferences: 旅行偏好
-            
-        Returns:
-            包含行程和预算分析的字典
-        """
-        prompt = f"""你是一个专业且安全的旅行规划助手。请根据以下信息生成合法、健康、积极的旅行计划：
+    ) -> str:
+        """构建生成旅行计划的提示词"""
+        return f"""你是一个专业且安全的旅行规划助手。请根据以下信息生成合法、健康、积极的旅行计划：
 
 目的地：{destination}
 旅行天数：{days}天
@@ -224,22 +293,133 @@ class AIService:
 
 只返回 JSON 内容，不要添加其他解释文字。
 """
+    
+    @staticmethod
+    def _salvage_plan(
+        method: str,
+        priority: int,
+        model: str,
+        content: str,
+        parsed: Any,
+        error_msg: str,
+        destination: str,
+        days: int,
+        budget: float,
+        travelers_count: int,
+        preferences: str,
+        required: list,
+        feedback: str = "",
+        reference: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        整体解析失败或结果不完整时，保留完好的天和字段，只请求模型补全缺失的部分
+        
+        补全使用同一个模型，不再经过档位路由和对冲。
+        
+        Args:
+            method: 发起生成的方法名，用于补全统计
+            parsed: 整体解析的结果，解析失败时为 None
+            error_msg: 整体解析失败的错误信息
+            required: 完整行程必需的顶层字段
+            feedback: 用户的修改意见（修改行程时）
+            reference: 修改前的行程，缺失部分的原内容作为补全的参考
         
+        Returns:
+            补全后的完整行程；无法补全但整体解析成功时返回 parsed
+        
+        Raises:
+            Exception: 整体解析失败且无法补全，由模型路由按原逻辑整体重试
+        """
+        def give_up(outcome: str, reason: str, kept: int = 0, regenerated: int = 0) -> Dict[str, Any]:
+            plan_salvage.record(method, outcome, kept, regenerated)
+            if parsed is not None:
+                print(f"⚠️ 行程补全未完成（{reason}），使用整体解析结果")
+                return parsed
+            raise Exception(f"{error_msg}（{reason}）")
+        
+        salvaged = PlanSalvage.extract(content, days)
+        missing_days, missing_keys = PlanSalvage.missing(salvaged, days, required)
+        kept = PlanSalvage.section_count(salvaged)
+        regenerated = len(missing_days) + len(missing_keys)
+        if not salvaged["days"]:
+            return give_up(PlanSalvage.OUTCOME_UNSALVAGEABLE, "没有可保留的行程")
+        if not regenerated:
+            plan_salvage.record(method, PlanSalvage.OUTCOME_SALVAGED, kept, 0)
+            return PlanSalvage.assemble(salvaged)
+        
+        print(f"🩹 行程部分损坏: 保留 {kept} 段, 补全第 {missing_days} 天和 {missing_keys}")
+        prompt = PlanSalvage.build_prompt(
+            destination, days, budget, travelers_count, preferences,
+            salvaged, missing_days, missing_keys, feedback, reference
+        )
         try:
-            print(f"\n{'='*60}")
-            print(f"开始调用 AI 生成旅行计划")
-            print(f"目的地: {destination}, 天数: {days}, 预算: {budget}")
-            print(f"{'='*60}\n")
+            response = AIService._call_llm(
+                "complete_plan_sections",
+                priority,
+                700 * len(missing_days) + 150 * len(missing_keys),
+                model=model,
+                prompt=prompt,
+                result_format='message'
+            )
+            if response.status_code != 200:
+                raise Exception(f"API 调用失败 - 状态码: {response.status_code}, 消息: {response.message}")
+            completion = AIService._parse_json_content(response.output.choices[0].message.content)
+        except Exception as e:
+            print(f"❌ 行程补全失败（{model}）: {str(e)}")
+            return give_up(PlanSalvage.OUTCOME_FAILED, f"补全失败: {str(e)}", kept, regenerated)
+        
+        PlanSalvage.merge(salvaged, completion, days, missing_days, missing_keys)
+        still_missing_days, still_missing_keys = PlanSalvage.missing(salvaged, days, required)
+        if still_missing_days or still_missing_keys:
+            return give_up(
+                PlanSalvage.OUTCOME_FAILED,
+                f"补全后仍缺少第 {still_missing_days} 天和 {still_missing_keys}",
+                kept,
+                regenerated
+            )
+        
+        plan_salvage.record(method, PlanSalvage.OUTCOME_SALVAGED, kept, regenerated)
+        print(f"✅ 行程补全成功: 重新生成 {regenerated} 段，避免整体重试")
+        return PlanSalvage.assemble(salvaged)
+    
+    @staticmethod
+    def generate_travel_plan(
+        destination: str,
+        days: int,
+        budget: float,
+        travelers_count: int,
+        preferences: str
+    ) -> Dict[str, Any]:
+        """
+        生成旅行计划
+        
+        Args:
+            destination: 目的地
+            days: 旅行天数
+            budget: 预算
+            travelers_count: 旅行人数
+            preferences: 旅行偏好
             
-            response = Generation.call(
-                model='qwen-max',  # 使用通义千问最强模型
+        Returns:
+            包含行程和预算分析的字典
+        """
+        prompt = AIService._build_travel_plan_prompt(
+            destination, days, budget, travelers_count, preferences
+        )
+        required = list(PlanSalvage.REQUIRED_SECTIONS)
+        
+        def attempt(model: str) -> Dict[str, Any]:
+            response = AIService._call_llm(
+                "generate_travel_plan",
+                LLMScheduler.PRIORITY_INTERACTIVE,
+                4000,
+                model=model,
                 prompt=prompt,
                 result_format='message'
             )
             
             print(f"\n{'='*60}")
-            print(f"AI API 响应状态码: {response.status_code}")
-            print(f"完整响应对象: {response}")
+            print(f"AI API 响应状态码（{model}）: {response.status_code}")
             print(f"{'='*60}\n")
             
             if response.status_code == 200:
@@ -250,30 +430,28 @@ class AIService:
                 print(content)
                 print(f"{'='*60}\n")
                 
-                # 尝试提取和修复 JSON
+                # 提取 JSON，格式不规范时自动修复
                 try:
-                    # 查找 JSON 块
-                    start_idx = content.find('{')
-                    end_idx = content.rfind('}')
-                    if start_idx != -1 and end_idx != -1:
-                        json_str = content[start_idx:end_idx + 1]
-                        
-                        # 清理 JSON 字符串，修复常见问题
-                        json_str = AIService._clean_json_string(json_str)
-                        
-                        result = json.loads(json_str)
-                        print(f"✅ JSON 解析成功")
+                    result = AIService._parse_json_content(content)
+                    print(f"✅ JSON 解析成功")
+                    if PlanSalvage.is_complete(result, days, required):
                         return result
-                    else:
-                        error_msg = "AI 返回的内容中未找到 JSON 格式数据"
-                        print(f"❌ {error_msg}")
-                        raise Exception(error_msg)
-                        
+                    error_msg = "行程内容不完整"
                 except json.JSONDecodeError as json_err:
+                    result = None
                     error_msg = f"JSON 解析失败: {str(json_err)}"
                     print(f"❌ {error_msg}")
-                    print(f"尝试修复的 JSON 字符串前500字符:\n{json_str[:500]}")
-                    raise Exception(error_msg)
+                    print(f"AI 返回内容前500字符:\n{content[:500]}")
+                except ValueError as no_json_err:
+                    result = None
+                    error_msg = str(no_json_err)
+                    print(f"❌ {error_msg}")
+                
+                # 保留完好的部分，只补全缺失或损坏的天和字段
+                return AIService._salvage_plan(
+                    "generate_travel_plan", LLMScheduler.PRIORITY_INTERACTIVE, model, content, result, error_msg,
+                    destination, days, budget, travelers_count, preferences, required
+                )
             else:
                 error_code = getattr(response, 'code', '')
                 error_msg = f"API 调用失败 - 状态码: {response.status_code}, 消息: {response.message}"
@@ -287,7 +465,17 @@ class AIService:
                 if error_code:
                     error_msg += f", 错误代码: {error_code}"
                 raise Exception(error_msg)
-                
+        
+        try:
+            print(f"\n{'='*60}")
+            print(f"开始调用 AI 生成旅行计划")
+            print(f"目的地: {destination}, 天数: {days}, 预算: {budget}")
+            print(f"{'='*60}\n")
+            
+            return model_router.call("travel_plan", attempt)
+        
+        except LLMOverloadedError:
+            raise
         except Exception as e:
             # 记录详细错误信息
             print(f"\n{'='*60}")
@@ -302,6 +490,284 @@ class AIService:
             # 直接抛出异常，不返回默认数据
             raise Exception(f"AI 旅行计划生成失败: {str(e)}")
     
+    @staticmethod
+    def stream_travel_plan(
+        destination: str,
+        days: int,
+        budget: float,
+        travelers_count: int,
+        preferences: str
+    ) -> Iterator[str]:
+        """
+        流式生成旅行计划，使用增量输出逐段返回模型生成的文本
+        
+        Args:
+            destination: 目的地
+            days: 旅行天数
+            budget: 预算
+            travelers_count: 旅行人数
+            preferences: 旅行偏好
+            
+        Yields:
+            模型新生成的文本片段
+        """
+        prompt = AIService._build_travel_plan_prompt(
+            destination, days, budget, travelers_count, preferences
+        )
+        
+        print(f"\n{'='*60}")
+        print(f"开始流式调用 AI 生成旅行计划")
+        print(f"目的地: {destination}, 天数: {days}, 预算: {budget}")
+        print(f"{'='*60}\n")
+        
+        # 流式输出无法对冲，只按档位选择模型
+        responses = AIService._stream_llm(
+            "stream_travel_plan",
+            LLMScheduler.PRIORITY_INTERACTIVE,
+            4000,
+            model=model_router.model_for(model_router.tiers_for("travel_plan")[0]),
+            prompt=prompt,
+            result_format='message'
+        )
+        
+        for response in responses:
+            if response.status_code != 200:
+                error_code = getattr(response, 'code', '')
+                error_msg = f"API 调用失败 - 状态码: {response.status_code}, 消息: {response.message}"
+                if error_code == 'DataInspectionFailed' or 'inappropriate content' in str(response.message):
+                    error_msg = "AI 内容审核触发，请尝试修改旅行偏好或目的地描述，避免使用敏感词汇"
+                print(f"❌ {error_msg}")
+                raise Exception(error_msg)
+            
+            choices = response.output.choices
+            if choices and choices[0].message.content:
+                yield choices[0].message.content
+    
+    @staticmethod
+    def _generate_json(
+        prompt: str,
+        purpose: str,
+        task: str,
+        method: str,
+        priority: int = LLMScheduler.PRIORITY_INTERACTIVE,
+        expected_output_tokens: int = 1000
+    ) -> Dict[str, Any]:
+        """按任务的模型档位调用模型，并把返回内容解析为 JSON 对象"""
+        def attempt(model: str) -> Dict[str, Any]:
+            response = AIService._call_llm(
+                method,
+                priority,
+                expected_output_tokens,
+                model=model,
+                prompt=prompt,
+                result_format='message'
+            )
+            
+            if response.status_code != 200:
+                error_msg = f"API 调用失败 - 状态码: {response.status_code}, 消息: {response.message}"
+                print(f"❌ {purpose}失败（{model}）: {error_msg}")
+                raise Exception(error_msg)
+            
+            content = response.output.choices[0].message.content
+            try:
+                return AIService._parse_json_content(content)
+            except (json.JSONDecodeError, ValueError) as parse_err:
+                print(f"❌ {purpose} JSON 解析失败（{model}）: {str(parse_err)}")
+                raise Exception(f"JSON 解析失败: {str(parse_err)}")
+        
+        return model_router.call(task, attempt)
+    
+    @staticmethod
+    def generate_plan_skeleton(
+        destination: str,
+        days: int,
+        budget: float,
+        travelers_count: int,
+        preferences: str
+    ) -> Dict[str, Any]:
+        """
+        生成行程骨架（并行生成模式的第一阶段）
+        
+        只包含行程概述、每天的主题和区域、交通、住宿、预算分配和建议，
+        输出远小于完整行程，每天的详细安排由 generate_day_itinerary 并行生成。
+        
+        Returns:
+            行程骨架字典，day_themes 的长度等于旅行天数
+        """
+        prompt = f"""你是一个专业且安全的旅行规划助手。请为以下旅行先制定一个行程骨架：
+
+目的地：{destination}
+旅行天数：{days}天
+预算：{budget}元人民币
+旅行人数：{travelers_count}人
+偏好：{preferences or '常规旅游'}
+
+要求：
+1. 生成内容必须合法合规，推荐正规的旅游景点和合法的商业场所
+2. day_themes 必须正好包含 {days} 天，每天给出主题和主要游览区域，不同天的区域尽量不重复
+3. 所有费用必须使用纯数字
+4. 酒店必须给出具体名称，并包含 poi_name 字段用于地图搜索
+
+请严格按照以下 JSON 格式返回：
+{{
+    "overview": "行程概述",
+    "day_themes": [
+        {{"day": 1, "title": "第一天标题", "area": "主要游览区域", "focus": "当天重点（景点类型、节奏等）", "daily_budget": 300}}
+    ],
+    "transportation": {{
+        "to_destination": "前往目的地的交通方式",
+        "local": "当地交通建议",
+        "estimated_cost": 500
+    }},
+    "accommodation_summary": {{
+        "type": "酒店类型",
+        "hotels": [
+            {{"name": "具体酒店名称", "address": "酒店地址", "price_range": "价格区间", "rating": "评分", "poi_name": "酒店POI名称", "features": ["特色1", "特色2"]}}
+        ],
+        "estimated_cost_per_night": 200,
+        "total_nights": {max(days - 1, 0)},
+        "total_cost": 600
+    }},
+    "budget_breakdown": {{
+        "transportation": 500,
+        "accommodation": 600,
+        "meals": 400,
+        "attractions": 300,
+        "shopping": 200,
+        "emergency": 100,
+        "total": 2100
+    }},
+    "tips": ["旅行建议1", "旅行建议2", "旅行建议3"]
+}}
+
+只返回 JSON 内容，不要添加其他解释文字。
+"""
+        skeleton = AIService._generate_json(prompt, "行程骨架生成", "plan_skeleton", "generate_plan_skeleton")
+        
+        themes = skeleton.get("day_themes")
+        if not isinstance(themes, list) or len(themes) != days:
+            raise Exception(f"行程骨架天数不匹配: 期望 {days} 天")
+        
+        return skeleton
+    
+    @staticmethod
+    def generate_day_itinerary(
+        destination: str,
+        day_theme: Dict[str, Any],
+        skeleton: Dict[str, Any],
+        travelers_count: int,
+        preferences: str
+    ) -> Dict[str, Any]:
+        """
+        根据行程骨架生成某一天的详细行程（并行生成模式的第二阶段）
+        
+        Args:
+            destination: 目的地
+            day_theme: 骨架中当天的主题
+            skeleton: 完整的行程骨架，作为上下文避免各天重复
+            travelers_count: 旅行人数
+            preferences: 旅行偏好
+            
+        Returns:
+            与 daily_itinerary 中单个元素格式相同的字典
+        """
+        day = day_theme.get("day")
+        all_themes = "\n".join(
+            f"- 第{theme.get('day')}天：{theme.get('title', '')}（{theme.get('area', '')}）"
+            for theme in skeleton.get("day_themes", [])
+        )
+        hotels = "、".join(
+            hotel.get("name", "") for hotel in skeleton.get("accommodation_summary", {}).get("hotels", [])
+        )
+        
+        prompt = f"""你是一个专业且安全的旅行规划助手。请为{destination}之旅的第{day}天生成详细行程。
+
+整体行程概述：{skeleton.get('overview', '')}
+各天安排：
+{all_themes}
+
+第{day}天主题：{day_theme.get('title', '')}
+游览区域：{day_theme.get('area', '')}
+当天重点：{day_theme.get('focus', '')}
+当天预算：{day_theme.get('daily_budget', '')}元
+旅行人数：{travelers_count}人
+偏好：{preferences or '常规旅游'}
+推荐酒店：{hotels}
+
+要求：
+1. 只安排第{day}天的活动，不要与其他天的景点重复
+2. 所有费用必须使用纯数字
+3. 每个活动、餐厅、酒店都必须包含 poi_name 字段，用于地图搜索
+4. 必须给出具体的餐厅名称和酒店名称
+
+请严格按照以下 JSON 格式返回：
+{{
+    "day": {day},
+    "title": "{day_theme.get('title', '')}",
+    "activities": [
+        {{
+            "time": "09:00",
+            "activity": "活动名称",
+            "location": "地点",
+            "poi_name": "精确的景点名称用于地图搜索",
+            "description": "详细描述",
+            "estimated_cost": 50,
+            "duration": "2小时"
+        }}
+    ],
+    "meals": {{
+        "breakfast": {{"restaurant_name": "具体餐厅名称", "address": "餐厅地址", "specialty": "特色菜品", "avg_cost": 30, "poi_name": "餐厅POI名称"}},
+        "lunch": {{"restaurant_name": "具体餐厅名称", "address": "餐厅地址", "specialty": "特色菜品", "avg_cost": 50, "poi_name": "餐厅POI名称"}},
+        "dinner": {{"restaurant_name": "具体餐厅名称", "address": "餐厅地址", "specialty": "特色菜品", "avg_cost": 80, "poi_name": "餐厅POI名称"}}
+    }},
+    "accommodation": {{
+        "hotel_name": "具体酒店名称",
+        "address": "酒店地址",
+        "room_type": "房型建议",
+        "price_per_night": 300,
+        "poi_name": "酒店POI名称",
+        "features": ["酒店特色1", "酒店特色2"]
+    }}
+}}
+
+只返回 JSON 内容，不要添加其他解释文字。
+"""
+        result = AIService._generate_json(prompt, f"第{day}天行程生成", "day_itinerary", "generate_day_itinerary")
+        result["day"] = day
+        return result
+    
+    @staticmethod
+    def _merge_parallel_plan(skeleton: Dict[str, Any], daily_itinerary: list) -> Dict[str, Any]:
+        """把行程骨架和并行生成的每日行程合并为与单次生成相同的结构"""
+        restaurants = []
+        seen = set()
+        for day_plan in daily_itinerary:
+            for meal_type, meal in (day_plan.get("meals") or {}).items():
+                if not isinstance(meal, dict):
+                    continue
+                name = meal.get("restaurant_name")
+                if not name or name in seen:
+                    continue
+                seen.add(name)
+                restaurants.append({
+                    "name": name,
+                    "address": meal.get("address", ""),
+                    "specialty": meal.get("specialty", ""),
+                    "avg_cost": meal.get("avg_cost", 0),
+                    "poi_name": meal.get("poi_name", name),
+                    "recommended_for": meal_type
+                })
+        
+        return {
+            "overview": skeleton.get("overview", ""),
+            "daily_itinerary": sorted(daily_itinerary, key=lambda item: item.get("day", 0)),
+            "transportation": skeleton.get("transportation", {}),
+            "accommodation_summary": skeleton.get("accommodation_summary", {}),
+            "restaurant_recommendations": restaurants,
+            "budget_breakdown": skeleton.get("budget_breakdown", {}),
+            "tips": skeleton.get("tips", [])
+        }
+    
     @staticmethod
     def analyze_expense(
         travel_plan_info: str,
@@ -318,6 +784,10 @@ class AIService:
             
         Returns:
             分析结果和建议
+        
+        Raises:
+            LLMOverloadedError: 排队已满或等待超时
+            Exception: 模型调用失败或返回内容为空
         """
         prompt = f"""你是一个旅行预算分析助手。请分析以下信息：
 
@@ -335,20 +805,25 @@ class AIService:
 请用简洁友好的语言回答。
 """
         
-        try:
-            response = Generation.call(
-                model='qwen-max',
+        def attempt(model: str) -> str:
+            response = AIService._call_llm(
+                "analyze_expense",
+                LLMScheduler.PRIORITY_BACKGROUND,
+                500,
+                model=model,
                 prompt=prompt,
                 result_format='message'
             )
             
-            if response.status_code == 200:
-                return response.output.choices[0].message.content
-            else:
-                return "预算分析暂时不可用，请稍后再试。"
-                
-        except Exception as e:
-            return f"预算分析失败：{str(e)}"
+            if response.status_code != 200:
+                raise Exception(f"API 调用失败 - 状态码: {response.status_code}, 消息: {response.message}")
+            content = response.output.choices[0].message.content
+            if not content or not content.strip():
+                raise Exception("AI 返回内容为空")
+            return content
+        
+        # 失败时直接抛出，由调用方标记为失败并在下次请求时重试，不把错误提示当作分析结果缓存
+        return model_router.call("expense_analysis", attempt)
     
     @staticmethod
     def modify_itinerary_with_feedback(
@@ -374,7 +849,7 @@ class AIService:
             修改后的行程数据
         """
         # 将当前行程转换为简洁的文本描述
-        current_plan_summary = json.dumps(current_itinerary, ensure_ascii=False, indent=2)
+        current_plan_summary = json.dumps(current_itinerary, ensure_ascii=False, separators=(',', ':'))
         
         prompt = f"""你是一个专业的旅行规划助手。用户有一个现有的旅行计划，现在需要根据他们的反馈进行调整。
 
@@ -479,21 +954,20 @@ class AIService:
 
 只返回 JSON 内容，不要添加其他解释文字。
 """
+        required = PlanSalvage.required_sections(current_itinerary)
         
-        try:
-            print(f"\n{'='*60}")
-            print(f"开始调用 AI 修改行程")
-            print(f"用户反馈: {user_feedback}")
-            print(f"{'='*60}\n")
-            
-            response = Generation.call(
-                model='qwen-max',
+        def attempt(model: str) -> Dict[str, Any]:
+            response = AIService._call_llm(
+                "modify_itinerary_with_feedback",
+                LLMScheduler.PRIORITY_MODIFY,
+                4000,
+                model=model,
                 prompt=prompt,
                 result_format='message'
             )
             
             print(f"\n{'='*60}")
-            print(f"AI API 响应状态码: {response.status_code}")
+            print(f"AI API 响应状态码（{model}）: {response.status_code}")
             print(f"{'='*60}\n")
             
             if response.status_code == 200:
@@ -506,31 +980,41 @@ class AIService:
                 
                 # 提取和修复 JSON
                 try:
-                    start_idx = content.find('{')
-                    end_idx = content.rfind('}')
-                    if start_idx != -1 and end_idx != -1:
-                        json_str = content[start_idx:end_idx + 1]
-                        
-                        # 清理 JSON 字符串
-                        json_str = AIService._clean_json_string(json_str)
-                        
-                        result = json.loads(json_str)
-                        print(f"✅ JSON 解析成功")
+                    result = AIService._parse_json_content(content)
+                    print(f"✅ JSON 解析成功")
+                    if PlanSalvage.is_complete(result, days, required):
                         return result
-                    else:
-                        error_msg = "AI 返回的内容中未找到 JSON 格式数据"
-                        print(f"❌ {error_msg}")
-                        raise Exception(error_msg)
-                        
+                    error_msg = "行程内容不完整"
                 except json.JSONDecodeError as json_err:
+                    result = None
                     error_msg = f"JSON 解析失败: {str(json_err)}"
                     print(f"❌ {error_msg}")
-                    raise Exception(error_msg)
+                except ValueError as no_json_err:
+                    result = None
+                    error_msg = str(no_json_err)
+                    print(f"❌ {error_msg}")
+                
+                # 保留完好的部分，只补全缺失或损坏的天和字段，附上原行程中对应的内容作为参考
+                return AIService._salvage_plan(
+                    "modify_itinerary_with_feedback", LLMScheduler.PRIORITY_MODIFY, model, content, result, error_msg,
+                    destination, days, budget, travelers_count, "", required,
+                    feedback=user_feedback, reference=current_itinerary
+                )
             else:
                 error_msg = f"API 调用失败 - 状态码: {response.status_code}, 消息: {response.message}"
                 print(f"❌ {error_msg}")
                 raise Exception(error_msg)
-                
+        
+        try:
+            print(f"\n{'='*60}")
+            print(f"开始调用 AI 修改行程")
+            print(f"用户反馈: {user_feedback}")
+            print(f"{'='*60}\n")
+            
+            return model_router.call("modify_itinerary", attempt)
+        
+        except LLMOverloadedError:
+            raise
         except Exception as e:
             print(f"\n{'='*60}")
             print(f"❌ AI 修改行程失败")
@@ -543,6 +1027,162 @@ class AIService:
             
             raise Exception(f"AI 行程修改失败: {str(e)}")
     
+    @staticmethod
+    def validate_itinerary(itinerary: Any, days: int):
+        """校验行程结构（修改后的行程、预生成目录条目等），不合法时抛出 ValueError"""
+        if not isinstance(itinerary, dict):
+            raise ValueError("行程必须是对象")
+        
+        daily_itinerary = itinerary.get("daily_itinerary")
+        if not isinstance(daily_itinerary, list) or len(daily_itinerary) != days:
+            raise ValueError(f"daily_itinerary 必须正好包含 {days} 天")
+        for day_plan in daily_itinerary:
+            if not isinstance(day_plan, dict) or "day" not in day_plan:
+                raise ValueError("每一天的行程必须是包含 day 字段的对象")
+        
+        if not isinstance(itinerary.get("budget_breakdown", {}), dict):
+            raise ValueError("budget_breakdown 必须是对象")
+    
+    @staticmethod
+    def _apply_itinerary_patch(
+        current_itinerary: Dict[str, Any],
+        patch: Dict[str, Any],
+        days: int
+    ) -> Dict[str, Any]:
+        """
+        把 AI 返回的增量修改应用到行程上
+        
+        Args:
+            current_itinerary: 当前行程
+            patch: {"replace_days": [整天行程...], "operations": [JSON Patch 操作...]}
+            days: 旅行天数
+            
+        Returns:
+            修改后的行程（新对象）
+            
+        Raises:
+            ValueError: 补丁无效或修改后的行程结构不合法
+        """
+        replace_days = patch.get("replace_days") or []
+        operations = patch.get("operations") or []
+        if not isinstance(replace_days, list) or not isinstance(operations, list):
+            raise ValueError("replace_days 和 operations 必须是列表")
+        if not replace_days and not operations:
+            raise ValueError("补丁中没有任何修改")
+        
+        itinerary = copy.deepcopy(current_itinerary)
+        daily_itinerary = itinerary.get("daily_itinerary") or []
+        
+        # 先整天替换
+        for new_day in replace_days:
+            if not isinstance(new_day, dict):
+                raise ValueError("replace_days 中的每一项必须是对象")
+            day = new_day.get("day")
+            index = next(
+                (i for i, day_plan in enumerate(daily_itinerary) if day_plan.get("day") == day),
+                None
+            )
+            if index is None:
+                raise ValueError(f"第{day}天不存在")
+            daily_itinerary[index] = new_day
+        
+        # 再应用细粒度的 JSON Patch
+        itinerary = apply_patch(itinerary, operations)
+        
+        AIService.validate_itinerary(itinerary, days)
+        return itinerary
+    
+    @staticmethod
+    def modify_itinerary_with_patch(
+        current_itinerary: Dict[str, Any],
+        destination: str,
+        days: int,
+        budget: float,
+        travelers_count: int,
+        user_feedback: str
+    ) -> Dict[str, Any]:
+        """
+        根据用户反馈增量修改行程
+        
+        模型只返回需要修改的内容（整天替换或 JSON Patch 操作），而不是整份行程，
+        小幅修改的输出 token 和耗时都大幅减少。
+        
+        Args:
+            current_itinerary: 当前的行程数据
+            destination: 目的地
+            days: 旅行天数
+            budget: 预算
+            travelers_count: 旅行人数
+            user_feedback: 用户的修改意见
+            
+        Returns:
+            修改后的行程数据
+            
+        Raises:
+            Exception: 模型调用失败、补丁无效或修改后的行程不合法
+        """
+        current_plan_json = json.dumps(current_itinerary, ensure_ascii=False, separators=(',', ':'))
+        
+        prompt = f"""你是一个专业的旅行规划助手。用户有一个现有的旅行计划，现在需要根据他们的反馈进行调整。
+
+原始旅行计划信息：
+- 目的地：{destination}
+- 旅行天数：{days}天
+- 预算：{budget}元人民币
+- 旅行人数：{travelers_count}人
+
+当前行程内容（JSON）：
+{current_plan_json}
+
+用户的修改意见：
+{user_feedback}
+
+请只返回需要修改的部分，不要返回完整行程。有两种修改方式，可以同时使用：
+1. replace_days：整天替换。某一天需要大幅调整时，给出这一天完整的新行程（格式与 daily_itinerary 中的元素相同，day 字段保持不变）
+2. operations：JSON Patch（RFC 6902）操作，用于小范围修改。path 使用 JSON Pointer，例如：
+   - 修改第二天标题：{{"op": "replace", "path": "/daily_itinerary/1/title", "value": "新标题"}}
+   - 第一天增加一个活动：{{"op": "add", "path": "/daily_itinerary/0/activities/-", "value": {{...}}}}
+   - 删除第三天第二个活动：{{"op": "remove", "path": "/daily_itinerary/2/activities/1"}}
+   - 修改预算：{{"op": "replace", "path": "/budget_breakdown/total", "value": 2000}}
+
+要求：
+1. 只修改用户提到的部分，其他部分保持不变
+2. 所有费用必须使用纯数字
+3. 新增或替换的活动、餐厅、酒店必须包含 poi_name 字段，并给出具体名称
+4. 如果修改影响了费用，同时修改 budget_breakdown 中对应的项目和 total
+5. 数组下标从 0 开始，第 N 天对应 /daily_itinerary/N-1
+
+请严格按照以下 JSON 格式返回：
+{{
+    "replace_days": [],
+    "operations": [
+        {{"op": "replace", "path": "/daily_itinerary/1/title", "value": "新标题"}}
+    ]
+}}
+
+只返回 JSON 内容，不要添加其他解释文字。
+"""
+        
+        print(f"\n{'='*60}")
+        print(f"开始调用 AI 增量修改行程")
+        print(f"用户反馈: {user_feedback}")
+        print(f"{'='*60}\n")
+        
+        patch = AIService._generate_json(
+            prompt, "行程增量修改", "modify_itinerary", "modify_itinerary_with_patch", LLMScheduler.PRIORITY_MODIFY
+        )
+        try:
+            result = AIService._apply_itinerary_patch(current_itinerary, patch, days)
+        except ValueError as patch_err:
+            print(f"❌ 行程补丁无效: {str(patch_err)}")
+            raise Exception(f"行程补丁无效: {str(patch_err)}")
+        
+        print(
+            f"✅ 行程补丁应用成功: 替换 {len(patch.get('replace_days') or [])} 天, "
+            f"{len(patch.get('operations') or [])} 个操作"
+        )
+        return result
+    
     @staticmethod
     def parse_voice_query(text: str) -> Dict[str, Any]:
         """
@@ -608,41 +1248,34 @@ class AIService:
 只返回 JSON，不要包含任何其他内容！
 """
         
-        try:
-            response = Generation.call(
-                model='qwen-max',
+        def attempt(model: str) -> Dict[str, Any]:
+            response = AIService._call_llm(
+                "parse_voice_query",
+                LLMScheduler.PRIORITY_INTERACTIVE,
+                200,
+                model=model,
                 prompt=prompt,
                 result_format='message'
             )
             
-            if response.status_code == 200:
-                content = response.output.choices[0].message.content
-                print(f"📢 AI 原始响应: {content[:200]}...")
-                
-                # 提取 JSON
-                start_idx = content.find('{')
-                end_idx = content.rfind('}')
-                if start_idx != -1 and end_idx != -1:
-                    json_str = content[start_idx:end_idx + 1]
-                    
-                    # 使用 _clean_json_string 清理 JSON
-                    json_str = AIService._clean_json_string(json_str)
-                    print(f"🧹 清理后的 JSON: {json_str[:200]}...")
-                    
-                    result = json.loads(json_str)
-                    print(f"✅ JSON 解析成功: query_type={result.get('query_type')}")
-                    return result
-                else:
-                    print(f"❌ 未找到有效的 JSON 结构")
-                    
-            return {
-                "raw_text": text,
-                "query_type": "query"
-            }
+            if response.status_code != 200:
+                raise Exception(f"API 调用失败 - 状态码: {response.status_code}, 消息: {response.message}")
+            
+            content = response.output.choices[0].message.content
+            print(f"📢 AI 原始响应（{model}）: {content[:200]}...")
             
+            # 提取 JSON，格式不规范时自动修复
+            if '{' not in content:
+                raise ValueError("未找到有效的 JSON 结构")
+            result = AIService._parse_json_content(content)
+            print(f"✅ JSON 解析成功: query_type={result.get('query_type')}")
+            return result
+        
+        try:
+            return model_router.call("voice_query", attempt)
+        
         except json.JSONDecodeError as e:
             print(f"❌ JSON 解析错误: {str(e)}")
-            print(f"   问题 JSON: {json_str if 'json_str' in locals() else 'N/A'}")
             return {
                 "raw_text": text,
                 "error": str(e),
@@ -655,4 +1288,252 @@ class AIService:
                 "error": str(e),
                 "query_type": "query"
             }
+    
+    @staticmethod
+    async def generate_travel_plan_async(
+        destination: str,
+        days: int,
+        budget: float,
+        travelers_count: int,
+        preferences: str
+    ) -> Dict[str, Any]:
+        """generate_travel_plan 的异步版本，不阻塞事件循环"""
+        return await AIService._run_in_executor(
+            AIService.generate_travel_plan,
+            destination=destination,
+            days=days,
+            budget=budget,
+            travelers_count=travelers_count,
+            preferences=preferences
+        )
+    
+    @staticmethod
+    async def generate_travel_plan_parallel_async(
+        destination: str,
+        days: int,
+        budget: float,
+        travelers_count: int,
+        preferences: str
+    ) -> Dict[str, Any]:
+        """
+        两阶段并行生成旅行计划
+        
+        先生成行程骨架，再以骨架为上下文并发生成每一天的详细行程（并发数受
+        AI_PARALLEL_DAY_CONCURRENCY 限制），最后合并为与单次生成相同的结构。
+        任何一步失败都会回退到单次生成。
+        """
+        try:
+            skeleton = await AIService._run_in_executor(
+                AIService.generate_plan_skeleton,
+                destination, days, budget, travelers_count, preferences
+            )
+            
+            semaphore = asyncio.Semaphore(max(1, settings.AI_PARALLEL_DAY_CONCURRENCY))
+            
+            async def generate_day(day_theme: Dict[str, Any]) -> Dict[str, Any]:
+                async with semaphore:
+                    return await AIService._run_in_executor(
+                        AIService.generate_day_itinerary,
+                        destination, day_theme, skeleton, travelers_count, preferences
+                    )
+            
+            daily_itinerary = await asyncio.gather(
+                *[generate_day(theme) for theme in skeleton["day_themes"]]
+            )
+            
+            print(f"✅ 并行生成完成: {days} 天")
+            return AIService._merge_parallel_plan(skeleton, list(daily_itinerary))
+        except LLMOverloadedError:
+            # 服务繁忙时回退到单次生成只会加重负载
+            raise
+        except Exception as e:
+            print(f"⚠️ 并行生成失败，回退到单次生成: {str(e)}")
+            return await AIService.generate_travel_plan_async(
+                destination, days, budget, travelers_count, preferences
+            )
+    
+    @staticmethod
+    async def generate_travel_plan_by_mode_async(
+        destination: str,
+        days: int,
+        budget: float,
+        travelers_count: int,
+        preferences: str,
+        generation_mode: str = "auto"
+    ) -> Dict[str, Any]:
+        """
+        按生成模式生成旅行计划
+        
+        参数（归一化后）相同的并发请求只调用一次模型，共享同一个结果。
+        
+        Args:
+            generation_mode: single 单次生成；parallel 骨架 + 每日并行生成；
+                auto 在天数达到 AI_PARALLEL_MIN_DAYS 时使用并行生成；
+                fast（预生成目录中没有匹配的行程时）与 auto 相同
+        """
+        use_parallel = generation_mode == "parallel" or (
+            generation_mode in ("auto", "fast") and days >= settings.AI_PARALLEL_MIN_DAYS
+        )
+        
+        async def generate():
+            if use_parallel:
+                return await AIService.generate_travel_plan_parallel_async(
+                    destination, days, budget, travelers_count, preferences
+                )
+            return await AIService.generate_travel_plan_async(
+                destination, days, budget, travelers_count, preferences
+            )
+        
+        key = (
+            PlanCache.normalize_destination(destination),
+            days,
+            budget,
+            travelers_count,
+            PlanCache.normalize_preferences(preferences),
+            use_parallel
+        )
+        return await ai_single_flight.do("generate_travel_plan", key, generate)
+    
+    @staticmethod
+    async def get_or_generate_travel_plan_async(
+        destination: str,
+        days: int,
+        budget: float,
+        travelers_count: int,
+        preferences: str,
+        use_cache: bool = True,
+        generation_mode: str = "auto"
+    ) -> Tuple[Dict[str, Any], str]:
+        """
+        先查询旅行计划缓存，未命中时调用 AI 生成并写入缓存
+        
+        Returns:
+            (行程数据, 缓存状态)，缓存状态为 HIT、MISS 或 BYPASS
+        """
+        if not (use_cache and settings.PLAN_CACHE_ENABLED):
+            result = await AIService.generate_travel_plan_by_mode_async(
+                destination, days, budget, travelers_count, preferences, generation_mode
+            )
+            return result, "BYPASS"
+        
+        cache_key = plan_cache.make_key(destination, days, budget, travelers_count, preferences)
+        cached = plan_cache.get(cache_key)
+        if cached is not None:
+            print(f"✅ 旅行计划缓存命中: {cache_key}")
+            return cached, "HIT"
+        
+        result = await AIService.generate_travel_plan_by_mode_async(
+            destination, days, budget, travelers_count, preferences, generation_mode
+        )
+        plan_cache.set(cache_key, result)
+        return result, "MISS"
+    
+    @staticmethod
+    async def stream_travel_plan_async(
+        destination: str,
+        days: int,
+        budget: float,
+        travelers_count: int,
+        preferences: str
+    ) -> AsyncIterator[str]:
+        """stream_travel_plan 的异步版本，每个片段都在 AI 线程池中拉取"""
+        iterator = AIService.stream_travel_plan(
+            destination, days, budget, travelers_count, preferences
+        )
+        sentinel = object()
+        while True:
+            chunk = await AIService._run_in_executor(next, iterator, sentinel)
+            if chunk is sentinel:
+                break
+            yield chunk
+    
+    @staticmethod
+    async def analyze_expense_async(
+        travel_plan_info: str,
+        current_expenses: float,
+        budget: float
+    ) -> str:
+        """analyze_expense 的异步版本，不阻塞事件循环；相同的并发请求合并为一次调用"""
+        return await ai_single_flight.do(
+            "analyze_expense",
+            (travel_plan_info.strip(), round(current_expenses, 2), budget),
+            lambda: AIService._run_in_executor(
+                AIService.analyze_expense,
+                travel_plan_info=travel_plan_info,
+                current_expenses=current_expenses,
+                budget=budget
+            )
+        )
+    
+    @staticmethod
+    async def modify_itinerary_with_feedback_async(
+        current_itinerary: Dict[str, Any],
+        destination: str,
+        days: int,
+        budget: float,
+        travelers_count: int,
+        user_feedback: str
+    ) -> Dict[str, Any]:
+        """modify_itinerary_with_feedback 的异步版本，不阻塞事件循环"""
+        return await AIService._run_in_executor(
+            AIService.modify_itinerary_with_feedback,
+            current_itinerary=current_itinerary,
+            destination=destination,
+            days=days,
+            budget=budget,
+            travelers_count=travelers_count,
+            user_feedback=user_feedback
+        )
+    
+    @staticmethod
+    async def modify_itinerary_async(
+        current_itinerary: Dict[str, Any],
+        destination: str,
+        days: int,
+        budget: float,
+        travelers_count: int,
+        user_feedback: str,
+        mode: str = "auto"
+    ) -> Dict[str, Any]:
+        """
+        根据用户反馈修改行程
+        
+        Args:
+            mode: patch/auto 优先增量修改，补丁无效时回退到完整重新生成；full 直接完整重新生成
+        """
+        if mode != "full":
+            try:
+                return await AIService._run_in_executor(
+                    AIService.modify_itinerary_with_patch,
+                    current_itinerary, destination, days, budget, travelers_count, user_feedback
+                )
+            except LLMOverloadedError:
+                raise
+            except Exception as e:
+                print(f"⚠️ 增量修改失败，回退到完整重新生成: {str(e)}")
+        
+        return await AIService.modify_itinerary_with_feedback_async(
+            current_itinerary, destination, days, budget, travelers_count, user_feedback
+        )
+    
+    @staticmethod
+    async def parse_voice_query_async(text: str) -> Dict[str, Any]:
+        """
+        parse_voice_query 的异步版本，不阻塞事件循环
 
+        常见的简单语句（如"午饭花了35元"、"下周五去杭州玩三天"）先用本地规则解析，
+        规则没有把握时再调用大模型。结果中的 parsed_by 字段标明解析来源（rules / llm）。
+        """
+        result = VoiceQueryRuleParser.parse(text)
+        if result is not None:
+            print(f"⚡ 语音查询由规则解析: {result.get('query_type')}")
+            result["parsed_by"] = "rules"
+            return result
+
+        result = await ai_single_flight.do(
+            "parse_voice_query",
+            " ".join(text.split()),
+            lambda: AIService._run_in_executor(AIService.parse_voice_query, text)
+        )
+        result["parsed_by"] = "llm"
+        return result
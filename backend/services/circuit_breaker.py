@@ -0,0 +1,170 @@
+"""
+熔断器 - 外部接口连续失败或过慢时暂停调用，直接失败而不是每次都等到超时
+"""
+import time
+import threading
+from typing import Dict, Any, List, Optional
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开，调用被直接拒绝"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} 接口已熔断，{retry_after:.0f} 秒后重试")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    单个接口的熔断器
+
+    - closed：正常调用；连续失败 failure_threshold 次（超过 slow_call_seconds 的调用也算失败）后打开
+    - open：直接拒绝调用，recovery_seconds 后进入 half_open
+    - half_open：只放行一个探测调用，成功则关闭，失败则重新打开；
+      探测调用超过 recovery_seconds 没有结果（如被取消）时允许新的探测
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, recovery_seconds: float, slow_call_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_started_at: Optional[float] = None
+        self._stats = {"successes": 0, "failures": 0, "slow_calls": 0, "rejected": 0, "opened": 0}
+
+    def _current_state(self, now: float) -> str:
+        """当前状态（调用方需持有锁），打开时间超过 recovery_seconds 后转为 half_open"""
+        if self._state == self.OPEN and now - self._opened_at >= self.recovery_seconds:
+            self._state = self.HALF_OPEN
+            self._probe_started_at = None
+        return self._state
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def retry_after(self) -> float:
+        """距离允许下一次探测的秒数，未打开时为 0"""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == self.OPEN:
+                return max(0.0, self._opened_at + self.recovery_seconds - now)
+            if state == self.HALF_OPEN and self._probe_started_at is not None:
+                return max(0.0, self._probe_started_at + self.recovery_seconds - now)
+            return 0.0
+
+    def allow(self) -> bool:
+        """是否允许这次调用；half_open 时放行的调用即为探测调用"""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and (
+                self._probe_started_at is None or now - self._probe_started_at >= self.recovery_seconds
+            ):
+                self._probe_started_at = now
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def check(self):
+        """
+        不允许调用时抛出 CircuitOpenError
+
+        Raises:
+            CircuitOpenError: 熔断器打开，或 half_open 时已有探测调用在进行
+        """
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_after())
+
+    def record(self, success: bool, seconds: float = 0.0):
+        """记录一次调用的结果；成功但耗时超过 slow_call_seconds 的调用按失败处理"""
+        slow = success and seconds > self.slow_call_seconds
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if slow:
+                self._stats["slow_calls"] += 1
+            if success and not slow:
+                self._stats["successes"] += 1
+                self._consecutive_failures = 0
+                if state != self.CLOSED:
+                    print(f"✅ 熔断器 {self.name} 已恢复")
+                self._state = self.CLOSED
+                self._probe_started_at = None
+                return
+
+            self._stats["failures"] += 1
+            self._consecutive_failures += 1
+            if state == self.HALF_OPEN or (
+                state == self.CLOSED and self._consecutive_failures >= self.failure_threshold
+            ):
+                self._state = self.OPEN
+                self._opened_at = now
+                self._probe_started_at = None
+                self._stats["opened"] += 1
+                print(
+                    f"⛔ 熔断器 {self.name} 已打开（连续失败 {self._consecutive_failures} 次），"
+                    f"{self.recovery_seconds:.0f} 秒内直接失败"
+                )
+
+    def stats(self) -> Dict[str, Any]:
+        """状态、连续失败次数、调用结果计数和距离下一次探测的秒数"""
+        retry_after = self.retry_after()
+        with self._lock:
+            stats = dict(self._stats)
+            stats["state"] = self._current_state(time.monotonic())
+            stats["consecutive_failures"] = self._consecutive_failures
+        stats["retry_after_seconds"] = round(retry_after, 1)
+        return stats
+
+
+class CircuitBreakers:
+    """一组按接口划分的熔断器（如高德的 geocode、place、direction、weather）"""
+
+    def __init__(
+        self,
+        names: List[str],
+        enabled: bool,
+        failure_threshold: int,
+        recovery_seconds: float,
+        slow_call_seconds: float
+    ):
+        self.enabled = enabled
+        self._breakers = {
+            name: CircuitBreaker(name, failure_threshold, recovery_seconds, slow_call_seconds) for name in names
+        }
+
+    def get(self, name: str) -> CircuitBreaker:
+        return self._breakers[name]
+
+    def check(self, name: str):
+        """未启用熔断时总是允许"""
+        if self.enabled:
+            self._breakers[name].check()
+
+    def record(self, name: str, success: bool, seconds: float = 0.0):
+        if self.enabled:
+            self._breakers[name].record(success, seconds)
+
+    def states(self) -> Dict[str, str]:
+        """各接口熔断器的状态，用于健康检查"""
+        return {name: breaker.state for name, breaker in self._breakers.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "breakers": {name: breaker.stats() for name, breaker in self._breakers.items()}
+        }
@@ -0,0 +1,152 @@
+"""
+费用预算分析缓存 - AI 分析在后台执行，费用汇总接口不再等待大模型
+"""
+import asyncio
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Optional, Set
+from ..config import settings
+from .ai_service import AIService
+
+
+class ExpenseAnalysisCache:
+    """
+    按旅行计划缓存 AI 预算分析
+
+    每个计划保存最近一次分析时的花费总额。只有花费变化超过阈值
+    （预算的一定比例，且不少于最小金额）或计划信息、预算变化时才重新分析，
+    分析在后台任务中执行，期间返回 pending 状态和上一次的分析结果。
+    分析失败时标记为 failed（保留上一次成功的结果），下次请求时重新分析。
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_READY = "ready"
+    STATUS_FAILED = "failed"
+
+    def __init__(self, change_ratio: float, min_change: float, max_entries: int):
+        self.change_ratio = change_ratio
+        self.min_change = min_change
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 保存后台任务的引用，避免任务在执行过程中被垃圾回收
+        self._tasks: Set[asyncio.Task] = set()
+
+    def change_threshold(self, budget: float) -> float:
+        """花费变化达到该金额才重新分析"""
+        return max(budget * self.change_ratio, self.min_change)
+
+    def _is_fresh(self, entry: Dict[str, Any], plan_info: str, total: float, budget: float) -> bool:
+        """缓存的分析是否仍然适用于当前的花费"""
+        return (
+            entry["plan_info"] == plan_info
+            and entry["budget"] == budget
+            and abs(entry["total"] - total) < self.change_threshold(budget)
+        )
+
+    @staticmethod
+    def _view(entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "status": entry["status"],
+            "analysis": entry["analysis"],
+            "analyzed_total": entry["analyzed_total"],
+            "updated_at": entry["updated_at"]
+        }
+
+    def get(self, plan_id: int) -> Optional[Dict[str, Any]]:
+        """读取缓存的分析状态，不触发计算"""
+        with self._lock:
+            entry = self._entries.get(plan_id)
+            return self._view(entry) if entry else None
+
+    def get_or_schedule(
+        self,
+        plan_id: int,
+        plan_info: str,
+        total: float,
+        budget: float
+    ) -> Dict[str, Any]:
+        """
+        获取分析结果，缓存不适用时在后台启动新的分析
+
+        必须在事件循环中调用。
+
+        Returns:
+            {"status": "ready" | "pending" | "failed", "analysis": ..., "analyzed_total": ..., "updated_at": ...}
+            pending 时 analysis 为上一次的分析结果（可能为 None）
+        """
+        with self._lock:
+            entry = self._entries.get(plan_id)
+            if entry is not None:
+                self._entries.move_to_end(plan_id)
+                if entry["status"] == self.STATUS_PENDING:
+                    # 已有分析在进行中，完成后若花费仍有明显变化会在下次请求时重新分析
+                    return self._view(entry)
+                if entry["status"] == self.STATUS_READY and self._is_fresh(entry, plan_info, total, budget):
+                    return self._view(entry)
+
+            entry = {
+                "status": self.STATUS_PENDING,
+                "plan_info": plan_info,
+                "total": total,
+                "budget": budget,
+                "analysis": entry["analysis"] if entry else None,
+                "analyzed_total": entry["analyzed_total"] if entry else None,
+                "updated_at": entry["updated_at"] if entry else None
+            }
+            self._entries[plan_id] = entry
+            self._entries.move_to_end(plan_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        task = asyncio.get_running_loop().create_task(
+            self._analyze(plan_id, entry, plan_info, total, budget)
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return self._view(entry)
+
+    async def _analyze(
+        self,
+        plan_id: int,
+        entry: Dict[str, Any],
+        plan_info: str,
+        total: float,
+        budget: float
+    ):
+        """后台执行 AI 分析并写回缓存"""
+        print(f"🤖 后台分析预算: 计划 {plan_id}，已花费 {total}/{budget}")
+        try:
+            analysis = await AIService.analyze_expense_async(
+                travel_plan_info=plan_info,
+                current_expenses=total,
+                budget=budget
+            )
+            status = self.STATUS_READY
+        except Exception as e:
+            print(f"❌ 预算分析失败: {str(e)}")
+            analysis = None
+            status = self.STATUS_FAILED
+
+        with self._lock:
+            # 计划已被删除或条目被替换时丢弃结果
+            if self._entries.get(plan_id) is not entry:
+                return
+            entry["status"] = status
+            if status == self.STATUS_READY:
+                entry["analysis"] = analysis
+                entry["analyzed_total"] = total
+                entry["updated_at"] = datetime.now().isoformat()
+
+    def invalidate(self, plan_id: int):
+        """删除计划的分析缓存"""
+        with self._lock:
+            self._entries.pop(plan_id, None)
+
+
+expense_analysis_cache = ExpenseAnalysisCache(
+    change_ratio=settings.EXPENSE_ANALYSIS_CHANGE_RATIO,
+    min_change=settings.EXPENSE_ANALYSIS_MIN_CHANGE,
+    max_entries=settings.EXPENSE_ANALYSIS_MAX_ENTRIES
+)
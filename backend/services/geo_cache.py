@@ -0,0 +1,263 @@
+"""
+地理编码 / POI 搜索 / 周边搜索 / 路径规划 / 天气缓存 - 内存 LRU + 数据库两级缓存，相同的地址和关键词不再重复请求高德
+"""
+import re
+import copy
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
+from ..config import settings
+from ..database import SessionLocal
+from ..models import GeoCacheEntry
+from .plan_cache import PlanCache
+
+
+class GeoCache:
+    """
+    两级缓存：进程内 LRU + 数据库中的 geo_cache 表
+
+    缓存键由种类（geocode / poi / around / route / weather）和归一化的（地址或关键词，城市，类型）组成。
+    高德明确返回"未找到"时同样缓存（较短的 TTL），避免同一个找不到的名称反复消耗配额；
+    请求失败、配额用尽等错误不缓存。
+
+    读取顺序为内存 → 数据库，数据库命中后写回内存（使用剩余的有效期）。
+    过期的条目还会保留 stale_seconds：高德不可用（熔断器打开或请求失败）时通过 get_stale 返回过期的结果。
+    数据库读写是同步的，异步接口 aget / aset 放到线程中执行。
+    """
+
+    KIND_GEOCODE = "geocode"
+    KIND_POI = "poi"
+    KIND_AROUND = "around"
+    KIND_ROUTE = "route"
+    KIND_WEATHER = "weather"
+
+    def __init__(self, enabled: bool, max_entries: int, ttl_seconds: int, negative_ttl_seconds: int, stale_seconds: int):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.stale_seconds = stale_seconds
+        # 键 -> (过期时间戳, 是否找到, 结果)
+        self._entries: "OrderedDict[str, Tuple[float, bool, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def _normalize(text: Optional[str]) -> str:
+        return re.sub(r"\s+", "", text or "").lower()
+
+    @staticmethod
+    def make_key(kind: str, query: str, city: Optional[str] = None, types: Optional[str] = None) -> str:
+        """
+        生成缓存键
+
+        例如 "南京 中山陵" + "南京市" 与 "南京中山陵" + "南京" 命中同一条缓存。
+        """
+        return "|".join((
+            kind,
+            GeoCache._normalize(query),
+            PlanCache.normalize_destination(city or ""),
+            GeoCache._normalize(types)
+        ))
+
+    @staticmethod
+    def _hash(key: str) -> str:
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def _record(self, kind: str, field: str):
+        with self._lock:
+            stats = self._stats.setdefault(kind, {
+                "memory_hits": 0,
+                "db_hits": 0,
+                "misses": 0,
+                "negative_hits": 0,
+                "stale_hits": 0,
+                "writes": 0
+            })
+            stats[field] += 1
+
+    def _remember(self, key: str, expires_at: float, found: bool, value: Any):
+        with self._lock:
+            self._entries[key] = (expires_at, found, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        读取缓存
+
+        Returns:
+            (是否命中, 结果)。命中"未找到"的缓存时结果为 None 或空列表
+        """
+        kind = key.split("|", 1)[0]
+        if not self.enabled:
+            return False, None
+
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < now:
+                # 过期的条目在保留期内留给 get_stale
+                if entry[0] + self.stale_seconds < now:
+                    del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                value = copy.deepcopy(entry[2])
+        if entry is not None:
+            self._record(kind, "memory_hits")
+            if not entry[1]:
+                self._record(kind, "negative_hits")
+            return True, value
+
+        db = SessionLocal()
+        try:
+            row = db.query(GeoCacheEntry).filter(
+                GeoCacheEntry.kind == kind,
+                GeoCacheEntry.key_hash == self._hash(key)
+            ).first()
+            if row is None or row.expires_at < datetime.utcnow():
+                self._record(kind, "misses")
+                return False, None
+            expires_at = now + (row.expires_at - datetime.utcnow()).total_seconds()
+            found, value = row.found, row.result
+        finally:
+            db.close()
+
+        self._remember(key, expires_at, found, value)
+        self._record(kind, "db_hits")
+        if not found:
+            self._record(kind, "negative_hits")
+        return True, value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        """写入缓存，value 为 None 或空列表表示"未找到"；ttl 不传时使用默认有效期"""
+        if not self.enabled:
+            return
+        kind = key.split("|", 1)[0]
+        found = bool(value)
+        if ttl is None:
+            ttl = self.ttl_seconds if found else self.negative_ttl_seconds
+        self._remember(key, time.time() + ttl, found, value)
+        self._record(kind, "writes")
+
+        key_hash = self._hash(key)
+        expires_at = datetime.utcnow() + timedelta(seconds=ttl)
+        db = SessionLocal()
+        try:
+            row = db.query(GeoCacheEntry).filter(
+                GeoCacheEntry.kind == kind,
+                GeoCacheEntry.key_hash == key_hash
+            ).first()
+            if row is None:
+                row = GeoCacheEntry(kind=kind, key_hash=key_hash, cache_key=key[:500])
+                db.add(row)
+            row.found = found
+            row.result = value
+            row.expires_at = expires_at
+            db.commit()
+        except IntegrityError:
+            # 其他请求同时写入了同一个键
+            db.rollback()
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ 地理缓存写入数据库失败: {str(e)}")
+        finally:
+            db.close()
+
+    def get_stale(self, key: str) -> Tuple[bool, Any]:
+        """
+        读取缓存，包括已过期但仍在保留期（stale_seconds）内的条目
+
+        Returns:
+            (是否命中, 结果)
+        """
+        kind = key.split("|", 1)[0]
+        if not self.enabled:
+            return False, None
+
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] + self.stale_seconds >= now:
+                value = copy.deepcopy(entry[2])
+            else:
+                entry = None
+        if entry is None:
+            db = SessionLocal()
+            try:
+                row = db.query(GeoCacheEntry).filter(
+                    GeoCacheEntry.kind == kind,
+                    GeoCacheEntry.key_hash == self._hash(key)
+                ).first()
+                if row is None or row.expires_at + timedelta(seconds=self.stale_seconds) < datetime.utcnow():
+                    return False, None
+                expires_at = now + (row.expires_at - datetime.utcnow()).total_seconds()
+                value = row.result
+            finally:
+                db.close()
+            self._remember(key, expires_at, row.found, value)
+
+        self._record(kind, "stale_hits")
+        return True, value
+
+    async def aget(self, key: str) -> Tuple[bool, Any]:
+        if not self.enabled:
+            return False, None
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: Any, ttl: Optional[int] = None):
+        if self.enabled:
+            await asyncio.to_thread(self.set, key, value, ttl)
+
+    async def aget_stale(self, key: str) -> Tuple[bool, Any]:
+        if not self.enabled:
+            return False, None
+        return await asyncio.to_thread(self.get_stale, key)
+
+    def purge_expired(self) -> int:
+        """删除数据库中过期且超过保留期的条目，返回删除的条数"""
+        db = SessionLocal()
+        try:
+            removed = db.query(GeoCacheEntry).filter(
+                GeoCacheEntry.expires_at < datetime.utcnow() - timedelta(seconds=self.stale_seconds)
+            ).delete(synchronize_session=False)
+            db.commit()
+            return removed
+        finally:
+            db.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """各种类的命中统计：hit_ratio 为两级缓存合计的命中率"""
+        with self._lock:
+            kinds = {kind: dict(stats) for kind, stats in self._stats.items()}
+            entries = len(self._entries)
+        for stats in kinds.values():
+            hits = stats["memory_hits"] + stats["db_hits"]
+            lookups = hits + stats["misses"]
+            stats["hit_ratio"] = round(hits / lookups, 4) if lookups else 0.0
+            stats["memory_hit_ratio"] = round(stats["memory_hits"] / lookups, 4) if lookups else 0.0
+        return {
+            "enabled": self.enabled,
+            "memory_entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "negative_ttl_seconds": self.negative_ttl_seconds,
+            "stale_seconds": self.stale_seconds,
+            "kinds": kinds
+        }
+
+
+geo_cache = GeoCache(
+    enabled=settings.GEO_CACHE_ENABLED,
+    max_entries=settings.GEO_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.GEO_CACHE_TTL_SECONDS,
+    negative_ttl_seconds=settings.GEO_CACHE_NEGATIVE_TTL_SECONDS,
+    stale_seconds=settings.GEO_CACHE_STALE_SECONDS
+)
@@ -0,0 +1,226 @@
+"""
+行程坐标补全 - 生成或修改行程后在服务端解析所有地点的坐标并写入行程，前端展示地图时不再逐个地理编码
+"""
+import re
+import copy
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+from ..config import settings
+from .map_service import MapService
+from .geo_cache import GeoCache
+
+# 与前端 map.js 一致：去掉目的地的省份前缀，作为高德搜索的城市
+PROVINCE_PREFIX = re.compile(
+    r"^(江苏|浙江|广东|四川|湖北|湖南|河南|河北|山东|山西|陕西|福建|安徽|江西|云南|贵州|甘肃|青海|海南|台湾|广西|西藏|宁夏|新疆|内蒙古|黑龙江|吉林|辽宁|北京|上海|天津|重庆)"
+)
+
+# 活动名称中去掉的动词前缀（没有 poi_name 时用活动名称搜索）
+ACTIVITY_VERB_PREFIX = re.compile(r"^(参观|游览|逛|品尝|漫步|散步|探访|体验|前往|去|到)")
+
+
+class ItineraryGeo:
+    """
+    行程地点坐标补全
+
+    覆盖活动、三餐、每日住宿和 accommodation_summary.hotels 中的地点：
+    按 poi_name（没有时用名称）批量搜索 POI，取第一个结果；搜索不到的再按地址批量地理编码。
+    结果写入地点的 coordinates（{"longitude", "latitude"}）和 amap_id 字段
+    （活动已有的 location 字段是地点的文字描述，保持不变）。
+
+    修改行程时传入修改前的行程，搜索词和地址都没有变化的地点直接沿用原来的坐标，
+    只有新增或改动过的地点才会重新解析。
+    """
+
+    COORDINATES_KEY = "coordinates"
+    AMAP_ID_KEY = "amap_id"
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats = {
+            "itineraries": 0,
+            "places": 0,
+            "reused": 0,
+            "resolved_poi": 0,
+            "resolved_geocode": 0,
+            "unresolved": 0,
+            "errors": 0
+        }
+
+    def _record(self, field: str, value: int = 1):
+        with self._lock:
+            self._stats[field] += value
+
+    @staticmethod
+    def city_of(destination: str) -> str:
+        return PROVINCE_PREFIX.sub("", (destination or "").strip()) or destination
+
+    @staticmethod
+    def places(itinerary: Dict[str, Any]) -> List[Tuple[Dict[str, Any], str, str]]:
+        """
+        行程中所有需要定位的地点
+
+        Returns:
+            [(地点字典, 搜索词, 地址)]，地点字典是行程中的原对象
+        """
+        found = []
+
+        def add(entry: Any, name_key: str, address_key: str):
+            if not isinstance(entry, dict):
+                return
+            keyword = entry.get("poi_name") or entry.get(name_key)
+            if not isinstance(keyword, str) or not keyword.strip():
+                return
+            if name_key == "activity" and not entry.get("poi_name"):
+                keyword = ACTIVITY_VERB_PREFIX.sub("", keyword) or keyword
+            address = entry.get(address_key)
+            found.append((entry, keyword.strip(), address.strip() if isinstance(address, str) else ""))
+
+        for day in itinerary.get("daily_itinerary") or []:
+            if not isinstance(day, dict):
+                continue
+            for activity in day.get("activities") or []:
+                add(activity, "activity", "location")
+            meals = day.get("meals")
+            if isinstance(meals, dict):
+                for meal in meals.values():
+                    add(meal, "restaurant_name", "address")
+            add(day.get("accommodation"), "hotel_name", "address")
+
+        summary = itinerary.get("accommodation_summary")
+        if isinstance(summary, dict):
+            for hotel in summary.get("hotels") or []:
+                add(hotel, "name", "address")
+
+        return found
+
+    @staticmethod
+    def _place_key(keyword: str, address: str) -> str:
+        return f"{GeoCache._normalize(keyword)}|{GeoCache._normalize(address)}"
+
+    @staticmethod
+    def strip(itinerary: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        去掉坐标字段的副本
+
+        交给大模型修改的行程不需要坐标：既节省 token，也避免模型照抄已经不对应的坐标。
+        修改后的行程再通过 enrich 按搜索词沿用原来的坐标。
+        """
+        result = copy.deepcopy(itinerary)
+        for entry, _, _ in ItineraryGeo.places(result):
+            entry.pop(ItineraryGeo.COORDINATES_KEY, None)
+            entry.pop(ItineraryGeo.AMAP_ID_KEY, None)
+        return result
+
+    async def enrich(
+        self,
+        itinerary: Dict[str, Any],
+        destination: str,
+        previous: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        解析行程中所有地点的坐标
+
+        Args:
+            itinerary: 行程（不会被修改）
+            destination: 目的地，去掉省份前缀后作为搜索的城市
+            previous: 修改前的行程，未变化的地点沿用其中的坐标
+
+        Returns:
+            写入了坐标的行程副本；解析失败的地点没有 coordinates 字段
+        """
+        if not self.enabled or not isinstance(itinerary, dict):
+            return itinerary
+
+        result = copy.deepcopy(itinerary)
+        places = self.places(result)
+        if not places:
+            return result
+
+        known: Dict[str, Dict[str, Any]] = {}
+        if isinstance(previous, dict):
+            for entry, keyword, address in self.places(previous):
+                if isinstance(entry.get(self.COORDINATES_KEY), dict):
+                    known[self._place_key(keyword, address)] = entry
+
+        pending: Dict[str, Tuple[str, str]] = {}
+        reused = 0
+        for entry, keyword, address in places:
+            key = self._place_key(keyword, address)
+            source = known.get(key)
+            if source is not None:
+                entry[self.COORDINATES_KEY] = copy.deepcopy(source[self.COORDINATES_KEY])
+                entry[self.AMAP_ID_KEY] = source.get(self.AMAP_ID_KEY)
+                reused += 1
+            else:
+                # 新增或改动过的地点：旧的坐标（如模型照抄的）不再可信
+                entry.pop(self.COORDINATES_KEY, None)
+                entry.pop(self.AMAP_ID_KEY, None)
+                pending[key] = (keyword, address)
+
+        self._record("itineraries")
+        self._record("places", len(places))
+        self._record("reused", reused)
+
+        resolved: Dict[str, Tuple[Dict[str, float], Optional[str]]] = {}
+        if pending:
+            city = self.city_of(destination)
+            try:
+                resolved = await self._resolve(pending, city)
+            except Exception as e:
+                self._record("errors")
+                print(f"❌ 行程坐标解析失败: {str(e)}")
+
+        for entry, keyword, address in places:
+            key = self._place_key(keyword, address)
+            if key in resolved:
+                entry[self.COORDINATES_KEY], entry[self.AMAP_ID_KEY] = copy.deepcopy(resolved[key])
+
+        unresolved = len(pending) - len(resolved)
+        self._record("unresolved", unresolved)
+        print(
+            f"📍 行程坐标: {len(places)} 个地点, 沿用 {reused}, "
+            f"新解析 {len(resolved)}, 未找到 {unresolved}"
+        )
+        return result
+
+    async def _resolve(
+        self,
+        pending: Dict[str, Tuple[str, str]],
+        city: str
+    ) -> Dict[str, Tuple[Dict[str, float], Optional[str]]]:
+        """先批量搜索 POI，搜索不到的再批量地理编码，返回 {地点键: (坐标, 高德 POI ID)}"""
+        keys = list(pending)
+        resolved: Dict[str, Tuple[Dict[str, float], Optional[str]]] = {}
+
+        poi_results = await MapService.search_poi_batch([pending[key][0] for key in keys], city)
+        for key, pois in zip(keys, poi_results):
+            poi = pois[0] if pois else None
+            location = poi.get("location") if poi else None
+            if location and location.get("longitude") is not None and location.get("latitude") is not None:
+                resolved[key] = (
+                    {"longitude": location["longitude"], "latitude": location["latitude"]},
+                    poi.get("id")
+                )
+        self._record("resolved_poi", len(resolved))
+
+        missing = [key for key in keys if key not in resolved]
+        if missing:
+            addresses = [f"{city}{pending[key][1] or pending[key][0]}" for key in missing]
+            geocodes = await MapService.geocode_batch(addresses, city)
+            for key, geocode in zip(missing, geocodes):
+                if geocode:
+                    resolved[key] = ({"longitude": geocode["longitude"], "latitude": geocode["latitude"]}, None)
+                    self._record("resolved_geocode")
+
+        return resolved
+
+    def stats(self) -> Dict[str, Any]:
+        """地点数、沿用数和解析结果统计"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["enabled"] = self.enabled
+        return stats
+
+
+itinerary_geo = ItineraryGeo(enabled=settings.ITINERARY_GEO_ENABLED)
@@ -0,0 +1,169 @@
+"""
+行程流式解析 - 在模型增量输出的过程中识别已经完整的 JSON 片段
+"""
+import json
+from typing import Dict, Any, List, Optional, Tuple
+from .json_repair import repair_json, loads_tolerant
+
+
+class ItineraryStreamParser:
+    """
+    增量解析 AI 流式返回的行程 JSON
+
+    每收到一段文本就继续扫描，一旦某个顶层字段（overview、budget_breakdown、tips 等）
+    或 daily_itinerary 中的某一天闭合，就立即产出对应的事件，无需等待整个响应结束。
+    """
+
+    DAILY_KEY = "daily_itinerary"
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect_key = False
+        self._key_start: Optional[int] = None
+        self._current_key: Optional[str] = None
+        self._value_start: Optional[int] = None
+        self._day_start: Optional[int] = None
+        self.sections: Dict[str, Any] = {}
+        self.days: List[Dict[str, Any]] = []
+
+    @staticmethod
+    def _parse_fragment(fragment: str) -> Any:
+        """解析单个 JSON 片段，格式不规范时先修复，仍失败则返回 None"""
+        try:
+            return json.loads(fragment)
+        except json.JSONDecodeError:
+            pass
+
+        if not fragment.startswith(('{', '[')):
+            return None
+        try:
+            return json.loads(repair_json(fragment)[0])
+        except json.JSONDecodeError:
+            return None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        追加一段模型输出并返回新产生的事件
+
+        Returns:
+            事件列表，每个事件为 (事件类型, 数据)：
+            - ("day", {"index": i, "day": {...}})
+            - ("section", {"key": "overview", "value": ...})
+        """
+        self.buffer += chunk
+        events: List[Tuple[str, Dict[str, Any]]] = []
+        text = self.buffer
+
+        while self._pos < len(text) and not self._finished:
+            i = self._pos
+            ch = text[i]
+            self._pos += 1
+
+            if not self._started:
+                if ch == '{':
+                    self._started = True
+                    self._depth = 1
+                    self._expect_key = True
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._key_start is not None:
+                        self._current_key = text[self._key_start:i]
+                        self._key_start = None
+                    elif self._depth == 1 and self._value_start is not None:
+                        self._close_section(text[self._value_start:i + 1], events)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    if self._expect_key:
+                        self._key_start = i + 1
+                        self._expect_key = False
+                    elif self._value_start is None:
+                        self._value_start = i
+                continue
+
+            if ch in '{[':
+                if self._depth == 1 and self._value_start is None:
+                    self._value_start = i
+                if (ch == '{' and self._depth == 2
+                        and self._current_key == self.DAILY_KEY):
+                    self._day_start = i
+                self._depth += 1
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 2 and self._day_start is not None:
+                    day = self._parse_fragment(text[self._day_start:i + 1])
+                    self._day_start = None
+                    if isinstance(day, dict):
+                        events.append(("day", {"index": len(self.days), "day": day}))
+                        self.days.append(day)
+                elif self._depth == 1 and self._value_start is not None:
+                    self._close_section(text[self._value_start:i + 1], events)
+                elif self._depth == 0:
+                    # 根对象闭合，之后的内容忽略
+                    if self._value_start is not None:
+                        self._close_section(text[self._value_start:i].strip(), events)
+                    self._finished = True
+            elif self._depth == 1:
+                if ch == ',':
+                    if self._value_start is not None:
+                        self._close_section(text[self._value_start:i].strip(), events)
+                    self._expect_key = True
+                elif ch == ':':
+                    self._value_start = None
+                elif not ch.isspace() and self._value_start is None and self._current_key:
+                    # 数字、true/false/null 等原始值
+                    self._value_start = i
+
+        return events
+
+    def _close_section(self, fragment: str, events: List[Tuple[str, Dict[str, Any]]]):
+        """一个顶层字段的值已经完整"""
+        key = self._current_key
+        self._value_start = None
+        self._current_key = None
+        if not key:
+            return
+
+        if key == self.DAILY_KEY:
+            # 每一天已经单独产出过事件
+            self.sections[key] = self.days
+            return
+
+        value = self._parse_fragment(fragment)
+        if value is None and fragment.startswith('"'):
+            value = fragment.strip('"')
+        self.sections[key] = value
+        events.append(("section", {"key": key, "value": value}))
+
+    def result(self) -> Dict[str, Any]:
+        """
+        获取完整的行程结果
+
+        优先对完整文本做一次整体解析；失败时使用流式过程中已解析出的各个片段拼装。
+        """
+        try:
+            return loads_tolerant(self.buffer)[0]
+        except (json.JSONDecodeError, ValueError):
+            pass
+
+        if not self.days:
+            raise Exception("AI 返回的内容中未找到可用的行程数据")
+
+        result = dict(self.sections)
+        result[self.DAILY_KEY] = self.days
+        return result
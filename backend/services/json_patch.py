@@ -0,0 +1,130 @@
+"""
+JSON Patch（RFC 6902）- 把 AI 返回的增量修改应用到行程上
+"""
+import copy
+from typing import Any, Dict, List, Tuple
+
+
+class JsonPatchError(ValueError):
+    """补丁格式错误或无法应用"""
+
+
+def _parse_pointer(path: str) -> List[str]:
+    """解析 JSON Pointer（RFC 6901）"""
+    if path == "":
+        return []
+    if not isinstance(path, str) or not path.startswith("/"):
+        raise JsonPatchError(f"无效的路径: {path}")
+    return [part.replace("~1", "/").replace("~0", "~") for part in path[1:].split("/")]
+
+
+def _array_index(container: list, token: str, allow_end: bool) -> int:
+    if token == "-" and allow_end:
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token.startswith("0")):
+        raise JsonPatchError(f"无效的数组下标: {token}")
+    index = int(token)
+    limit = len(container) if allow_end else len(container) - 1
+    if index > limit:
+        raise JsonPatchError(f"数组下标越界: {token}")
+    return index
+
+
+def _resolve_parent(document: Any, tokens: List[str]) -> Tuple[Any, str]:
+    """定位路径的父节点，返回 (父节点, 最后一级的键)"""
+    if not tokens:
+        raise JsonPatchError("不允许修改整个文档")
+    node = document
+    for token in tokens[:-1]:
+        if isinstance(node, dict):
+            if token not in node:
+                raise JsonPatchError(f"路径不存在: {token}")
+            node = node[token]
+        elif isinstance(node, list):
+            node = node[_array_index(node, token, allow_end=False)]
+        else:
+            raise JsonPatchError(f"路径不存在: {token}")
+    return node, tokens[-1]
+
+
+def _get(document: Any, path: str) -> Any:
+    parent, key = _resolve_parent(document, _parse_pointer(path))
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise JsonPatchError(f"路径不存在: {path}")
+        return parent[key]
+    if isinstance(parent, list):
+        return parent[_array_index(parent, key, allow_end=False)]
+    raise JsonPatchError(f"路径不存在: {path}")
+
+
+def _add(document: Any, path: str, value: Any):
+    parent, key = _resolve_parent(document, _parse_pointer(path))
+    if isinstance(parent, dict):
+        parent[key] = value
+    elif isinstance(parent, list):
+        parent.insert(_array_index(parent, key, allow_end=True), value)
+    else:
+        raise JsonPatchError(f"路径不存在: {path}")
+
+
+def _remove(document: Any, path: str) -> Any:
+    parent, key = _resolve_parent(document, _parse_pointer(path))
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise JsonPatchError(f"路径不存在: {path}")
+        return parent.pop(key)
+    if isinstance(parent, list):
+        return parent.pop(_array_index(parent, key, allow_end=False))
+    raise JsonPatchError(f"路径不存在: {path}")
+
+
+def apply_patch(document: Dict[str, Any], operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    应用 JSON Patch，原文档不会被修改
+
+    Args:
+        document: 原始文档
+        operations: RFC 6902 操作列表（add、remove、replace、move、copy、test）
+
+    Returns:
+        应用补丁后的新文档
+
+    Raises:
+        JsonPatchError: 补丁无效，或 test 操作不通过
+    """
+    if not isinstance(operations, list):
+        raise JsonPatchError("补丁必须是操作列表")
+
+    result = copy.deepcopy(document)
+    for operation in operations:
+        if not isinstance(operation, dict) or "op" not in operation or "path" not in operation:
+            raise JsonPatchError(f"无效的操作: {operation}")
+
+        op = operation["op"]
+        path = operation["path"]
+        if op in ("add", "replace", "test") and "value" not in operation:
+            raise JsonPatchError(f"{op} 操作缺少 value: {path}")
+        if op in ("move", "copy") and "from" not in operation:
+            raise JsonPatchError(f"{op} 操作缺少 from: {path}")
+
+        if op == "add":
+            _add(result, path, copy.deepcopy(operation["value"]))
+        elif op == "remove":
+            _remove(result, path)
+        elif op == "replace":
+            _remove(result, path)
+            _add(result, path, copy.deepcopy(operation["value"]))
+        elif op == "move":
+            if path.startswith(operation["from"] + "/"):
+                raise JsonPatchError(f"不能移动到自身的子路径: {path}")
+            _add(result, path, _remove(result, operation["from"]))
+        elif op == "copy":
+            _add(result, path, copy.deepcopy(_get(result, operation["from"])))
+        elif op == "test":
+            if _get(result, path) != operation["value"]:
+                raise JsonPatchError(f"test 操作不通过: {path}")
+        else:
+            raise JsonPatchError(f"不支持的操作: {op}")
+
+    return result
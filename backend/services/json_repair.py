@@ -0,0 +1,508 @@
+"""
+JSON 修复 - 单遍扫描修复 AI 返回的不规范 JSON
+
+替代原先对全文多次执行的正则替换：只扫描一遍文本，线性时间完成修复，
+支持分段输入（流式输出），并记录实际触发了哪些修复规则。
+"""
+import re
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# 合法的 JSON 数字
+_NUMBER_RE = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?')
+# 从文字描述中提取数字
+_NUMBER_IN_TEXT_RE = re.compile(r'\d+(?:\.\d+)?')
+# 只包含加法/乘法的算式，如 1000 + 100
+_SIMPLE_ARITHMETIC_RE = re.compile(r'\d+(?:\.\d+)?(?:\s*[+*]\s*\d+(?:\.\d+)?)+')
+# 字符串内需要特殊处理的字符：引号、反斜杠、控制字符
+_STRING_SPECIAL_RE = re.compile(r'["\\\x00-\x1f]')
+# 未加引号的值在这些位置结束：分隔符、换行、空白后的引号（缺少逗号的下一个键）、空白后的注释
+# 紧跟在值后面的 // 不是注释，如 http://example.com
+_RAW_END_RE = re.compile(r'[,}\]\n]|\s+(?:"|//|/\*)')
+# 分段输入时未加引号的值末尾可能是下一段中结束符的开头，留到下一段再判断
+_RAW_TAIL_RE = re.compile(r'\s+/?$')
+_WHITESPACE_RE = re.compile(r'\s+')
+_ROOT_START_RE = re.compile(r'[{\[]')
+# 快速路径：完整的合法字符串、数字和字面量整体匹配，避免逐字符处理
+_FAST_STRING_RE = re.compile(r'"[^"\\\x00-\x1f]*(?:\\.[^"\\\x00-\x1f]*)*"')
+_FAST_LITERAL_RE = re.compile(
+    r'(?:-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null)(?=\s*[,}\]]|\s+(?:"|//|/\*))'
+)
+
+_CONTROL_ESCAPES = {'\n': '\\n', '\r': '\\r', '\t': '\\t', '\b': '\\b', '\f': '\\f'}
+
+# 必须为数字的字段，值为文字描述或算式时转换为数字
+NUMERIC_KEYS = {
+    "estimated_cost",
+    "avg_cost",
+    "price_per_night",
+    "estimated_cost_per_night",
+    "total_cost",
+    "total_nights",
+    "daily_budget",
+    "budget",
+    "amount",
+}
+# 该字段下的所有值都必须为数字
+NUMERIC_PARENT_KEYS = {"budget_breakdown"}
+
+
+class _Container:
+    """扫描过程中尚未闭合的对象或数组"""
+
+    __slots__ = ("kind", "key", "expect", "item_start", "pending_key")
+
+    def __init__(self, kind: str, key: Optional[str]):
+        self.kind = kind  # '{' 或 '['
+        self.key = key  # 该容器作为哪个字段的值
+        self.expect = "key" if kind == "{" else "value"  # key / colon / value / comma
+        self.item_start = 0  # 当前键值对（或元素）在输出中的起始位置
+        self.pending_key: Optional[str] = None
+
+
+class JsonRepairer:
+    """
+    单遍扫描的 JSON 修复器
+
+    可以一次性传入完整文本，也可以多次调用 feed() 传入流式片段，最后调用 finish()
+    获取修复后的 JSON 字符串。修复内容：
+    - 去掉 JSON 前后的说明文字和 markdown 标记
+    - 去掉 // 和 /* */ 注释、尾随逗号、多余逗号，补全缺失的逗号
+    - 字符串中的换行等控制字符转义
+    - estimated_cost 等数字字段中的文字描述（如 "约100"）和算式（如 "1000 + 100 = 1100"）转换为数字
+    - 未加引号的文字值加上引号（值在分隔符、换行、空白后的引号或注释处结束，值中的 // 如网址不视为注释）
+    - 输出被截断时补全字符串、丢弃不完整的键值对并闭合所有括号
+    """
+
+    def __init__(self):
+        self._out: List[str] = []
+        self._stack: List[_Container] = []
+        self._started = False
+        self._done = False
+        self._mode: Optional[str] = None  # string / raw / line_comment / block_comment
+        self._string_is_key = False
+        self._key_parts: List[str] = []
+        self._escape = False
+        self._raw: List[str] = []
+        self._pending_comma = False
+        self._carry = ""
+        self.repairs: Dict[str, int] = {}
+
+    def _note(self, rule: str):
+        self.repairs[rule] = self.repairs.get(rule, 0) + 1
+
+    def feed(self, chunk: str):
+        """传入一段文本"""
+        if self._carry:
+            chunk = self._carry + chunk
+            self._carry = ""
+        self._process(chunk, final=False)
+
+    def finish(self) -> str:
+        """结束输入，补全被截断的结构并返回修复后的 JSON 字符串"""
+        if self._carry:
+            carry, self._carry = self._carry, ""
+            self._process(carry, final=True)
+
+        if not self._started:
+            return ""
+
+        if not self._done:
+            self._close_truncated()
+
+        return "".join(self._out)
+
+    # ---- 扫描 ----
+
+    def _process(self, text: str, final: bool):
+        i = 0
+        n = len(text)
+        while i < n:
+            if self._done:
+                if text[i:].strip() and "trailing_text" not in self.repairs:
+                    self._note("trailing_text")
+                return
+
+            mode = self._mode
+            if mode == "string":
+                i = self._scan_string(text, i)
+                continue
+            if mode == "raw":
+                match = _RAW_END_RE.search(text, i)
+                if match is None:
+                    tail = None if final else _RAW_TAIL_RE.search(text, i)
+                    if tail is not None:
+                        self._raw.append(text[i:tail.start()])
+                        self._carry = tail.group()
+                    else:
+                        self._raw.append(text[i:])
+                    return
+                self._raw.append(text[i:match.start()])
+                self._finish_raw()
+                token = match.group().lstrip()
+                if token == "//":
+                    self._note("comment")
+                    self._mode = "line_comment"
+                    i = match.end()
+                elif token == "/*":
+                    self._note("comment")
+                    self._mode = "block_comment"
+                    i = match.end()
+                else:
+                    i = match.start()
+                continue
+            if mode == "line_comment":
+                end = text.find("\n", i)
+                if end == -1:
+                    return
+                self._mode = None
+                i = end
+                continue
+            if mode == "block_comment":
+                end = text.find("*/", i)
+                if end == -1:
+                    if not final and text.endswith("*"):
+                        self._carry = "*"
+                    return
+                self._mode = None
+                i = end + 2
+                continue
+
+            if not self._started:
+                match = _ROOT_START_RE.search(text, i)
+                if match is None:
+                    if text[i:].strip():
+                        self._note("leading_text")
+                    return
+                start = match.start()
+                if text[i:start].strip():
+                    self._note("leading_text")
+                self._started = True
+                self._stack.append(_Container(text[start], None))
+                self._out.append(text[start])
+                i = start + 1
+                continue
+
+            ch = text[i]
+            if ch.isspace():
+                i = _WHITESPACE_RE.match(text, i).end()
+                continue
+
+            if ch == "/":
+                if i + 1 >= n:
+                    if not final:
+                        self._carry = "/"
+                        return
+                elif text[i + 1] in "/*":
+                    self._note("comment")
+                    self._mode = "line_comment" if text[i + 1] == "/" else "block_comment"
+                    i += 2
+                    continue
+
+            i = self._structural(text, i)
+
+    def _scan_string(self, text: str, i: int) -> int:
+        """扫描字符串内容，返回下一个待处理的位置"""
+        n = len(text)
+        if self._escape:
+            self._emit_string(text[i])
+            self._escape = False
+            return i + 1
+
+        match = _STRING_SPECIAL_RE.search(text, i)
+        if match is None:
+            self._emit_string(text[i:])
+            return n
+
+        j = match.start()
+        if j > i:
+            self._emit_string(text[i:j])
+        ch = text[j]
+        if ch == "\\":
+            if j + 1 < n:
+                self._emit_string(text[j:j + 2])
+                return j + 2
+            self._emit_string(ch)
+            self._escape = True
+            return n
+        if ch == '"':
+            self._out.append('"')
+            self._mode = None
+            self._end_string()
+            return j + 1
+
+        # 字符串中未转义的控制字符
+        self._note("control_char")
+        self._emit_string(_CONTROL_ESCAPES.get(ch, "\\u%04x" % ord(ch)))
+        return j + 1
+
+    def _emit_string(self, piece: str):
+        self._out.append(piece)
+        if self._string_is_key:
+            self._key_parts.append(piece)
+
+    def _end_string(self):
+        top = self._stack[-1]
+        if self._string_is_key:
+            top.pending_key = "".join(self._key_parts)
+            top.expect = "colon"
+        else:
+            top.expect = "comma"
+
+    def _begin_item(self):
+        """一个新的键值对或数组元素开始"""
+        top = self._stack[-1]
+        if top.expect == "comma":
+            self._note("missing_comma")
+            self._pending_comma = True
+        top.item_start = len(self._out)
+        if self._pending_comma:
+            self._out.append(",")
+            self._pending_comma = False
+
+    def _begin_value(self, text: str, i: int) -> int:
+        top = self._stack[-1]
+        ch = text[i]
+        if ch == '"':
+            match = _FAST_STRING_RE.match(text, i)
+            if match:
+                self._out.append(match.group())
+                top.expect = "comma"
+                return match.end()
+            self._out.append('"')
+            self._mode = "string"
+            self._string_is_key = False
+            return i + 1
+        if ch in "{[":
+            key = top.pending_key if top.kind == "{" else top.key
+            self._stack.append(_Container(ch, key))
+            self._out.append(ch)
+            return i + 1
+
+        match = _FAST_LITERAL_RE.match(text, i)
+        if match:
+            self._out.append(match.group())
+            top.expect = "comma"
+            return match.end()
+        # 未加引号的值，从当前字符开始收集
+        self._raw = []
+        self._mode = "raw"
+        return i
+
+    def _structural(self, text: str, i: int) -> int:
+        """处理字符串之外的一个结构字符，返回下一个待处理的位置"""
+        top = self._stack[-1]
+        ch = text[i]
+
+        if ch == ",":
+            if top.expect == "comma":
+                self._pending_comma = True
+                top.expect = "key" if top.kind == "{" else "value"
+            elif top.kind == "{" and top.expect == "value":
+                # "key": , 缺少值
+                self._note("missing_value")
+                self._out.append("null")
+                self._pending_comma = True
+                top.expect = "key"
+            elif top.kind == "{" and top.expect == "colon":
+                self._note("missing_value")
+                del self._out[top.item_start:]
+                self._pending_comma = len(self._out) > 1
+                top.expect = "key"
+            else:
+                self._note("extra_comma")
+            return i + 1
+
+        if ch in "}]":
+            if (ch == "}") != (top.kind == "{"):
+                self._note("mismatched_bracket")
+            if self._pending_comma:
+                self._note("trailing_comma")
+                self._pending_comma = False
+            if top.kind == "{" and top.expect == "value":
+                self._note("missing_value")
+                self._out.append("null")
+            elif top.kind == "{" and top.expect == "colon":
+                self._note("missing_value")
+                del self._out[top.item_start:]
+            self._close_container()
+            return i + 1
+
+        if top.kind == "{":
+            if top.expect in ("key", "comma"):
+                if ch != '"':
+                    self._note("unexpected_char")
+                    return i + 1
+                self._begin_item()
+                match = _FAST_STRING_RE.match(text, i)
+                if match:
+                    key = match.group()
+                    self._out.append(key)
+                    top.pending_key = key[1:-1]
+                    top.expect = "colon"
+                    return match.end()
+                self._out.append('"')
+                self._mode = "string"
+                self._string_is_key = True
+                self._key_parts = []
+                return i + 1
+            if top.expect == "colon":
+                if ch == ":":
+                    self._out.append(":")
+                    top.expect = "value"
+                else:
+                    self._note("unexpected_char")
+                return i + 1
+            return self._begin_value(text, i)
+
+        # 数组
+        if ch == ":":
+            self._note("unexpected_char")
+            return i + 1
+        self._begin_item()
+        return self._begin_value(text, i)
+
+    def _close_container(self):
+        container = self._stack.pop()
+        self._out.append("}" if container.kind == "{" else "]")
+        if self._stack:
+            self._stack[-1].expect = "comma"
+        else:
+            self._done = True
+
+    # ---- 未加引号的值 ----
+
+    def _finish_raw(self):
+        raw = "".join(self._raw).strip()
+        self._raw = []
+        self._mode = None
+        top = self._stack[-1]
+        key = top.pending_key if top.kind == "{" else top.key
+
+        if raw in ("true", "false", "null") or _NUMBER_RE.fullmatch(raw):
+            self._out.append(raw)
+        elif key in NUMERIC_KEYS or top.key in NUMERIC_PARENT_KEYS:
+            self._out.append(self._coerce_number(raw))
+        elif raw:
+            self._note("unquoted_string")
+            self._out.append(json.dumps(raw, ensure_ascii=False))
+        else:
+            self._note("missing_value")
+            self._out.append("null")
+        top.expect = "comma"
+
+    def _coerce_number(self, raw: str) -> str:
+        """把数字字段中的文字描述或算式转换为数字"""
+        if "=" in raw:
+            # 1000 + 100 = 1100 取等号后的结果
+            self._note("cost_arithmetic")
+            numbers = _NUMBER_IN_TEXT_RE.findall(raw.rsplit("=", 1)[1])
+            number = numbers[-1] if numbers else None
+        elif _SIMPLE_ARITHMETIC_RE.fullmatch(raw):
+            # 1000 + 100 直接计算
+            self._note("cost_arithmetic")
+            total = 0.0
+            for term in raw.split("+"):
+                product = 1.0
+                for factor in term.split("*"):
+                    product *= float(factor)
+                total += product
+            number = repr(total)
+        else:
+            # 交通+门票 约100 取第一个数字，视个人消费而定 取 0
+            self._note("cost_prose")
+            numbers = _NUMBER_IN_TEXT_RE.findall(raw)
+            number = numbers[0] if numbers else None
+
+        if number is None:
+            return "0"
+        value = float(number)
+        return str(int(value)) if value.is_integer() else str(value)
+
+    # ---- 截断补全 ----
+
+    def _close_truncated(self):
+        self._note("truncated")
+        if self._mode == "string":
+            top = self._stack[-1]
+            if self._string_is_key:
+                del self._out[top.item_start:]
+                top.expect = "comma"
+            else:
+                self._out.append('"')
+                top.expect = "comma"
+        elif self._mode == "raw":
+            self._finish_raw()
+        self._mode = None
+        self._pending_comma = False
+
+        while self._stack:
+            top = self._stack[-1]
+            if top.kind == "{" and top.expect in ("colon", "value"):
+                del self._out[top.item_start:]
+            self._close_container()
+
+
+def repair_json(text: str) -> Tuple[str, Dict[str, int]]:
+    """
+    修复 AI 返回的 JSON 文本
+
+    Args:
+        text: AI 返回的原始文本（可以包含 JSON 之外的说明文字）
+
+    Returns:
+        (修复后的 JSON 字符串, 触发的修复规则及次数)
+    """
+    repairer = JsonRepairer()
+    repairer.feed(text)
+    return repairer.finish(), repairer.repairs
+
+
+def loads_tolerant(text: str, timings: Optional[Dict[str, float]] = None) -> Tuple[Any, Dict[str, int]]:
+    """
+    解析 AI 返回的 JSON，必要时先修复
+
+    先截取第一个 { 到最后一个 } 之间的内容直接解析（绝大多数响应是合法 JSON，
+    走 C 实现的 json.loads 即可）；失败时再对从第一个 { 开始的全部内容做单遍修复，
+    这样被截断的输出也能补全。
+
+    Args:
+        text: AI 返回的原始文本
+        timings: 传入字典时写入耗时（秒）：loads 为 json.loads 的总耗时，repair 为修复耗时
+
+    Returns:
+        (解析结果, 触发的修复规则及次数)
+
+    Raises:
+        ValueError: 文本中没有 JSON 对象
+        json.JSONDecodeError: 修复后仍无法解析
+    """
+    if timings is None:
+        timings = {}
+    timings.setdefault("loads", 0.0)
+    timings.setdefault("repair", 0.0)
+
+    start_idx = text.find("{")
+    if start_idx == -1:
+        raise ValueError("AI 返回的内容中未找到 JSON 格式数据")
+
+    end_idx = text.rfind("}")
+    if end_idx > start_idx:
+        started = time.perf_counter()
+        try:
+            return json.loads(text[start_idx:end_idx + 1]), {}
+        except json.JSONDecodeError:
+            pass
+        finally:
+            timings["loads"] += time.perf_counter() - started
+
+    started = time.perf_counter()
+    repaired, repairs = repair_json(text[start_idx:])
+    timings["repair"] += time.perf_counter() - started
+
+    started = time.perf_counter()
+    try:
+        return json.loads(repaired), repairs
+    finally:
+        timings["loads"] += time.perf_counter() - started
@@ -0,0 +1,249 @@
+"""
+大模型服务提供方 - 统一 DashScope 与 OpenAI 兼容接口的调用方式
+"""
+import abc
+import json
+import threading
+from dataclasses import dataclass, field
+from typing import Any, List, Iterator, Optional
+import httpx
+from ..config import settings
+
+
+@dataclass
+class LLMMessage:
+    content: str
+    role: str = "assistant"
+
+
+@dataclass
+class LLMChoice:
+    message: LLMMessage
+    finish_reason: Optional[str] = None
+
+
+@dataclass
+class LLMOutput:
+    choices: List[LLMChoice] = field(default_factory=list)
+
+
+@dataclass
+class LLMUsage:
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+
+@dataclass
+class LLMResponse:
+    """
+    模型响应
+
+    字段与 DashScope 的 GenerationResponse（result_format='message'）一致，
+    AIService 无需关心具体的提供方。
+    """
+    status_code: int
+    output: Optional[LLMOutput] = None
+    usage: Optional[LLMUsage] = None
+    code: str = ""
+    message: str = ""
+
+    @staticmethod
+    def from_text(content: str, usage: Optional[LLMUsage] = None, finish_reason: Optional[str] = None) -> "LLMResponse":
+        return LLMResponse(
+            status_code=200,
+            output=LLMOutput(choices=[LLMChoice(message=LLMMessage(content=content), finish_reason=finish_reason)]),
+            usage=usage
+        )
+
+    @staticmethod
+    def from_error(status_code: int, message: str, code: str = "") -> "LLMResponse":
+        return LLMResponse(status_code=status_code, code=code, message=message)
+
+
+class LLMProvider(abc.ABC):
+    """
+    大模型提供方接口
+
+    call() 返回一个完整的响应；stream() 逐段返回增量输出（incremental_output）。
+    调用失败（HTTP 错误、限流等）通过响应的 status_code 表示，网络异常直接抛出。
+    """
+
+    name = "base"
+
+    @abc.abstractmethod
+    def call(self, model: str, prompt: str, **kwargs) -> LLMResponse:
+        """调用模型并返回完整的响应"""
+
+    @abc.abstractmethod
+    def stream(self, model: str, prompt: str, **kwargs) -> Iterator[LLMResponse]:
+        """调用模型并逐段返回增量输出"""
+
+
+class DashScopeProvider(LLMProvider):
+    """
+    阿里云百炼（DashScope SDK）
+
+    超时在每次调用时传入，不修改 SDK 的全局配置。
+    SDK（1.14）没有按请求指定 API 地址的参数，只使用进程级的默认地址
+    （可通过 SDK 的环境变量 DASHSCOPE_HTTP_BASE_URL 修改）；
+    其他地址请使用 OpenAI 兼容接口（OpenAICompatibleProvider）。
+    """
+
+    name = "dashscope"
+
+    def __init__(self, api_key: str, timeout: Optional[float] = None):
+        from dashscope import Generation
+
+        self._generation = Generation
+        self._api_key = api_key
+        self._timeout = timeout
+
+    def _generate(self, model: str, prompt: str, stream: bool, kwargs: dict) -> Any:
+        params = dict(
+            model=model,
+            prompt=prompt,
+            api_key=self._api_key,
+            result_format=kwargs.pop("result_format", "message"),
+            stream=stream,
+            **kwargs
+        )
+        if self._timeout:
+            params["request_timeout"] = self._timeout
+        return self._generation.call(**params)
+
+    def call(self, model: str, prompt: str, **kwargs):
+        return self._generate(model, prompt, False, kwargs)
+
+    def stream(self, model: str, prompt: str, **kwargs):
+        kwargs["incremental_output"] = True
+        return self._generate(model, prompt, True, kwargs)
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """
+    OpenAI 兼容的 Chat Completions 接口
+
+    可用于百炼的兼容模式（https://dashscope.aliyuncs.com/compatible-mode/v1）、
+    本地的模型替身服务（backend/tools/llm_standin_server.py）或其他兼容服务。
+    """
+
+    name = "openai"
+
+    def __init__(self, base_url: str, api_key: str, timeout: float):
+        self._base_url = base_url.rstrip("/")
+        self._client = httpx.Client(
+            timeout=timeout,
+            headers={"Authorization": f"Bearer {api_key}"} if api_key else {}
+        )
+
+    @staticmethod
+    def _payload(model: str, prompt: str, stream: bool, kwargs: dict) -> dict:
+        payload = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": stream
+        }
+        for key in ("temperature", "top_p", "max_tokens", "seed"):
+            if key in kwargs:
+                payload[key] = kwargs[key]
+        if stream:
+            payload["stream_options"] = {"include_usage": True}
+        return payload
+
+    @staticmethod
+    def _error(response: httpx.Response) -> LLMResponse:
+        try:
+            error = response.json().get("error") or {}
+        except ValueError:
+            error = {}
+        return LLMResponse.from_error(
+            response.status_code,
+            error.get("message") or response.text[:200],
+            error.get("code") or error.get("type") or ""
+        )
+
+    def call(self, model: str, prompt: str, **kwargs) -> LLMResponse:
+        response = self._client.post(
+            f"{self._base_url}/chat/completions",
+            json=self._payload(model, prompt, False, kwargs)
+        )
+        if response.status_code != 200:
+            return self._error(response)
+
+        data = response.json()
+        choice = (data.get("choices") or [{}])[0]
+        usage = data.get("usage") or {}
+        return LLMResponse.from_text(
+            (choice.get("message") or {}).get("content") or "",
+            LLMUsage(usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)),
+            choice.get("finish_reason")
+        )
+
+    def stream(self, model: str, prompt: str, **kwargs) -> Iterator[LLMResponse]:
+        with self._client.stream(
+            "POST",
+            f"{self._base_url}/chat/completions",
+            json=self._payload(model, prompt, True, kwargs)
+        ) as response:
+            if response.status_code != 200:
+                response.read()
+                yield self._error(response)
+                return
+
+            for line in response.iter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    return
+
+                chunk = json.loads(data)
+                usage = chunk.get("usage")
+                for choice in chunk.get("choices") or []:
+                    content = (choice.get("delta") or {}).get("content")
+                    if content:
+                        yield LLMResponse.from_text(content, finish_reason=choice.get("finish_reason"))
+                if usage:
+                    yield LLMResponse.from_text(
+                        "", LLMUsage(usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+                    )
+
+
+_provider: Optional[LLMProvider] = None
+_provider_lock = threading.Lock()
+
+
+def get_llm_provider() -> LLMProvider:
+    """
+    按配置创建大模型提供方（首次调用时创建）
+
+    LLM_PROVIDER=dashscope 使用 DashScope SDK 的默认地址，不支持 LLM_BASE_URL；
+    LLM_PROVIDER=openai 使用 OpenAI 兼容接口，LLM_BASE_URL 必填（自定义地址都走这种方式）。
+    API Key 优先使用 LLM_API_KEY，未配置时使用 ALIYUN_BAILIAN_API_KEY。
+    """
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            api_key = settings.LLM_API_KEY or settings.ALIYUN_BAILIAN_API_KEY
+            if settings.LLM_PROVIDER == "openai":
+                if not settings.LLM_BASE_URL:
+                    raise ValueError("LLM_PROVIDER=openai 时必须配置 LLM_BASE_URL")
+                _provider = OpenAICompatibleProvider(
+                    settings.LLM_BASE_URL, api_key, settings.LLM_TIMEOUT_SECONDS
+                )
+            else:
+                if settings.LLM_BASE_URL:
+                    raise ValueError(
+                        "LLM_PROVIDER=dashscope 不支持 LLM_BASE_URL，自定义地址请使用 LLM_PROVIDER=openai"
+                        "（百炼兼容模式：https://dashscope.aliyuncs.com/compatible-mode/v1）"
+                    )
+                _provider = DashScopeProvider(api_key, settings.LLM_TIMEOUT_SECONDS)
+            print(f"✅ 大模型提供方: {_provider.name}")
+        return _provider
+
+
+def set_llm_provider(provider: Optional[LLMProvider]):
+    """替换当前的大模型提供方（为 None 时下次调用按配置重新创建），用于压测和基准测试"""
+    global _provider
+    with _provider_lock:
+        _provider = provider
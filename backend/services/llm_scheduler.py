@@ -0,0 +1,249 @@
+"""
+大模型调用调度 - 全局并发上限、请求数/Token 数令牌桶限流、按优先级排队
+"""
+import time
+import heapq
+import itertools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Iterator
+from ..config import settings
+
+
+class LLMOverloadedError(Exception):
+    """AI 服务繁忙：排队已满，或在截止时间内无法获得调用配额"""
+
+
+class TokenBucket:
+    """
+    令牌桶
+
+    容量为每分钟的配额，按每秒 rate_per_minute / 60 的速度补充。
+    rate_per_minute 为 0 时不限流。
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.tokens = self.capacity
+        self._updated_at = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def clamp(self, amount: float) -> float:
+        """单次消耗不能超过桶容量，否则永远无法满足"""
+        return min(amount, self.capacity) if self.enabled else 0
+
+    def time_until(self, amount: float, now: float) -> float:
+        """距离桶内有 amount 个令牌还需要的秒数"""
+        if not self.enabled:
+            return 0.0
+        self._refill(now)
+        missing = amount - self.tokens
+        return max(0.0, missing / self.rate)
+
+    def consume(self, amount: float):
+        if self.enabled:
+            self.tokens -= amount
+
+    def refund(self, amount: float):
+        """按实际用量修正（amount 为负数时追加扣减）"""
+        if self.enabled:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class LLMScheduler:
+    """
+    大模型调用调度器
+
+    每次调用前通过 slot() 申请配额：
+    - 同时进行的调用数不超过 max_concurrency
+    - 每分钟请求数和估算 Token 数不超过对应的令牌桶
+    - 等待的调用按优先级排队（交互式生成 > 行程修改 > 后台分析），同优先级先到先得
+    - 队列已满，或预计在该优先级的最长等待时间内拿不到配额时立即拒绝，
+      避免低价值的请求长时间占用排队位置
+
+    模型调用在线程池中同步执行，因此调度基于线程锁和条件变量。
+    """
+
+    PRIORITY_INTERACTIVE = 0
+    PRIORITY_MODIFY = 1
+    PRIORITY_BACKGROUND = 2
+
+    PRIORITY_NAMES = {
+        PRIORITY_INTERACTIVE: "interactive",
+        PRIORITY_MODIFY: "modify",
+        PRIORITY_BACKGROUND: "background",
+    }
+
+    # 保留最近的等待时间用于计算分位数
+    _WAIT_SAMPLES = 500
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        max_queue: int,
+        queue_timeouts: Dict[int, float]
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeouts = queue_timeouts
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._condition = threading.Condition()
+        self._waiters: list = []  # 堆：(优先级, 序号, 估算 Token 数)
+        self._sequence = itertools.count()
+        self._active = 0
+        self._stats = {
+            name: {"admitted": 0, "rejected_queue_full": 0, "rejected_deadline": 0, "waits": deque(maxlen=self._WAIT_SAMPLES)}
+            for name in self.PRIORITY_NAMES.values()
+        }
+        self._max_queue_depth = 0
+
+    @staticmethod
+    def estimate_tokens(prompt: str, expected_output_tokens: int) -> int:
+        """估算一次调用的 Token 数：提示词长度（中文约 1 字 1 Token）加预计输出"""
+        return int(len(prompt or "") * settings.LLM_TOKENS_PER_CHAR) + expected_output_tokens
+
+    def _estimated_wait(self, priority: int, tokens: float, now: float) -> float:
+        """按令牌桶补充速度，估算排在前面的请求都被满足后本请求的等待时间"""
+        ahead = [waiter for waiter in self._waiters if waiter[0] <= priority]
+        ahead_tokens = sum(waiter[2] for waiter in ahead)
+        return max(
+            self._requests.time_until(len(ahead) + 1, now),
+            self._tokens.time_until(ahead_tokens + tokens, now)
+        )
+
+    def _can_start(self, entry: tuple, now: float) -> Optional[float]:
+        """
+        判断排在队首的请求能否开始
+
+        Returns:
+            0 表示可以开始；否则为建议的等待秒数（None 表示等待其他调用结束）
+        """
+        if self._waiters[0] is not entry or self._active >= self.max_concurrency:
+            return None
+        wait = max(
+            self._requests.time_until(1, now),
+            self._tokens.time_until(entry[2], now)
+        )
+        return wait
+
+    @contextmanager
+    def slot(self, priority: int, estimated_tokens: int) -> Iterator[Dict[str, Any]]:
+        """
+        申请一次调用配额，离开 with 块时释放并发名额
+
+        Yields:
+            调用凭证，可传给 settle() 按实际 Token 用量修正令牌桶
+
+        Raises:
+            LLMOverloadedError: 排队已满或等待超时
+        """
+        name = self.PRIORITY_NAMES.get(priority, "background")
+        stats = self._stats[name]
+        timeout = self.queue_timeouts.get(priority, 10.0)
+        tokens = self._tokens.clamp(estimated_tokens)
+        start = time.monotonic()
+        deadline = start + timeout
+
+        with self._condition:
+            if len(self._waiters) >= self.max_queue:
+                stats["rejected_queue_full"] += 1
+                raise LLMOverloadedError("AI 服务繁忙（排队已满），请稍后再试")
+
+            if self._estimated_wait(priority, tokens, start) > timeout:
+                stats["rejected_deadline"] += 1
+                raise LLMOverloadedError("AI 服务繁忙（超出调用频率限制），请稍后再试")
+
+            entry = (priority, next(self._sequence), tokens)
+            heapq.heappush(self._waiters, entry)
+            self._max_queue_depth = max(self._max_queue_depth, len(self._waiters))
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self._can_start(entry, now)
+                    if wait == 0:
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0 or (wait is not None and wait > remaining):
+                        stats["rejected_deadline"] += 1
+                        raise LLMOverloadedError("AI 服务繁忙（排队超时），请稍后再试")
+                    self._condition.wait(min(remaining, wait) if wait is not None else remaining)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                # 队首变化，唤醒其他等待者重新检查
+                self._condition.notify_all()
+
+            self._requests.consume(1)
+            self._tokens.consume(tokens)
+            self._active += 1
+            stats["admitted"] += 1
+            stats["waits"].append(time.monotonic() - start)
+
+        ticket = {"priority": name, "estimated_tokens": tokens}
+        try:
+            yield ticket
+        finally:
+            with self._condition:
+                self._active -= 1
+                self._condition.notify_all()
+
+    def settle(self, ticket: Dict[str, Any], actual_tokens: Optional[int]):
+        """调用完成后按实际 Token 用量修正令牌桶"""
+        if not actual_tokens:
+            return
+        with self._condition:
+            self._tokens.refund(ticket["estimated_tokens"] - actual_tokens)
+            self._condition.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """队列深度、等待时间和拒绝次数"""
+        with self._condition:
+            by_priority = {}
+            for name, stats in self._stats.items():
+                waits = sorted(stats["waits"])
+                by_priority[name] = {
+                    "admitted": stats["admitted"],
+                    "rejected_queue_full": stats["rejected_queue_full"],
+                    "rejected_deadline": stats["rejected_deadline"],
+                    "queued": sum(
+                        1 for waiter in self._waiters if self.PRIORITY_NAMES.get(waiter[0]) == name
+                    ),
+                    "wait_avg_ms": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+                    "wait_p95_ms": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 1) if waits else 0.0,
+                    "wait_max_ms": round(waits[-1] * 1000, 1) if waits else 0.0
+                }
+            return {
+                "active": self._active,
+                "max_concurrency": self.max_concurrency,
+                "queue_depth": len(self._waiters),
+                "max_queue_depth": self._max_queue_depth,
+                "max_queue": self.max_queue,
+                "request_tokens_available": round(self._requests.tokens, 1) if self._requests.enabled else None,
+                "llm_tokens_available": round(self._tokens.tokens, 1) if self._tokens.enabled else None,
+                "by_priority": by_priority
+            }
+
+
+llm_scheduler = LLMScheduler(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+    tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+    max_queue=settings.LLM_MAX_QUEUE,
+    queue_timeouts={
+        LLMScheduler.PRIORITY_INTERACTIVE: settings.LLM_QUEUE_TIMEOUT_INTERACTIVE,
+        LLMScheduler.PRIORITY_MODIFY: settings.LLM_QUEUE_TIMEOUT_MODIFY,
+        LLMScheduler.PRIORITY_BACKGROUND: settings.LLM_QUEUE_TIMEOUT_BACKGROUND,
+    }
+)
@@ -0,0 +1,285 @@
+"""
+大模型调用遥测 - 记录每次调用的提示词/响应大小、耗时拆分、JSON 修复和失败类别
+"""
+import time
+import threading
+from collections import deque
+from typing import Dict, Any, List, Sequence
+from ..config import settings
+
+
+class Histogram:
+    """
+    固定分桶的直方图
+
+    buckets 为各桶的上界（升序），输出时按 Prometheus 的习惯给出累计计数（le = 小于等于）。
+    """
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 最后一个桶为 +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets + ["+Inf"], self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {"count": self.count, "sum": round(self.sum, 4), "buckets": buckets}
+
+
+# 各指标的分桶
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)            # 秒
+PARSE_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)     # 秒
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+
+def _percentile(values: List[float], ratio: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+class LLMTelemetry:
+    """
+    大模型调用遥测
+
+    一次调用分两个阶段记录，都在执行调用的线程中完成：
+    - begin()/admitted()/end_call()：AIService._call_llm 中记录模型、提示词大小、排队耗时、
+      上游耗时（不含排队）、Token 用量和调用结果
+    - record_parse()：AIService._parse_json_content 中记录修复耗时、json.loads 耗时和触发的修复规则，
+      通过线程局部变量关联到同一线程中最近一次调用
+
+    累计直方图用于 /api/metrics，最近 window 次调用的明细用于滚动汇总。
+    """
+
+    # 调用结果
+    OUTCOME_OK = "ok"
+    OUTCOME_RATE_LIMITED = "rate_limited"
+    OUTCOME_CONTENT_FILTER = "content_filter"
+    OUTCOME_API_ERROR = "api_error"
+    OUTCOME_OVERLOADED = "overloaded"
+    OUTCOME_EXCEPTION = "exception"
+
+    # 解析结果
+    PARSE_CLEAN = "clean"
+    PARSE_REPAIRED = "repaired"
+    PARSE_NO_JSON = "no_json"
+    PARSE_INVALID = "invalid_json"
+
+    def __init__(self, window: int):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._recent: deque = deque(maxlen=window)
+        self._methods: Dict[str, Dict[str, Any]] = {}
+
+    def _method_stats(self, method: str) -> Dict[str, Any]:
+        stats = self._methods.get(method)
+        if stats is None:
+            stats = {
+                "calls": 0,
+                "outcomes": {},
+                "parse_outcomes": {},
+                "repairs": {},
+                "queue_wait_seconds": Histogram(LATENCY_BUCKETS),
+                "upstream_latency_seconds": Histogram(LATENCY_BUCKETS),
+                "first_token_seconds": Histogram(LATENCY_BUCKETS),
+                "repair_seconds": Histogram(PARSE_BUCKETS),
+                "json_loads_seconds": Histogram(PARSE_BUCKETS),
+                "prompt_tokens": Histogram(TOKEN_BUCKETS),
+                "completion_tokens": Histogram(TOKEN_BUCKETS),
+            }
+            self._methods[method] = stats
+        return stats
+
+    def begin(self, method: str, model: str, prompt: str, estimated_tokens: int, streamed: bool = False) -> Dict[str, Any]:
+        """开始记录一次调用，返回调用记录（同时成为当前线程的当前调用）"""
+        record = {
+            "method": method,
+            "model": model,
+            "streamed": streamed,
+            "prompt_chars": len(prompt or ""),
+            "estimated_tokens": estimated_tokens,
+            "input_tokens": None,
+            "completion_tokens": None,
+            "queue_ms": None,
+            "upstream_ms": None,
+            "first_token_ms": None,
+            "repair_ms": None,
+            "json_loads_ms": None,
+            "repairs": {},
+            "outcome": None,
+            "parse_outcome": None,
+            "started_at": time.time(),
+            "_start": time.perf_counter(),
+        }
+        self._local.current = record
+        return record
+
+    def admitted(self, record: Dict[str, Any]):
+        """调度器放行，之后的耗时计入上游耗时"""
+        now = time.perf_counter()
+        record["queue_ms"] = round((now - record["_start"]) * 1000, 1)
+        record["_start"] = now
+
+    def first_token(self, record: Dict[str, Any]):
+        """流式调用收到第一个片段"""
+        if record["first_token_ms"] is None:
+            record["first_token_ms"] = round((time.perf_counter() - record["_start"]) * 1000, 1)
+
+    def end_call(self, record: Dict[str, Any], outcome: str, response: Any = None):
+        """
+        上游调用结束
+
+        Args:
+            record: begin() 返回的记录
+            outcome: 调用结果（OUTCOME_*）
+            response: 模型响应，用于读取 Token 用量
+        """
+        if record["queue_ms"] is not None:
+            record["upstream_ms"] = round((time.perf_counter() - record["_start"]) * 1000, 1)
+        record["outcome"] = outcome
+        usage = getattr(response, "usage", None) if response is not None else None
+        if usage is not None:
+            record["input_tokens"] = getattr(usage, "input_tokens", None)
+            record["completion_tokens"] = getattr(usage, "output_tokens", None)
+
+        with self._lock:
+            stats = self._method_stats(record["method"])
+            stats["calls"] += 1
+            stats["outcomes"][outcome] = stats["outcomes"].get(outcome, 0) + 1
+            if record["queue_ms"] is not None:
+                stats["queue_wait_seconds"].observe(record["queue_ms"] / 1000)
+            if record["upstream_ms"] is not None:
+                stats["upstream_latency_seconds"].observe(record["upstream_ms"] / 1000)
+            if record["first_token_ms"] is not None:
+                stats["first_token_seconds"].observe(record["first_token_ms"] / 1000)
+            stats["prompt_tokens"].observe(record["input_tokens"] or record["estimated_tokens"])
+            if record["completion_tokens"]:
+                stats["completion_tokens"].observe(record["completion_tokens"])
+            self._recent.append(record)
+
+        print(
+            f"📊 {record['method']}（{record['model']}）: {outcome}, "
+            f"排队 {record['queue_ms'] or 0}ms, 上游 {record['upstream_ms'] or 0}ms, "
+            f"提示词 {record['prompt_chars']} 字符, 输出 {record['completion_tokens'] or '-'} Token"
+        )
+
+    @staticmethod
+    def classify(response: Any) -> str:
+        """根据模型响应判断调用结果"""
+        if response.status_code == 200:
+            return LLMTelemetry.OUTCOME_OK
+        code = str(getattr(response, "code", "") or "")
+        message = str(getattr(response, "message", "") or "")
+        if response.status_code == 429 or code.startswith("Throttling"):
+            return LLMTelemetry.OUTCOME_RATE_LIMITED
+        if code == "DataInspectionFailed" or "inappropriate content" in message:
+            return LLMTelemetry.OUTCOME_CONTENT_FILTER
+        return LLMTelemetry.OUTCOME_API_ERROR
+
+    def record_parse(self, outcome: str, repair_seconds: float, loads_seconds: float, repairs: Dict[str, int]):
+        """记录当前线程最近一次调用的 JSON 解析耗时和修复规则"""
+        record = getattr(self._local, "current", None)
+        if record is None or record["parse_outcome"] is not None:
+            return
+        record["parse_outcome"] = outcome
+        record["repair_ms"] = round(repair_seconds * 1000, 3)
+        record["json_loads_ms"] = round(loads_seconds * 1000, 3)
+        record["repairs"] = dict(repairs)
+
+        with self._lock:
+            stats = self._method_stats(record["method"])
+            stats["parse_outcomes"][outcome] = stats["parse_outcomes"].get(outcome, 0) + 1
+            stats["json_loads_seconds"].observe(loads_seconds)
+            if repair_seconds:
+                stats["repair_seconds"].observe(repair_seconds)
+            for rule, count in repairs.items():
+                stats["repairs"][rule] = stats["repairs"].get(rule, 0) + count
+
+    def histograms(self) -> Dict[str, Any]:
+        """启动以来各方法的累计计数和直方图"""
+        with self._lock:
+            result = {}
+            for method, stats in self._methods.items():
+                result[method] = {
+                    key: value.snapshot() if isinstance(value, Histogram) else (
+                        dict(value) if isinstance(value, dict) else value
+                    )
+                    for key, value in stats.items()
+                }
+            return result
+
+    def summary(self, recent: int = 20) -> Dict[str, Any]:
+        """
+        最近 window 次调用的滚动汇总
+
+        Args:
+            recent: 同时返回的最近调用明细条数
+        """
+        with self._lock:
+            records = list(self._recent)
+
+        by_method: Dict[str, List[Dict[str, Any]]] = {}
+        for record in records:
+            by_method.setdefault(record["method"], []).append(record)
+
+        def distribution(values: List[float]) -> Dict[str, float]:
+            values = [value for value in values if value is not None]
+            return {
+                "avg": round(sum(values) / len(values), 3) if values else 0.0,
+                "p50": round(_percentile(values, 0.5), 3),
+                "p95": round(_percentile(values, 0.95), 3),
+                "max": round(max(values), 3) if values else 0.0,
+            }
+
+        methods = {}
+        for method, items in by_method.items():
+            outcomes: Dict[str, int] = {}
+            parse_outcomes: Dict[str, int] = {}
+            repairs: Dict[str, int] = {}
+            for item in items:
+                outcomes[item["outcome"]] = outcomes.get(item["outcome"], 0) + 1
+                if item["parse_outcome"]:
+                    parse_outcomes[item["parse_outcome"]] = parse_outcomes.get(item["parse_outcome"], 0) + 1
+                for rule, count in item["repairs"].items():
+                    repairs[rule] = repairs.get(rule, 0) + count
+            methods[method] = {
+                "calls": len(items),
+                "outcomes": outcomes,
+                "parse_outcomes": parse_outcomes,
+                "repairs": repairs,
+                "queue_ms": distribution([item["queue_ms"] for item in items]),
+                "upstream_ms": distribution([item["upstream_ms"] for item in items]),
+                "first_token_ms": distribution([item["first_token_ms"] for item in items]),
+                "repair_ms": distribution([item["repair_ms"] for item in items]),
+                "json_loads_ms": distribution([item["json_loads_ms"] for item in items]),
+                "prompt_chars": distribution([item["prompt_chars"] for item in items]),
+                "completion_tokens": distribution([item["completion_tokens"] for item in items]),
+            }
+
+        return {
+            "window": self._recent.maxlen,
+            "calls": len(records),
+            "methods": methods,
+            "recent": [
+                {key: value for key, value in record.items() if not key.startswith("_")}
+                for record in records[-recent:]
+            ] if recent > 0 else []
+        }
+
+
+llm_telemetry = LLMTelemetry(window=settings.LLM_TELEMETRY_WINDOW)
@@ -1,26 +1,136 @@
 """
 地图服务 - 使用高德地图 API
 """
-from typing import Dict, List, Optional, Any
-import requests
+import time
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Any, Set, Tuple, Callable, Awaitable
 from ..config import settings
+from .outbound_http import outbound_http
+from .circuit_breaker import CircuitBreakers, CircuitOpenError
+from .geo_cache import geo_cache, GeoCache
+from .poi_index import poi_index, distance_meters
+from . import polyline
 
 
 class MapService:
-    """高德地图服务类"""
+    """
+    高德地图服务类（请求经过共享的出站连接池）
     
-    BASE_URL = "https://restapi.amap.com/v3"
+    地理编码、关键字 / 周边搜索、路径规划和天气各有一个熔断器（amap_breakers）：
+    熔断器打开时不再请求高德、直接失败，有缓存的结果返回过期的缓存并在后台刷新。
+    """
+    
+    BASE_URL = settings.AMAP_BASE_URL.rstrip("/")
+    
+    # 视为高德暂时不可用的错误码：配额用尽、访问过于频繁、服务繁忙等（3 开头的服务端错误同样计入）
+    UNAVAILABLE_INFOCODES = {
+        "10003", "10004", "10014", "10015", "10016", "10017", "10019", "10020", "10021", "10044", "10045"
+    }
+    
+    # 正在后台刷新的缓存键
+    _refreshing: Set[str] = set()
+    # 后台预取、刷新任务的引用，避免任务在执行过程中被垃圾回收
+    _background_tasks: Set["asyncio.Task"] = set()
     
     @staticmethod
-    def geocode(address: str) -> Optional[Dict[str, Any]]:
+    async def _amap_get(breaker: str, url: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
-        地理编码：将地址转换为经纬度
+        经过熔断器请求高德接口
+        
+        请求异常、非 200 响应、配额用尽等错误码记为失败，耗时超过 AMAP_BREAKER_SLOW_CALL_SECONDS 的调用
+        也记为失败；参数错误、未找到等正常的业务结果不影响熔断器。
+        
+        Args:
+            breaker: 熔断器名称（geocode、place、direction、weather）
+            url: 接口地址
+            params: 请求参数
+            
+        Returns:
+            响应的 JSON，HTTP 状态码不是 200 时返回 None
+            
+        Raises:
+            CircuitOpenError: 熔断器打开，请求没有发出
+        """
+        amap_breakers.check(breaker)
+        start = time.perf_counter()
+        try:
+            response = await outbound_http.request("amap", "GET", url, params=params)
+            data = response.json() if response.status_code == 200 else None
+        except Exception:
+            amap_breakers.record(breaker, False)
+            raise
+        
+        infocode = str((data or {}).get("infocode", ""))
+        failed = data is None or (
+            data.get("status") != "1" and (infocode in MapService.UNAVAILABLE_INFOCODES or infocode.startswith("3"))
+        )
+        amap_breakers.record(breaker, not failed, time.perf_counter() - start)
+        return data
+    
+    @staticmethod
+    async def _serve_stale(breaker: str, key: str, refresh: Callable[[], Awaitable[Any]]) -> Tuple[bool, Any]:
+        """
+        高德请求失败或熔断时读取过期的缓存，命中时在后台刷新
+        
+        刷新在熔断器允许探测时进行（熔断器关闭时等待 AMAP_BREAKER_RECOVERY_SECONDS），
+        同一个键同时只有一个刷新任务；刷新仍然失败时放弃，下次读到过期缓存时再安排。
+        
+        Returns:
+            (是否命中, 过期的结果)
+        """
+        hit, value = await geo_cache.aget_stale(key)
+        if not hit or key in MapService._refreshing:
+            return hit, value
+        
+        circuit = amap_breakers.get(breaker)
+        delay = circuit.retry_after() if circuit.state != circuit.CLOSED else settings.AMAP_BREAKER_RECOVERY_SECONDS
+        print(f"♻️ 高德 {breaker} 不可用，返回过期的缓存，{delay:.0f} 秒后在后台刷新")
+        
+        async def run():
+            try:
+                await asyncio.sleep(delay)
+                await refresh()
+            finally:
+                MapService._refreshing.discard(key)
+        
+        MapService._refreshing.add(key)
+        task = asyncio.get_running_loop().create_task(run())
+        MapService._background_tasks.add(task)
+        task.add_done_callback(MapService._background_tasks.discard)
+        return hit, value
+    
+    @staticmethod
+    async def geocode(address: str, city: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        地理编码：将地址转换为经纬度（经过地理缓存）
         
         Args:
             address: 地址字符串
+            city: 限定的城市
             
         Returns:
-            包含经纬度的字典
+            包含经纬度的字典，找不到或请求失败时返回 None
+        """
+        key = GeoCache.make_key(GeoCache.KIND_GEOCODE, address, city)
+        hit, cached = await geo_cache.aget(key)
+        if hit:
+            return cached
+        
+        definitive, result = await MapService._fetch_geocode(address, city)
+        if definitive:
+            await geo_cache.aset(key, result)
+            return result
+        _, stale = await MapService._serve_stale("geocode", key, lambda: MapService.geocode(address, city))
+        return stale
+    
+    @staticmethod
+    async def _fetch_geocode(address: str, city: Optional[str] = None) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        请求高德地理编码
+        
+        Returns:
+            (高德是否给出了明确结果, 结果)。请求失败、配额用尽等错误时第一项为 False，不应缓存
         """
         try:
             url = f"{MapService.BASE_URL}/geocode/geo"
@@ -28,17 +138,17 @@ class MapService:
                 "key": settings.AMAP_WEB_SERVICE_KEY,
                 "address": address
             }
+            if city:
+                params["city"] = city
             
             print(f"\n📍 地理编码请求:")
             print(f"  地址: {address}")
             print(f"  URL: {url}")
             print(f"  API Key 前10位: {settings.AMAP_WEB_SERVICE_KEY[:10]}...")
             
-            response = requests.get(url, params=params, timeout=10)
-            print(f"  响应状态码: {response.status_code}")
+            data = await MapService._amap_get("geocode", url, params)
             
-            if response.status_code == 200:
-                data = response.json()
+            if data is not None:
                 print(f"  响应数据: {data}")
                 
                 if data.get("status") == "1" and data.get("geocodes"):
@@ -51,28 +161,35 @@ class MapService:
                             "formatted_address": geocode.get("formatted_address", address)
                         }
                         print(f"  ✅ 地理编码成功: {result}")
-                        return result
+                        return True, result
+                    return True, None
+                elif data.get("status") == "1":
+                    print(f"  ⚠️ 地址未找到: {address}")
+                    return True, None
                 else:
                     error_msg = data.get("info", "未知错误")
                     print(f"  ❌ 地理编码失败: status={data.get('status')}, info={error_msg}")
-                    return None
+                    return False, None
             else:
-                print(f"  ❌ HTTP 请求失败: {response.status_code}")
-            return None
+                print(f"  ❌ HTTP 请求失败")
+            return False, None
+        except CircuitOpenError as e:
+            print(f"⛔ 地理编码跳过: {str(e)}")
+            return False, None
         except Exception as e:
             print(f"❌ 地理编码异常: {str(e)}")
             import traceback
             traceback.print_exc()
-            return None
+            return False, None
     
     @staticmethod
-    def search_poi(
+    async def search_poi(
         query: str,
         city: Optional[str] = None,
         types: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
-        搜索兴趣点（POI）
+        搜索兴趣点（POI，经过地理缓存）
         
         Args:
             query: 搜索关键词
@@ -82,6 +199,46 @@ class MapService:
         Returns:
             POI 列表
         """
+        key = GeoCache.make_key(GeoCache.KIND_POI, query, city, types)
+        hit, cached = await geo_cache.aget(key)
+        if hit:
+            # 其他进程写入数据库的结果也加入本进程的空间索引（已存在的会跳过）
+            poi_index.add_many(cached or [])
+            return cached or []
+        
+        definitive, pois = await MapService._fetch_pois(query, city, types)
+        if definitive:
+            await geo_cache.aset(key, pois)
+            poi_index.add_many(pois)
+            return pois
+        _, stale = await MapService._serve_stale("place", key, lambda: MapService.search_poi(query, city, types))
+        return stale or []
+    
+    @staticmethod
+    def _parse_poi(poi: Dict[str, Any]) -> Dict[str, Any]:
+        """高德返回的 POI 转换为统一的格式"""
+        location = poi.get("location", "").split(",")
+        return {
+            "id": poi.get("id"),
+            "name": poi.get("name"),
+            "type": poi.get("type"),
+            "typecode": poi.get("typecode"),
+            "address": poi.get("address"),
+            "location": {
+                "longitude": float(location[0]) if len(location) > 0 else None,
+                "latitude": float(location[1]) if len(location) > 1 else None
+            },
+            "tel": poi.get("tel"),
+            "distance": poi.get("distance")
+        }
+    
+    @staticmethod
+    async def _fetch_pois(
+        query: str,
+        city: Optional[str] = None,
+        types: Optional[str] = None
+    ) -> Tuple[bool, List[Dict[str, Any]]]:
+        """请求高德关键字搜索，返回 (高德是否给出了明确结果, POI 列表)"""
         try:
             url = f"{MapService.BASE_URL}/place/text"
             params = {
@@ -95,33 +252,230 @@ class MapService:
             if types:
                 params["types"] = types
             
-            response = requests.get(url, params=params, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("status") == "1":
-                    pois = []
-                    for poi in data.get("pois", []):
-                        location = poi.get("location", "").split(",")
-                        pois.append({
-                            "id": poi.get("id"),
-                            "name": poi.get("name"),
-                            "type": poi.get("type"),
-                            "address": poi.get("address"),
-                            "location": {
-                                "longitude": float(location[0]) if len(location) > 0 else None,
-                                "latitude": float(location[1]) if len(location) > 1 else None
-                            },
-                            "tel": poi.get("tel"),
-                            "distance": poi.get("distance")
-                        })
-                    return pois
-            return []
+            data = await MapService._amap_get("place", url, params)
+            if data is not None and data.get("status") == "1":
+                return True, [MapService._parse_poi(poi) for poi in data.get("pois", [])]
+            return False, []
         except Exception as e:
             print(f"POI 搜索错误: {str(e)}")
-            return []
+            return False, []
+    
+    # 高德周边搜索每页最多 25 个结果
+    AROUND_PAGE_SIZE = 25
+    
+    @staticmethod
+    async def search_nearby(
+        longitude: float,
+        latitude: float,
+        radius: int = 1000,
+        types: Optional[str] = None,
+        limit: int = 20
+    ) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        搜索附近的 POI：优先使用进程内的 POI 空间索引
+        
+        本地结果少于 min(limit, POI_NEARBY_MIN_RESULTS) 个时才请求高德周边搜索，
+        周边搜索的结果经过地理缓存（中心点取到约 100 米），并加入空间索引。
+        
+        Returns:
+            (结果来源 "index" 或 "amap", 按距离排序的 POI 列表)
+        """
+        local = poi_index.nearby(longitude, latitude, radius, types, limit)
+        if len(local) >= min(limit, settings.POI_NEARBY_MIN_RESULTS):
+            return "index", local
+        
+        pois = await MapService._search_around(f"{round(longitude, 3)},{round(latitude, 3)}", radius, types)
+        if pois is None:
+            return "index", local
+        
+        # 与本地结果合并；缓存的中心点与请求的中心点略有偏差，距离按请求的中心点重新计算
+        merged = {poi["id"]: poi for poi in local}
+        for poi in pois or []:
+            location = poi.get("location") or {}
+            if poi.get("id") in merged or location.get("longitude") is None or location.get("latitude") is None:
+                continue
+            distance = distance_meters(longitude, latitude, location["longitude"], location["latitude"])
+            if distance <= radius:
+                merged[poi.get("id")] = {**poi, "distance": str(int(round(distance)))}
+        return "amap", sorted(merged.values(), key=lambda poi: int(poi["distance"]))[:limit]
+    
+    @staticmethod
+    async def _search_around(location: str, radius: int, types: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """周边搜索（经过地理缓存），结果加入空间索引；请求失败且没有缓存时返回 None"""
+        key = GeoCache.make_key(GeoCache.KIND_AROUND, f"{location},{radius}", None, types)
+        hit, pois = await geo_cache.aget(key)
+        if not hit:
+            definitive, pois = await MapService._fetch_around(location, radius, types)
+            if definitive:
+                await geo_cache.aset(key, pois)
+            else:
+                hit, pois = await MapService._serve_stale(
+                    "place", key, lambda: MapService._search_around(location, radius, types)
+                )
+                if not hit:
+                    return None
+        poi_index.add_many(pois or [])
+        return pois or []
+    
+    @staticmethod
+    async def _fetch_around(
+        location: str,
+        radius: int,
+        types: Optional[str] = None
+    ) -> Tuple[bool, List[Dict[str, Any]]]:
+        """请求高德周边搜索，返回 (高德是否给出了明确结果, POI 列表)"""
+        try:
+            url = f"{MapService.BASE_URL}/place/around"
+            params = {
+                "key": settings.AMAP_WEB_SERVICE_KEY,
+                "location": location,
+                "radius": radius,
+                "sortrule": "distance",
+                "offset": MapService.AROUND_PAGE_SIZE
+            }
+            if types:
+                params["types"] = types
+            
+            data = await MapService._amap_get("place", url, params)
+            if data is not None and data.get("status") == "1":
+                return True, [MapService._parse_poi(poi) for poi in data.get("pois", [])]
+            return False, []
+        except Exception as e:
+            print(f"周边搜索错误: {str(e)}")
+            return False, []
+    
+    # 高德批量地理编码每次最多 10 个地址
+    GEOCODE_BATCH_SIZE = 10
     
     @staticmethod
-    def get_route(
+    async def geocode_batch(addresses: List[str], city: Optional[str] = None) -> List[Optional[Dict[str, Any]]]:
+        """
+        批量地理编码（经过地理缓存）
+        
+        未命中缓存的地址去重后按每 10 个一组使用高德的 batch=true 接口，各组并发请求。
+        
+        Args:
+            addresses: 地址列表
+            city: 限定的城市
+            
+        Returns:
+            与 addresses 顺序一致的结果列表，找不到或请求失败的位置为 None
+        """
+        keys = [GeoCache.make_key(GeoCache.KIND_GEOCODE, address, city) for address in addresses]
+        unique = dict(zip(keys, addresses))
+        cached = await asyncio.gather(*[geo_cache.aget(key) for key in unique])
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+        pending = []
+        for (key, address), (hit, value) in zip(unique.items(), cached):
+            if hit:
+                results[key] = value
+            else:
+                pending.append((key, address))
+        
+        if pending:
+            print(f"📍 批量地理编码: {len(addresses)} 个地址, 缓存命中 {len(unique) - len(pending)}, 请求 {len(pending)}")
+            semaphore = asyncio.Semaphore(settings.AMAP_BATCH_CONCURRENCY)
+            
+            async def resolve_chunk(chunk: List[Tuple[str, str]]):
+                async with semaphore:
+                    definitive, chunk_results = await MapService._fetch_geocode_batch(
+                        [address for _, address in chunk], city
+                    )
+                for (key, address), result in zip(chunk, chunk_results):
+                    if definitive:
+                        results[key] = result
+                        await geo_cache.aset(key, result)
+                    else:
+                        _, results[key] = await MapService._serve_stale(
+                            "geocode", key, lambda address=address: MapService.geocode(address, city)
+                        )
+            
+            size = MapService.GEOCODE_BATCH_SIZE
+            await asyncio.gather(*[
+                resolve_chunk(pending[start:start + size]) for start in range(0, len(pending), size)
+            ])
+        
+        return [results.get(key) for key in keys]
+    
+    @staticmethod
+    async def _fetch_geocode_batch(
+        addresses: List[str],
+        city: Optional[str] = None
+    ) -> Tuple[bool, List[Optional[Dict[str, Any]]]]:
+        """
+        请求高德批量地理编码（最多 10 个地址）
+        
+        Returns:
+            (高德是否给出了明确结果, 与 addresses 顺序一致的结果列表)
+        """
+        empty: List[Optional[Dict[str, Any]]] = [None] * len(addresses)
+        try:
+            params = {
+                "key": settings.AMAP_WEB_SERVICE_KEY,
+                # 地址中的 | 会被当作分隔符
+                "address": "|".join(address.replace("|", " ") for address in addresses),
+                "batch": "true"
+            }
+            if city:
+                params["city"] = city
+            
+            data = await MapService._amap_get("geocode", f"{MapService.BASE_URL}/geocode/geo", params)
+            if data is None:
+                print(f"❌ 批量地理编码 HTTP 请求失败")
+                return False, empty
+            
+            if data.get("status") != "1":
+                print(f"❌ 批量地理编码失败: status={data.get('status')}, info={data.get('info')}")
+                return False, empty
+            
+            results = []
+            geocodes = data.get("geocodes") or []
+            for index, address in enumerate(addresses):
+                geocode = geocodes[index] if index < len(geocodes) else None
+                location = geocode.get("location") if isinstance(geocode, dict) else None
+                parts = location.split(",") if isinstance(location, str) else []
+                if len(parts) == 2:
+                    results.append({
+                        "longitude": float(parts[0]),
+                        "latitude": float(parts[1]),
+                        "formatted_address": geocode.get("formatted_address") or address
+                    })
+                else:
+                    # 批量模式下找不到的地址对应空对象
+                    results.append(None)
+            return True, results
+        except Exception as e:
+            print(f"❌ 批量地理编码异常: {str(e)}")
+            return False, empty
+    
+    @staticmethod
+    async def search_poi_batch(
+        queries: List[str],
+        city: Optional[str] = None,
+        types: Optional[str] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        批量搜索 POI（经过地理缓存）
+        
+        高德关键字搜索没有批量接口，去重后并发请求（同时最多 AMAP_BATCH_CONCURRENCY 个）。
+        
+        Returns:
+            与 queries 顺序一致的 POI 列表
+        """
+        keys = [GeoCache.make_key(GeoCache.KIND_POI, query, city, types) for query in queries]
+        unique = dict(zip(keys, queries))
+        semaphore = asyncio.Semaphore(settings.AMAP_BATCH_CONCURRENCY)
+        
+        async def search(query: str) -> List[Dict[str, Any]]:
+            async with semaphore:
+                return await MapService.search_poi(query, city, types)
+        
+        found = await asyncio.gather(*[search(query) for query in unique.values()])
+        results = dict(zip(unique, found))
+        return [results[key] for key in keys]
+    
+    @staticmethod
+    async def get_route(
         origin: str,
         destination: str,
         mode: str = "driving"
@@ -153,28 +507,177 @@ class MapService:
                 "destination": destination
             }
             
-            response = requests.get(url, params=params, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("status") == "1":
-                    route = data.get("route", {})
-                    paths = route.get("paths", [])
-                    if paths:
-                        path = paths[0]
-                        return {
-                            "distance": path.get("distance"),
-                            "duration": path.get("duration"),
-                            "steps": path.get("steps", [])
-                        }
+            data = await MapService._amap_get("direction", url, params)
+            if data is not None and data.get("status") == "1":
+                route = data.get("route", {})
+                paths = route.get("paths", [])
+                if paths:
+                    path = paths[0]
+                    return {
+                        "distance": path.get("distance"),
+                        "duration": path.get("duration"),
+                        "steps": path.get("steps", [])
+                    }
             return None
         except Exception as e:
             print(f"路径规划错误: {str(e)}")
             return None
     
+    # 路径规划的接口地址
+    ROUTE_PATHS = {
+        "driving": "/direction/driving",
+        "walking": "/direction/walking",
+        "transit": "/direction/transit/integrated"
+    }
+    
     @staticmethod
-    def get_weather(city: str) -> Optional[Dict[str, Any]]:
+    def _point(longitude: float, latitude: float) -> str:
+        """坐标格式化为 lon,lat，保留 6 位小数（同一地点的缓存键一致）"""
+        return f"{round(longitude, 6)},{round(latitude, 6)}"
+    
+    @staticmethod
+    async def get_day_routes(
+        points: List[Tuple[float, float]],
+        mode: str = "driving",
+        zoom: int = 14,
+        city: Optional[str] = None
+    ) -> List[Optional[Dict[str, Any]]]:
         """
-        获取天气信息
+        一天行程的逐段路径（经过路径缓存）
+        
+        相邻两点为一段，各段并发请求（同时最多 AMAP_BATCH_CONCURRENCY 个）。
+        缓存中保存完整精度的折线，返回时按缩放级别抽稀（容差约 1 像素）并编码。
+        
+        Args:
+            points: 按顺序排列的坐标 [(经度, 纬度)]
+            mode: 出行方式（driving、walking、transit）
+            zoom: 地图缩放级别，决定折线抽稀的程度
+            city: 城市（公交规划必填）
+            
+        Returns:
+            各段结果 {"distance", "duration", "polyline", "points"}，规划失败的段为 None
+        """
+        tolerance = polyline.tolerance_for_zoom(zoom)
+        semaphore = asyncio.Semaphore(settings.AMAP_BATCH_CONCURRENCY)
+        
+        async def leg(origin: str, destination: str) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                route = await MapService.get_route_leg(origin, destination, mode, city)
+            if not route:
+                return None
+            path = polyline.simplify(polyline.decode(route["polyline"]), tolerance)
+            return {
+                "distance": route["distance"],
+                "duration": route["duration"],
+                "polyline": polyline.encode(path),
+                "points": len(path)
+            }
+        
+        coordinates = [MapService._point(longitude, latitude) for longitude, latitude in points]
+        return list(await asyncio.gather(*[
+            leg(origin, destination) for origin, destination in zip(coordinates, coordinates[1:])
+        ]))
+    
+    @staticmethod
+    async def get_route_leg(
+        origin: str,
+        destination: str,
+        mode: str = "driving",
+        city: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        单段路径（经过路径缓存）
+        
+        Returns:
+            {"distance": 米, "duration": 秒, "polyline": 完整精度的编码折线}，规划失败时返回 None
+        """
+        key = GeoCache.make_key(GeoCache.KIND_ROUTE, f"{origin};{destination}", city if mode == "transit" else None, mode)
+        hit, cached = await geo_cache.aget(key)
+        if hit:
+            return cached
+        
+        definitive, route = await MapService._fetch_route_leg(origin, destination, mode, city)
+        if definitive:
+            await geo_cache.aset(key, route, settings.ROUTE_CACHE_TTL_SECONDS if route else None)
+            return route
+        _, stale = await MapService._serve_stale(
+            "direction", key, lambda: MapService.get_route_leg(origin, destination, mode, city)
+        )
+        return stale
+    
+    @staticmethod
+    async def _fetch_route_leg(
+        origin: str,
+        destination: str,
+        mode: str,
+        city: Optional[str] = None
+    ) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """请求高德路径规划，返回 (高德是否给出了明确结果, 路径)"""
+        if mode not in MapService.ROUTE_PATHS:
+            return False, None
+        try:
+            params = {
+                "key": settings.AMAP_WEB_SERVICE_KEY,
+                "origin": origin,
+                "destination": destination
+            }
+            if mode == "transit" and city:
+                params["city"] = city
+            
+            data = await MapService._amap_get("direction", f"{MapService.BASE_URL}{MapService.ROUTE_PATHS[mode]}", params)
+            if data is None:
+                return False, None
+            if data.get("status") != "1":
+                print(f"❌ 路径规划失败: status={data.get('status')}, info={data.get('info')}")
+                return False, None
+            
+            route = data.get("route", {})
+            if mode == "transit":
+                plans = route.get("transits") or []
+                if not plans:
+                    return True, None
+                plan = plans[0]
+                paths = []
+                for segment in plan.get("segments") or []:
+                    for step in (segment.get("walking") or {}).get("steps") or []:
+                        paths.append(polyline.parse_amap_polyline(step.get("polyline")))
+                    buslines = (segment.get("bus") or {}).get("buslines") or []
+                    if buslines:
+                        paths.append(polyline.parse_amap_polyline(buslines[0].get("polyline")))
+                # 没有分段信息时用各步骤的折线
+                if not any(paths):
+                    paths = [polyline.parse_amap_polyline(step.get("polyline")) for step in plan.get("steps") or []]
+            else:
+                plans = route.get("paths") or []
+                if not plans:
+                    return True, None
+                plan = plans[0]
+                paths = [polyline.parse_amap_polyline(step.get("polyline")) for step in plan.get("steps") or []]
+            
+            return True, {
+                "distance": int(float(plan.get("distance") or 0)),
+                "duration": int(float(plan.get("duration") or 0)),
+                "polyline": polyline.encode(polyline.join_paths(paths))
+            }
+        except Exception as e:
+            print(f"路径规划错误: {str(e)}")
+            return False, None
+    
+    # 高德天气预报覆盖的天数（含当天）
+    WEATHER_FORECAST_DAYS = 4
+    # reporttime 为北京时间
+    WEATHER_TIMEZONE = timezone(timedelta(hours=8))
+    
+    # 正在进行的天气查询，同一城市同时只请求一次高德
+    _weather_inflight: Dict[str, "asyncio.Future"] = {}
+    
+    @staticmethod
+    async def get_weather(city: str) -> Optional[Dict[str, Any]]:
+        """
+        获取天气信息（经过天气缓存）
+        
+        缓存有效期按预报的发布时间（reporttime）计算：发布后 WEATHER_REFRESH_SECONDS 内有效，
+        同一城市同时进行的查询共用一次高德请求。
         
         Args:
             city: 城市名称或城市编码
@@ -182,6 +685,47 @@ class MapService:
         Returns:
             天气信息
         """
+        key = GeoCache.make_key(GeoCache.KIND_WEATHER, city)
+        hit, cached = await geo_cache.aget(key)
+        if hit:
+            return cached
+        
+        inflight = MapService._weather_inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+        
+        future = asyncio.get_running_loop().create_future()
+        MapService._weather_inflight[key] = future
+        try:
+            definitive, forecast = await MapService._fetch_weather(city)
+            if definitive:
+                await geo_cache.aset(key, forecast, MapService._weather_ttl(forecast) if forecast else None)
+            else:
+                _, forecast = await MapService._serve_stale("weather", key, lambda: MapService.get_weather(city))
+            future.set_result(forecast)
+            return forecast
+        except BaseException:
+            # 查询被取消时，等待同一查询的其他请求按查询失败处理
+            if not future.done():
+                future.set_result(None)
+            raise
+        finally:
+            MapService._weather_inflight.pop(key, None)
+    
+    @staticmethod
+    def _weather_ttl(forecast: Dict[str, Any]) -> int:
+        """预报的缓存有效期：发布时间 + WEATHER_REFRESH_SECONDS - 当前时间，限制在最短和最长有效期之间"""
+        try:
+            reported = datetime.strptime(forecast.get("reporttime", ""), "%Y-%m-%d %H:%M:%S")
+            age = (datetime.now(MapService.WEATHER_TIMEZONE).replace(tzinfo=None) - reported).total_seconds()
+            ttl = settings.WEATHER_REFRESH_SECONDS - age
+        except ValueError:
+            ttl = settings.WEATHER_CACHE_MIN_TTL_SECONDS
+        return int(min(max(ttl, settings.WEATHER_CACHE_MIN_TTL_SECONDS), settings.WEATHER_CACHE_MAX_TTL_SECONDS))
+    
+    @staticmethod
+    async def _fetch_weather(city: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """请求高德天气预报，返回 (高德是否给出了明确结果, 预报)"""
         try:
             url = f"{MapService.BASE_URL}/weather/weatherInfo"
             params = {
@@ -190,13 +734,60 @@ class MapService:
                 "extensions": "all"  # 返回预报天气
             }
             
-            response = requests.get(url, params=params, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("status") == "1":
-                    return data.get("forecasts", [{}])[0]
-            return None
+            data = await MapService._amap_get("weather", url, params)
+            if data is not None and data.get("status") == "1":
+                forecasts = data.get("forecasts") or []
+                return True, (forecasts[0] if forecasts else None)
+            return False, None
         except Exception as e:
             print(f"天气查询错误: {str(e)}")
-            return None
+            return False, None
+    
+    @staticmethod
+    def in_forecast_range(start_date: date, end_date: date) -> bool:
+        """行程日期是否与高德预报覆盖的范围（今天起 WEATHER_FORECAST_DAYS 天）有重叠"""
+        today = datetime.now(MapService.WEATHER_TIMEZONE).date()
+        return end_date >= today and start_date < today + timedelta(days=MapService.WEATHER_FORECAST_DAYS)
+    
+    @staticmethod
+    def prefetch_weather(city: str, start_date: date, end_date: date):
+        """
+        在后台预取天气预报（行程在预报范围外时跳过）
+        
+        必须在事件循环中调用；创建计划后调用，打开计划页面时天气已经在缓存中。
+        """
+        if not MapService.in_forecast_range(start_date, end_date):
+            return
+        task = asyncio.get_running_loop().create_task(MapService.get_weather(city))
+        MapService._background_tasks.add(task)
+        task.add_done_callback(MapService._background_tasks.discard)
+    
+    @staticmethod
+    async def get_trip_weather(city: str, start_date: date, end_date: date) -> Dict[str, Any]:
+        """
+        行程日期范围内的天气预报
+        
+        Returns:
+            {"available": 是否有预报, "reporttime", "days": [{"date", "weather": 当天预报或 None}]}
+            行程完全在预报范围外（尚未进入预报范围或已经结束）时不请求高德
+        """
+        dates = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+        forecast = await MapService.get_weather(city) if MapService.in_forecast_range(start_date, end_date) else None
+        casts = {cast.get("date"): cast for cast in (forecast or {}).get("casts") or []}
+        days = [{"date": day.isoformat(), "weather": casts.get(day.isoformat())} for day in dates]
+        return {
+            "available": any(day["weather"] for day in days),
+            "city": (forecast or {}).get("city") or city,
+            "reporttime": (forecast or {}).get("reporttime"),
+            "days": days
+        }
+
 
+# 高德各接口的熔断器
+amap_breakers = CircuitBreakers(
+    ["geocode", "place", "direction", "weather"],
+    enabled=settings.AMAP_BREAKER_ENABLED,
+    failure_threshold=settings.AMAP_BREAKER_FAILURE_THRESHOLD,
+    recovery_seconds=settings.AMAP_BREAKER_RECOVERY_SECONDS,
+    slow_call_seconds=settings.AMAP_BREAKER_SLOW_CALL_SECONDS
+)
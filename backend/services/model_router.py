@@ -0,0 +1,167 @@
+"""
+模型分档与对冲调用 - 按任务选择模型档位，主模型过慢或结果无效时请求备用档位
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Dict, Any, Callable, Optional, Tuple, TypeVar
+from ..config import settings
+
+T = TypeVar("T")
+
+
+class ModelRouter:
+    """
+    模型档位路由
+
+    每类任务在 Settings 中配置使用的档位（max 或 fast），另一个档位作为备用：
+    - 主模型返回失败或结果无法解析，立即改用备用档位
+    - 开启对冲（AI_HEDGE_ENABLED）时，主模型在对冲延迟内没有返回，同时向备用档位发起请求，
+      采用先返回的有效结果
+
+    落后的那个请求无法中途取消，会在后台执行完后被丢弃，因此每次对冲都会多计费一次调用。
+    """
+
+    TIER_MAX = "max"
+    TIER_FAST = "fast"
+
+    # 任务 -> 配置该任务档位的 Settings 字段
+    TASK_SETTINGS = {
+        "travel_plan": "AI_TIER_TRAVEL_PLAN",
+        "plan_skeleton": "AI_TIER_PLAN_SKELETON",
+        "day_itinerary": "AI_TIER_DAY_ITINERARY",
+        "modify_itinerary": "AI_TIER_MODIFY_ITINERARY",
+        "expense_analysis": "AI_TIER_EXPENSE_ANALYSIS",
+        "voice_query": "AI_TIER_VOICE_QUERY",
+    }
+
+    def __init__(self, max_workers: int):
+        # 独立的线程池：对冲调用本身就运行在 AI 线程池中，复用同一个线程池可能互相等待
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ai-hedge")
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def model_for(tier: str) -> str:
+        """档位对应的模型名称"""
+        return settings.AI_MODEL_FAST if tier == ModelRouter.TIER_FAST else settings.AI_MODEL_MAX
+
+    @staticmethod
+    def tiers_for(task: str) -> Tuple[str, str]:
+        """任务的 (主档位, 备用档位)"""
+        primary = getattr(settings, ModelRouter.TASK_SETTINGS[task], ModelRouter.TIER_MAX)
+        if primary not in (ModelRouter.TIER_MAX, ModelRouter.TIER_FAST):
+            primary = ModelRouter.TIER_MAX
+        secondary = ModelRouter.TIER_FAST if primary == ModelRouter.TIER_MAX else ModelRouter.TIER_MAX
+        return primary, secondary
+
+    @staticmethod
+    def hedge_delay(tier: str) -> float:
+        """主模型为该档位时，等待多少秒后发起对冲请求"""
+        if tier == ModelRouter.TIER_FAST:
+            return settings.AI_HEDGE_DELAY_FAST_SECONDS
+        return settings.AI_HEDGE_DELAY_MAX_SECONDS
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, int]:
+        return {"served_max": 0, "served_fast": 0, "hedged": 0, "fallback_on_error": 0, "failed": 0}
+
+    def _record(self, task: str, field: str):
+        with self._lock:
+            stats = self._stats.setdefault(task, self._empty_stats())
+            stats[field] += 1
+
+    def call(self, task: str, attempt: Callable[[str], T]) -> T:
+        """
+        按任务的档位配置执行调用
+
+        Args:
+            task: 任务名称（TASK_SETTINGS 的键）
+            attempt: 接收模型名称、返回有效结果的函数；调用失败或结果无效时应抛出异常
+
+        Returns:
+            先返回的有效结果
+
+        Raises:
+            两个档位都失败时，抛出最后一个异常
+        """
+        primary, secondary = self.tiers_for(task)
+        if not settings.AI_HEDGE_ENABLED:
+            return self._call_sequential(task, attempt, primary, secondary)
+
+        futures: Dict[Future, str] = {
+            self._executor.submit(attempt, self.model_for(primary)): primary
+        }
+        done, _ = wait(futures, timeout=self.hedge_delay(primary))
+        if done:
+            future = next(iter(done))
+            if future.exception() is None:
+                self._served(task, primary)
+                return future.result()
+            print(f"⚠️ {task} 主模型（{primary}）失败，改用 {secondary}: {future.exception()}")
+            self._record(task, "fallback_on_error")
+            futures = {}
+        else:
+            print(f"⏱️ {task} 主模型（{primary}）超过 {self.hedge_delay(primary)} 秒未返回，同时请求 {secondary}")
+            self._record(task, "hedged")
+
+        futures[self._executor.submit(attempt, self.model_for(secondary))] = secondary
+
+        last_error: Optional[BaseException] = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self._served(task, futures[future])
+                    return future.result()
+                last_error = future.exception()
+                print(f"⚠️ {task} {futures[future]} 档位失败: {last_error}")
+
+        self._record(task, "failed")
+        raise last_error
+
+    def _call_sequential(self, task: str, attempt: Callable[[str], T], primary: str, secondary: str) -> T:
+        """不对冲：主档位失败后再调用备用档位"""
+        try:
+            result = attempt(self.model_for(primary))
+        except Exception as e:
+            print(f"⚠️ {task} 主模型（{primary}）失败，改用 {secondary}: {e}")
+            self._record(task, "fallback_on_error")
+        else:
+            self._served(task, primary)
+            return result
+
+        try:
+            result = attempt(self.model_for(secondary))
+        except Exception as e:
+            print(f"⚠️ {task} {secondary} 档位失败: {e}")
+            self._record(task, "failed")
+            raise
+        self._served(task, secondary)
+        return result
+
+    def _served(self, task: str, tier: str):
+        print(f"🎯 {task} 由 {tier} 档位（{self.model_for(tier)}）返回")
+        self._record(task, f"served_{tier}")
+
+    def stats(self) -> Dict[str, Any]:
+        """各任务由哪个档位返回、对冲和回退次数"""
+        with self._lock:
+            tasks = {task: dict(stats) for task, stats in self._stats.items()}
+        return {
+            "hedge_enabled": settings.AI_HEDGE_ENABLED,
+            "models": {
+                self.TIER_MAX: settings.AI_MODEL_MAX,
+                self.TIER_FAST: settings.AI_MODEL_FAST
+            },
+            "tasks": {
+                task: {"tier": self.tiers_for(task)[0], **tasks.get(task, self._empty_stats())}
+                for task in self.TASK_SETTINGS
+            }
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+model_router = ModelRouter(max_workers=settings.AI_EXECUTOR_MAX_WORKERS * 2)
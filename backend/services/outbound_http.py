@@ -0,0 +1,179 @@
+"""
+出站 HTTP - 高德地图、阿里云语音识别等外部接口共用的异步连接池
+"""
+import time
+import random
+import asyncio
+import threading
+import importlib.util
+from dataclasses import dataclass
+from typing import Dict, Any, Optional
+from urllib.parse import urlsplit
+import httpx
+from ..config import settings
+
+# HTTP/2 需要 h2
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+@dataclass(frozen=True)
+class EndpointPolicy:
+    """单个外部接口的超时和重试策略"""
+    timeout: float
+    max_retries: int
+    retry_after_send: bool = True  # 请求已经发出后失败（读超时、5xx 等）是否重试
+
+
+class OutboundHTTP:
+    """
+    共享的异步 HTTP 客户端
+
+    所有外部接口使用同一个 httpx.AsyncClient：
+    - 连接保持复用，不再每次请求都重新建立 TCP + TLS 连接
+    - 每个主机的并发请求数不超过 HTTP_MAX_CONNECTIONS_PER_HOST，避免单个上游占满连接池
+    - 安装了 h2 时使用 HTTP/2
+    - 按接口（amap、nls_asr、nls_token）设置超时和重试，重试前按指数退避随机等待
+
+    客户端在应用启动时创建、关闭时释放；在其他事件循环中使用（如命令行工具）时自动创建。
+    """
+
+    # 可以重试的状态码
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+
+    # 请求还没有发出的连接错误，任何接口都可以安全重试
+    CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._lock = threading.Lock()
+        self.http2 = settings.HTTP2_ENABLED and HTTP2_AVAILABLE
+        self.policies: Dict[str, EndpointPolicy] = {
+            "amap": EndpointPolicy(settings.AMAP_TIMEOUT_SECONDS, settings.AMAP_MAX_RETRIES),
+            "nls_asr": EndpointPolicy(settings.ASR_TIMEOUT_SECONDS, settings.ASR_MAX_RETRIES, retry_after_send=False),
+            "nls_token": EndpointPolicy(settings.NLS_TOKEN_TIMEOUT_SECONDS, settings.NLS_TOKEN_MAX_RETRIES),
+        }
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def _new_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS
+            )
+        )
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        """
+        当前事件循环的客户端（客户端和连接都绑定在创建它的事件循环上）
+
+        事件循环变化时先关闭原来的客户端再创建新的；原事件循环已经关闭时，
+        其中的连接无法正常关闭，只记录日志。
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            previous = self._client
+            self._client = self._new_client()
+            self._loop = loop
+            self._host_limits = {}
+            if previous is not None:
+                try:
+                    await previous.aclose()
+                except Exception as e:
+                    print(f"⚠️ 关闭原事件循环的出站 HTTP 客户端失败: {str(e)}")
+        return self._client
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = asyncio.Semaphore(settings.HTTP_MAX_CONNECTIONS_PER_HOST)
+            self._host_limits[host] = limit
+        return limit
+
+    async def start(self):
+        """应用启动时创建客户端"""
+        await self._get_client()
+        print(f"✅ 出站 HTTP 连接池已创建（{'HTTP/2' if self.http2 else 'HTTP/1.1'}）")
+
+    async def stop(self):
+        """应用关闭时释放连接"""
+        client, self._client, self._loop = self._client, None, None
+        if client is not None:
+            await client.aclose()
+
+    def _record(self, endpoint: str, field: str, value: float = 1):
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, {
+                "requests": 0,
+                "retries": 0,
+                "failures": 0,
+                "total_seconds": 0.0
+            })
+            stats[field] += value
+
+    async def request(self, endpoint: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        发送请求，按接口策略超时和重试
+
+        Args:
+            endpoint: 接口名称（amap / nls_asr / nls_token），决定超时和重试策略
+            method: HTTP 方法
+            url: 请求地址
+            **kwargs: 传给 httpx.AsyncClient.request 的参数（params、headers、content 等）
+
+        Returns:
+            最后一次请求的响应（重试用尽后的 429/5xx 响应也原样返回）
+
+        Raises:
+            httpx.HTTPError: 重试用尽后仍然无法完成请求
+        """
+        policy = self.policies[endpoint]
+        client = await self._get_client()
+        limit = self._host_limit(url)
+        start = time.perf_counter()
+        attempt = 0
+        self._record(endpoint, "requests")
+
+        try:
+            while True:
+                try:
+                    async with limit:
+                        response = await client.request(method, url, timeout=policy.timeout, **kwargs)
+                    if (response.status_code not in self.RETRY_STATUS
+                            or not policy.retry_after_send or attempt >= policy.max_retries):
+                        return response
+                    reason = f"HTTP {response.status_code}"
+                except httpx.TransportError as e:
+                    retryable = isinstance(e, self.CONNECT_ERRORS) or policy.retry_after_send
+                    if not retryable or attempt >= policy.max_retries:
+                        self._record(endpoint, "failures")
+                        raise
+                    reason = type(e).__name__
+
+                attempt += 1
+                self._record(endpoint, "retries")
+                delay = random.uniform(0, settings.HTTP_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+                print(f"🔁 {endpoint} 请求失败（{reason}），{delay:.2f} 秒后第 {attempt} 次重试")
+                await asyncio.sleep(delay)
+        finally:
+            self._record(endpoint, "total_seconds", time.perf_counter() - start)
+
+    def stats(self) -> Dict[str, Any]:
+        """各接口的请求数、重试数、失败数和平均耗时"""
+        with self._lock:
+            endpoints = {endpoint: dict(stats) for endpoint, stats in self._stats.items()}
+        for stats in endpoints.values():
+            stats["avg_ms"] = round(stats.pop("total_seconds") * 1000 / stats["requests"], 1) if stats["requests"] else 0.0
+        return {
+            "http2": self.http2,
+            "max_connections": settings.HTTP_MAX_CONNECTIONS,
+            "max_connections_per_host": settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+            "endpoints": endpoints
+        }
+
+
+outbound_http = OutboundHTTP()
@@ -0,0 +1,133 @@
+"""
+旅行计划结果缓存 - 相同（归一化后）需求直接复用已生成的行程
+"""
+import re
+import copy
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+from ..config import settings
+
+
+class PlanCache:
+    """
+    带 TTL 和 LRU 淘汰的内存缓存
+
+    缓存键由归一化的目的地、天数、预算档位、人数和排序后的偏好组成，
+    例如 "成都市 3天 3100元 2人 美食" 与 "成都 3天 3000元 2人 美食" 命中同一条缓存。
+    """
+
+    # 偏好的分隔符：中英文逗号、顿号、分号、斜杠、空白以及"和/与/及"
+    _PREFERENCE_SEPARATORS = re.compile(r"[,，、;；/\s]+|和|与|及")
+
+    def __init__(self, max_entries: int, ttl_seconds: int, budget_bucket: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.budget_bucket = budget_bucket
+        self._entries: "OrderedDict[Tuple, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize_destination(destination: str) -> str:
+        """归一化目的地：去空白、转小写、去掉末尾的"市" """
+        normalized = re.sub(r"\s+", "", destination or "").lower()
+        if len(normalized) > 2 and normalized.endswith("市"):
+            normalized = normalized[:-1]
+        return normalized
+
+    @staticmethod
+    def normalize_preferences(preferences: Optional[str]) -> str:
+        """归一化偏好：拆分、去重、排序"""
+        if not preferences:
+            return ""
+        parts = PlanCache._PREFERENCE_SEPARATORS.split(preferences.lower())
+        return ",".join(sorted({part.strip() for part in parts if part and part.strip()}))
+
+    def make_key(
+        self,
+        destination: str,
+        days: int,
+        budget: float,
+        travelers_count: int,
+        preferences: Optional[str]
+    ) -> Tuple:
+        """生成缓存键"""
+        budget_level = int(budget // self.budget_bucket) if self.budget_bucket > 0 else budget
+        return (
+            self.normalize_destination(destination),
+            days,
+            budget_level,
+            travelers_count,
+            self.normalize_preferences(preferences)
+        )
+
+    def get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        """读取缓存，过期条目视为未命中；返回深拷贝，调用方可放心修改"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(value)
+
+    def set(self, key: Tuple, value: Dict[str, Any]):
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, destination: Optional[str] = None) -> int:
+        """
+        清除缓存
+
+        Args:
+            destination: 只清除该目的地的条目；为空时清空全部
+
+        Returns:
+            清除的条目数
+        """
+        with self._lock:
+            if not destination:
+                removed = len(self._entries)
+                self._entries.clear()
+                return removed
+
+            target = self.normalize_destination(destination)
+            keys = [key for key in self._entries if key[0] == target]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计信息"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0
+            }
+
+
+plan_cache = PlanCache(
+    max_entries=settings.PLAN_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.PLAN_CACHE_TTL_SECONDS,
+    budget_bucket=settings.PLAN_CACHE_BUDGET_BUCKET
+)
@@ -0,0 +1,317 @@
+"""
+目的地行程目录 - 热门目的地预先生成基础行程，fast 模式按预算和人数缩放后直接返回
+"""
+import re
+import copy
+import asyncio
+import threading
+from typing import Dict, Any, List, Optional, Set
+from sqlalchemy.orm import Session
+from ..database import SessionLocal
+from ..models import DestinationPlan, TravelPlan
+from .ai_service import AIService
+from .plan_cache import PlanCache
+from .itinerary_geo import itinerary_geo
+from .voice_query_parser import VoiceQueryRuleParser
+
+_DAY_NUMERAL = r"\d+|[一二两三四五六七八九十]+"
+# 天数和晚数，如 三日游、3天2晚（不包括 第三天 这样的序数）
+_DAY_COUNT_RE = re.compile(rf"(?<!第)({_DAY_NUMERAL})\s*([天日晚])")
+# 第几天
+_DAY_ORDINAL_RE = re.compile(rf"第({_DAY_NUMERAL})[天日]")
+# 按逗号、分号、句号切分子句，标点保留在子句末尾
+_CLAUSE_SPLIT_RE = re.compile(r"(?<=[，,；;。])")
+_CN_DIGITS = "零一二三四五六七八九"
+
+
+class PlanCatalog:
+    """
+    预生成的目的地行程目录
+
+    目录由 backend/tools/build_plan_catalog.py 离线批量生成，每个（目的地，天数）一条。
+    fast 模式选择天数不少于请求天数的最短条目，截取前 N 天，再确定性地缩放费用：
+    - 单价（门票、餐厅人均、房价）按人均每日预算之比缩放，体现消费档次
+    - 总额（budget_breakdown 各项、交通费用、住宿总价）按总预算之比缩放
+
+    天数变少时，概述和提示中的天数（如 三日游、3天2晚）改写为请求的天数，
+    提到被截掉的天（如 第三天）的子句删除；其他文字可以通过后台的个性化修改更新。
+    """
+
+    # 按人均每日预算之比缩放的单价字段
+    UNIT_PRICE_KEYS = ("estimated_cost", "avg_cost", "price_per_night")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 保存后台任务的引用，避免任务在执行过程中被垃圾回收
+        self._tasks: Set[asyncio.Task] = set()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "personalize_scheduled": 0,
+            "personalize_succeeded": 0,
+            "personalize_failed": 0,
+            "personalize_skipped": 0
+        }
+
+    def _record(self, field: str):
+        with self._lock:
+            self._stats[field] += 1
+
+    @staticmethod
+    def find(db: Session, destination: str, days: int) -> Optional[DestinationPlan]:
+        """查找天数不少于 days 的最短条目"""
+        return db.query(DestinationPlan).filter(
+            DestinationPlan.destination == PlanCache.normalize_destination(destination),
+            DestinationPlan.days >= days
+        ).order_by(DestinationPlan.days.asc()).first()
+
+    @staticmethod
+    def upsert(
+        db: Session,
+        destination: str,
+        days: int,
+        budget: float,
+        travelers_count: int,
+        itinerary: Dict[str, Any]
+    ) -> DestinationPlan:
+        """写入或替换目录条目"""
+        normalized = PlanCache.normalize_destination(destination)
+        entry = db.query(DestinationPlan).filter(
+            DestinationPlan.destination == normalized,
+            DestinationPlan.days == days
+        ).first()
+        if entry is None:
+            entry = DestinationPlan(destination=normalized, days=days)
+            db.add(entry)
+        entry.budget = budget
+        entry.travelers_count = travelers_count
+        entry.itinerary = itinerary
+        db.commit()
+        db.refresh(entry)
+        return entry
+
+    @staticmethod
+    def _scale_number(value: Any, factor: float) -> Any:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return value
+        return int(round(value * factor))
+
+    @staticmethod
+    def _scale_unit_prices(node: Any, factor: float):
+        """递归缩放对象中的单价字段"""
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key in PlanCatalog.UNIT_PRICE_KEYS:
+                    node[key] = PlanCatalog._scale_number(value, factor)
+                else:
+                    PlanCatalog._scale_unit_prices(value, factor)
+        elif isinstance(node, list):
+            for item in node:
+                PlanCatalog._scale_unit_prices(item, factor)
+
+    @staticmethod
+    def _chinese_numeral(value: int, unit: str) -> str:
+        """100 以内的整数写成中文数字，两天 / 两晚 用 两"""
+        if value == 2 and unit in "天晚":
+            return "两"
+        if value < 10:
+            return _CN_DIGITS[value]
+        tens, ones = divmod(value, 10)
+        return ("" if tens == 1 else _CN_DIGITS[tens]) + "十" + (_CN_DIGITS[ones] if ones else "")
+
+    @staticmethod
+    def _rewrite_day_text(text: str, from_days: int, to_days: int) -> str:
+        """把文字中的天数从 from_days 改为 to_days，删除提到第 to_days 天之后的子句"""
+        def beyond(match: "re.Match") -> bool:
+            value = VoiceQueryRuleParser.chinese_to_number(match.group(1))
+            return value is not None and value > to_days
+
+        clauses = [clause for clause in _CLAUSE_SPLIT_RE.split(text) if clause]
+        kept = [clause for clause in clauses if not any(beyond(m) for m in _DAY_ORDINAL_RE.finditer(clause))]
+        if len(kept) < len(clauses) and kept:
+            # 删掉了结尾的子句时，把新的结尾标点改为句号
+            kept[-1] = re.sub(r"[，,；;]$", "。", kept[-1])
+        text = "".join(kept)
+
+        def replace(match: "re.Match") -> str:
+            numeral, unit = match.group(1), match.group(2)
+            value = VoiceQueryRuleParser.chinese_to_number(numeral)
+            source, target = (from_days - 1, to_days - 1) if unit == "晚" else (from_days, to_days)
+            if value != source:
+                return match.group()
+            if target <= 0:
+                # 一日游没有过夜
+                return ""
+            if numeral.isdigit():
+                return f"{target}{unit}"
+            return f"{PlanCatalog._chinese_numeral(target, unit)}{unit}"
+
+        return _DAY_COUNT_RE.sub(replace, text)
+
+    @staticmethod
+    def _rewrite_day_texts(result: Dict[str, Any], from_days: int, to_days: int):
+        """改写概述和提示中的天数"""
+        if isinstance(result.get("overview"), str):
+            result["overview"] = PlanCatalog._rewrite_day_text(result["overview"], from_days, to_days)
+        tips = result.get("tips")
+        if isinstance(tips, list):
+            rewritten: List[Any] = []
+            for tip in tips:
+                if isinstance(tip, str):
+                    tip = PlanCatalog._rewrite_day_text(tip, from_days, to_days)
+                    if not tip:
+                        continue
+                rewritten.append(tip)
+            result["tips"] = rewritten
+
+    @staticmethod
+    def rescale(
+        entry: DestinationPlan,
+        days: int,
+        budget: float,
+        travelers_count: int
+    ) -> Dict[str, Any]:
+        """
+        把目录条目缩放为请求的天数、预算和人数
+
+        Returns:
+            与 AI 生成结果格式相同的行程数据
+        """
+        result = copy.deepcopy(entry.itinerary)
+        result["daily_itinerary"] = (result.get("daily_itinerary") or [])[:days]
+        if days < entry.days:
+            PlanCatalog._rewrite_day_texts(result, entry.days, days)
+
+        per_person_day = budget / (travelers_count * days)
+        base_per_person_day = entry.budget / (entry.travelers_count * entry.days)
+        level = per_person_day / base_per_person_day if base_per_person_day > 0 else 1.0
+        total_ratio = budget / entry.budget if entry.budget > 0 else 1.0
+
+        PlanCatalog._scale_unit_prices(result["daily_itinerary"], level)
+        PlanCatalog._scale_unit_prices(result.get("restaurant_recommendations"), level)
+
+        transportation = result.get("transportation")
+        if isinstance(transportation, dict):
+            transportation["estimated_cost"] = PlanCatalog._scale_number(
+                transportation.get("estimated_cost"), total_ratio
+            )
+
+        accommodation = result.get("accommodation_summary")
+        if isinstance(accommodation, dict):
+            accommodation["estimated_cost_per_night"] = PlanCatalog._scale_number(
+                accommodation.get("estimated_cost_per_night"), level
+            )
+            accommodation["total_cost"] = PlanCatalog._scale_number(accommodation.get("total_cost"), total_ratio)
+            accommodation["total_nights"] = max(days - 1, 0)
+
+        breakdown = result.get("budget_breakdown")
+        if isinstance(breakdown, dict):
+            for key, value in breakdown.items():
+                if key != "total":
+                    breakdown[key] = PlanCatalog._scale_number(value, total_ratio)
+            breakdown["total"] = sum(
+                value for key, value in breakdown.items()
+                if key != "total" and isinstance(value, (int, float)) and not isinstance(value, bool)
+            )
+
+        return result
+
+    def plan_from_catalog(
+        self,
+        db: Session,
+        destination: str,
+        days: int,
+        budget: float,
+        travelers_count: int
+    ) -> Optional[Dict[str, Any]]:
+        """按目录生成行程，目录中没有合适的条目时返回 None"""
+        entry = self.find(db, destination, days)
+        if entry is None:
+            self._record("misses")
+            return None
+
+        self._record("hits")
+        print(f"📚 使用预生成行程: {entry.destination} {entry.days}天 -> {days}天, 预算 {budget}, {travelers_count}人")
+        return self.rescale(entry, days, budget, travelers_count)
+
+    def schedule_personalization(self, plan_id: int, preferences: str):
+        """
+        在后台按偏好个性化已保存的计划
+
+        必须在事件循环中调用。个性化期间用户修改过计划时放弃结果。
+        """
+        self._record("personalize_scheduled")
+        task = asyncio.get_running_loop().create_task(self._personalize(plan_id, preferences))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _personalize(self, plan_id: int, preferences: str):
+        # 模型调用期间不占用数据库连接，读取和写回分别使用独立的会话
+        db = SessionLocal()
+        try:
+            plan = db.query(TravelPlan).filter(TravelPlan.id == plan_id).first()
+            if plan is None:
+                self._record("personalize_skipped")
+                return
+            snapshot = {
+                "itinerary": plan.itinerary,
+                "destination": plan.destination,
+                "days": plan.days,
+                "budget": plan.budget,
+                "travelers_count": plan.travelers_count,
+                "updated_at": plan.updated_at
+            }
+        finally:
+            db.close()
+
+        feedback = (
+            f"这是一份{snapshot['days']}天的行程，请根据旅行偏好（{preferences or '常规旅游'}）个性化："
+            f"替换与偏好不符的活动和餐厅，并更新行程概述使其与{snapshot['days']}天的安排一致，"
+            f"总费用保持在预算{snapshot['budget']}元以内"
+        )
+        print(f"🎨 后台个性化行程: 计划 {plan_id}")
+        try:
+            itinerary = await AIService.modify_itinerary_async(
+                current_itinerary=itinerary_geo.strip(snapshot["itinerary"] or {}),
+                destination=snapshot["destination"],
+                days=snapshot["days"],
+                budget=snapshot["budget"],
+                travelers_count=snapshot["travelers_count"],
+                user_feedback=feedback
+            )
+            itinerary = await itinerary_geo.enrich(
+                itinerary, snapshot["destination"], previous=snapshot["itinerary"]
+            )
+        except Exception as e:
+            print(f"❌ 行程个性化失败: {str(e)}")
+            self._record("personalize_failed")
+            return
+
+        db = SessionLocal()
+        try:
+            plan = db.query(TravelPlan).filter(TravelPlan.id == plan_id).first()
+            if plan is None or plan.updated_at != snapshot["updated_at"]:
+                print(f"⚠️ 计划 {plan_id} 已被删除或修改，放弃个性化结果")
+                self._record("personalize_skipped")
+                return
+
+            plan.itinerary = itinerary
+            if "budget_breakdown" in itinerary:
+                plan.budget_breakdown = itinerary.get("budget_breakdown", {})
+            db.commit()
+            self._record("personalize_succeeded")
+            print(f"✅ 行程个性化完成: 计划 {plan_id}")
+        finally:
+            db.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """目录命中和后台个性化统计"""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["personalize_running"] = len(self._tasks)
+        return stats
+
+
+plan_catalog = PlanCatalog()
@@ -0,0 +1,166 @@
+"""
+旅行计划生成任务队列 - 长时间的 AI 生成在后台 worker 中执行，任务状态保存在数据库
+"""
+import asyncio
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Callable, Awaitable
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..database import SessionLocal
+from ..models import PlanJob
+
+# 任务处理函数：(任务 ID, 用户 ID, 旅行需求) -> 生成的旅行计划 ID
+PlanJobHandler = Callable[[int, int, Dict[str, Any]], Awaitable[int]]
+
+
+class PlanJobQueue:
+    """
+    基于数据库的任务队列
+
+    任务先写入 plan_jobs 表，再放入进程内队列由 worker 处理。
+    服务重启时，未完成（queued / running）的任务会重新放回队列，
+    因此客户端断开或代理超时都不会丢失已经提交的生成请求。
+
+    只支持单个服务进程：任务没有租约，启动时无法区分 running 的任务是上次中断的
+    还是其他进程正在处理的，多进程部署时会重复执行。
+    """
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+
+    FINISHED_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED)
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._handler: Optional[PlanJobHandler] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def set_handler(self, handler: PlanJobHandler):
+        """注册任务处理函数"""
+        self._handler = handler
+
+    def enqueue(self, db: Session, user_id: int, request: Dict[str, Any]) -> PlanJob:
+        """创建任务并放入队列"""
+        job = PlanJob(user_id=user_id, status=self.STATUS_QUEUED, request=request, attempts=0)
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+
+        # worker 未启动时任务保留在数据库中，启动后会被重新加载
+        if self._queue is not None:
+            self._queue.put_nowait(job.id)
+        print(f"📥 旅行计划任务 {job.id} 已加入队列")
+        return job
+
+    async def start(self):
+        """启动 worker，并重新加载上次未完成的任务"""
+        if self._tasks:
+            return
+
+        self._queue = asyncio.Queue()
+        for job_id in self._recover_unfinished():
+            self._queue.put_nowait(job_id)
+
+        for index in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(index)))
+        print(f"✅ 旅行计划任务队列已启动（{self.workers} 个 worker）")
+
+    async def stop(self):
+        """停止 worker；正在处理的任务会在下次启动时重新执行"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def _recover_unfinished(self) -> List[int]:
+        """
+        把中断的任务重置为 queued，返回需要重新处理的任务 ID
+
+        所有 running 的任务都视为上次运行时中断的任务，因此只能在单个服务进程中使用。
+        """
+        db = SessionLocal()
+        try:
+            jobs = db.query(PlanJob).filter(
+                PlanJob.status.in_([self.STATUS_QUEUED, self.STATUS_RUNNING])
+            ).order_by(PlanJob.id).all()
+            for job in jobs:
+                job.status = self.STATUS_QUEUED
+            db.commit()
+            if jobs:
+                print(f"🔁 重新加载 {len(jobs)} 个未完成的旅行计划任务")
+            return [job.id for job in jobs]
+        finally:
+            db.close()
+
+    def _claim(self, job_id: int) -> Optional[PlanJob]:
+        """把任务从 queued 改为 running，任务已被其他 worker 领取时返回 None"""
+        db = SessionLocal()
+        try:
+            claimed = db.query(PlanJob).filter(
+                PlanJob.id == job_id,
+                PlanJob.status == self.STATUS_QUEUED
+            ).update({
+                PlanJob.status: self.STATUS_RUNNING,
+                PlanJob.started_at: datetime.utcnow(),
+                PlanJob.attempts: PlanJob.attempts + 1
+            }, synchronize_session=False)
+            db.commit()
+            if not claimed:
+                return None
+
+            job = db.query(PlanJob).filter(PlanJob.id == job_id).first()
+            db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    def _finish(self, job_id: int, travel_plan_id: Optional[int] = None, error: Optional[str] = None):
+        """记录任务结果"""
+        db = SessionLocal()
+        try:
+            job = db.query(PlanJob).filter(PlanJob.id == job_id).first()
+            if not job:
+                return
+            job.status = self.STATUS_FAILED if error else self.STATUS_SUCCEEDED
+            job.travel_plan_id = travel_plan_id
+            job.error = error
+            job.finished_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+
+    async def _worker(self, index: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._process(job_id)
+            except Exception as e:
+                print(f"❌ worker {index} 处理任务 {job_id} 出错: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job_id: int):
+        job = self._claim(job_id)
+        if job is None:
+            return
+
+        print(f"🚀 开始处理旅行计划任务 {job_id}（第 {job.attempts} 次）")
+        try:
+            travel_plan_id = await self._handler(job.id, job.user_id, job.request)
+        except asyncio.CancelledError:
+            # 服务关闭，任务保持 running，下次启动时重新处理
+            raise
+        except Exception as e:
+            print(f"❌ 旅行计划任务 {job_id} 失败: {str(e)}")
+            self._finish(job_id, error=str(e))
+            return
+
+        self._finish(job_id, travel_plan_id=travel_plan_id)
+        print(f"✅ 旅行计划任务 {job_id} 完成，计划 ID: {travel_plan_id}")
+
+
+plan_job_queue = PlanJobQueue(workers=settings.PLAN_JOB_WORKERS)
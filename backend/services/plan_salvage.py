@@ -0,0 +1,365 @@
+"""
+行程分段补全 - 模型返回的行程 JSON 损坏或不完整时，保留完好的部分，只重新生成缺失的部分
+"""
+import json
+import threading
+from typing import Dict, Any, List, Tuple, Iterable, Optional
+from .itinerary_stream import ItineraryStreamParser
+
+
+class PlanSalvage:
+    """
+    行程分段补全
+
+    一份完整的行程由 daily_itinerary 中的每一天和若干顶层字段组成。整体解析失败
+    （或解析结果缺少部分内容）时：
+    1. extract() 用 ItineraryStreamParser 逐段解析原始文本，只保留已经闭合且结构正确的天和字段
+    2. missing() 找出缺失或损坏的天和字段
+    3. build_prompt() 构造只要求这些部分的补全提示词，由调用方请求模型
+    4. merge() 把补全结果合并进来，assemble() 拼装为完整行程
+
+    一处逗号错误只需要补全一天，而不是重新生成整份行程。
+    """
+
+    DAILY_KEY = ItineraryStreamParser.DAILY_KEY
+
+    # 行程的顶层字段及其类型
+    SECTION_TYPES = {
+        "overview": str,
+        "transportation": dict,
+        "accommodation_summary": dict,
+        "restaurant_recommendations": list,
+        "budget_breakdown": dict,
+        "tips": list,
+    }
+
+    # 前端展示必需的顶层字段，其余字段缺失时页面直接不展示对应区块，不触发补全
+    REQUIRED_SECTIONS = ("overview", "budget_breakdown")
+
+    # 补全提示词中各部分的格式示例
+    DAY_TEMPLATE = """{
+            "day": 1,
+            "title": "当天标题",
+            "activities": [
+                {"time": "09:00", "activity": "活动名称", "location": "地点", "poi_name": "精确的景点名称用于地图搜索", "description": "详细描述", "estimated_cost": 50, "duration": "2小时"}
+            ],
+            "meals": {
+                "breakfast": {"restaurant_name": "具体餐厅名称", "address": "餐厅地址", "specialty": "特色菜品", "avg_cost": 30, "poi_name": "餐厅POI名称"},
+                "lunch": {"restaurant_name": "具体餐厅名称", "address": "餐厅地址", "specialty": "特色菜品", "avg_cost": 50, "poi_name": "餐厅POI名称"},
+                "dinner": {"restaurant_name": "具体餐厅名称", "address": "餐厅地址", "specialty": "特色菜品", "avg_cost": 80, "poi_name": "餐厅POI名称"}
+            },
+            "accommodation": {"hotel_name": "具体酒店名称", "address": "酒店地址", "room_type": "房型建议", "price_per_night": 300, "poi_name": "酒店POI名称", "features": ["酒店特色1", "酒店特色2"]}
+        }"""
+
+    SECTION_TEMPLATES = {
+        "overview": '"行程概述"',
+        "transportation": '{"to_destination": "前往目的地的交通方式", "local": "当地交通建议", "estimated_cost": 500}',
+        "accommodation_summary": (
+            '{"type": "酒店类型", "hotels": [{"name": "...", "address": "...", "price_range": "...", '
+            '"rating": "...", "poi_name": "...", "features": ["..."]}], '
+            '"estimated_cost_per_night": 200, "total_nights": 3, "total_cost": 600}'
+        ),
+        "restaurant_recommendations": (
+            '[{"name": "...", "cuisine_type": "...", "address": "...", "specialty": "...", '
+            '"avg_cost": 60, "poi_name": "...", "recommended_for": "..."}]'
+        ),
+        "budget_breakdown": (
+            '{"transportation": 500, "accommodation": 600, "meals": 400, "attractions": 300, '
+            '"shopping": 200, "emergency": 100, "total": 2100}'
+        ),
+        "tips": '["旅行建议1", "旅行建议2", "旅行建议3"]',
+    }
+
+    # 补全结果
+    OUTCOME_SALVAGED = "salvaged"          # 补全成功，避免了一次整体重新生成
+    OUTCOME_FAILED = "failed"              # 补全请求失败或补全后仍不完整，回退为整体重试
+    OUTCOME_UNSALVAGEABLE = "unsalvageable"  # 没有可保留的天，直接整体重试
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._methods: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def _repair_day(day: Any) -> Optional[Dict[str, Any]]:
+        """
+        就地修复一天的结构问题，无法修复时返回 None
+
+        activities 缺失时视为空列表（当天自由活动），单个活动对象包装为列表。
+        """
+        if not isinstance(day, dict):
+            return None
+        activities = day.get("activities")
+        if activities is None:
+            day["activities"] = []
+        elif isinstance(activities, dict):
+            day["activities"] = [activities]
+        elif not isinstance(activities, list):
+            return None
+        return day
+
+    @staticmethod
+    def _day_number(day: Dict[str, Any], days: int) -> int:
+        """天序号，缺失或超出范围时返回 0"""
+        number = day.get("day")
+        if isinstance(number, str) and number.strip().isdigit():
+            number = int(number.strip())
+        if isinstance(number, bool) or not isinstance(number, int) or not 1 <= number <= days:
+            return 0
+        return number
+
+    @staticmethod
+    def _repair_section(key: str, value: Any) -> Any:
+        """
+        修复顶层字段的类型问题，无法修复时返回 None
+
+        - 列表字段返回了字符串（如 tips 为一段文字）：按行拆分为列表
+        - 列表字段返回了单个对象：包装为列表
+        - 字符串字段返回了字符串列表：按行拼接
+        """
+        expected = PlanSalvage.SECTION_TYPES.get(key)
+        if expected is None:
+            return None
+        if expected is list and isinstance(value, str):
+            value = [line.strip() for line in value.splitlines() if line.strip()]
+        elif expected is list and isinstance(value, dict):
+            value = [value]
+        elif expected is str and isinstance(value, list) and all(isinstance(item, str) for item in value):
+            value = "\n".join(value)
+        if not isinstance(value, expected):
+            return None
+        if isinstance(value, str) and not value.strip():
+            return None
+        return value
+
+    @staticmethod
+    def required_sections(itinerary: Any) -> List[str]:
+        """修改行程时只要求原行程中已有的必需字段"""
+        if not isinstance(itinerary, dict):
+            return list(PlanSalvage.REQUIRED_SECTIONS)
+        return [key for key in PlanSalvage.REQUIRED_SECTIONS if key in itinerary]
+
+    @staticmethod
+    def _collect(days_list: Any, sections: Dict[str, Any], days: int) -> Dict[str, Any]:
+        salvaged_days: Dict[int, Dict[str, Any]] = {}
+        for day in days_list if isinstance(days_list, list) else []:
+            day = PlanSalvage._repair_day(day)
+            if day is None:
+                continue
+            number = PlanSalvage._day_number(day, days)
+            if number and number not in salvaged_days:
+                day["day"] = number
+                salvaged_days[number] = day
+        repaired_sections = {}
+        for key, value in sections.items():
+            value = PlanSalvage._repair_section(key, value)
+            if value is not None:
+                repaired_sections[key] = value
+        return {"days": salvaged_days, "sections": repaired_sections}
+
+    @staticmethod
+    def extract(content: str, days: int) -> Dict[str, Any]:
+        """
+        从原始文本中提取已经闭合且结构正确的天和顶层字段
+
+        Returns:
+            {"days": {天序号: 当天行程}, "sections": {字段名: 值}}
+        """
+        parser = ItineraryStreamParser()
+        parser.feed(content or "")
+        return PlanSalvage._collect(parser.days, parser.sections, days)
+
+    @staticmethod
+    def missing(
+        salvaged: Dict[str, Any],
+        days: int,
+        required: Iterable[str]
+    ) -> Tuple[List[int], List[str]]:
+        """缺失或损坏的天序号和顶层字段"""
+        missing_days = [number for number in range(1, days + 1) if number not in salvaged["days"]]
+        missing_keys = [key for key in required if key not in salvaged["sections"]]
+        return missing_days, missing_keys
+
+    @staticmethod
+    def is_complete(itinerary: Any, days: int, required: Iterable[str]) -> bool:
+        """
+        整体解析结果是否包含全部天和要求的顶层字段
+
+        可以就地修复的类型问题（如 tips 为字符串、某天 activities 缺失）直接写回 itinerary，
+        不算作不完整；无法修复的非必需字段从 itinerary 中移除，避免前端按错误类型渲染。
+        """
+        if not isinstance(itinerary, dict):
+            return False
+        collected = PlanSalvage._collect(list(itinerary.get(PlanSalvage.DAILY_KEY) or []), itinerary, days)
+        missing_days, missing_keys = PlanSalvage.missing(collected, days, required)
+        if missing_days or missing_keys:
+            return False
+        for key in PlanSalvage.SECTION_TYPES:
+            if key in collected["sections"]:
+                itinerary[key] = collected["sections"][key]
+            else:
+                itinerary.pop(key, None)
+        return True
+
+    @staticmethod
+    def build_prompt(
+        destination: str,
+        days: int,
+        budget: float,
+        travelers_count: int,
+        preferences: str,
+        salvaged: Dict[str, Any],
+        missing_days: List[int],
+        missing_keys: List[str],
+        feedback: str = "",
+        reference: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        构造只要求缺失部分的补全提示词
+
+        Args:
+            feedback: 用户的修改意见（修改行程时）
+            reference: 修改前的行程，缺失部分的原内容附在提示词中作为参考
+        """
+        day_lines = "\n".join(
+            f"- 第{number}天：{day.get('title', '')}（"
+            + "、".join(str(activity.get("activity", "")) for activity in day["activities"] if isinstance(activity, dict))
+            + "）"
+            for number, day in sorted(salvaged["days"].items())
+        ) or "（无）"
+        overview = salvaged["sections"].get("overview", "")
+
+        parts = []
+        if missing_days:
+            parts.append("、".join(f"第{number}天" for number in missing_days) + "的完整行程")
+        parts.extend(missing_keys)
+
+        fields = []
+        if missing_days:
+            fields.append(f'    "{PlanSalvage.DAILY_KEY}": [\n        {PlanSalvage.DAY_TEMPLATE}\n    ]')
+        for key in missing_keys:
+            fields.append(f'    "{key}": {PlanSalvage.SECTION_TEMPLATES[key]}')
+        template = "{\n" + ",\n".join(fields) + "\n}"
+
+        extra_context = ""
+        if feedback:
+            extra_context += f"\n用户的修改意见：\n{feedback}\n"
+        if isinstance(reference, dict):
+            original: Dict[str, Any] = {}
+            original_days = [
+                day for day in reference.get(PlanSalvage.DAILY_KEY) or []
+                if isinstance(day, dict) and day.get("day") in missing_days
+            ]
+            if original_days:
+                original[PlanSalvage.DAILY_KEY] = original_days
+            original.update({key: reference[key] for key in missing_keys if key in reference})
+            if original:
+                extra_context += (
+                    "\n原行程中需要补全部分的内容（请在此基础上按修改意见调整）：\n"
+                    + json.dumps(original, ensure_ascii=False, separators=(',', ':'))
+                    + "\n"
+                )
+
+        return f"""你是一个专业且安全的旅行规划助手。下面这份旅行计划的部分内容在生成时丢失了，请只补全丢失的部分。
+
+目的地：{destination}
+旅行天数：{days}天
+预算：{budget}元人民币
+旅行人数：{travelers_count}人
+偏好：{preferences or '常规旅游'}
+行程概述：{overview}
+
+已有的每日安排（不要重复其中的景点）：
+{day_lines}
+{extra_context}
+需要补全：{"；".join(parts)}
+
+要求：
+1. 只返回需要补全的部分，不要返回已有的内容
+2. daily_itinerary 中只包含需要补全的天，day 字段使用对应的天序号
+3. 所有费用必须使用纯数字
+4. 每个活动、餐厅、酒店都必须包含 poi_name 字段，用于地图搜索
+
+请严格按照以下 JSON 格式返回：
+{template}
+
+只返回 JSON 内容，不要添加其他解释文字。
+"""
+
+    @staticmethod
+    def merge(
+        salvaged: Dict[str, Any],
+        completion: Any,
+        days: int,
+        missing_days: List[int],
+        missing_keys: List[str]
+    ):
+        """把补全结果中需要的天和字段合并到 salvaged 中"""
+        if not isinstance(completion, dict):
+            return
+        collected = PlanSalvage._collect(completion.get(PlanSalvage.DAILY_KEY), completion, days)
+        for number in missing_days:
+            if number in collected["days"]:
+                salvaged["days"][number] = collected["days"][number]
+        for key in missing_keys:
+            if key in collected["sections"]:
+                salvaged["sections"][key] = collected["sections"][key]
+
+    @staticmethod
+    def assemble(salvaged: Dict[str, Any]) -> Dict[str, Any]:
+        """按与模型输出相同的字段顺序拼装行程"""
+        sections = dict(salvaged["sections"])
+        result: Dict[str, Any] = {}
+        if "overview" in sections:
+            result["overview"] = sections.pop("overview")
+        result[PlanSalvage.DAILY_KEY] = [day for _, day in sorted(salvaged["days"].items())]
+        result.update(sections)
+        return result
+
+    @staticmethod
+    def section_count(salvaged: Dict[str, Any]) -> int:
+        return len(salvaged["days"]) + len(salvaged["sections"])
+
+    def record(self, method: str, outcome: str, kept: int = 0, regenerated: int = 0):
+        """
+        记录一次补全
+
+        Args:
+            method: 发起生成的方法名
+            outcome: 补全结果（OUTCOME_*）
+            kept: 保留下来的天和字段数
+            regenerated: 请求补全的天和字段数
+        """
+        with self._lock:
+            stats = self._methods.setdefault(method, {
+                "damaged": 0,
+                self.OUTCOME_SALVAGED: 0,
+                self.OUTCOME_FAILED: 0,
+                self.OUTCOME_UNSALVAGEABLE: 0,
+                "sections_kept": 0,
+                "sections_regenerated": 0,
+            })
+            stats["damaged"] += 1
+            stats[outcome] += 1
+            stats["sections_kept"] += kept
+            stats["sections_regenerated"] += regenerated
+
+    def stats(self) -> Dict[str, Any]:
+        """各方法的补全统计，salvage_rate 为损坏的输出中通过补全避免整体重试的比例"""
+        with self._lock:
+            methods = {method: dict(stats) for method, stats in self._methods.items()}
+
+        damaged = sum(stats["damaged"] for stats in methods.values())
+        salvaged = sum(stats[self.OUTCOME_SALVAGED] for stats in methods.values())
+        for stats in methods.values():
+            stats["salvage_rate"] = (
+                round(stats[self.OUTCOME_SALVAGED] / stats["damaged"], 4) if stats["damaged"] else 0.0
+            )
+        return {
+            "damaged": damaged,
+            "full_retries_avoided": salvaged,
+            "salvage_rate": round(salvaged / damaged, 4) if damaged else 0.0,
+            "methods": methods,
+        }
+
+
+plan_salvage = PlanSalvage()
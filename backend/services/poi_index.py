@@ -0,0 +1,314 @@
+"""
+POI 空间索引 - 进程内按网格分桶索引已经解析过的 POI，附近搜索优先在本地完成
+"""
+import sys
+import math
+import time
+import threading
+from array import array
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from ..config import settings
+from ..database import SessionLocal
+from ..models import GeoCacheEntry
+from .geo_cache import GeoCache
+
+EARTH_RADIUS_METERS = 6371008.8
+METERS_PER_DEGREE = EARTH_RADIUS_METERS * math.pi / 180
+
+# 文本字段之间的分隔符（POI 名称、地址中不会出现）
+_SEPARATOR = "\x1f"
+
+
+def distance_meters(lng1: float, lat1: float, lng2: float, lat2: float) -> float:
+    """两点之间的球面距离（米）"""
+    lng1, lat1, lng2, lat2 = map(math.radians, (lng1, lat1, lng2, lat2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(math.sqrt(min(1.0, a)))
+
+
+class POIIndex:
+    """
+    POI 空间索引
+
+    按经纬度把 POI 分到 cell_degrees 大小的网格桶中（与同精度的 geohash 分桶等价，但相邻桶可以直接按行列计算），
+    查询时只取圆形范围外接矩形覆盖的桶，再用 NumPy 批量计算球面距离。
+
+    为了在百万量级下仍然占用很少的内存，POI 不保存为字典，而是按列存放在紧凑的数组中：
+    经纬度为 float64，类型为类型表中的下标，ID 另存一份 64 位哈希（用于去重），
+    ID、名称、地址、电话用 UTF-8 拼接存放在同一个 bytearray 中，只记录各自的起始偏移；每个桶只保存 POI 的下标。
+    查询结果返回时才还原为与 MapService.search_poi 相同格式的字典。
+
+    索引只增不减：POI 的位置基本不会变化，地理缓存过期后索引中的条目仍然可用；
+    达到 max_pois 后不再加入新的 POI。
+    """
+
+    def __init__(self, enabled: bool, cell_degrees: float, max_pois: int):
+        self.enabled = enabled
+        self.cell_degrees = cell_degrees
+        self.max_pois = max_pois
+        self._lock = threading.Lock()
+        self._longitudes = array("d")
+        self._latitudes = array("d")
+        self._type_ids = array("I")
+        self._id_hashes = array("q")
+        self._text_offsets = array("Q", [0])
+        self._text = bytearray()
+        # 桶键 -> 桶内 POI 的下标
+        self._buckets: Dict[int, array] = {}
+        # 类型表：(类型名称, 类型编码) -> 下标
+        self._types: List[Tuple[str, str]] = []
+        self._type_lookup: Dict[Tuple[str, str], int] = {}
+        self._type_masks: Dict[str, np.ndarray] = {}
+        self._warm_thread: Optional[threading.Thread] = None
+        self._stats = {
+            "added": 0,
+            "duplicates": 0,
+            "dropped": 0,
+            "warmed": 0,
+            "queries": 0,
+            "query_seconds": 0.0
+        }
+
+    def __len__(self) -> int:
+        return len(self._longitudes)
+
+    def _cell(self, longitude: float, latitude: float) -> Tuple[int, int]:
+        return math.floor(latitude / self.cell_degrees), math.floor(longitude / self.cell_degrees)
+
+    @staticmethod
+    def _bucket_key(row: int, column: int) -> int:
+        return (row << 32) + (column + (1 << 31))
+
+    @staticmethod
+    def _text_of(value: Any) -> str:
+        # 高德对空字段返回 []
+        return value.replace(_SEPARATOR, " ") if isinstance(value, str) else ""
+
+    def _type_id(self, type_name: str, type_code: str) -> int:
+        key = (type_name, type_code)
+        type_id = self._type_lookup.get(key)
+        if type_id is None:
+            type_id = len(self._types)
+            self._types.append(key)
+            self._type_lookup[key] = type_id
+            self._type_masks.clear()
+        return type_id
+
+    def add(self, poi: Dict[str, Any]) -> bool:
+        """加入一个 POI（MapService.search_poi 返回的格式），返回是否为新加入的"""
+        return self.add_many([poi]) == 1
+
+    def add_many(self, pois: List[Dict[str, Any]]) -> int:
+        """批量加入 POI，已存在（同一高德 ID）或缺少 ID、坐标的跳过，返回新加入的数量"""
+        if not self.enabled or not pois:
+            return 0
+
+        added = duplicates = dropped = 0
+        with self._lock:
+            for poi in pois:
+                if not isinstance(poi, dict):
+                    continue
+                poi_id = poi.get("id")
+                location = poi.get("location") or {}
+                longitude, latitude = location.get("longitude"), location.get("latitude")
+                if not isinstance(poi_id, str) or not poi_id or longitude is None or latitude is None:
+                    continue
+
+                key = self._bucket_key(*self._cell(longitude, latitude))
+                id_hash = hash(poi_id)
+                bucket = self._buckets.get(key)
+                if bucket is not None and (
+                    np.frombuffer(self._id_hashes, dtype=np.int64)[np.frombuffer(bucket, dtype=np.uint32)] == id_hash
+                ).any():
+                    duplicates += 1
+                    continue
+                if len(self._longitudes) >= self.max_pois:
+                    dropped += 1
+                    continue
+                if bucket is None:
+                    bucket = self._buckets[key] = array("I")
+
+                index = len(self._longitudes)
+                self._longitudes.append(float(longitude))
+                self._latitudes.append(float(latitude))
+                self._id_hashes.append(id_hash)
+                self._type_ids.append(self._type_id(self._text_of(poi.get("type")), self._text_of(poi.get("typecode"))))
+                self._text.extend(_SEPARATOR.join((
+                    poi_id,
+                    self._text_of(poi.get("name")),
+                    self._text_of(poi.get("address")),
+                    self._text_of(poi.get("tel"))
+                )).encode("utf-8"))
+                self._text_offsets.append(len(self._text))
+                bucket.append(index)
+                added += 1
+
+            self._stats["added"] += added
+            self._stats["duplicates"] += duplicates
+            self._stats["dropped"] += dropped
+        return added
+
+    def _type_mask(self, types: Optional[str]) -> Optional[np.ndarray]:
+        """
+        类型表中与 types 匹配的类型（调用方需持有锁）
+
+        types 与高德一致，多个类型用 | 分隔：纯数字按类型编码前缀匹配（"050000" 匹配所有 05 开头的编码），
+        其他按类型名称包含匹配（"餐饮服务"、"酒店"）。
+        """
+        if not types or not types.strip():
+            return None
+        mask = self._type_masks.get(types)
+        if mask is None:
+            terms = [term.strip() for term in types.split("|") if term.strip()]
+            prefixes = [term.rstrip("0") for term in terms if term.isdigit()]
+            names = [term for term in terms if not term.isdigit()]
+            mask = np.array([
+                any(code.startswith(prefix) for prefix in prefixes if code) or any(name in type_name for name in names)
+                for type_name, code in self._types
+            ], dtype=bool)
+            self._type_masks[types] = mask
+        return mask
+
+    def _record(self, index: int, distance: float) -> Dict[str, Any]:
+        """还原为 MapService.search_poi 的 POI 格式（调用方需持有锁）"""
+        text = self._text[self._text_offsets[index]:self._text_offsets[index + 1]].decode("utf-8")
+        poi_id, name, address, tel = text.split(_SEPARATOR)
+        type_name, type_code = self._types[self._type_ids[index]]
+        return {
+            "id": poi_id,
+            "name": name,
+            "type": type_name,
+            "typecode": type_code,
+            "address": address,
+            "location": {"longitude": self._longitudes[index], "latitude": self._latitudes[index]},
+            "tel": tel,
+            "distance": str(int(round(distance)))
+        }
+
+    def nearby(
+        self,
+        longitude: float,
+        latitude: float,
+        radius: float,
+        types: Optional[str] = None,
+        limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """
+        半径 radius 米以内的 POI，按距离由近到远排序
+
+        Returns:
+            POI 列表，distance 为到中心点的距离（米，字符串，与高德一致）
+        """
+        if not self.enabled:
+            return []
+
+        start_time = time.perf_counter()
+        lat_span = radius / METERS_PER_DEGREE
+        lng_span = lat_span / max(math.cos(math.radians(latitude)), 0.01)
+        min_row, min_column = self._cell(longitude - lng_span, latitude - lat_span)
+        max_row, max_column = self._cell(longitude + lng_span, latitude + lat_span)
+
+        with self._lock:
+            candidates = []
+            for row in range(min_row, max_row + 1):
+                for column in range(min_column, max_column + 1):
+                    bucket = self._buckets.get(self._bucket_key(row, column))
+                    if bucket is not None:
+                        candidates.append(np.frombuffer(bucket, dtype=np.uint32))
+
+            results = []
+            if candidates:
+                indices = np.concatenate(candidates).astype(np.int64)
+                candidates = None  # 释放对桶数组的引用，之后才能继续向桶中追加
+                mask = self._type_mask(types)
+                if mask is not None:
+                    indices = indices[mask[np.frombuffer(self._type_ids, dtype=np.uint32)[indices]]]
+
+                longitudes = np.radians(np.frombuffer(self._longitudes, dtype=np.float64)[indices])
+                latitudes = np.radians(np.frombuffer(self._latitudes, dtype=np.float64)[indices])
+                center_lng, center_lat = math.radians(longitude), math.radians(latitude)
+                a = (np.sin((latitudes - center_lat) / 2) ** 2
+                     + math.cos(center_lat) * np.cos(latitudes) * np.sin((longitudes - center_lng) / 2) ** 2)
+                distances = 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+                inside = np.flatnonzero(distances <= radius)
+                if len(inside) > limit:
+                    inside = inside[np.argpartition(distances[inside], limit - 1)[:limit]]
+                inside = inside[np.argsort(distances[inside], kind="stable")]
+                results = [self._record(int(indices[position]), float(distances[position])) for position in inside]
+
+            self._stats["queries"] += 1
+            self._stats["query_seconds"] += time.perf_counter() - start_time
+        return results
+
+    def warm_from_cache(self) -> int:
+        """从数据库的地理缓存中加载所有未过期的 POI 搜索结果，返回新加入的数量"""
+        added = 0
+        db = SessionLocal()
+        try:
+            rows = db.query(GeoCacheEntry.result).filter(
+                GeoCacheEntry.kind.in_((GeoCache.KIND_POI, GeoCache.KIND_AROUND)),
+                GeoCacheEntry.found.is_(True),
+                GeoCacheEntry.expires_at >= datetime.utcnow()
+            ).yield_per(500)
+            for (result,) in rows:
+                if isinstance(result, list):
+                    added += self.add_many(result)
+        finally:
+            db.close()
+
+        with self._lock:
+            self._stats["warmed"] += added
+        return added
+
+    def start_warm(self):
+        """在后台线程中从地理缓存加载 POI，不阻塞启动"""
+        if not self.enabled or self._warm_thread is not None:
+            return
+
+        def warm():
+            start_time = time.perf_counter()
+            try:
+                added = self.warm_from_cache()
+                print(f"🗺️ POI 空间索引已加载 {added} 个 POI，用时 {time.perf_counter() - start_time:.1f} 秒")
+            except Exception as e:
+                print(f"⚠️ POI 空间索引加载失败: {str(e)}")
+
+        self._warm_thread = threading.Thread(target=warm, name="poi-index-warm", daemon=True)
+        self._warm_thread.start()
+
+    def memory_bytes(self) -> int:
+        """索引占用的内存（数组、文本和桶，不含 Python 对象本身的固定开销）"""
+        with self._lock:
+            total = sum(sys.getsizeof(column) for column in (
+                self._longitudes, self._latitudes, self._type_ids, self._id_hashes, self._text_offsets, self._text
+            ))
+            total += sys.getsizeof(self._buckets)
+            total += sum(sys.getsizeof(bucket) for bucket in self._buckets.values())
+        return total
+
+    def stats(self) -> Dict[str, Any]:
+        """POI 数、桶数、内存占用和查询耗时"""
+        memory = self.memory_bytes()
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pois"] = len(self._longitudes)
+            stats["buckets"] = len(self._buckets)
+            stats["types"] = len(self._types)
+        query_seconds = stats.pop("query_seconds")
+        stats["avg_query_ms"] = round(query_seconds * 1000 / stats["queries"], 3) if stats["queries"] else 0.0
+        stats["memory_bytes"] = memory
+        stats["bytes_per_poi"] = round(memory / stats["pois"], 1) if stats["pois"] else 0.0
+        stats["enabled"] = self.enabled
+        stats["cell_degrees"] = self.cell_degrees
+        stats["max_pois"] = self.max_pois
+        return stats
+
+
+poi_index = POIIndex(
+    enabled=settings.POI_INDEX_ENABLED,
+    cell_degrees=settings.POI_INDEX_CELL_DEGREES,
+    max_pois=settings.POI_INDEX_MAX_POIS
+)
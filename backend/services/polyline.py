@@ -0,0 +1,134 @@
+"""
+路线折线 - 解析高德返回的折线，按地图缩放级别抽稀后编码为紧凑字符串
+
+编码使用 Google Encoded Polyline 算法（精度 1e-5 度，约 1 米），
+每个坐标点通常只需 4~8 个字符，前端解码后直接绘制。
+"""
+import math
+from typing import List, Tuple
+
+Point = Tuple[float, float]  # (经度, 纬度)
+
+# 256 像素宽的世界地图在 0 级时每像素对应的经度
+_DEGREES_PER_PIXEL_AT_ZOOM_0 = 360.0 / 256
+
+
+def parse_amap_polyline(text: str) -> List[Point]:
+    """解析高德的折线字符串 "lng,lat;lng,lat;..." """
+    points = []
+    for pair in (text or "").split(";"):
+        parts = pair.split(",")
+        if len(parts) != 2:
+            continue
+        try:
+            points.append((float(parts[0]), float(parts[1])))
+        except ValueError:
+            continue
+    return points
+
+
+def join_paths(paths: List[List[Point]]) -> List[Point]:
+    """拼接各段路径，去掉相邻段首尾重复的点"""
+    points: List[Point] = []
+    for path in paths:
+        for point in path:
+            if not points or points[-1] != point:
+                points.append(point)
+    return points
+
+
+def tolerance_for_zoom(zoom: int, pixels: float = 1.0) -> float:
+    """缩放级别下 pixels 个像素对应的经度跨度，作为抽稀的容差"""
+    return _DEGREES_PER_PIXEL_AT_ZOOM_0 / (2 ** zoom) * pixels
+
+
+def simplify(points: List[Point], tolerance: float) -> List[Point]:
+    """
+    Douglas-Peucker 抽稀
+
+    距离按所在纬度修正经度后计算（近似等距投影），偏离首尾连线不超过 tolerance 的点被去掉。
+    使用显式栈代替递归，几万个点的长路线也不会超出递归深度。
+    """
+    if len(points) <= 2 or tolerance <= 0:
+        return list(points)
+
+    scale = math.cos(math.radians(sum(lat for _, lat in points) / len(points)))
+    xs = [lng * scale for lng, _ in points]
+    ys = [lat for _, lat in points]
+    tolerance_sq = tolerance * tolerance * scale * scale
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        dx, dy = xs[last] - xs[first], ys[last] - ys[first]
+        length_sq = dx * dx + dy * dy
+        farthest, max_distance_sq = -1, tolerance_sq
+        for index in range(first + 1, last):
+            px, py = xs[index] - xs[first], ys[index] - ys[first]
+            if length_sq == 0:
+                distance_sq = px * px + py * py
+            else:
+                # 到线段（而不是直线）的距离，首尾重合或折返的路线也能正确处理
+                t = max(0.0, min(1.0, (px * dx + py * dy) / length_sq))
+                ex, ey = px - t * dx, py - t * dy
+                distance_sq = ex * ex + ey * ey
+            if distance_sq > max_distance_sq:
+                farthest, max_distance_sq = index, distance_sq
+        if farthest >= 0:
+            keep[farthest] = True
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def _encode_value(value: int) -> str:
+    value = ~(value << 1) if value < 0 else value << 1
+    chunks = []
+    while value >= 0x20:
+        chunks.append(chr((0x20 | (value & 0x1f)) + 63))
+        value >>= 5
+    chunks.append(chr(value + 63))
+    return "".join(chunks)
+
+
+def encode(points: List[Point], precision: int = 5) -> str:
+    """
+    编码为 Google Encoded Polyline 字符串
+
+    注意算法按 (纬度, 经度) 的顺序编码，与 Google 和常见的解码库保持一致。
+    """
+    factor = 10 ** precision
+    result = []
+    previous_lat = previous_lng = 0
+    for lng, lat in points:
+        lat_value, lng_value = int(round(lat * factor)), int(round(lng * factor))
+        result.append(_encode_value(lat_value - previous_lat))
+        result.append(_encode_value(lng_value - previous_lng))
+        previous_lat, previous_lng = lat_value, lng_value
+    return "".join(result)
+
+
+def decode(text: str, precision: int = 5) -> List[Point]:
+    """解码 Google Encoded Polyline 字符串，返回 [(经度, 纬度)]"""
+    factor = 10 ** precision
+    points: List[Point] = []
+    index = lat = lng = 0
+    while index < len(text):
+        values = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                byte = ord(text[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            values.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += values[0]
+        lng += values[1]
+        points.append((lng / factor, lat / factor))
+    return points
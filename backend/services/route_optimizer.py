@@ -0,0 +1,284 @@
+"""
+行程路线优化 - 按地理位置重新安排每天景点的游览顺序，减少来回折返
+"""
+import re
+import copy
+import time
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from .itinerary_geo import ItineraryGeo
+
+EARTH_RADIUS_METERS = 6371008.8
+
+_TIME_RE = re.compile(r"(\d{1,2})[:：](\d{2})")
+
+
+def haversine_matrix(points: np.ndarray) -> np.ndarray:
+    """
+    两两之间的球面距离矩阵（米）
+
+    Args:
+        points: 形状为 (n, 2) 的数组，每行为 (经度, 纬度)
+    """
+    radians = np.radians(points)
+    lng, lat = radians[:, 0], radians[:, 1]
+    dlat = lat[:, None] - lat[None, :]
+    dlng = lng[:, None] - lng[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def path_length(matrix: np.ndarray, order: List[int]) -> float:
+    if len(order) < 2:
+        return 0.0
+    return float(matrix[order[:-1], order[1:]].sum())
+
+
+def solve_path(matrix: np.ndarray, start: Optional[int], end: Optional[int], stops: List[int]) -> List[int]:
+    """
+    求经过所有 stops 的短路径（起点 start、终点 end 固定，为 None 时不限）
+
+    最近邻构造初始路径，再用 2-opt 反转区间直到没有改进；
+    每轮对固定的 i 用 NumPy 一次算出所有 j 的改进量。
+
+    Returns:
+        stops 的访问顺序
+    """
+    if len(stops) <= 1:
+        return list(stops)
+
+    def nearest_neighbour(first: int, remaining: List[int]) -> List[int]:
+        order, current, remaining = [], first, list(remaining)
+        while remaining:
+            distances = matrix[current, remaining]
+            current = remaining.pop(int(np.argmin(distances)))
+            order.append(current)
+        return order
+
+    if start is not None:
+        candidates = [nearest_neighbour(start, stops)]
+    else:
+        # 起点不固定时依次以每个景点开头，取最短的
+        candidates = [[first] + nearest_neighbour(first, [stop for stop in stops if stop != first]) for first in stops]
+
+    def total(order: List[int]) -> float:
+        full = ([start] if start is not None else []) + order + ([end] if end is not None else [])
+        return path_length(matrix, full)
+
+    best = min(candidates, key=total)
+
+    # 2-opt：路径为 [start] + order + [end]，只反转 order 内部的区间，首尾锚点不动
+    route = ([start] if start is not None else []) + best + ([end] if end is not None else [])
+    first_movable = 1 if start is not None else 0
+    last_movable = len(route) - (2 if end is not None else 1)
+    route = np.array(route)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(first_movable, last_movable):
+            # 反转 route[i..j]：断开 (i-1, i) 和 (j, j+1)，连接 (i-1, j) 和 (i, j+1)
+            j = np.arange(i + 1, last_movable + 1)
+            before = route[i - 1] if i > 0 else None
+            after = np.where(j + 1 < len(route), route[np.minimum(j + 1, len(route) - 1)], -1)
+            has_after = after >= 0
+            old = np.where(has_after, matrix[route[j], np.maximum(after, 0)], 0.0)
+            new = np.where(has_after, matrix[route[i], np.maximum(after, 0)], 0.0)
+            if before is not None:
+                old = old + matrix[before, route[i]]
+                new = new + matrix[before, route[j]]
+            delta = new - old
+            best_j = int(np.argmin(delta))
+            if delta[best_j] < -1e-6:
+                j_value = int(j[best_j])
+                route[i:j_value + 1] = route[i:j_value + 1][::-1].copy()
+                improved = True
+
+    route = route.tolist()
+    if start is not None:
+        route = route[1:]
+    if end is not None:
+        route = route[:-1]
+    return route
+
+
+class RouteOptimizer:
+    """
+    每天景点游览顺序的优化
+
+    一天的路线为：前一晚的酒店 → 早餐 → 上午的景点 → 午餐 → 下午的景点 → 晚餐 → 晚上的景点 → 当晚的酒店。
+    酒店和三餐是固定的锚点，景点按时间（12:00、18:00 为界）归入对应的时段，
+    只在时段内、两个锚点之间重新排序；没有坐标的景点也视为锚点，保持原位。
+    排序后各时段原有的时间依次分配给新的顺序，时间表本身不变。
+
+    距离为球面直线距离，只使用行程中已经保存的坐标（见 ItineraryGeo），不请求高德。
+    """
+
+    LUNCH_TIME = 12 * 60
+    DINNER_TIME = 18 * 60
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {"days": 0, "reordered": 0, "distance_saved_meters": 0.0, "total_seconds": 0.0}
+
+    @staticmethod
+    def _position(entry: Any) -> Optional[Tuple[float, float]]:
+        coordinates = entry.get(ItineraryGeo.COORDINATES_KEY) if isinstance(entry, dict) else None
+        if not isinstance(coordinates, dict):
+            return None
+        longitude, latitude = coordinates.get("longitude"), coordinates.get("latitude")
+        if longitude is None or latitude is None:
+            return None
+        return float(longitude), float(latitude)
+
+    @staticmethod
+    def _minutes(value: Any) -> Optional[int]:
+        match = _TIME_RE.search(value) if isinstance(value, str) else None
+        return int(match.group(1)) * 60 + int(match.group(2)) if match else None
+
+    def _slots(self, activities: List[Any]) -> List[int]:
+        """各活动所属的时段：0 上午、1 下午、2 晚上；没有时间的活动跟随前一个活动"""
+        slots, current = [], 0
+        for activity in activities:
+            minutes = self._minutes(activity.get("time")) if isinstance(activity, dict) else None
+            if minutes is not None:
+                current = 0 if minutes < self.LUNCH_TIME else (1 if minutes < self.DINNER_TIME else 2)
+            slots.append(current)
+        return slots
+
+    def optimize_day(self, day: Dict[str, Any], previous_day: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        优化一天的游览顺序
+
+        Args:
+            day: daily_itinerary 中的一天（不会被修改）
+            previous_day: 前一天，用其住宿作为当天的出发点
+
+        Returns:
+            {"day": 优化后的当天行程, "reordered": 顺序是否变化,
+             "distance_before" / "distance_after" / "distance_saved": 全天路线的直线距离（米）}
+        """
+        start_time = time.perf_counter()
+        result = copy.deepcopy(day)
+        activities = result.get("activities") or []
+        meals = result.get("meals") if isinstance(result.get("meals"), dict) else {}
+
+        # 按时间顺序排列的全天节点：("anchor", 坐标) 或 ("activity", 下标)
+        start_hotel = self._position((previous_day or {}).get("accommodation")) or self._position(result.get("accommodation"))
+        sequence: List[Tuple[str, Any]] = [("anchor", start_hotel), ("anchor", self._position(meals.get("breakfast")))]
+        slots = self._slots(activities)
+        for slot, meal in ((1, "lunch"), (2, "dinner"), (3, None)):
+            sequence.extend(("activity", index) for index, value in enumerate(slots) if value == slot - 1)
+            if meal:
+                sequence.append(("anchor", self._position(meals.get(meal))))
+        sequence.append(("anchor", self._position(result.get("accommodation"))))
+
+        # 坐标表：所有有坐标的节点
+        positions: List[Tuple[float, float]] = []
+        node_ids: List[Optional[int]] = []
+        for kind, value in sequence:
+            position = value if kind == "anchor" else self._position(activities[value])
+            if position is None:
+                node_ids.append(None)
+            else:
+                node_ids.append(len(positions))
+                positions.append(position)
+
+        if len(positions) < 3:
+            return self._finish(result, False, 0.0, 0.0, start_time)
+        matrix = haversine_matrix(np.array(positions, dtype=float))
+
+        # 按锚点切分为若干段，每段内有坐标的景点重新排序。
+        # 没有坐标的景点和三餐也会切分（段的这一端不固定），保证景点不会跨时段、也不会越过它们；
+        # 段开始之前遇到的没有坐标的锚点（如早餐）则直接跳过，仍以更早的锚点（酒店）为起点
+        new_sequence = list(sequence)
+        segment: List[int] = []
+        anchor_before: Optional[int] = None
+        for position_index in range(len(sequence) + 1):
+            node = node_ids[position_index] if position_index < len(sequence) else None
+            if position_index < len(sequence):
+                kind = sequence[position_index][0]
+                if kind == "activity" and node is not None:
+                    segment.append(position_index)
+                    continue
+                if node is None and not segment:
+                    continue
+            if len(segment) > 1:
+                order = solve_path(matrix, anchor_before, node, [node_ids[index] for index in segment])
+                by_node = {node_ids[index]: sequence[index] for index in segment}
+                for slot_index, stop in zip(segment, order):
+                    new_sequence[slot_index] = by_node[stop]
+            segment = []
+            anchor_before = node
+
+        # 锚点位置不变，景点的坐标节点随景点移动
+        activity_nodes = {
+            value: node_ids[index] for index, (kind, value) in enumerate(sequence) if kind == "activity"
+        }
+
+        def route_length(items: List[Tuple[str, Any]]) -> float:
+            nodes = []
+            for index, (kind, value) in enumerate(items):
+                node = node_ids[index] if kind == "anchor" else activity_nodes[value]
+                if node is not None:
+                    nodes.append(node)
+            return path_length(matrix, nodes)
+
+        before, after = route_length(sequence), route_length(new_sequence)
+        if after >= before - 1e-6:
+            return self._finish(result, False, before, before, start_time)
+
+        # 按新的顺序重排活动，各位置原有的时间保持不变
+        old_order = [value for kind, value in sequence if kind == "activity"]
+        new_order = [value for kind, value in new_sequence if kind == "activity"]
+        reordered = [None] * len(activities)
+        for target, source in zip(old_order, new_order):
+            activity = copy.deepcopy(activities[source])
+            if isinstance(activity, dict) and isinstance(activities[target], dict) and "time" in activities[target]:
+                activity["time"] = activities[target]["time"]
+            reordered[target] = activity
+        result["activities"] = reordered
+        return self._finish(result, True, before, after, start_time)
+
+    def _finish(self, day: Dict[str, Any], reordered: bool, before: float, after: float, start_time: float) -> Dict[str, Any]:
+        with self._lock:
+            self._stats["days"] += 1
+            self._stats["reordered"] += int(reordered)
+            self._stats["distance_saved_meters"] += before - after
+            self._stats["total_seconds"] += time.perf_counter() - start_time
+        return {
+            "day": day,
+            "reordered": reordered,
+            "distance_before": round(before),
+            "distance_after": round(after),
+            "distance_saved": round(before - after)
+        }
+
+    def optimize(self, itinerary: Dict[str, Any], day_number: Optional[int] = None) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        优化行程中每一天（或指定的一天）
+
+        Returns:
+            (优化后的行程副本, 各天的优化结果)
+        """
+        result = copy.deepcopy(itinerary)
+        days = result.get("daily_itinerary") or []
+        reports = []
+        for index, day in enumerate(days):
+            if not isinstance(day, dict) or (day_number is not None and day.get("day") != day_number):
+                continue
+            report = self.optimize_day(day, days[index - 1] if index > 0 else None)
+            days[index] = report["day"]
+            reports.append(report)
+        return result, reports
+
+    def stats(self) -> Dict[str, Any]:
+        """优化过的天数、调整了顺序的天数、累计节省的直线距离和平均耗时"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["distance_saved_meters"] = round(stats["distance_saved_meters"])
+        stats["avg_ms"] = round(stats.pop("total_seconds") * 1000 / stats["days"], 2) if stats["days"] else 0.0
+        return stats
+
+
+route_optimizer = RouteOptimizer()
@@ -0,0 +1,72 @@
+"""
+请求合并（single-flight）- 参数相同且同时进行的 AI 调用只请求一次模型
+"""
+import copy
+import asyncio
+import threading
+from typing import Dict, Any, Hashable, Callable, Awaitable, Tuple
+
+
+class SingleFlight:
+    """
+    合并相同的并发调用
+
+    同一个键同时只会执行一次：第一个调用方启动实际的调用，
+    之后到达的相同调用等待同一个结果（成功或异常都共享）。
+    调用在独立的任务中执行，发起者断开连接也不会中断，其他等待者仍能拿到结果。
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Tuple[str, Hashable], asyncio.Task] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _record(self, name: str, field: str):
+        with self._lock:
+            stats = self._stats.setdefault(name, {"calls": 0, "executed": 0, "coalesced": 0})
+            stats[field] += 1
+
+    async def do(self, name: str, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        执行调用，相同 (name, key) 的并发调用共享一次执行
+
+        Args:
+            name: 调用类别，用于统计（如 generate_travel_plan）
+            key: 归一化后的参数
+            func: 实际执行调用的协程函数
+
+        Returns:
+            调用结果的深拷贝，各调用方可以放心修改
+        """
+        flight_key = (name, key)
+        self._record(name, "calls")
+
+        task = self._in_flight.get(flight_key)
+        if task is not None:
+            self._record(name, "coalesced")
+            print(f"🔗 合并相同的进行中请求: {name}")
+            result = await asyncio.shield(task)
+            return copy.deepcopy(result)
+
+        self._record(name, "executed")
+        task = asyncio.get_running_loop().create_task(func())
+        self._in_flight[flight_key] = task
+        task.add_done_callback(lambda _: self._in_flight.pop(flight_key, None))
+        result = await asyncio.shield(task)
+        return copy.deepcopy(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """各类调用的合并统计"""
+        with self._lock:
+            by_name = {name: dict(stats) for name, stats in self._stats.items()}
+        for stats in by_name.values():
+            stats["coalesced_ratio"] = (
+                round(stats["coalesced"] / stats["calls"], 4) if stats["calls"] else 0.0
+            )
+        return {
+            "in_flight": len(self._in_flight),
+            "calls": by_name
+        }
+
+
+ai_single_flight = SingleFlight()
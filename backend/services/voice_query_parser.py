@@ -0,0 +1,301 @@
+"""
+语音查询规则解析 - 常见的简单语句在本地直接解析，无需调用大模型
+"""
+import re
+from datetime import date, timedelta
+from typing import Dict, Any, Optional, List
+
+
+class VoiceQueryRuleParser:
+    """
+    基于规则和词典的语音查询解析器
+
+    支持中文数字、相对日期（明天、下周五、周末等）、费用类别关键词和常见城市名。
+    只有在足够确定时才返回结果，否则返回 None，由调用方交给大模型处理：
+    提到多个城市、或者出发日期只用节假日等规则无法换算的说法表示时都不回答。
+    返回结果的格式与 AIService.parse_voice_query 相同。
+    """
+
+    CITIES = [
+        # 直辖市和省会
+        "北京", "上海", "天津", "重庆", "哈尔滨", "长春", "沈阳", "呼和浩特", "石家庄",
+        "太原", "济南", "郑州", "西安", "兰州", "西宁", "银川", "乌鲁木齐", "拉萨",
+        "成都", "昆明", "贵阳", "南宁", "广州", "海口", "长沙", "武汉", "南昌", "合肥",
+        "南京", "杭州", "福州", "台北", "香港", "澳门",
+        # 热门旅游城市
+        "深圳", "厦门", "青岛", "大连", "苏州", "无锡", "宁波", "温州", "绍兴", "嘉兴",
+        "扬州", "镇江", "常州", "南通", "徐州", "烟台", "威海", "秦皇岛", "承德", "大同",
+        "洛阳", "开封", "平遥", "敦煌", "张掖", "嘉峪关", "喀什", "伊犁", "吐鲁番",
+        "三亚", "北海", "桂林", "阳朔", "丽江", "大理", "西双版纳", "香格里拉", "腾冲",
+        "稻城", "九寨沟", "峨眉山", "乐山", "都江堰", "张家界", "凤凰", "黄山", "婺源",
+        "景德镇", "九江", "庐山", "武夷山", "泉州", "漳州", "汕头", "潮州", "珠海",
+        "佛山", "东莞", "惠州", "湛江", "宜昌", "恩施", "襄阳", "舟山", "千岛湖", "乌镇",
+        "西塘", "周庄", "婺源", "呼伦贝尔", "阿尔山", "长白山", "延吉", "丹东", "满洲里",
+        "林芝", "日喀则", "西宁", "青海湖", "茶卡", "遵义", "安顺", "黔东南", "柳州",
+        # 境外热门目的地
+        "东京", "大阪", "京都", "北海道", "札幌", "冲绳", "首尔", "济州岛", "釜山",
+        "曼谷", "清迈", "普吉岛", "新加坡", "吉隆坡", "巴厘岛", "河内", "胡志明",
+        "岘港", "芽庄", "马尔代夫", "迪拜", "巴黎", "伦敦", "罗马", "巴塞罗那", "纽约",
+        "洛杉矶", "旧金山", "悉尼", "墨尔本",
+    ]
+
+    CATEGORY_KEYWORDS = {
+        "交通": ["交通", "打车", "出租车", "滴滴", "网约车", "地铁", "公交", "高铁", "动车",
+                "火车", "机票", "飞机", "车票", "船票", "加油", "油费", "停车", "过路费", "租车"],
+        "住宿": ["住宿", "酒店", "宾馆", "民宿", "客栈", "旅馆", "房费", "住了"],
+        "餐饮": ["餐饮", "早饭", "午饭", "晚饭", "早餐", "午餐", "晚餐", "吃饭", "夜宵", "宵夜",
+                "火锅", "小吃", "奶茶", "咖啡", "饮料", "水果", "外卖", "聚餐", "吃了"],
+        "景点": ["景点", "门票", "景区", "索道", "缆车", "观光车", "游船", "博物馆", "讲解"],
+        "购物": ["购物", "纪念品", "特产", "伴手礼", "衣服", "买了", "商场", "免税"],
+    }
+
+    PREFERENCE_KEYWORDS = [
+        "美食", "购物", "历史", "文化", "自然", "风景", "爬山", "徒步", "海边", "海岛",
+        "博物馆", "拍照", "摄影", "动漫", "亲子", "带孩子", "带老人", "休闲", "度假",
+        "夜景", "古镇", "温泉", "滑雪", "露营", "音乐节", "网红", "小众",
+    ]
+
+    EXPENSE_VERBS = ["花了", "花费", "消费", "付了", "支付", "用了", "支出", "开销", "记一笔", "记录"]
+    TRAVEL_VERBS = ["去", "旅游", "旅行", "玩", "游", "出发", "规划", "行程"]
+
+    _CN_DIGITS = {"零": 0, "〇": 0, "一": 1, "二": 2, "两": 2, "三": 3, "四": 4,
+                  "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+    _CN_UNITS = {"十": 10, "百": 100, "千": 1000, "万": 10000}
+    # 周末按周六计算
+    _WEEKDAYS = {"一": 0, "二": 1, "三": 2, "四": 3, "五": 4, "六": 5, "日": 6, "天": 6, "末": 5}
+
+    _NUM = r"[0-9]+(?:\.[0-9]+)?[十百千万]?[零〇一二两三四五六七八九十百千万]*|[零〇一二两三四五六七八九十百千万]+"
+
+    _AMOUNT_PATTERNS = [
+        re.compile(rf"({_NUM})\s*(?:元|块|rmb|RMB)"),
+        re.compile(rf"(?:花了|花费|消费|付了|支付|用了|支出|一共|总共|共)\s*({_NUM})"),
+    ]
+    _BUDGET_PATTERNS = [
+        re.compile(rf"预算\s*(?:是|为|在|大概|大约|约|有)?\s*({_NUM})"),
+        re.compile(rf"({_NUM})\s*(?:元|块钱|块)?\s*(?:左右)?的?预算"),
+    ]
+    _DAYS_PATTERN = re.compile(rf"({_NUM})\s*(?:天|日游)")
+    _NIGHTS_PATTERN = re.compile(rf"({_NUM})\s*晚")
+    _WEEKS_PATTERN = re.compile(rf"({_NUM})\s*个?(?:周|星期|礼拜)(?![一二三四五六日天末])")
+    _TRAVELERS_PATTERNS = [
+        # "三千人民币" 中的 "千人" 不是人数
+        re.compile(rf"({_NUM})\s*(?:个|位)?\s*人(?!民)"),
+        re.compile(rf"一家({_NUM})口"),
+    ]
+    _ISO_DATE_PATTERN = re.compile(r"(\d{4})[-/年](\d{1,2})[-/月](\d{1,2})[日号]?")
+    _MONTH_DAY_PATTERN = re.compile(rf"({_NUM})\s*月\s*({_NUM})\s*[日号]")
+    _WEEKDAY_PATTERN = re.compile(r"(下下|下个?|这个?|本)?(?:周|星期|礼拜)([一二三四五六日天末])")
+    _RELATIVE_DAYS = {"今天": 0, "明天": 1, "后天": 2, "大后天": 3}
+    # 规则无法换算为具体日期的说法（节假日、月底等），出现且没有给出具体日期时交给大模型
+    _UNRESOLVED_DATE_PATTERN = re.compile(
+        r"国庆|五一|十一(?![月天日号点个位人晚])|春节|过年|元旦|清明|端午|中秋|劳动节|黄金周|长假|"
+        r"寒假|暑假|圣诞|月初|月中|月底|月末|年初|年底|上旬|中旬|下旬|下个?月|过几天|改天"
+    )
+
+    @staticmethod
+    def chinese_to_number(text: str) -> Optional[float]:
+        """
+        中文数字（可与阿拉伯数字混用）转换为数字
+
+        例如：三十五 -> 35、两千 -> 2000、一千五 -> 1500、3千 -> 3000、1.5万 -> 15000
+        """
+        if not text:
+            return None
+        if re.fullmatch(r"[0-9]+(?:\.[0-9]+)?", text):
+            return float(text)
+
+        total = 0.0
+        section = 0.0
+        number: Optional[float] = None
+        last_unit = 1
+        saw_zero = False
+        for token in re.findall(r"[0-9]+(?:\.[0-9]+)?|.", text):
+            if token[0].isdigit():
+                number = float(token)
+            elif token in VoiceQueryRuleParser._CN_DIGITS:
+                digit = VoiceQueryRuleParser._CN_DIGITS[token]
+                if digit == 0:
+                    saw_zero = True
+                number = float(digit)
+            elif token in VoiceQueryRuleParser._CN_UNITS:
+                unit = VoiceQueryRuleParser._CN_UNITS[token]
+                if unit == 10000:
+                    total += (section + (number or 0)) * unit
+                    section = 0
+                else:
+                    section += (number if number is not None else 1) * unit
+                number = None
+                last_unit = unit
+                saw_zero = False
+            else:
+                return None
+
+        if number is not None:
+            # "一千五" 省略了末尾的单位，表示 1500；"一千零五" 表示 1005
+            if last_unit >= 100 and not saw_zero and number < 10:
+                number *= last_unit / 10
+            section += number
+        return total + section
+
+    @staticmethod
+    def _first_number(patterns: List["re.Pattern"], text: str) -> Optional[float]:
+        for pattern in patterns:
+            match = pattern.search(text)
+            if match:
+                value = VoiceQueryRuleParser.chinese_to_number(match.group(1))
+                if value:
+                    return value
+        return None
+
+    @staticmethod
+    def _to_int_or_float(value: float):
+        return int(value) if float(value).is_integer() else value
+
+    @staticmethod
+    def _find_city(text: str) -> Optional[str]:
+        """
+        查找文本中的城市名
+
+        被更长的名称包含的匹配不单独计算（"北海道" 中的 "北海"）；
+        提到多个不同城市时无法确定目的地，返回 None。
+        """
+        found = [city for city in set(VoiceQueryRuleParser.CITIES) if city in text]
+        cities = [city for city in found if not any(city != other and city in other for other in found)]
+        return cities[0] if len(cities) == 1 else None
+
+    @staticmethod
+    def _find_category(text: str) -> Optional[str]:
+        for category, keywords in VoiceQueryRuleParser.CATEGORY_KEYWORDS.items():
+            if any(keyword in text for keyword in keywords):
+                return category
+        return None
+
+    @staticmethod
+    def _parse_start_date(text: str, today: date) -> Optional[date]:
+        """解析出发日期：明天、下周五、周末、10月1号、2025-10-01 等"""
+        match = VoiceQueryRuleParser._ISO_DATE_PATTERN.search(text)
+        if match:
+            try:
+                return date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+            except ValueError:
+                return None
+
+        match = VoiceQueryRuleParser._MONTH_DAY_PATTERN.search(text)
+        if match:
+            month = VoiceQueryRuleParser.chinese_to_number(match.group(1))
+            day = VoiceQueryRuleParser.chinese_to_number(match.group(2))
+            if month and day:
+                try:
+                    result = date(today.year, int(month), int(day))
+                except ValueError:
+                    return None
+                # 已经过去的日期指明年
+                if result < today:
+                    result = date(today.year + 1, int(month), int(day))
+                return result
+
+        for word in sorted(VoiceQueryRuleParser._RELATIVE_DAYS, key=len, reverse=True):
+            if word in text:
+                return today + timedelta(days=VoiceQueryRuleParser._RELATIVE_DAYS[word])
+
+        match = VoiceQueryRuleParser._WEEKDAY_PATTERN.search(text)
+        if match:
+            prefix = match.group(1) or ""
+            weekday = VoiceQueryRuleParser._WEEKDAYS[match.group(2)]
+            monday = today - timedelta(days=today.weekday())
+            if prefix.startswith("下下"):
+                return monday + timedelta(days=14 + weekday)
+            if prefix.startswith("下"):
+                return monday + timedelta(days=7 + weekday)
+            result = monday + timedelta(days=weekday)
+            # 只说"周五"且本周已过时，指下周
+            if not prefix and result < today:
+                result += timedelta(days=7)
+            return result
+
+        return None
+
+    @staticmethod
+    def _parse_expense(text: str) -> Optional[Dict[str, Any]]:
+        amount = VoiceQueryRuleParser._first_number(VoiceQueryRuleParser._AMOUNT_PATTERNS, text)
+        category = VoiceQueryRuleParser._find_category(text)
+        if not amount or not category:
+            return None
+
+        return {
+            "query_type": "expense",
+            "category": category,
+            "amount": VoiceQueryRuleParser._to_int_or_float(amount),
+            "description": re.sub(r"[，。！？,.!?\s]+$", "", text.strip())
+        }
+
+    @staticmethod
+    def _parse_travel_plan(text: str, today: date) -> Optional[Dict[str, Any]]:
+        destination = VoiceQueryRuleParser._find_city(text)
+        if not destination:
+            return None
+
+        days = None
+        match = VoiceQueryRuleParser._DAYS_PATTERN.search(text)
+        if match:
+            days = VoiceQueryRuleParser.chinese_to_number(match.group(1))
+        if not days:
+            match = VoiceQueryRuleParser._NIGHTS_PATTERN.search(text)
+            if match:
+                nights = VoiceQueryRuleParser.chinese_to_number(match.group(1))
+                days = nights + 1 if nights else None
+        if not days:
+            match = VoiceQueryRuleParser._WEEKS_PATTERN.search(text)
+            if match:
+                weeks = VoiceQueryRuleParser.chinese_to_number(match.group(1))
+                days = weeks * 7 if weeks else None
+        days = int(days) if days else None
+
+        start_date = VoiceQueryRuleParser._parse_start_date(text, today)
+        if not days and not start_date:
+            return None
+        if not start_date and VoiceQueryRuleParser._UNRESOLVED_DATE_PATTERN.search(text):
+            return None
+
+        travelers = VoiceQueryRuleParser._first_number(VoiceQueryRuleParser._TRAVELERS_PATTERNS, text)
+        budget = VoiceQueryRuleParser._first_number(VoiceQueryRuleParser._BUDGET_PATTERNS, text)
+        preferences = [
+            keyword for keyword in VoiceQueryRuleParser.PREFERENCE_KEYWORDS if keyword in text
+        ]
+
+        end_date = start_date + timedelta(days=days - 1) if start_date and days else None
+        return {
+            "query_type": "travel_plan",
+            "destination": destination,
+            "start_date": start_date.isoformat() if start_date else None,
+            "end_date": end_date.isoformat() if end_date else None,
+            "days": days,
+            "budget": VoiceQueryRuleParser._to_int_or_float(budget) if budget else None,
+            "travelers_count": int(travelers) if travelers else None,
+            "preferences": "、".join(preferences) if preferences else None
+        }
+
+    @staticmethod
+    def parse(text: str, today: Optional[date] = None) -> Optional[Dict[str, Any]]:
+        """
+        解析语音文本
+
+        Args:
+            text: 语音识别的文本
+            today: 计算相对日期的基准日期，默认今天
+
+        Returns:
+            解析结果；没有把握时返回 None
+        """
+        if not text or not text.strip():
+            return None
+        today = today or date.today()
+
+        if any(verb in text for verb in VoiceQueryRuleParser.EXPENSE_VERBS):
+            return VoiceQueryRuleParser._parse_expense(text)
+
+        if any(verb in text for verb in VoiceQueryRuleParser.TRAVEL_VERBS):
+            return VoiceQueryRuleParser._parse_travel_plan(text, today)
+
+        # 没有明确动词时，"午饭35元" 这类带金额和类别的短句按费用处理
+        return VoiceQueryRuleParser._parse_expense(text)
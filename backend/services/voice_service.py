@@ -7,11 +7,12 @@ import time
 import hmac
 import hashlib
 import io
+import asyncio
 from datetime import datetime, timezone
 from typing import Optional
 from urllib.parse import quote
-import requests
 from ..config import settings
+from .outbound_http import outbound_http
 
 # 音频格式转换
 try:
@@ -29,6 +30,8 @@ class VoiceService:
     # 缓存 token，避免频繁获取
     _cached_token = None
     _token_expire_time = 0
+    # 同时到达的识别请求只获取一次 token
+    _token_lock = asyncio.Lock()
     
     @staticmethod
     def _convert_to_ogg_opus(audio_data: bytes, source_format: str) -> bytes:
@@ -110,7 +113,7 @@ class VoiceService:
             raise Exception(f"音频格式转换失败: {error_msg}")
     
     @staticmethod
-    def recognize_audio_file(audio_data: bytes, format: str = "wav") -> Optional[str]:
+    async def recognize_audio_file(audio_data: bytes, format: str = "wav") -> Optional[str]:
         """
         识别音频文件 - 使用阿里云一句话识别 RESTful API
         
@@ -134,7 +137,7 @@ class VoiceService:
                 raise Exception("未配置阿里云语音识别 APP_KEY，请在 .env 文件中配置 ALIYUN_ASR_APP_KEY")
             
             # 获取 token
-            token = VoiceService._get_token()
+            token = await VoiceService._get_token()
             if not token:
                 print("❌ 获取 Token 失败")
                 raise Exception("获取阿里云 Token 失败")
@@ -152,7 +155,8 @@ class VoiceService:
             if audio_format == 'webm':
                 print(f"🔄 检测到 webm 格式，需要转换为 ogg/opus（阿里云兼容格式）")
                 try:
-                    audio_data = VoiceService._convert_to_ogg_opus(audio_data, audio_format)
+                    # 格式转换是 CPU 密集的同步操作，放到线程中执行，避免阻塞事件循环
+                    audio_data = await asyncio.to_thread(VoiceService._convert_to_ogg_opus, audio_data, audio_format)
                     audio_format = 'opus'  # 转换后的格式
                     print(f"✅ 格式转换完成，现在使用: ogg/opus")
                 except Exception as e:
@@ -186,12 +190,13 @@ class VoiceService:
             print(f"   参数: {params}")
             
             # 发送请求
-            response = requests.post(
+            response = await outbound_http.request(
+                "nls_asr",
+                "POST",
                 url,
                 params=params,
                 headers=headers,
-                data=audio_data,
-                timeout=30
+                content=audio_data
             )
             
             print(f"📢 阿里云语音识别 API 响应状态码: {response.status_code}")
@@ -240,12 +245,18 @@ class VoiceService:
             raise Exception(f"语音识别失败: {error_msg}")
     
     @staticmethod
-    def _get_token() -> str:
+    async def _get_token() -> str:
         """
         获取阿里云 NLS Token (带缓存)
         使用 AccessKey 和 POP 签名机制获取临时 token
         文档: https://help.aliyun.com/zh/isi/getting-started/use-http-or-https-to-obtain-an-access-token
         """
+        async with VoiceService._token_lock:
+            return await VoiceService._fetch_token()
+    
+    @staticmethod
+    async def _fetch_token() -> str:
+        """返回缓存的 token，过期时重新获取（调用方持有 _token_lock）"""
         try:
             # 检查缓存的 token 是否还有效（token 有效期通常是 24 小时）
             current_time = time.time()
@@ -302,7 +313,7 @@ class VoiceService:
             print(f"📤 发送 Token 请求...")
             
             # 6. 发送请求
-            response = requests.get(url, timeout=10)
+            response = await outbound_http.request("nls_token", "GET", url)
             
             print(f"📢 Token 服务响应状态码: {response.status_code}")
             
@@ -339,7 +350,7 @@ class VoiceService:
             return ""
     
     @staticmethod
-    def recognize_from_base64(audio_base64: str, format: str = "wav") -> Optional[str]:
+    async def recognize_from_base64(audio_base64: str, format: str = "wav") -> Optional[str]:
         """
         从 Base64 编码的音频数据识别
         
@@ -353,7 +364,7 @@ class VoiceService:
         try:
             # 解码 Base64
             audio_data = base64.b64decode(audio_base64)
-            return VoiceService.recognize_audio_file(audio_data, format)
+            return await VoiceService.recognize_audio_file(audio_data, format)
         except Exception as e:
             print(f"Base64 解码错误: {str(e)}")
             return None
@@ -0,0 +1,287 @@
+"""
+本地高德地图替身服务 - 模拟高德 Web 服务接口，用于离线压测和延迟基准测试
+
+提供地理编码（支持 batch=true）、关键字搜索、周边搜索、路径规划（--path-points 个点的弯曲折线）和天气查询接口，
+返回格式与高德一致。坐标根据地址或关键字的哈希在城市中心附近确定性地生成，
+同一个名称每次返回相同的坐标。包含 --not-found 标记的地址或关键字返回空结果。
+
+用法：
+    python -m backend.tools.amap_standin_server --port 9100 --latency 0.05
+    然后 AMAP_BASE_URL=http://127.0.0.1:9100/v3
+"""
+import math
+import random
+import asyncio
+import hashlib
+import argparse
+from datetime import datetime, timedelta, timezone
+from dataclasses import dataclass
+from typing import Dict, Any, List, Tuple
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+import uvicorn
+
+# 城市中心坐标（经度, 纬度），未知城市使用南京
+CITY_CENTERS = {
+    "北京": (116.397, 39.909),
+    "上海": (121.473, 31.230),
+    "广州": (113.264, 23.129),
+    "深圳": (114.057, 22.543),
+    "成都": (104.066, 30.572),
+    "重庆": (106.551, 29.563),
+    "杭州": (120.155, 30.274),
+    "西安": (108.940, 34.341),
+    "南京": (118.796, 32.060),
+}
+DEFAULT_CENTER = CITY_CENTERS["南京"]
+
+
+@dataclass
+class AmapStandinConfig:
+    """替身服务的行为配置"""
+    latency: float = 0.05       # 每个请求的平均延迟（秒）
+    jitter: float = 0.2         # 延迟的随机波动比例
+    error_rate: float = 0.0     # 返回 HTTP 500 的概率
+    not_found: str = "不存在"    # 包含该标记的地址或关键字返回空结果
+    path_points: int = 200      # 路径规划每段折线的坐标点数（真实的高德驾车路线通常有数百个点）
+
+
+class AmapStandin:
+    """根据名称确定性地生成高德格式的结果"""
+
+    def __init__(self, config: AmapStandinConfig, seed: int = None):
+        self.config = config
+        self._random = random.Random(seed)
+        self.stats: Dict[str, int] = {"requests": 0, "errors": 0}
+
+    async def delay(self):
+        jitter = self.config.latency * self.config.jitter
+        await asyncio.sleep(max(0.0, self.config.latency + self._random.uniform(-jitter, jitter)))
+
+    def count(self, path: str) -> bool:
+        """记录请求，返回是否注入错误"""
+        self.stats["requests"] += 1
+        self.stats[path] = self.stats.get(path, 0) + 1
+        if self._random.random() < self.config.error_rate:
+            self.stats["errors"] += 1
+            return True
+        return False
+
+    @staticmethod
+    def _center(city: str) -> Tuple[float, float]:
+        for name, center in CITY_CENTERS.items():
+            if city and name in city:
+                return center
+        return DEFAULT_CENTER
+
+    @staticmethod
+    def location(name: str, city: str = "") -> Tuple[float, float]:
+        """名称对应的坐标：城市中心附近 10 公里内"""
+        digest = hashlib.md5(f"{city}|{name}".encode("utf-8")).digest()
+        lng, lat = AmapStandin._center(city)
+        dx = (int.from_bytes(digest[:4], "big") / 2 ** 32 - 0.5) * 0.2
+        dy = (int.from_bytes(digest[4:8], "big") / 2 ** 32 - 0.5) * 0.2
+        return round(lng + dx, 6), round(lat + dy, 6)
+
+    @staticmethod
+    def poi_id(name: str) -> str:
+        return "B0" + hashlib.md5(name.encode("utf-8")).hexdigest()[:8].upper()
+
+    def geocode(self, address: str, city: str) -> Dict[str, Any]:
+        lng, lat = self.location(address, city)
+        return {
+            "formatted_address": f"{city or ''}{address}",
+            "city": city or "",
+            "level": "兴趣点",
+            "location": f"{lng},{lat}"
+        }
+
+    def pois(self, keywords: str, city: str, count: int) -> List[Dict[str, Any]]:
+        results = []
+        for index in range(count):
+            name = keywords if index == 0 else f"{keywords}（{index}号店）"
+            lng, lat = self.location(name, city)
+            results.append({
+                "id": self.poi_id(f"{city}|{name}"),
+                "name": name,
+                "type": "风景名胜;风景名胜;风景名胜",
+                "address": f"{city or ''}{name}附近",
+                "location": f"{lng},{lat}",
+                "tel": [],
+                "distance": []
+            })
+        return results
+
+
+def _distance(origin: str, destination: str) -> float:
+    """两个坐标之间的球面距离（米）"""
+    lng1, lat1 = (float(value) for value in origin.split(","))
+    lng2, lat2 = (float(value) for value in destination.split(","))
+    lng1, lat1, lng2, lat2 = map(math.radians, (lng1, lat1, lng2, lat2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371000 * math.asin(math.sqrt(a))
+
+
+def _path(origin: str, destination: str, count: int) -> List[str]:
+    """起终点之间弯曲的路线：沿直线插值，并叠加确定性的横向偏移模拟道路"""
+    lng1, lat1 = (float(value) for value in origin.split(","))
+    lng2, lat2 = (float(value) for value in destination.split(","))
+    normal_lng, normal_lat = -(lat2 - lat1), lng2 - lng1
+    points = []
+    for index in range(count):
+        t = index / (count - 1)
+        offset = 0.08 * math.sin(t * math.pi) * math.sin(t * 7 * math.pi) + 0.002 * math.sin(t * 97 * math.pi)
+        points.append(f"{round(lng1 + (lng2 - lng1) * t + normal_lng * offset, 6)},"
+                      f"{round(lat1 + (lat2 - lat1) * t + normal_lat * offset, 6)}")
+    return points
+
+
+def create_app(standin: AmapStandin) -> FastAPI:
+    app = FastAPI(title="AMap Stand-in Server")
+    error = JSONResponse(status_code=500, content={"status": "0", "info": "INJECTED_ERROR", "infocode": "50000"})
+
+    @app.get("/stats")
+    async def stats():
+        """各接口的请求数和注入的错误数"""
+        return {"config": standin.config.__dict__, **standin.stats}
+
+    @app.get("/v3/geocode/geo")
+    async def geocode(request: Request):
+        """地理编码，batch=true 时 address 为 | 分隔的多个地址（最多 10 个）"""
+        params = request.query_params
+        if standin.count("geocode"):
+            return error
+        await standin.delay()
+        city = params.get("city", "")
+        addresses = params.get("address", "").split("|") if params.get("batch") == "true" else [params.get("address", "")]
+        if len(addresses) > 10:
+            return {"status": "0", "info": "TOO_MANY_ADDRESSES", "infocode": "20011"}
+        geocodes = [
+            [] if standin.config.not_found in address else standin.geocode(address, city)
+            for address in addresses
+        ]
+        if params.get("batch") != "true":
+            geocodes = [item for item in geocodes if item]
+        return {"status": "1", "info": "OK", "infocode": "10000", "count": str(len(geocodes)), "geocodes": geocodes}
+
+    @app.get("/v3/place/text")
+    async def place_text(request: Request):
+        """关键字搜索"""
+        params = request.query_params
+        if standin.count("place_text"):
+            return error
+        await standin.delay()
+        keywords = params.get("keywords", "")
+        count = 0 if standin.config.not_found in keywords else min(int(params.get("offset", 20)), 5)
+        pois = standin.pois(keywords, params.get("city", ""), count)
+        return {"status": "1", "info": "OK", "infocode": "10000", "count": str(len(pois)), "pois": pois}
+
+    @app.get("/v3/place/around")
+    async def place_around(request: Request):
+        """周边搜索"""
+        params = request.query_params
+        if standin.count("place_around"):
+            return error
+        await standin.delay()
+        center = params.get("location", "")
+        keywords = params.get("keywords") or params.get("types") or "景点"
+        pois = standin.pois(keywords, center, min(int(params.get("offset", 20)), 10))
+        lng, lat = (float(value) for value in center.split(","))
+        for index, poi in enumerate(pois):
+            # 围绕中心点分布在半径范围内
+            radius = float(params.get("radius", 3000))
+            angle = index * 2 * math.pi / max(len(pois), 1)
+            offset = radius * (index + 1) / (len(pois) + 1)
+            poi_lng = lng + offset * math.cos(angle) / (111320 * math.cos(math.radians(lat)))
+            poi_lat = lat + offset * math.sin(angle) / 110540
+            poi["location"] = f"{round(poi_lng, 6)},{round(poi_lat, 6)}"
+            poi["distance"] = str(int(offset))
+        return {"status": "1", "info": "OK", "infocode": "10000", "count": str(len(pois)), "pois": pois}
+
+    async def direction(request: Request, mode: str, speed: float):
+        params = request.query_params
+        if standin.count(f"direction_{mode}"):
+            return error
+        await standin.delay()
+        origin, destination = params.get("origin", ""), params.get("destination", "")
+        distance = _distance(origin, destination) * 1.3
+        points = _path(origin, destination, max(2, standin.config.path_points))
+        # 每 20 个点为一个步骤，相邻步骤首尾共用一个点（与高德一致）
+        steps = []
+        for start in range(0, len(points) - 1, 20):
+            chunk = points[start:start + 21]
+            steps.append({
+                "instruction": "沿道路行驶" if start else "出发",
+                "distance": str(int(distance * (len(chunk) - 1) / (len(points) - 1))),
+                "polyline": ";".join(chunk)
+            })
+        path = {"distance": str(int(distance)), "duration": str(int(distance / speed)), "steps": steps}
+        if mode == "transit":
+            route = {"origin": origin, "destination": destination, "transits": [{**path, "segments": []}]}
+        else:
+            route = {"origin": origin, "destination": destination, "paths": [path]}
+        return {"status": "1", "info": "OK", "infocode": "10000", "count": "1", "route": route}
+
+    @app.get("/v3/direction/driving")
+    async def driving(request: Request):
+        return await direction(request, "driving", 8.0)
+
+    @app.get("/v3/direction/walking")
+    async def walking(request: Request):
+        return await direction(request, "walking", 1.2)
+
+    @app.get("/v3/direction/transit/integrated")
+    async def transit(request: Request):
+        return await direction(request, "transit", 5.0)
+
+    @app.get("/v3/weather/weatherInfo")
+    async def weather(request: Request):
+        """天气查询（extensions=all 返回预报）"""
+        params = request.query_params
+        if standin.count("weather"):
+            return error
+        await standin.delay()
+        city = params.get("city", "")
+        # 从今天（北京时间）开始的 4 天预报，发布时间为当前整点
+        now = datetime.now(timezone(timedelta(hours=8)))
+        casts = [
+            {"date": (now + timedelta(days=index)).strftime("%Y-%m-%d"), "week": str((now + timedelta(days=index)).isoweekday()),
+             "dayweather": "晴", "nightweather": "多云",
+             "daytemp": str(15 + index), "nighttemp": str(5 + index), "daywind": "东", "nightwind": "东",
+             "daypower": "≤3", "nightpower": "≤3"}
+            for index in range(4)
+        ]
+        return {
+            "status": "1", "info": "OK", "infocode": "10000", "count": "1",
+            "forecasts": [{"city": city, "adcode": "000000", "province": city,
+                           "reporttime": now.strftime("%Y-%m-%d %H:00:00"), "casts": casts}]
+        }
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地高德地图替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.05, help="每个请求的平均延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.2, help="延迟的随机波动比例（0-1）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 HTTP 500 的概率（0-1）")
+    parser.add_argument("--not-found", default="不存在", help="包含该标记的地址或关键字返回空结果")
+    parser.add_argument("--path-points", type=int, default=200, help="路径规划每段折线的坐标点数")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    args = parser.parse_args()
+
+    config = AmapStandinConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        not_found=args.not_found,
+        path_points=args.path_points
+    )
+    print(f"🧪 高德地图替身服务: http://{args.host}:{args.port}/v3（{config}）")
+    uvicorn.run(create_app(AmapStandin(config, seed=args.seed)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+JSON 修复基准测试 - 对比原先的正则替换与单遍扫描修复在长行程上的吞吐量
+
+用法：
+    python -m backend.tools.bench_json_repair --days 3,7,14 --rounds 200
+
+以大模型替身录制的行程为模板生成指定天数的响应，分别测量三种输入：
+- valid：合法 JSON（loads_tolerant 直接走 json.loads）
+- malformed：加入 markdown 标记、注释、尾随逗号、estimated_cost 文字描述和算式
+- truncated：malformed 截掉最后 20%（原先的正则替换无法处理）
+
+原先的实现（_clean_json_string 的六次正则替换 + json.loads）作为对比，无法解析时记为失败。
+"""
+import re
+import json
+import time
+import argparse
+from typing import Callable, Dict, List
+from ..services.json_repair import loads_tolerant
+from .llm_standin_server import RESPONSES_DIR, ResponseLibrary
+
+
+def legacy_clean_json_string(json_str: str) -> str:
+    """原先 AIService._clean_json_string 的正则替换，仅用于对比"""
+    json_str = re.sub(r'"estimated_cost":\s*[^0-9"\[\{,\}]+(\d+)', r'"estimated_cost": \1', json_str)
+    json_str = re.sub(r'"estimated_cost":\s*[^\d\",\[\{][^,\}]*(?=,|\})', r'"estimated_cost": 0', json_str)
+    json_str = re.sub(r'"estimated_cost":\s*[\d\s\+\-\*\/=]+?(\d+)(?=\s*[,\}])', r'"estimated_cost": \1', json_str)
+    json_str = re.sub(r'//.*?\n', '\n', json_str)
+    json_str = re.sub(r'/\*.*?\*/', '', json_str, flags=re.DOTALL)
+    json_str = re.sub(r',(\s*[}\]])', r'\1', json_str)
+    return json_str
+
+
+def legacy_loads(text: str):
+    start_idx = text.find("{")
+    end_idx = text.rfind("}")
+    return json.loads(legacy_clean_json_string(text[start_idx:end_idx + 1]))
+
+
+def build_inputs(days: int) -> Dict[str, str]:
+    """生成 days 天行程的三种输入"""
+    plan = json.loads(ResponseLibrary(RESPONSES_DIR).render(f"旅行天数：{days}天\ndaily_itinerary")["content"])
+    valid = json.dumps(plan, ensure_ascii=False, indent=2)
+
+    malformed = valid
+    # 每个 estimated_cost 轮流换成文字描述和算式
+    replacements = iter(["交通+门票 约100", "1000 + 100 = 1100", "视个人消费而定", "80"] * len(valid))
+    malformed = re.sub(r'"estimated_cost": \d+', lambda _: f'"estimated_cost": {next(replacements)}', malformed)
+    malformed = malformed.replace('"tips": [', '"tips": [ // 注意事项\n')
+    malformed = re.sub(r'(\n\s*)\]', r',\1]', malformed)
+    malformed = f"好的，以下是为您规划的行程：\n```json\n{malformed}\n```\n祝您旅途愉快！"
+    return {
+        "valid": valid,
+        "malformed": malformed,
+        "truncated": malformed[:int(len(malformed) * 0.8)]
+    }
+
+
+def _measure(parse: Callable[[str], object], text: str, rounds: int) -> Dict[str, float]:
+    """重复解析 rounds 次，返回吞吐量（MB/秒）和是否成功"""
+    try:
+        parse(text)
+    except (ValueError, json.JSONDecodeError):
+        return {"ok": False, "mb_per_second": 0.0}
+    size = len(text.encode("utf-8"))
+    started = time.perf_counter()
+    for _ in range(rounds):
+        parse(text)
+    elapsed = time.perf_counter() - started
+    return {"ok": True, "mb_per_second": size * rounds / elapsed / 1024 / 1024}
+
+
+def run_benchmark(day_counts: List[int], rounds: int):
+    parsers = {
+        "regex": legacy_loads,
+        "single-pass": lambda text: loads_tolerant(text)[0]
+    }
+    for days in day_counts:
+        for kind, text in build_inputs(days).items():
+            results = {name: _measure(parse, text, rounds) for name, parse in parsers.items()}
+            line = "  ".join(
+                f"{name} {result['mb_per_second']:>6.1f} MB/s" if result["ok"] else f"{name} {'解析失败':>9}"
+                for name, result in results.items()
+            )
+            print(f"📈 {days:>2} 天 {kind:<9} {len(text) / 1024:>6.1f} KB  {line}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON 修复基准测试（正则替换 vs 单遍扫描）")
+    parser.add_argument("--days", default="3,7,14", help="逗号分隔的行程天数")
+    parser.add_argument("--rounds", type=int, default=200, help="每种输入的解析次数")
+    args = parser.parse_args()
+    run_benchmark([int(item) for item in args.days.split(",") if item.strip()], max(1, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
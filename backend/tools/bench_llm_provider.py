@@ -0,0 +1,90 @@
+"""
+大模型提供方基准测试 - 同一个替身服务分别通过 DashScope SDK 和 OpenAI 兼容接口调用，对比延迟
+
+用法：
+    python -m backend.tools.llm_standin_server --port 9000 --ttft 0.5 --token-rate 200
+    python -m backend.tools.bench_llm_provider --standin-url http://127.0.0.1:9000 --requests 40 --concurrency 8
+
+替身服务同时提供两种接口，两个提供方的上游耗时相同，结果的差异就是切换提供方带来的开销
+（SDK 的请求构造、连接复用、SSE 解析等）。每个提供方分别测量非流式调用的总耗时，
+以及流式调用的首个分片延迟和总耗时。
+"""
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+from ..services.llm_provider import DashScopeProvider, LLMProvider, OpenAICompatibleProvider
+
+PROMPT = "请分析以下旅行预算：总预算5000元，已花费2300元。"
+
+
+def _percentile(values: List[float], ratio: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))] if ordered else 0.0
+
+
+def _call(provider: LLMProvider) -> Dict[str, float]:
+    start = time.perf_counter()
+    response = provider.call(model="qwen-max", prompt=PROMPT)
+    if response.status_code != 200:
+        raise RuntimeError(f"调用失败: {response.status_code} {response.message}")
+    return {"total": (time.perf_counter() - start) * 1000}
+
+
+def _stream(provider: LLMProvider) -> Dict[str, float]:
+    start = time.perf_counter()
+    first = None
+    for response in provider.stream(model="qwen-max", prompt=PROMPT):
+        if response.status_code != 200:
+            raise RuntimeError(f"调用失败: {response.status_code} {response.message}")
+        if first is None:
+            first = (time.perf_counter() - start) * 1000
+    return {"first_chunk": first or 0.0, "total": (time.perf_counter() - start) * 1000}
+
+
+def _run(name: str, mode: str, func: Callable[[], Dict[str, float]], total: int, concurrency: int):
+    func()  # 预热连接
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda _: func(), range(total)))
+    elapsed = time.perf_counter() - start
+
+    line = f"📈 {name:<9} {mode:<6}"
+    for metric in ("first_chunk", "total"):
+        values = [result[metric] for result in results if metric in result]
+        if values:
+            line += (
+                f"  {metric} p50 {_percentile(values, 0.5):.1f}ms"
+                f" p95 {_percentile(values, 0.95):.1f}ms"
+            )
+    print(f"{line}  吞吐 {total / elapsed:.1f} 次/秒")
+
+
+def run_benchmark(standin_url: str, total: int, concurrency: int, timeout: float):
+    import dashscope
+
+    standin_url = standin_url.rstrip("/")
+    # DashScope SDK 只使用进程级的 API 地址，基准测试进程中只有这一个 SDK 调用方，直接设置即可
+    dashscope.base_http_api_url = f"{standin_url}/api/v1"
+    providers = {
+        "dashscope": DashScopeProvider("standin", timeout),
+        "openai": OpenAICompatibleProvider(f"{standin_url}/v1", "standin", timeout),
+    }
+    print(f"📈 替身服务 {standin_url}：每组 {total} 次调用，并发 {concurrency}")
+    for name, provider in providers.items():
+        _run(name, "call", lambda: _call(provider), total, concurrency)
+        _run(name, "stream", lambda: _stream(provider), total, concurrency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="大模型提供方基准测试（DashScope SDK vs OpenAI 兼容接口）")
+    parser.add_argument("--standin-url", default="http://127.0.0.1:9000", help="大模型替身服务地址")
+    parser.add_argument("--requests", type=int, default=40, help="每组的调用次数")
+    parser.add_argument("--concurrency", type=int, default=8, help="并发数")
+    parser.add_argument("--timeout", type=float, default=60, help="单次调用超时（秒）")
+    args = parser.parse_args()
+    run_benchmark(args.standin_url, max(1, args.requests), max(1, args.concurrency), args.timeout)
+
+
+if __name__ == "__main__":
+    main()
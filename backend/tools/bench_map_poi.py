@@ -0,0 +1,94 @@
+"""
+/map/poi 延迟基准测试 - 并发请求运行中的后端，输出 p50 / p95 / p99 延迟和吞吐量
+
+配合高德地图替身服务使用，避免消耗高德配额：
+    python -m backend.tools.amap_standin_server --port 9100 --latency 0.05
+    AMAP_BASE_URL=http://127.0.0.1:9100/v3 uvicorn backend.main:app --port 8000
+    python -m backend.tools.bench_map_poi --base-url http://127.0.0.1:8000 --requests 400 --concurrency 20
+"""
+import time
+import asyncio
+import argparse
+from typing import List
+import httpx
+
+DEFAULT_QUERIES = ["中山陵", "夫子庙", "玄武湖", "总统府", "南京博物院", "鸡鸣寺", "老门东", "明孝陵"]
+
+
+def _percentile(values: List[float], ratio: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))] if ordered else 0.0
+
+
+async def _login(client: httpx.AsyncClient, username: str, password: str) -> str:
+    """登录测试账号，不存在时先注册"""
+    await client.post("/auth/register", json={
+        "username": username,
+        "email": f"{username}@example.com",
+        "password": password
+    })
+    response = await client.post("/auth/login", json={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def run_benchmark(
+    base_url: str,
+    total: int,
+    concurrency: int,
+    queries: List[str],
+    city: str,
+    username: str,
+    password: str
+):
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        client.headers["Authorization"] = f"Bearer {await _login(client, username, password)}"
+
+        latencies: List[float] = []
+        failures = 0
+        counter = iter(range(total))
+
+        async def worker():
+            nonlocal failures
+            for index in counter:
+                start = time.perf_counter()
+                try:
+                    response = await client.get("/map/poi", params={"query": queries[index % len(queries)], "city": city})
+                    ok = response.status_code == 200 and response.json().get("count", 0) > 0
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append((time.perf_counter() - start) * 1000)
+                if not ok:
+                    failures += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+
+    print(f"📈 /map/poi: {total} 个请求, 并发 {concurrency}, 失败 {failures}")
+    print(
+        f"   p50 {_percentile(latencies, 0.5):.1f}ms, p95 {_percentile(latencies, 0.95):.1f}ms, "
+        f"p99 {_percentile(latencies, 0.99):.1f}ms, 吞吐 {total / elapsed:.1f} 请求/秒"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/map/poi 延迟基准测试")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="后端地址")
+    parser.add_argument("--requests", type=int, default=400, help="请求总数")
+    parser.add_argument("--concurrency", type=int, default=20, help="并发数")
+    parser.add_argument("--queries", default=",".join(DEFAULT_QUERIES), help="逗号分隔的搜索关键词，轮流使用")
+    parser.add_argument("--city", default="南京")
+    parser.add_argument("--username", default="bench_user")
+    parser.add_argument("--password", default="bench_password")
+    args = parser.parse_args()
+
+    queries = [item.strip() for item in args.queries.split(",") if item.strip()]
+    asyncio.run(run_benchmark(
+        args.base_url, args.requests, max(1, args.concurrency), queries,
+        args.city, args.username, args.password
+    ))
+
+
+if __name__ == "__main__":
+    main()
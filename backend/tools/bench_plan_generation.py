@@ -0,0 +1,72 @@
+"""
+行程生成基准测试 - 对比单次生成与骨架 + 每日并行生成在不同天数下的耗时
+
+配合本地大模型替身服务使用，不消耗模型配额：
+    python -m backend.tools.llm_standin_server --port 9000 --ttft 0.8 --token-rate 40
+    python -m backend.tools.bench_plan_generation --llm-url http://127.0.0.1:9000/v1 --days 3,7,14 --rounds 3
+
+直接在进程内调用 AIService（不经过 HTTP 接口和旅行计划缓存），每一轮依次运行各模式，
+输出每种模式的平均、最快耗时和并行生成的加速比。
+对冲请求（AI_HEDGE_ENABLED）会改变模型调用次数，基准测试时建议关闭。
+"""
+import time
+import asyncio
+import argparse
+from typing import Dict, List
+from ..config import settings
+from ..services.ai_service import AIService
+from ..services.llm_provider import OpenAICompatibleProvider, set_llm_provider
+
+MODES = ["single", "parallel"]
+
+
+async def _time_generation(destination: str, days: int, budget: float, mode: str) -> float:
+    """生成一次行程，返回耗时（秒）；生成结果天数不对时报错"""
+    start = time.perf_counter()
+    plan = await AIService.generate_travel_plan_by_mode_async(
+        destination, days, budget, 2, "", generation_mode=mode
+    )
+    elapsed = time.perf_counter() - start
+    if len(plan.get("daily_itinerary") or []) != days:
+        raise RuntimeError(f"{mode} 模式生成的行程天数不是 {days} 天")
+    return elapsed
+
+
+async def run_benchmark(day_counts: List[int], rounds: int, destination: str, budget_per_day: float):
+    print(
+        f"📈 行程生成: {destination}，每种组合 {rounds} 轮，"
+        f"每日并发上限 {settings.AI_PARALLEL_DAY_CONCURRENCY}，对冲 {'开启' if settings.AI_HEDGE_ENABLED else '关闭'}"
+    )
+    for days in day_counts:
+        timings: Dict[str, List[float]] = {mode: [] for mode in MODES}
+        for _ in range(rounds):
+            for mode in MODES:
+                timings[mode].append(await _time_generation(destination, days, budget_per_day * days, mode))
+
+        averages = {mode: sum(values) / len(values) for mode, values in timings.items()}
+        print(
+            f"   {days:>2} 天: " + "  ".join(
+                f"{mode} 平均 {averages[mode]:.1f}s 最快 {min(timings[mode]):.1f}s" for mode in MODES
+            ) + f"  加速比 {averages['single'] / averages['parallel']:.2f}x"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="行程生成基准测试（单次生成 vs 并行生成）")
+    parser.add_argument("--llm-url", default="http://127.0.0.1:9000/v1", help="大模型替身服务的 OpenAI 兼容接口地址")
+    parser.add_argument("--days", default="3,7,14", help="逗号分隔的行程天数")
+    parser.add_argument("--rounds", type=int, default=3, help="每种天数和模式的运行轮数")
+    parser.add_argument("--destination", default="成都")
+    parser.add_argument("--budget-per-day", type=float, default=1000, help="每天的预算（元）")
+    args = parser.parse_args()
+
+    set_llm_provider(OpenAICompatibleProvider(args.llm_url, "", settings.LLM_TIMEOUT_SECONDS))
+    day_counts = [int(item) for item in args.days.split(",") if item.strip()]
+    try:
+        asyncio.run(run_benchmark(day_counts, max(1, args.rounds), args.destination, args.budget_per_day))
+    finally:
+        AIService.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+行程补全基准测试 - 对比损坏的行程响应分段补全与整体重新生成的耗时和输出 Token 数
+
+配合本地大模型替身服务使用，不消耗模型配额：
+    python -m backend.tools.llm_standin_server --port 9000 --ttft 0.8 --token-rate 40
+    python -m backend.tools.bench_plan_salvage --standin-url http://127.0.0.1:9000 --days 3,7,14 --cut 0.5,0.9
+
+以替身服务录制的行程为模板，按 --cut 指定的比例截断得到损坏的响应，分别测量：
+- salvage：AIService._salvage_plan 保留完好的天，只请求缺失的天和必需字段
+- regenerate：补全不可用时的做法，用同一个模型重新生成整份行程
+输出 Token 数取自替身服务 /stats 的增量。
+"""
+import time
+import argparse
+from typing import Callable, Dict, List
+import httpx
+from ..config import settings
+from ..services.ai_service import AIService
+from ..services.llm_provider import OpenAICompatibleProvider, set_llm_provider
+from ..services.llm_scheduler import LLMScheduler
+from ..services.plan_salvage import PlanSalvage
+from .llm_standin_server import RESPONSES_DIR, ResponseLibrary
+
+DESTINATION = "成都"
+BUDGET_PER_DAY = 1000
+
+
+def _damaged_response(days: int, cut: float) -> str:
+    """截掉录制行程最后 1 - cut 的部分，模拟输出中断"""
+    content = ResponseLibrary(RESPONSES_DIR).render(f"旅行天数：{days}天\ndaily_itinerary")["content"]
+    return content[:int(len(content) * cut)]
+
+
+def _measure(standin_url: str, func: Callable[[], Dict]) -> Dict[str, float]:
+    """运行一次，返回耗时（秒）和替身服务输出的 Token 数"""
+    before = httpx.get(f"{standin_url}/stats").json()["output_tokens"]
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    after = httpx.get(f"{standin_url}/stats").json()["output_tokens"]
+    return {"seconds": elapsed, "tokens": after - before}
+
+
+def _salvage(days: int, content: str) -> Dict:
+    plan = AIService._salvage_plan(
+        "bench_plan_salvage", LLMScheduler.PRIORITY_INTERACTIVE, settings.AI_MODEL_MAX,
+        content, None, "JSON 解析失败", DESTINATION, days, BUDGET_PER_DAY * days, 2, "",
+        list(PlanSalvage.REQUIRED_SECTIONS)
+    )
+    if len(plan["daily_itinerary"]) != days:
+        raise RuntimeError(f"补全后的行程天数不是 {days} 天")
+    return plan
+
+
+def _regenerate(days: int) -> Dict:
+    prompt = AIService._build_travel_plan_prompt(DESTINATION, days, BUDGET_PER_DAY * days, 2, "")
+    response = AIService._call_llm(
+        "generate_travel_plan", LLMScheduler.PRIORITY_INTERACTIVE, 4000,
+        model=settings.AI_MODEL_MAX, prompt=prompt, result_format='message'
+    )
+    return AIService._parse_json_content(response.output.choices[0].message.content)
+
+
+def run_benchmark(standin_url: str, day_counts: List[int], cuts: List[float], rounds: int):
+    print(f"📈 行程补全: {DESTINATION}，每种组合 {rounds} 轮")
+    for days in day_counts:
+        for cut in cuts:
+            content = _damaged_response(days, cut)
+            kept = len(PlanSalvage.extract(content, days)["days"])
+            results = {"salvage": [], "regenerate": []}
+            for _ in range(rounds):
+                results["salvage"].append(_measure(standin_url, lambda: _salvage(days, content)))
+                results["regenerate"].append(_measure(standin_url, lambda: _regenerate(days)))
+
+            averages = {
+                name: {
+                    metric: sum(item[metric] for item in items) / len(items)
+                    for metric in ("seconds", "tokens")
+                }
+                for name, items in results.items()
+            }
+            print(
+                f"   {days:>2} 天 截断于 {cut:.0%}（保留 {kept} 天）: " + "  ".join(
+                    f"{name} {average['seconds']:.1f}s {average['tokens']:.0f} tokens"
+                    for name, average in averages.items()
+                ) + f"  耗时比 {averages['regenerate']['seconds'] / averages['salvage']['seconds']:.2f}x"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="行程补全基准测试（分段补全 vs 整体重新生成）")
+    parser.add_argument("--standin-url", default="http://127.0.0.1:9000", help="大模型替身服务地址")
+    parser.add_argument("--days", default="3,7,14", help="逗号分隔的行程天数")
+    parser.add_argument("--cut", default="0.5,0.9", help="逗号分隔的截断比例")
+    parser.add_argument("--rounds", type=int, default=3, help="每种组合的运行轮数")
+    args = parser.parse_args()
+
+    standin_url = args.standin_url.rstrip("/")
+    set_llm_provider(OpenAICompatibleProvider(f"{standin_url}/v1", "", settings.LLM_TIMEOUT_SECONDS))
+    try:
+        run_benchmark(
+            standin_url,
+            [int(item) for item in args.days.split(",") if item.strip()],
+            [float(item) for item in args.cut.split(",") if item.strip()],
+            max(1, args.rounds)
+        )
+    finally:
+        AIService.shutdown()
+
+
+if __name__ == "__main__":
+    main()
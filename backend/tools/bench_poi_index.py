@@ -0,0 +1,133 @@
+"""
+POI 空间索引基准测试 - 生成大量模拟 POI，测量每个 POI 占用的内存和附近搜索的延迟
+
+用法：
+    python -m backend.tools.bench_poi_index --pois 1000000 --queries 2000
+    python -m backend.tools.bench_poi_index --pois 200000 --cell 0.01 --dict-sample 0
+
+POI 按高斯分布聚集在几个城市中心附近（城区密、郊区疏），名称、地址长度与高德返回的结果相近。
+--dict-sample 个 POI 会同时保存为 MapService.search_poi 格式的字典，用 tracemalloc 测量作为对比。
+"""
+import gc
+import time
+import random
+import argparse
+import tracemalloc
+from typing import Any, Dict, List
+from ..services.poi_index import POIIndex
+
+# (城市, 经度, 纬度, 权重)
+CITY_CENTERS = [
+    ("上海", 121.47, 31.23, 5), ("北京", 116.40, 39.90, 5), ("广州", 113.26, 23.13, 3),
+    ("深圳", 114.06, 22.54, 3), ("成都", 104.07, 30.57, 3), ("杭州", 120.16, 30.27, 2),
+    ("南京", 118.80, 32.06, 2), ("西安", 108.94, 34.34, 2), ("重庆", 106.55, 29.56, 2),
+    ("武汉", 114.31, 30.59, 2)
+]
+
+# (类型, 类型编码)
+POI_TYPES = [
+    ("餐饮服务;中餐厅;中餐厅", "050100"), ("餐饮服务;快餐厅;快餐厅", "050300"),
+    ("餐饮服务;咖啡厅;咖啡厅", "050500"), ("餐饮服务;外国餐厅;日本料理", "050202"),
+    ("住宿服务;宾馆酒店;四星级宾馆", "100102"), ("住宿服务;宾馆酒店;经济型连锁酒店", "100105"),
+    ("风景名胜;公园广场;公园", "110101"), ("风景名胜;风景名胜;国家级景点", "110202"),
+    ("购物服务;商场;购物中心", "060101"), ("购物服务;便民商店/便利店;便利店", "060200"),
+    ("交通设施服务;地铁站;地铁站", "150500"), ("科教文化服务;博物馆;博物馆", "140100"),
+    ("生活服务;生活服务场所;生活服务场所", "070000"), ("医疗保健服务;综合医院;三级甲等医院", "090101")
+]
+
+NAME_WORDS = ["老街", "人民", "和平", "新华", "中山", "滨江", "东方", "金陵", "长安", "建设", "解放", "友谊"]
+NAME_SUFFIXES = ["餐厅", "小馆", "咖啡", "酒店", "公园", "广场", "便利店", "博物馆", "地铁站", "商场"]
+
+
+def _percentile(values: List[float], ratio: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))] if ordered else 0.0
+
+
+def generate_pois(count: int, seed: int, first_id: int = 0) -> List[Dict[str, Any]]:
+    """生成 count 个模拟 POI（MapService.search_poi 的格式），ID 从 first_id 开始编号"""
+    rng = random.Random(seed)
+    weights = [weight for _, _, _, weight in CITY_CENTERS]
+    pois = []
+    for index in range(count):
+        city, longitude, latitude, _ = rng.choices(CITY_CENTERS, weights)[0]
+        # 70% 在城区（约 5 公里），其余分布在郊区（约 25 公里）
+        sigma = 0.05 if rng.random() < 0.7 else 0.25
+        type_name, type_code = rng.choice(POI_TYPES)
+        name = f"{rng.choice(NAME_WORDS)}{rng.choice(NAME_WORDS)}{rng.choice(NAME_SUFFIXES)}（{index % 997}号店）"
+        pois.append({
+            "id": f"B0{first_id + index:08X}",
+            "name": name,
+            "type": type_name,
+            "typecode": type_code,
+            "address": f"{city}市{rng.choice(NAME_WORDS)}路{rng.randint(1, 999)}号",
+            "location": {
+                "longitude": round(rng.gauss(longitude, sigma), 6),
+                "latitude": round(rng.gauss(latitude, sigma), 6)
+            },
+            "tel": f"021-{rng.randint(10000000, 99999999)}" if rng.random() < 0.5 else [],
+            "distance": []
+        })
+    return pois
+
+
+def measure_dicts(count: int, seed: int) -> float:
+    """字典方式保存 count 个 POI 时每个 POI 占用的字节数"""
+    gc.collect()
+    tracemalloc.start()
+    pois = generate_pois(count, seed)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del pois
+    return size / count
+
+
+def run_benchmark(total: int, queries: int, cell: float, chunk: int, dict_sample: int, seed: int):
+    index = POIIndex(enabled=True, cell_degrees=cell, max_pois=total)
+
+    build_seconds = 0.0
+    for start in range(0, total, chunk):
+        pois = generate_pois(min(chunk, total - start), seed + start, start)
+        started = time.perf_counter()
+        index.add_many(pois)
+        build_seconds += time.perf_counter() - started
+
+    stats = index.stats()
+    print(f"📦 POI 数: {stats['pois']}  桶数: {stats['buckets']}  类型数: {stats['types']}  网格: {cell} 度")
+    print(f"⏱️ 建索引: {build_seconds:.1f} 秒（{build_seconds * 1e6 / total:.1f} 微秒/POI）")
+    print(f"💾 索引内存: {stats['memory_bytes'] / 1024 / 1024:.1f} MB（{stats['bytes_per_poi']} 字节/POI）")
+    if dict_sample:
+        print(f"💾 对比：字典方式 {measure_dicts(dict_sample, seed):.0f} 字节/POI（{dict_sample} 个样本）")
+
+    rng = random.Random(seed + 1)
+    weights = [weight for _, _, _, weight in CITY_CENTERS]
+    for radius, types in ((500, None), (1000, None), (1000, "餐饮服务"), (3000, "100000"), (5000, None)):
+        latencies, found = [], 0
+        for _ in range(queries):
+            _, longitude, latitude, _ = rng.choices(CITY_CENTERS, weights)[0]
+            center = (rng.gauss(longitude, 0.05), rng.gauss(latitude, 0.05))
+            started = time.perf_counter()
+            results = index.nearby(center[0], center[1], radius, types, 20)
+            latencies.append((time.perf_counter() - started) * 1000)
+            found += len(results)
+        print(
+            f"🔍 半径 {radius:>4} 米 类型 {types or '全部':<8} "
+            f"p50 {_percentile(latencies, 0.5):.3f} ms  p95 {_percentile(latencies, 0.95):.3f} ms  "
+            f"p99 {_percentile(latencies, 0.99):.3f} ms  平均结果 {found / queries:.1f} 个"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="POI 空间索引基准测试")
+    parser.add_argument("--pois", type=int, default=1000000, help="POI 数")
+    parser.add_argument("--queries", type=int, default=2000, help="每种查询的次数")
+    parser.add_argument("--cell", type=float, default=0.005, help="网格大小（度）")
+    parser.add_argument("--chunk", type=int, default=50000, help="每批加入索引的 POI 数")
+    parser.add_argument("--dict-sample", type=int, default=100000, help="用于对比的字典方式样本数，0 表示不对比")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    run_benchmark(args.pois, args.queries, args.cell, args.chunk, args.dict_sample, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+批量生成目的地行程目录 - 为热门目的地离线生成基础行程，供 fast 模式缩放使用
+
+用法：
+    python -m backend.tools.build_plan_catalog --days 3,5,7
+    python -m backend.tools.build_plan_catalog --destinations 成都,重庆 --days 4 --force
+
+生成使用与线上相同的 AIService（以及 LLM_PROVIDER 等配置），已存在的条目默认跳过。
+"""
+import asyncio
+import argparse
+from typing import List
+from ..database import SessionLocal, init_db
+from ..services.ai_service import AIService
+from ..services.plan_catalog import PlanCatalog
+
+# 默认的热门目的地
+DEFAULT_DESTINATIONS = [
+    "北京", "上海", "广州", "深圳", "成都", "重庆", "杭州", "西安", "南京", "苏州",
+    "武汉", "长沙", "厦门", "青岛", "大连", "天津", "昆明", "大理", "丽江", "西双版纳",
+    "桂林", "阳朔", "三亚", "海口", "拉萨", "乌鲁木齐", "喀什", "敦煌", "兰州", "西宁",
+    "张家界", "黄山", "洛阳", "开封", "郑州", "济南", "泰安", "哈尔滨", "长春", "沈阳",
+    "呼和浩特", "银川", "贵阳", "南宁", "北海", "福州", "泉州", "南昌", "景德镇", "合肥",
+]
+
+
+async def _build_one(
+    semaphore: asyncio.Semaphore,
+    destination: str,
+    days: int,
+    budget_per_day: float,
+    travelers_count: int,
+    preferences: str,
+    generation_mode: str,
+    force: bool
+) -> str:
+    """生成一个（目的地，天数）条目，返回结果：created / skipped / failed"""
+    budget = budget_per_day * travelers_count * days
+
+    db = SessionLocal()
+    try:
+        existing = PlanCatalog.find(db, destination, days)
+        if existing is not None and existing.days == days and not force:
+            print(f"⏭️ 已存在: {destination} {days}天")
+            return "skipped"
+    finally:
+        db.close()
+
+    async with semaphore:
+        print(f"🤖 生成: {destination} {days}天, 预算 {budget}, {travelers_count}人")
+        try:
+            itinerary = await AIService.generate_travel_plan_by_mode_async(
+                destination, days, budget, travelers_count, preferences, generation_mode
+            )
+            AIService.validate_itinerary(itinerary, days)
+        except Exception as e:
+            print(f"❌ 生成失败: {destination} {days}天: {str(e)}")
+            return "failed"
+
+    db = SessionLocal()
+    try:
+        PlanCatalog.upsert(db, destination, days, budget, travelers_count, itinerary)
+    finally:
+        db.close()
+    print(f"✅ 已写入目录: {destination} {days}天")
+    return "created"
+
+
+async def build_catalog(
+    destinations: List[str],
+    days_list: List[int],
+    budget_per_day: float,
+    travelers_count: int,
+    preferences: str,
+    generation_mode: str,
+    concurrency: int,
+    force: bool
+):
+    semaphore = asyncio.Semaphore(concurrency)
+    results = await asyncio.gather(*[
+        _build_one(
+            semaphore, destination, days, budget_per_day, travelers_count,
+            preferences, generation_mode, force
+        )
+        for destination in destinations
+        for days in days_list
+    ])
+    summary = {result: results.count(result) for result in ("created", "skipped", "failed")}
+    print(f"📚 目录生成完成: 新增 {summary['created']}, 跳过 {summary['skipped']}, 失败 {summary['failed']}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量生成目的地行程目录")
+    parser.add_argument("--destinations", default="", help="逗号分隔的目的地，默认为内置的热门目的地")
+    parser.add_argument("--days", default="3,5,7", help="逗号分隔的天数")
+    parser.add_argument("--budget-per-day", type=float, default=600, help="每人每天的预算（元）")
+    parser.add_argument("--travelers", type=int, default=2, help="旅行人数")
+    parser.add_argument("--preferences", default="", help="生成基础行程使用的偏好")
+    parser.add_argument("--mode", default="auto", choices=["auto", "single", "parallel"], help="生成模式")
+    parser.add_argument("--concurrency", type=int, default=2, help="同时生成的行程数")
+    parser.add_argument("--force", action="store_true", help="重新生成已存在的条目")
+    args = parser.parse_args()
+
+    destinations = [item.strip() for item in args.destinations.split(",") if item.strip()] or DEFAULT_DESTINATIONS
+    days_list = sorted({int(item) for item in args.days.split(",") if item.strip()})
+
+    init_db()
+    try:
+        asyncio.run(build_catalog(
+            destinations, days_list, args.budget_per_day, args.travelers,
+            args.preferences, args.mode, max(1, args.concurrency), args.force
+        ))
+    finally:
+        AIService.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+"""
+本地大模型替身服务 - 回放录制的模型响应，用于离线压测和延迟基准测试
+
+同时提供两种接口：
+- OpenAI 兼容接口：POST /v1/chat/completions（LLM_PROVIDER=openai，LLM_BASE_URL=http://127.0.0.1:9000/v1）
+- DashScope 接口：POST /api/v1/services/aigc/text-generation/generation
+  （LLM_PROVIDER=dashscope，并设置 SDK 的环境变量 DASHSCOPE_HTTP_BASE_URL=http://127.0.0.1:9000/api/v1）
+
+根据提示词内容判断任务类型（完整行程、行程骨架、单日行程、行程补丁、行程补全、语音解析、预算分析），
+返回 llm_standin_responses 目录中对应的录制响应，行程天数按提示词中的天数调整。
+输出速度、首 Token 延迟和错误注入都可以通过命令行参数配置。
+
+用法：
+    python -m backend.tools.llm_standin_server --port 9000 --ttft 0.8 --token-rate 40
+"""
+import re
+import json
+import time
+import copy
+import uuid
+import random
+import asyncio
+import argparse
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, AsyncIterator
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+import uvicorn
+
+RESPONSES_DIR = Path(__file__).parent / "llm_standin_responses"
+
+# 每次推送的最小间隔（秒），速度很快时把多个 Token 合并为一个分片
+MIN_CHUNK_INTERVAL = 0.02
+
+
+@dataclass
+class StandinConfig:
+    """替身服务的行为配置"""
+    ttft: float = 0.5               # 首 Token 延迟（秒）
+    token_rate: float = 50.0        # 输出速度（Token/秒），0 表示不限速
+    chars_per_token: float = 1.5    # 每个 Token 对应的字符数
+    error_rate: float = 0.0         # 返回错误状态码的概率
+    error_status: int = 429         # 注入的错误状态码
+    truncate_rate: float = 0.0      # 返回被截断（无法解析）内容的概率
+
+
+class ResponseLibrary:
+    """录制的响应，按任务类型组织"""
+
+    # (提示词特征, 任务类型)，按顺序匹配
+    TASK_MARKERS = [
+        ("replace_days", "itinerary_patch"),
+        ("day_themes", "plan_skeleton"),
+        ("query_type", "voice_query"),
+        ("天生成详细行程", "day_itinerary"),
+        ("需要补全：", "plan_sections"),
+        ("daily_itinerary", "travel_plan"),
+    ]
+
+    def __init__(self, directory: Path):
+        self.responses: Dict[str, Any] = {}
+        for path in sorted(directory.glob("*.json")):
+            self.responses[path.stem] = json.loads(path.read_text(encoding="utf-8"))
+        for path in sorted(directory.glob("*.txt")):
+            self.responses[path.stem] = path.read_text(encoding="utf-8").strip()
+
+        # 行程补全从完整行程的录制响应中截取
+        missing = {task for _, task in self.TASK_MARKERS if task != "plan_sections"} | {"expense_analysis"}
+        missing -= set(self.responses)
+        if missing:
+            raise ValueError(f"录制响应缺少: {', '.join(sorted(missing))}")
+
+    @classmethod
+    def classify(cls, prompt: str) -> str:
+        for marker, task in cls.TASK_MARKERS:
+            if marker in prompt:
+                return task
+        return "expense_analysis"
+
+    @staticmethod
+    def _resize(items: List[Dict[str, Any]], days: int) -> List[Dict[str, Any]]:
+        """循环使用录制的每日内容，凑够请求的天数"""
+        result = []
+        for index in range(days):
+            item = copy.deepcopy(items[index % len(items)])
+            item["day"] = index + 1
+            result.append(item)
+        return result
+
+    def render(self, prompt: str) -> Dict[str, str]:
+        """
+        生成提示词对应的响应文本
+
+        Returns:
+            {"task": 任务类型, "content": 响应文本}
+        """
+        task = self.classify(prompt)
+        response = copy.deepcopy(self.responses["travel_plan" if task == "plan_sections" else task])
+
+        days_match = re.search(r"旅行天数：(\d+)天", prompt)
+        days = int(days_match.group(1)) if days_match else None
+
+        if task == "travel_plan" and days:
+            response["daily_itinerary"] = self._resize(response["daily_itinerary"], days)
+            response["accommodation_summary"]["total_nights"] = max(days - 1, 0)
+        elif task == "plan_skeleton" and days:
+            response["day_themes"] = self._resize(response["day_themes"], days)
+            response["accommodation_summary"]["total_nights"] = max(days - 1, 0)
+        elif task == "plan_sections":
+            # 只返回“需要补全”一行中列出的天和字段
+            wanted = re.search(r"需要补全：(.*)", prompt).group(1)
+            numbers = [int(number) for number in re.findall(r"第(\d+)天", wanted)]
+            days_list = self._resize(response["daily_itinerary"], max(numbers, default=0))
+            sections = {key: value for key, value in response.items() if key != "daily_itinerary" and key in wanted}
+            response = {"daily_itinerary": [day for day in days_list if day["day"] in numbers], **sections}
+        elif task == "day_itinerary":
+            day_match = re.search(r"第(\d+)天生成详细行程", prompt)
+            if day_match:
+                response["day"] = int(day_match.group(1))
+
+        if isinstance(response, str):
+            return {"task": task, "content": response}
+        return {"task": task, "content": json.dumps(response, ensure_ascii=False, indent=2)}
+
+
+class StandinServer:
+    """按配置的速度和错误率回放响应"""
+
+    def __init__(self, config: StandinConfig, library: ResponseLibrary, seed: Optional[int] = None):
+        self.config = config
+        self.library = library
+        self._random = random.Random(seed)
+        self.stats = {
+            "requests": 0,
+            "streams": 0,
+            "injected_errors": 0,
+            "truncated": 0,
+            "output_tokens": 0,
+            "by_task": {}
+        }
+
+    def count_tokens(self, text: str) -> int:
+        return max(1, int(len(text) / self.config.chars_per_token))
+
+    def prepare(self, prompt: str, stream: bool) -> Dict[str, Any]:
+        """
+        为一次请求准备响应内容，并决定是否注入错误
+
+        Returns:
+            {"error": 状态码或 None, "task", "content", "input_tokens", "output_tokens"}
+        """
+        self.stats["requests"] += 1
+        if stream:
+            self.stats["streams"] += 1
+
+        if self._random.random() < self.config.error_rate:
+            self.stats["injected_errors"] += 1
+            return {"error": self.config.error_status}
+
+        rendered = self.library.render(prompt)
+        content = rendered["content"]
+        if self._random.random() < self.config.truncate_rate:
+            self.stats["truncated"] += 1
+            content = content[:self._random.randint(1, max(1, len(content) - 1))]
+
+        self.stats["by_task"][rendered["task"]] = self.stats["by_task"].get(rendered["task"], 0) + 1
+        output_tokens = self.count_tokens(content)
+        self.stats["output_tokens"] += output_tokens
+        return {
+            "error": None,
+            "task": rendered["task"],
+            "content": content,
+            "input_tokens": self.count_tokens(prompt),
+            "output_tokens": output_tokens
+        }
+
+    def generation_seconds(self, output_tokens: int) -> float:
+        if self.config.token_rate <= 0:
+            return 0.0
+        return output_tokens / self.config.token_rate
+
+    async def chunks(self, content: str) -> AsyncIterator[str]:
+        """等待首 Token 延迟后，按输出速度逐段返回内容"""
+        await asyncio.sleep(self.config.ttft)
+        if self.config.token_rate <= 0:
+            yield content
+            return
+
+        interval = max(MIN_CHUNK_INTERVAL, 1 / self.config.token_rate)
+        chars_per_chunk = max(1, int(self.config.token_rate * interval * self.config.chars_per_token))
+        start = time.monotonic()
+        for index, offset in enumerate(range(0, len(content), chars_per_chunk)):
+            # 按开始时间对齐，避免 sleep 的误差累积
+            delay = start + index * interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield content[offset:offset + chars_per_chunk]
+
+
+def _prompt_from_messages(messages: List[Dict[str, Any]]) -> str:
+    return "\n".join(str(message.get("content") or "") for message in messages or [])
+
+
+def _sse(data: Dict[str, Any]) -> str:
+    return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def create_app(server: StandinServer) -> FastAPI:
+    app = FastAPI(title="LLM Stand-in Server")
+
+    @app.get("/stats")
+    async def stats():
+        """请求数、注入的错误数和输出 Token 数"""
+        return {"config": server.config.__dict__, **server.stats}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        """OpenAI 兼容的 Chat Completions 接口"""
+        body = await request.json()
+        model = body.get("model", "standin")
+        stream = bool(body.get("stream"))
+        prepared = server.prepare(_prompt_from_messages(body.get("messages")), stream)
+
+        if prepared["error"]:
+            await asyncio.sleep(server.config.ttft)
+            return JSONResponse(
+                status_code=prepared["error"],
+                content={"error": {
+                    "message": f"stand-in injected error {prepared['error']}",
+                    "type": "standin_error",
+                    "code": str(prepared["error"])
+                }}
+            )
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        usage = {
+            "prompt_tokens": prepared["input_tokens"],
+            "completion_tokens": prepared["output_tokens"],
+            "total_tokens": prepared["input_tokens"] + prepared["output_tokens"]
+        }
+
+        if not stream:
+            await asyncio.sleep(server.config.ttft + server.generation_seconds(prepared["output_tokens"]))
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": prepared["content"]},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            }
+
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+
+        async def events():
+            base = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+            async for chunk in server.chunks(prepared["content"]):
+                yield _sse({**base, "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]})
+            yield _sse({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            if include_usage:
+                yield _sse({**base, "choices": [], "usage": usage})
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/api/v1/services/aigc/text-generation/generation")
+    async def dashscope_generation(request: Request):
+        """DashScope 文本生成接口（请求头 X-DashScope-SSE: enable 时流式返回）"""
+        body = await request.json()
+        model_input = body.get("input") or {}
+        parameters = body.get("parameters") or {}
+        prompt = model_input.get("prompt") or _prompt_from_messages(model_input.get("messages"))
+        stream = request.headers.get("X-DashScope-SSE", "").lower() == "enable"
+        prepared = server.prepare(prompt, stream)
+        request_id = str(uuid.uuid4())
+
+        if prepared["error"]:
+            await asyncio.sleep(server.config.ttft)
+            return JSONResponse(
+                status_code=prepared["error"],
+                content={
+                    "request_id": request_id,
+                    "code": "Throttling" if prepared["error"] == 429 else "InternalError",
+                    "message": f"stand-in injected error {prepared['error']}"
+                }
+            )
+
+        def output(content: str, finish_reason: str) -> Dict[str, Any]:
+            if parameters.get("result_format") == "message":
+                return {"choices": [{
+                    "finish_reason": finish_reason,
+                    "message": {"role": "assistant", "content": content}
+                }]}
+            return {"text": content, "finish_reason": finish_reason}
+
+        def usage(output_tokens: int) -> Dict[str, int]:
+            return {"input_tokens": prepared["input_tokens"], "output_tokens": output_tokens}
+
+        if not stream:
+            await asyncio.sleep(server.config.ttft + server.generation_seconds(prepared["output_tokens"]))
+            return {
+                "request_id": request_id,
+                "output": output(prepared["content"], "stop"),
+                "usage": usage(prepared["output_tokens"])
+            }
+
+        incremental = bool(parameters.get("incremental_output"))
+
+        async def events():
+            sent = ""
+            index = 0
+            async for chunk in server.chunks(prepared["content"]):
+                index += 1
+                sent += chunk
+                data = {
+                    "request_id": request_id,
+                    "output": output(chunk if incremental else sent, "null"),
+                    "usage": usage(server.count_tokens(sent))
+                }
+                yield f"id:{index}\nevent:result\n:HTTP_STATUS/200\ndata:{json.dumps(data, ensure_ascii=False)}\n\n"
+            data = {
+                "request_id": request_id,
+                "output": output("" if incremental else sent, "stop"),
+                "usage": usage(prepared["output_tokens"])
+            }
+            yield f"id:{index + 1}\nevent:result\n:HTTP_STATUS/200\ndata:{json.dumps(data, ensure_ascii=False)}\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地大模型替身服务（回放录制的响应）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--responses", default=str(RESPONSES_DIR), help="录制响应所在目录")
+    parser.add_argument("--ttft", type=float, default=0.5, help="首 Token 延迟（秒）")
+    parser.add_argument("--token-rate", type=float, default=50.0, help="输出速度（Token/秒），0 表示不限速")
+    parser.add_argument("--chars-per-token", type=float, default=1.5, help="每个 Token 对应的字符数")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回错误状态码的概率（0-1）")
+    parser.add_argument("--error-status", type=int, default=429, help="注入的错误状态码，如 429 或 500")
+    parser.add_argument("--truncate-rate", type=float, default=0.0, help="返回被截断内容的概率（0-1）")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子，便于复现错误注入")
+    args = parser.parse_args()
+
+    config = StandinConfig(
+        ttft=args.ttft,
+        token_rate=args.token_rate,
+        chars_per_token=args.chars_per_token,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        truncate_rate=args.truncate_rate
+    )
+    server = StandinServer(config, ResponseLibrary(Path(args.responses)), seed=args.seed)
+    print(f"🧪 大模型替身服务: http://{args.host}:{args.port}（{config}）")
+    uvicorn.run(create_app(server), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
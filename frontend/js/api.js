@@ -241,6 +241,59 @@ class API {
         return this.post('/travel/plan', planData);
     }
 
+    // 流式创建旅行计划（SSE），每收到一个事件调用一次 onEvent(event, data)
+    async createTravelPlanStream(planData, onEvent) {
+        const response = await fetch(`${API_BASE_URL}/travel/plan/stream`, {
+            method: 'POST',
+            headers: this.getHeaders(),
+            body: JSON.stringify(planData),
+        });
+
+        if (!response.ok) {
+            const error = await response.json().catch(() => ({}));
+            throw new Error(this.parseErrorMessage(error, response.status));
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder('utf-8');
+        let buffer = '';
+        let result = null;
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            // SSE 消息以空行分隔
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const message = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let event = 'message';
+                let data = '';
+                for (const line of message.split('\n')) {
+                    if (line.startsWith('event:')) event = line.slice(6).trim();
+                    else if (line.startsWith('data:')) data += line.slice(5).trim();
+                }
+                const payload = data ? JSON.parse(data) : {};
+
+                if (event === 'error') {
+                    throw new Error(payload.detail || '生成旅行计划失败');
+                }
+                if (event === 'done') {
+                    result = payload;
+                }
+                if (onEvent) onEvent(event, payload);
+            }
+        }
+
+        if (!result) {
+            throw new Error('旅行计划生成中断，请重试');
+        }
+        return result;
+    }
+
     async getTravelPlans() {
         return this.get('/travel/plans');
     }
@@ -257,6 +310,10 @@ class API {
         return this.post(`/travel/plans/${planId}/modify-with-ai`, { feedback });
     }
 
+    async getPlanWeather(planId) {
+        return this.get(`/travel/plans/${planId}/weather`);
+    }
+
     async deleteTravelPlan(planId) {
         return this.delete(`/travel/plans/${planId}`);
     }
@@ -276,6 +333,10 @@ class API {
         return this.get('/expenses/summary', params);
     }
 
+    async getExpenseAnalysis(travelPlanId) {
+        return this.get('/expenses/analysis', { travel_plan_id: travelPlanId });
+    }
+
     async deleteExpense(expenseId) {
         return this.delete(`/expenses/${expenseId}`);
     }
@@ -311,10 +372,23 @@ class API {
         return this.get('/map/poi', params);
     }
 
+    async geocodeBatch(addresses, city = null) {
+        return this.post('/map/geocode/batch', { addresses, city });
+    }
+
+    async searchPOIBatch(queries, city = null, types = null, limit = 1) {
+        return this.post('/map/poi/batch', { queries, city, types, limit });
+    }
+
     async getRoute(origin, destination, mode = 'driving') {
         return this.get('/map/route', { origin, destination, mode });
     }
 
+    async getDayRoute(locations, mode = 'driving', zoom = 14, city = null) {
+        const points = locations.map(([longitude, latitude]) => ({ longitude, latitude }));
+        return this.post('/map/routes/day', { points, mode, zoom, city });
+    }
+
     async getWeather(city) {
         return this.get('/map/weather', { city });
     }
@@ -8,6 +8,7 @@ class ExpenseManager {
         this.summary = null;
         this.categoryChart = null; // 存储图表实例
         this.editingExpenseId = null; // 正在编辑的费用ID
+        this.analysisTimer = null; // AI 预算分析轮询定时器
     }
 
     async addExpense(formData) {
@@ -149,7 +150,66 @@ class ExpenseManager {
             // 隐藏图表容器
             document.getElementById('categoryChartContainer').style.display = 'none';
         }
-        
+
+        // AI 预算分析在后台生成，未完成时轮询获取
+        this.stopAnalysisPolling();
+        if (this.summary.ai_analysis_status) {
+            this.displayAnalysis(this.summary.ai_analysis_status, this.summary.ai_analysis);
+            if (this.summary.ai_analysis_status === 'pending') {
+                this.pollAnalysis(travelPlanner.currentPlan.travel_plan_id);
+            }
+        } else {
+            aiAnalysisContainer.innerHTML = '';
+        }
+    }
+
+    /**
+     * 显示 AI 预算分析
+     */
+    displayAnalysis(status, analysis) {
+        const aiAnalysisContainer = document.getElementById('aiAnalysis');
+        let html = '<div class="ai-analysis"><h4>🤖 AI 预算分析</h4>';
+
+        if (analysis) {
+            html += `<div style="white-space: pre-wrap;">${analysis}</div>`;
+        }
+        if (status === 'pending') {
+            html += `<p class="meta">${analysis ? '花费有变化，正在更新分析...' : '正在分析预算...'}</p>`;
+        } else if (status === 'failed' && !analysis) {
+            html += '<p class="meta">预算分析暂时不可用，请稍后再试。</p>';
+        }
+
+        html += '</div>';
+        aiAnalysisContainer.innerHTML = html;
+    }
+
+    /**
+     * 轮询 AI 预算分析，直到分析完成
+     */
+    pollAnalysis(travelPlanId, attempt = 0) {
+        const maxAttempts = 20;
+        if (attempt >= maxAttempts) {
+            return;
+        }
+
+        this.analysisTimer = setTimeout(async () => {
+            try {
+                const result = await api.getExpenseAnalysis(travelPlanId);
+                this.displayAnalysis(result.status, result.analysis);
+                if (result.status === 'pending') {
+                    this.pollAnalysis(travelPlanId, attempt + 1);
+                }
+            } catch (error) {
+                console.error('获取预算分析错误:', error);
+            }
+        }, 3000);
+    }
+
+    stopAnalysisPolling() {
+        if (this.analysisTimer) {
+            clearTimeout(this.analysisTimer);
+            this.analysisTimer = null;
+        }
     }
 
     getCategoryIcon(category) {
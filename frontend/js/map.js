@@ -296,18 +296,22 @@ class MapManager {
         const cityName = destination.replace(/^(江苏|浙江|广东|四川|湖北|湖南|河南|河北|山东|山西|陕西|福建|安徽|江西|云南|贵州|甘肃|青海|海南|台湾|广西|西藏|宁夏|新疆|内蒙古|黑龙江|吉林|辽宁|北京|上海|天津|重庆)/, '');
         console.log('🗺️ 解析出城市名称:', cityName);
 
-        // 先定位到目的地
-        console.log('🗺️ 正在定位目的地:', destination);
-        const cityCenter = await this.showLocation(destination);
+        // 先定位到目的地（行程中已保存坐标时直接按标记调整视野，无需地理编码）
+        if (!this._hasStoredCoordinates(itinerary)) {
+            console.log('🗺️ 正在定位目的地:', destination);
+            await this.showLocation(destination);
+        }
 
         // 如果有每日行程，标记景点、餐厅和酒店
         if (itinerary.daily_itinerary) {
             console.log(`🗺️ 找到 ${itinerary.daily_itinerary.length} 天的行程`);
             const allLocations = [];
+            // 每天景点的坐标，按天规划路径
+            const dayRoutes = new Map();
+            // 先收集所有需要标记的地点，再批量查询坐标，避免逐个串行请求
+            const entries = [];
 
             for (const day of itinerary.daily_itinerary) {
-                console.log(`🗺️ 处理第 ${day.day} 天的行程`);
-                
                 // 标记活动景点
                 if (day.activities) {
                     console.log(`🗺️ 第 ${day.day} 天有 ${day.activities.length} 个活动`);
@@ -320,18 +324,21 @@ class MapManager {
                                 searchKeyword = searchKeyword.replace(/^(参观|游览|逛|品尝|漫步|散步|探访|体验|前往|去|到)/, '');
                             }
                             
-                            console.log(`🗺️ 正在标记景点: ${activity.activity} - 搜索词: ${searchKeyword}`);
-                            const coords = await this._addLocationMarker(
-                                searchKeyword, cityName, activity.location,
-                                `第${day.day}天: ${activity.activity}`,
-                                'attraction',
-                                {
+                            entries.push({
+                                searchKeyword,
+                                locationStr: activity.location,
+                                coordinates: activity.coordinates,
+                                label: `第${day.day}天: ${activity.activity}`,
+                                markerType: 'attraction',
+                                info: {
                                     title: activity.activity,
                                     description: activity.description,
                                     time: activity.time
-                                }
-                            );
-                            if (coords) allLocations.push(coords);
+                                },
+                                // 只有景点加入路径规划
+                                onRoute: true,
+                                day: day.day
+                            });
                         }
                     }
                 }
@@ -346,48 +353,71 @@ class MapManager {
                     
                     for (const { type, name, meal } of meals) {
                         if (meal && typeof meal === 'object' && meal.restaurant_name) {
-                            console.log(`🗺️ 正在标记${name}餐厅: ${meal.restaurant_name}`);
-                            const searchKeyword = meal.poi_name || meal.restaurant_name;
-                            const coords = await this._addLocationMarker(
-                                searchKeyword, cityName, meal.address || '',
-                                `第${day.day}天${name}: ${meal.restaurant_name}`,
-                                'restaurant',
-                                {
+                            entries.push({
+                                searchKeyword: meal.poi_name || meal.restaurant_name,
+                                locationStr: meal.address || '',
+                                coordinates: meal.coordinates,
+                                label: `第${day.day}天${name}: ${meal.restaurant_name}`,
+                                markerType: 'restaurant',
+                                info: {
                                     title: meal.restaurant_name,
                                     address: meal.address,
                                     specialty: meal.specialty,
                                     avgCost: meal.avg_cost
-                                }
-                            );
-                            // 不将餐厅加入路径规划
+                                },
+                                onRoute: false
+                            });
                         }
                     }
                 }
                 
                 // 标记酒店
                 if (day.accommodation && typeof day.accommodation === 'object' && day.accommodation.hotel_name) {
-                    console.log(`🗺️ 正在标记酒店: ${day.accommodation.hotel_name}`);
-                    const searchKeyword = day.accommodation.poi_name || day.accommodation.hotel_name;
-                    const coords = await this._addLocationMarker(
-                        searchKeyword, cityName, day.accommodation.address || '',
-                        `第${day.day}天住宿: ${day.accommodation.hotel_name}`,
-                        'hotel',
-                        {
+                    entries.push({
+                        searchKeyword: day.accommodation.poi_name || day.accommodation.hotel_name,
+                        locationStr: day.accommodation.address || '',
+                        coordinates: day.accommodation.coordinates,
+                        label: `第${day.day}天住宿: ${day.accommodation.hotel_name}`,
+                        markerType: 'hotel',
+                        info: {
                             title: day.accommodation.hotel_name,
                             address: day.accommodation.address,
                             roomType: day.accommodation.room_type,
                             price: day.accommodation.price_per_night,
                             features: day.accommodation.features
-                        }
-                    );
-                    // 不将酒店加入路径规划
+                        },
+                        onRoute: false
+                    });
                 }
             }
 
-            // 使用驾车路径规划绘制路径
+            // 服务端生成行程时已解析并保存坐标，只有缺少坐标的地点（如较早的计划）才需要查询
+            const positions = entries.map(entry => this._storedPosition(entry.coordinates));
+            const missing = entries.map((entry, index) => index).filter(index => !positions[index]);
+            console.log(`🗺️ 共 ${entries.length} 个地点，${missing.length} 个需要查询坐标`);
+            if (missing.length > 0) {
+                const resolved = await this._resolveLocations(missing.map(index => entries[index]), cityName);
+                missing.forEach((index, offset) => {
+                    positions[index] = resolved[offset];
+                });
+            }
+            entries.forEach((entry, index) => {
+                const coords = positions[index]
+                    ? this._addLocationMarker(entry, positions[index])
+                    : null;
+                if (!coords) {
+                    console.warn(`⚠️ 无法获取坐标: ${entry.searchKeyword}`);
+                } else if (entry.onRoute) {
+                    allLocations.push(coords);
+                    if (!dayRoutes.has(entry.day)) dayRoutes.set(entry.day, []);
+                    dayRoutes.get(entry.day).push(coords);
+                }
+            });
+
+            // 使用驾车路径规划绘制每天的路径
             if (allLocations.length > 1) {
-                console.log(`🗺️ 开始规划驾车路径，共 ${allLocations.length} 个点`);
-                this.drawDrivingRoute(allLocations);
+                console.log(`🗺️ 开始规划驾车路径，共 ${dayRoutes.size} 天 ${allLocations.length} 个点`);
+                this.drawDrivingRoute([...dayRoutes.values()]);
             }
 
             // 自动调整地图视野以显示所有标记
@@ -403,44 +433,85 @@ class MapManager {
     }
 
     /**
-     * 添加位置标记的辅助函数
-     * @param {string} searchKeyword - 搜索关键词
-     * @param {string} cityName - 城市名称
-     * @param {string} locationStr - 位置描述
-     * @param {string} label - 标签文本
-     * @param {string} markerType - 标记类型: 'attraction', 'restaurant', 'hotel'
-     * @param {object} info - 详细信息对象
+     * 行程中保存的坐标 {longitude, latitude} 转换为 [lng, lat]
+     * @param {object} coordinates - 坐标
      * @returns {Array|null} 坐标 [lng, lat] 或 null
      */
-    async _addLocationMarker(searchKeyword, cityName, locationStr, label, markerType, info) {
+    _storedPosition(coordinates) {
+        if (coordinates && coordinates.longitude && coordinates.latitude) {
+            return [coordinates.longitude, coordinates.latitude];
+        }
+        return null;
+    }
+
+    /**
+     * 行程中是否有服务端保存的坐标
+     * @param {object} itinerary - 行程
+     * @returns {boolean}
+     */
+    _hasStoredCoordinates(itinerary) {
+        return (itinerary.daily_itinerary || []).some(day =>
+            (day.activities || []).some(activity => this._storedPosition(activity.coordinates))
+        );
+    }
+
+    /**
+     * 批量查询地点坐标：先批量搜索 POI（更准确），没有结果的再批量地理编码
+     * @param {Array} entries - 地点列表，每项包含 searchKeyword 和 locationStr
+     * @param {string} cityName - 城市名称
+     * @returns {Array} 与 entries 顺序一致的坐标 [lng, lat]，找不到时为 null
+     */
+    async _resolveLocations(entries, cityName) {
+        const positions = new Array(entries.length).fill(null);
+        // 单次批量请求最多 100 个
+        const chunkSize = 100;
+        
         try {
-            // 优先使用 POI 搜索（更准确）
-            let result = await api.searchPOI(searchKeyword, cityName);
-            
-            // 如果 POI 搜索失败或没结果，使用地理编码
-            if (!result.success || !result.data || result.data.length === 0) {
-                console.log(`⚠️ POI搜索失败，尝试地理编码: ${searchKeyword}`);
-                const fullAddress = `${cityName}${locationStr}`;
-                result = await api.geocode(fullAddress);
+            for (let start = 0; start < entries.length; start += chunkSize) {
+                const chunk = entries.slice(start, start + chunkSize);
+                const result = await api.searchPOIBatch(chunk.map(entry => entry.searchKeyword), cityName);
+                if (result.success && result.data) {
+                    result.data.forEach((item, offset) => {
+                        const poi = item.data && item.data[0];
+                        if (poi && poi.location && poi.location.longitude && poi.location.latitude) {
+                            positions[start + offset] = [poi.location.longitude, poi.location.latitude];
+                            console.log(`✅ POI搜索成功: ${poi.name} [${poi.location.longitude}, ${poi.location.latitude}]`);
+                        }
+                    });
+                }
             }
             
-            // 从结果中提取坐标
-            let longitude, latitude;
-            if (result.success && result.data) {
-                if (Array.isArray(result.data) && result.data.length > 0) {
-                    // POI 搜索结果
-                    const poi = result.data[0];
-                    longitude = poi.location.longitude;
-                    latitude = poi.location.latitude;
-                    console.log(`✅ POI搜索成功: ${poi.name} [${longitude}, ${latitude}]`);
-                } else if (result.data.longitude && result.data.latitude) {
-                    // 地理编码结果
-                    longitude = result.data.longitude;
-                    latitude = result.data.latitude;
-                    console.log(`✅ 地理编码成功: [${longitude}, ${latitude}]`);
+            // POI 搜索没有结果的，使用地理编码
+            const missing = entries.map((entry, index) => index).filter(index => !positions[index]);
+            for (let start = 0; start < missing.length; start += chunkSize) {
+                const indexes = missing.slice(start, start + chunkSize);
+                console.log(`⚠️ ${indexes.length} 个地点 POI 搜索无结果，尝试地理编码`);
+                const result = await api.geocodeBatch(indexes.map(index => `${cityName}${entries[index].locationStr}`));
+                if (result.success && result.data) {
+                    result.data.forEach((item, offset) => {
+                        if (item.success && item.data && item.data.longitude && item.data.latitude) {
+                            positions[indexes[offset]] = [item.data.longitude, item.data.latitude];
+                        }
+                    });
                 }
             }
-            
+        } catch (error) {
+            console.error('❌ 批量查询坐标错误:', error);
+        }
+        
+        return positions;
+    }
+
+    /**
+     * 添加位置标记的辅助函数
+     * @param {object} entry - 地点，包含 searchKeyword、label、markerType（'attraction'、'restaurant'、'hotel'）和 info
+     * @param {Array} position - 坐标 [lng, lat]
+     * @returns {Array|null} 坐标 [lng, lat] 或 null
+     */
+    _addLocationMarker(entry, position) {
+        const { searchKeyword, label, markerType, info } = entry;
+        const [longitude, latitude] = position;
+        try {
             if (longitude && latitude) {
                 // 根据类型选择不同的图标和颜色
                 let iconStyle = {};
@@ -510,10 +581,8 @@ class MapManager {
                 }
                 
                 return [longitude, latitude];
-            } else {
-                console.warn(`⚠️ 无法获取坐标: ${searchKeyword}`);
-                return null;
             }
+            return null;
         } catch (error) {
             console.error('❌ 标记地点错误:', error);
             return null;
@@ -563,90 +632,83 @@ class MapManager {
     }
 
     /**
-     * 使用驾车路径规划绘制路线
-     * @param {Array} locations - 坐标点数组 [[lng1, lat1], [lng2, lat2], ...]
+     * 绘制每天的驾车路径：每天一次请求，后端并发规划各段并返回抽稀后的编码折线
+     * @param {Array} days - 每天按顺序排列的坐标 [[lng, lat], ...]
      */
-    drawDrivingRoute(locations) {
-        if (!locations || locations.length < 2) {
-            console.warn('⚠️ 至少需要2个点才能规划路径');
-            return;
-        }
-
-        // 加载驾车路径规划插件
-        AMap.plugin('AMap.Driving', () => {
-            const driving = new AMap.Driving({
-                map: this.map,
-                policy: AMap.DrivingPolicy.LEAST_TIME, // 最快捷模式
-                autoFitView: false // 禁用自动调整视野，我们手动控制
-            });
+    async drawDrivingRoute(days) {
+        const zoom = Math.round(this.map.getZoom ? this.map.getZoom() : 14);
 
-            // 逐段规划路径（从第1个点到第2个，第2个到第3个...）
-            let completedRoutes = 0;
-            const totalRoutes = locations.length - 1;
+        await Promise.all(days.filter(locations => locations.length >= 2).map(async (locations, dayIndex) => {
+            let legs = [];
+            try {
+                const result = await api.getDayRoute(locations, 'driving', zoom);
+                legs = result.legs || [];
+                console.log(`✅ 第 ${dayIndex + 1} 组路径规划完成: ${result.distance} 米, ${result.duration} 秒`);
+            } catch (error) {
+                console.error('❌ 路径规划错误:', error);
+            }
 
             for (let i = 0; i < locations.length - 1; i++) {
-                const start = new AMap.LngLat(locations[i][0], locations[i][1]);
-                const end = new AMap.LngLat(locations[i + 1][0], locations[i + 1][1]);
-
-                console.log(`🚗 规划路段 ${i + 1}/${totalRoutes}: [${locations[i]}] → [${locations[i + 1]}]`);
-
-                driving.search(start, end, (status, result) => {
-                    completedRoutes++;
-                    
-                    if (status === 'complete') {
-                        console.log(`✅ 路段 ${completedRoutes}/${totalRoutes} 规划成功`);
-                        
-                        // 绘制路径
-                        if (result.routes && result.routes.length > 0) {
-                            const route = result.routes[0];
-                            const path = [];
-                            
-                            route.steps.forEach(step => {
-                                step.path.forEach(point => {
-                                    path.push([point.lng, point.lat]);
-                                });
-                            });
-
-                            // 创建路径线
-                            const polyline = new AMap.Polyline({
-                                path: path,
-                                strokeColor: '#3b82f6',  // 蓝色
-                                strokeWeight: 5,
-                                strokeOpacity: 0.8,
-                                strokeStyle: 'solid',
-                                lineJoin: 'round',
-                                lineCap: 'round',
-                                zIndex: 50,
-                                showDir: true  // 显示方向箭头
-                            });
+                const leg = legs[i];
+                if (leg && leg.success && leg.polyline) {
+                    // 创建路径线
+                    const polyline = new AMap.Polyline({
+                        path: this._decodePolyline(leg.polyline),
+                        strokeColor: '#3b82f6',  // 蓝色
+                        strokeWeight: 5,
+                        strokeOpacity: 0.8,
+                        strokeStyle: 'solid',
+                        lineJoin: 'round',
+                        lineCap: 'round',
+                        zIndex: 50,
+                        showDir: true  // 显示方向箭头
+                    });
+                    this.map.add(polyline);
+                    this.polylines.push(polyline);
+                } else {
+                    // 规划失败时，使用直线连接
+                    console.log(`⚠️ 路段 ${i + 1} 规划失败，改用直线连接`);
+                    const fallbackLine = new AMap.Polyline({
+                        path: [locations[i], locations[i + 1]],
+                        strokeColor: '#94a3b8',  // 灰色表示直线
+                        strokeWeight: 3,
+                        strokeOpacity: 0.6,
+                        strokeStyle: 'dashed',  // 虚线
+                        zIndex: 40
+                    });
+                    this.map.add(fallbackLine);
+                    this.polylines.push(fallbackLine);
+                }
+            }
+        }));
 
-                            this.map.add(polyline);
-                            this.polylines.push(polyline);
-                        }
-                    } else {
-                        console.error(`❌ 路段 ${completedRoutes}/${totalRoutes} 规划失败:`, result);
-                        
-                        // 规划失败时，使用直线连接
-                        console.log('⚠️ 改用直线连接');
-                        const fallbackLine = new AMap.Polyline({
-                            path: [start, end],
-                            strokeColor: '#94a3b8',  // 灰色表示直线
-                            strokeWeight: 3,
-                            strokeOpacity: 0.6,
-                            strokeStyle: 'dashed',  // 虚线
-                            zIndex: 40
-                        });
-                        this.map.add(fallbackLine);
-                        this.polylines.push(fallbackLine);
-                    }
+        console.log('🎉 所有驾车路径规划完成');
+    }
 
-                    // 所有路段规划完成后的回调
-                    if (completedRoutes === totalRoutes) {
-                        console.log('🎉 所有驾车路径规划完成');
-                    }
-                });
+    /**
+     * 解码 Google Encoded Polyline（精度 1e-5），与后端 backend/services/polyline.py 对应
+     * @param {string} encoded - 编码后的折线
+     * @returns {Array} 坐标 [[lng, lat], ...]
+     */
+    _decodePolyline(encoded) {
+        const points = [];
+        let index = 0, lat = 0, lng = 0;
+        while (index < encoded.length) {
+            const values = [];
+            for (let k = 0; k < 2; k++) {
+                let shift = 0, result = 0, byte;
+                do {
+                    byte = encoded.charCodeAt(index++) - 63;
+                    result |= (byte & 0x1f) << shift;
+                    shift += 5;
+                } while (byte >= 0x20);
+                values.push(result & 1 ? ~(result >> 1) : result >> 1);
             }
-        });
+            lat += values[0];
+            lng += values[1];
+            points.push([lng / 1e5, lat / 1e5]);
+        }
+        return points;
     }
 }
 
@@ -24,7 +24,12 @@ class TravelPlanner {
 
             console.log('📤 发送旅行计划请求:', planData);
             
-            const result = await api.createTravelPlan(planData);
+            // 流式生成：每完成一天就更新进度提示
+            const result = await api.createTravelPlanStream(planData, (event, data) => {
+                if (event === 'day') {
+                    showLoading(`AI 正在为你规划旅程...（已完成第 ${data.index + 1} 天）`);
+                }
+            });
             
             console.log('📥 收到旅行计划响应:', result);
             
@@ -74,6 +79,32 @@ class TravelPlanner {
         }
     }
 
+    /**
+     * 加载行程期间的天气预报，显示在每天的标题旁（只有最近几天有预报）
+     * @param {object} plan - 旅行计划
+     */
+    async loadPlanWeather(plan) {
+        const planId = plan.id || plan.travel_plan_id;
+        if (!planId) return;
+
+        try {
+            const result = await api.getPlanWeather(planId);
+            if (!result.success || !result.available) return;
+
+            result.days.forEach(({ day, weather }) => {
+                const title = document.querySelector(`#day-${day} .section-title`);
+                if (!weather || !title || title.querySelector('.day-weather')) return;
+                const badge = document.createElement('span');
+                badge.className = 'day-weather';
+                badge.style.cssText = 'margin-left: 12px; font-size: 14px; color: #666; font-weight: normal;';
+                badge.textContent = `🌤️ ${weather.dayweather} ${weather.nighttemp}~${weather.daytemp}°C`;
+                title.appendChild(badge);
+            });
+        } catch (error) {
+            console.error('❌ 加载天气预报失败:', error);
+        }
+    }
+
     displayItinerary(plan) {
         const wrapperSection = document.getElementById('itineraryMapWrapper');
         const resultSection = document.getElementById('itineraryResult');
@@ -475,6 +506,9 @@ class TravelPlanner {
         // 设置地图聚焦交互
         this.setupMapFocus();
 
+        // 在每天的标题旁显示天气预报（创建计划时已在后台预取）
+        this.loadPlanWeather(plan);
+
         // 滚动到结果
         resultSection.scrollIntoView({ behavior: 'smooth' });
         
@@ -42,6 +42,50 @@ CREATE TABLE IF NOT EXISTS expenses (
     FOREIGN KEY (travel_plan_id) REFERENCES travel_plans(id) ON DELETE SET NULL
 );
 
+-- 创建旅行计划生成任务表（异步生成模式）
+CREATE TABLE IF NOT EXISTS plan_jobs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    request JSON NOT NULL,
+    travel_plan_id INT,
+    error TEXT,
+    attempts INT DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP NULL,
+    finished_at TIMESTAMP NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (travel_plan_id) REFERENCES travel_plans(id) ON DELETE SET NULL
+);
+
+-- 创建预生成的目的地行程目录表
+CREATE TABLE IF NOT EXISTS destination_plans (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    destination VARCHAR(200) NOT NULL,
+    days INT NOT NULL,
+    budget FLOAT NOT NULL,
+    travelers_count INT NOT NULL DEFAULT 1,
+    itinerary JSON NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_destination_plans_destination_days (destination, days)
+);
+
+-- 创建高德地理编码 / POI 搜索结果缓存表
+CREATE TABLE IF NOT EXISTS geo_cache (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    kind VARCHAR(20) NOT NULL,
+    key_hash VARCHAR(40) NOT NULL,
+    cache_key VARCHAR(500) NOT NULL,
+    found BOOLEAN NOT NULL DEFAULT TRUE,
+    result JSON,
+    expires_at DATETIME NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_geo_cache_kind_key_hash (kind, key_hash)
+);
+
 -- 创建索引以提高查询性能（MySQL 8.0 不支持 IF NOT EXISTS）
 CREATE INDEX idx_users_username ON users(username);
 CREATE INDEX idx_users_email ON users(email);
@@ -51,6 +95,8 @@ CREATE INDEX idx_expenses_user_id ON expenses(user_id);
 CREATE INDEX idx_expenses_travel_plan_id ON expenses(travel_plan_id);
 CREATE INDEX idx_expenses_category ON expenses(category);
 CREATE INDEX idx_expenses_date ON expenses(date);
+CREATE INDEX idx_plan_jobs_status ON plan_jobs(status);
+CREATE INDEX idx_geo_cache_expires_at ON geo_cache(expires_at);
 
 -- 插入示例数据（可选）
 -- INSERT IGNORE INTO users (username, email, hashed_password) VALUES 
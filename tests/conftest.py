@@ -0,0 +1,142 @@
+"""
+测试公共配置 - 独立的 SQLite 数据库、可控的大模型替身和登录用户
+
+运行：python -m pytest -q
+"""
+import os
+import json
+import time
+import tempfile
+import threading
+from typing import Callable, Iterator, List, Optional, Union
+
+# 必须在导入 backend 之前设置：配置在导入时读取
+_TEST_DIR = tempfile.mkdtemp(prefix="travel-planner-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(_TEST_DIR, 'test.db')}",
+    "SECRET_KEY": "test-secret",
+    "ALIYUN_BAILIAN_API_KEY": "test",
+    "AMAP_API_KEY": "test",
+    "AMAP_WEB_SERVICE_KEY": "test",
+    # 不可达的地址：测试不应请求高德
+    "AMAP_BASE_URL": "http://127.0.0.1:9/v3",
+    "AMAP_MAX_RETRIES": "0",
+    "ITINERARY_GEO_ENABLED": "False",
+    "POI_INDEX_ENABLED": "False",
+    "PLAN_CACHE_ENABLED": "False",
+    "DEBUG": "False"
+})
+
+import pytest  # noqa: E402
+from backend.database import SessionLocal, init_db  # noqa: E402
+from backend.models import User  # noqa: E402
+from backend.auth import create_access_token  # noqa: E402
+from backend.services import llm_provider  # noqa: E402
+from backend.services.llm_provider import LLMProvider, LLMResponse, LLMUsage  # noqa: E402
+
+init_db()
+
+
+def make_plan(days: int = 3, destination: str = "成都") -> dict:
+    """结构完整的行程"""
+    return {
+        "overview": f"{destination}{days}日游",
+        "daily_itinerary": [
+            {
+                "day": day,
+                "title": f"第{day}天",
+                "activities": [{"time": "09:00", "activity": "宽窄巷子", "poi_name": "宽窄巷子", "estimated_cost": 50}],
+                "meals": {"lunch": {"restaurant_name": "陈麻婆豆腐", "avg_cost": 50}},
+                "accommodation": {"hotel_name": "成都香格里拉", "price_per_night": 300}
+            }
+            for day in range(1, days + 1)
+        ],
+        "transportation": {"estimated_cost": 500},
+        "accommodation_summary": {"hotels": [{"name": "成都香格里拉"}], "estimated_cost_per_night": 300},
+        "restaurant_recommendations": [{"name": "陈麻婆豆腐"}],
+        "budget_breakdown": {"transportation": 500, "accommodation": 600, "meals": 400, "attractions": 300, "total": 1800},
+        "tips": ["带好雨伞"]
+    }
+
+
+class FakeLLM(LLMProvider):
+    """
+    大模型替身：每次调用等待 latency 秒后返回 responder(prompt) 的结果
+
+    responder 可以返回字符串（模型输出）或 LLMResponse（如错误响应），抛出的异常原样传给调用方。
+    记录所有提示词和同时进行的最大调用数。
+    """
+
+    name = "fake"
+
+    def __init__(self, responder: Union[str, Callable[[str], Union[str, LLMResponse]]], latency: float = 0.0):
+        self.responder = responder if callable(responder) else (lambda prompt: responder)
+        self.latency = latency
+        self.prompts: List[str] = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def call(self, model: str, prompt: str, **kwargs) -> LLMResponse:
+        with self._lock:
+            self.prompts.append(prompt)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            result = self.responder(prompt)
+        finally:
+            with self._lock:
+                self.active -= 1
+        if isinstance(result, LLMResponse):
+            return result
+        return LLMResponse.from_text(result, LLMUsage(len(prompt) // 2, len(result) // 2))
+
+    def stream(self, model: str, prompt: str, **kwargs) -> Iterator[LLMResponse]:
+        yield self.call(model, prompt, **kwargs)
+
+
+@pytest.fixture
+def fake_llm():
+    """安装大模型替身，测试结束后恢复"""
+    installed: List[FakeLLM] = []
+
+    def install(responder, latency: float = 0.0) -> FakeLLM:
+        provider = FakeLLM(responder, latency)
+        llm_provider.set_llm_provider(provider)
+        installed.append(provider)
+        return provider
+
+    yield install
+    llm_provider.set_llm_provider(None)
+
+
+@pytest.fixture
+def user() -> User:
+    """测试用户（每个测试一个新用户）"""
+    db = SessionLocal()
+    try:
+        name = f"user{time.time_ns()}"
+        user = User(username=name, email=f"{name}@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        db.expunge(user)
+        return user
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def auth_headers(user: User) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def plan_json(days: int = 3, destination: Optional[str] = None) -> str:
+    return json.dumps(make_plan(days, destination or "成都"), ensure_ascii=False)
@@ -0,0 +1,33 @@
+"""
+认证依赖 - 共享会话在认证后仍可继续使用，地图、语音接口的认证不占用请求会话
+"""
+import httpx
+import pytest
+from backend.main import app
+
+
+@pytest.fixture
+async def client():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+        yield client
+
+
+@pytest.mark.anyio
+async def test_shared_session_stays_usable_after_auth(client, auth_headers):
+    response = await client.get("/travel/plans", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+@pytest.mark.anyio
+async def test_detached_auth_for_map_routes(client, auth_headers):
+    # 测试环境的高德地址不可达，接口返回失败，但认证应当通过
+    response = await client.get("/map/geocode", params={"address": "天府广场"}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["success"] is False
+
+    response = await client.get(
+        "/map/geocode", params={"address": "天府广场"}, headers={"Authorization": "Bearer invalid"}
+    )
+    assert response.status_code == 401
@@ -0,0 +1,222 @@
+"""
+熔断器 - 状态转换、慢调用计数、半开时只放行一个探测，以及高德不可用时返回过期的缓存
+"""
+from types import SimpleNamespace
+import pytest
+from backend.services import circuit_breaker, map_service
+from backend.services.circuit_breaker import CircuitBreaker, CircuitBreakers, CircuitOpenError
+from backend.services.geo_cache import GeoCache
+from backend.services.map_service import MapService
+
+THRESHOLD = 3
+RECOVERY = 30.0
+SLOW = 2.0
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker, "time", SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker("geocode", THRESHOLD, RECOVERY, SLOW)
+
+
+def _fail(breaker: CircuitBreaker, times: int):
+    for _ in range(times):
+        breaker.record(False)
+
+
+def test_opens_after_consecutive_failures(breaker):
+    _fail(breaker, THRESHOLD - 1)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record(True, 0.1)
+    _fail(breaker, THRESHOLD - 1)
+    assert breaker.state == CircuitBreaker.CLOSED, "成功调用应当清零连续失败次数"
+
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.stats()["opened"] == 1
+
+
+def test_open_rejects_until_recovery(breaker, clock):
+    _fail(breaker, THRESHOLD)
+
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.check()
+    assert error.value.retry_after == pytest.approx(RECOVERY)
+
+    clock.advance(RECOVERY - 1)
+    assert not breaker.allow()
+    assert breaker.retry_after() == pytest.approx(1)
+    assert breaker.stats()["rejected"] == 2
+
+
+def test_half_open_admits_a_single_probe(breaker, clock):
+    _fail(breaker, THRESHOLD)
+    clock.advance(RECOVERY)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    assert breaker.allow()
+    assert not breaker.allow()
+    assert not breaker.allow()
+
+    # 探测调用迟迟没有结果（例如被取消）时允许新的探测
+    clock.advance(RECOVERY)
+    assert breaker.allow()
+
+
+def test_successful_probe_closes(breaker, clock):
+    _fail(breaker, THRESHOLD)
+    clock.advance(RECOVERY)
+    assert breaker.allow()
+
+    breaker.record(True, 0.1)
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+    assert breaker.stats()["consecutive_failures"] == 0
+
+
+def test_failed_probe_reopens(breaker, clock):
+    _fail(breaker, THRESHOLD)
+    clock.advance(RECOVERY)
+    assert breaker.allow()
+
+    breaker.record(False)
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.retry_after() == pytest.approx(RECOVERY)
+    assert breaker.stats()["opened"] == 2
+
+
+def test_slow_calls_count_as_failures(breaker, clock):
+    for _ in range(THRESHOLD):
+        breaker.record(True, SLOW + 0.5)
+
+    stats = breaker.stats()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert stats["slow_calls"] == THRESHOLD
+    assert stats["successes"] == 0
+
+    # 半开时探测调用过慢同样重新打开
+    clock.advance(RECOVERY)
+    assert breaker.allow()
+    breaker.record(True, SLOW + 0.5)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_disabled_breakers_always_allow(clock):
+    breakers = CircuitBreakers(["geocode"], False, 1, RECOVERY, SLOW)
+    breakers.record("geocode", False)
+    breakers.check("geocode")
+    assert breakers.get("geocode").state == CircuitBreaker.CLOSED
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, data: dict):
+        self.status_code = status_code
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+@pytest.fixture
+def amap(monkeypatch, clock):
+    """替换高德请求和熔断器，返回依次使用的响应列表"""
+    breakers = CircuitBreakers(["geocode", "place", "direction", "weather"], True, THRESHOLD, RECOVERY, SLOW)
+    monkeypatch.setattr(map_service, "amap_breakers", breakers)
+    responses = []
+
+    async def request(endpoint, method, url, params=None):
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(map_service.outbound_http, "request", request)
+    return SimpleNamespace(breakers=breakers, responses=responses)
+
+
+@pytest.mark.anyio
+async def test_amap_get_records_unavailable_but_not_business_errors(amap):
+    breaker = amap.breakers.get("geocode")
+    amap.responses.extend([
+        FakeResponse(200, {"status": "0", "infocode": "20000"}),   # 参数错误：正常的业务结果
+        FakeResponse(200, {"status": "0", "infocode": "10003"}),   # 配额用尽
+        FakeResponse(200, {"status": "0", "infocode": "30001"}),   # 服务端错误
+        FakeResponse(500, {}),
+    ])
+
+    await MapService._amap_get("geocode", "http://amap/geocode/geo", {})
+    assert breaker.stats()["consecutive_failures"] == 0
+    for _ in range(3):
+        await MapService._amap_get("geocode", "http://amap/geocode/geo", {})
+
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        await MapService._amap_get("geocode", "http://amap/geocode/geo", {})
+    assert not amap.responses
+
+
+@pytest.mark.anyio
+async def test_amap_get_records_exceptions(amap):
+    amap.responses.extend([ConnectionError("down")] * THRESHOLD)
+    for _ in range(THRESHOLD):
+        with pytest.raises(ConnectionError):
+            await MapService._amap_get("weather", "http://amap/weather", {})
+    assert amap.breakers.get("weather").state == CircuitBreaker.OPEN
+
+
+@pytest.fixture
+def stale_cache(monkeypatch):
+    cache = GeoCache(enabled=True, max_entries=100, ttl_seconds=3600, negative_ttl_seconds=60, stale_seconds=3600)
+    monkeypatch.setattr(map_service, "geo_cache", cache)
+    yield cache
+    for task in list(MapService._background_tasks):
+        task.cancel()
+    MapService._refreshing.clear()
+
+
+@pytest.mark.anyio
+async def test_open_breaker_serves_stale_cache_and_schedules_one_refresh(amap, stale_cache):
+    address = f"熔断测试{id(stale_cache)}"
+    key = GeoCache.make_key(GeoCache.KIND_GEOCODE, address, "成都")
+    cached = {"longitude": 104.06, "latitude": 30.66, "formatted_address": address}
+    stale_cache.set(key, cached, ttl=-1)
+    assert stale_cache.get(key) == (False, None)
+
+    _fail(amap.breakers.get("geocode"), THRESHOLD)
+    tasks_before = len(MapService._background_tasks)
+
+    assert await MapService.geocode(address, "成都") == cached
+    assert key in MapService._refreshing
+    assert len(MapService._background_tasks) == tasks_before + 1
+
+    # 同一个键已经在刷新，不再安排新的刷新任务
+    assert await MapService.geocode(address, "成都") == cached
+    assert len(MapService._background_tasks) == tasks_before + 1
+    assert not amap.responses
+
+
+@pytest.mark.anyio
+async def test_open_breaker_without_cache_fails_fast(amap, stale_cache):
+    _fail(amap.breakers.get("geocode"), THRESHOLD)
+    assert await MapService.geocode("没有缓存的地址", "成都") is None
+    assert not MapService._refreshing
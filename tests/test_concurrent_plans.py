@@ -0,0 +1,42 @@
+"""
+并发生成行程 - 大模型调用在线程池中执行，多个请求的等待时间应当重叠而不是串行累加
+"""
+import time
+import asyncio
+import httpx
+import pytest
+from backend.main import app
+from .conftest import plan_json
+
+LATENCY = 1.0
+REQUESTS = 4
+
+
+@pytest.mark.anyio
+async def test_concurrent_plan_requests_overlap(fake_llm, auth_headers):
+    llm = fake_llm(plan_json(3), latency=LATENCY)
+    # 目的地各不相同，避免相同请求被合并为一次生成
+    destinations = ["成都", "西安", "杭州", "厦门"][:REQUESTS]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+        started = time.perf_counter()
+        responses = await asyncio.gather(*[
+            client.post("/travel/plan", headers=auth_headers, json={
+                "destination": destination,
+                "start_date": "2030-05-01",
+                "end_date": "2030-05-03",
+                "budget": 5000,
+                "travelers_count": 2,
+                "use_cache": False,
+                "generation_mode": "single"
+            })
+            for destination in destinations
+        ])
+        elapsed = time.perf_counter() - started
+
+    assert [response.status_code for response in responses] == [201] * REQUESTS, [r.text for r in responses]
+    assert len(llm.prompts) == REQUESTS
+    assert llm.max_active == REQUESTS
+    # 串行时约为 REQUESTS × LATENCY
+    assert elapsed < LATENCY * 1.8, f"{REQUESTS} 个请求耗时 {elapsed:.2f} 秒"
@@ -0,0 +1,32 @@
+"""
+费用预算分析缓存 - 分析失败不会被当作结果缓存
+"""
+import asyncio
+import pytest
+from backend.services.expense_analysis import ExpenseAnalysisCache
+from backend.services.llm_provider import LLMResponse
+
+
+async def _wait(cache: ExpenseAnalysisCache):
+    while cache._tasks:
+        await asyncio.gather(*list(cache._tasks))
+
+
+@pytest.mark.anyio
+async def test_failed_analysis_is_retried(fake_llm):
+    cache = ExpenseAnalysisCache(change_ratio=0.05, min_change=50, max_entries=10)
+    fake_llm(lambda prompt: LLMResponse.from_error(500, "upstream error"))
+
+    assert cache.get_or_schedule(1, "成都 3天游", 100, 3000)["status"] == cache.STATUS_PENDING
+    await _wait(cache)
+    failed = cache.get(1)
+    assert failed["status"] == cache.STATUS_FAILED
+    assert failed["analysis"] is None
+
+    # 花费没有变化也要重新分析
+    fake_llm("预算使用正常。")
+    assert cache.get_or_schedule(1, "成都 3天游", 100, 3000)["status"] == cache.STATUS_PENDING
+    await _wait(cache)
+    ready = cache.get_or_schedule(1, "成都 3天游", 100, 3000)
+    assert ready["status"] == cache.STATUS_READY
+    assert ready["analysis"] == "预算使用正常。"
@@ -0,0 +1,134 @@
+"""
+地理缓存 - "未找到"使用较短的 TTL，过期条目在保留期内仍可通过 get_stale 读取
+"""
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytest
+from backend.services import geo_cache as geo_cache_module
+from backend.services.geo_cache import GeoCache
+
+TTL = 3600
+NEGATIVE_TTL = 60
+STALE = 600
+
+
+class Clock:
+    """同时替换内存缓存使用的 time.time 和数据库缓存使用的 datetime.utcnow"""
+
+    def __init__(self):
+        self.now = time.time()
+
+    def time(self) -> float:
+        return self.now
+
+    def utcnow(self) -> datetime:
+        return datetime(1970, 1, 1) + timedelta(seconds=self.now)
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(geo_cache_module, "time", SimpleNamespace(time=clock.time))
+    monkeypatch.setattr(geo_cache_module, "datetime", SimpleNamespace(utcnow=clock.utcnow))
+    return clock
+
+
+@pytest.fixture
+def cache(clock):
+    return GeoCache(enabled=True, max_entries=100, ttl_seconds=TTL, negative_ttl_seconds=NEGATIVE_TTL, stale_seconds=STALE)
+
+
+def unique_key(kind: str = GeoCache.KIND_GEOCODE) -> str:
+    # 数据库在测试之间共享，每个测试使用不同的地址
+    return GeoCache.make_key(kind, f"地理缓存测试{time.time_ns()}", "成都")
+
+
+def forget_memory(cache: GeoCache):
+    """清空内存缓存，下次读取走数据库"""
+    cache._entries.clear()
+
+
+def test_key_normalization():
+    assert GeoCache.make_key("geocode", "南京 中山陵", "南京市") == GeoCache.make_key("geocode", "南京中山陵", "南京")
+    assert GeoCache.make_key("poi", "火锅", "成都", "050000") != GeoCache.make_key("poi", "火锅", "成都")
+
+
+@pytest.mark.parametrize("in_memory", [True, False])
+def test_not_found_is_cached_with_negative_ttl(cache, clock, in_memory):
+    key = unique_key()
+    cache.set(key, None)
+    if not in_memory:
+        forget_memory(cache)
+
+    assert cache.get(key) == (True, None)
+    clock.advance(NEGATIVE_TTL - 1)
+    assert cache.get(key) == (True, None)
+
+    clock.advance(2)
+    assert cache.get(key) == (False, None)
+    stats = cache.stats()["kinds"]["geocode"]
+    assert stats["negative_hits"] == 2
+    assert stats["misses"] == 1
+
+
+def test_found_result_uses_normal_ttl(cache, clock):
+    key = unique_key()
+    value = {"longitude": 104.06, "latitude": 30.66}
+    cache.set(key, value)
+
+    clock.advance(NEGATIVE_TTL + 1)
+    assert cache.get(key) == (True, value)
+    clock.advance(TTL)
+    assert cache.get(key) == (False, None)
+
+
+def test_empty_list_counts_as_not_found(cache, clock):
+    key = unique_key(GeoCache.KIND_POI)
+    cache.set(key, [])
+
+    assert cache.get(key) == (True, [])
+    clock.advance(NEGATIVE_TTL + 1)
+    assert cache.get(key) == (False, None)
+
+
+@pytest.mark.parametrize("in_memory", [True, False])
+def test_expired_entry_is_kept_for_get_stale(cache, clock, in_memory):
+    key = unique_key()
+    value = {"longitude": 104.06, "latitude": 30.66}
+    cache.set(key, value)
+    clock.advance(TTL + 1)
+    if not in_memory:
+        forget_memory(cache)
+
+    assert cache.get(key) == (False, None)
+    assert cache.get_stale(key) == (True, value)
+
+    # 超过保留期后 get_stale 也不再返回
+    clock.advance(STALE)
+    assert cache.get_stale(key) == (False, None)
+    assert cache.stats()["kinds"]["geocode"]["stale_hits"] == 1
+
+
+def test_expired_memory_entry_is_dropped_after_stale_period(cache, clock):
+    key = unique_key()
+    cache.set(key, {"longitude": 104.06, "latitude": 30.66})
+
+    clock.advance(TTL + 1)
+    cache.get(key)
+    assert key in cache._entries
+
+    clock.advance(STALE)
+    cache.get(key)
+    assert key not in cache._entries
+
+
+def test_disabled_cache_stores_nothing(clock):
+    cache = GeoCache(enabled=False, max_entries=100, ttl_seconds=TTL, negative_ttl_seconds=NEGATIVE_TTL, stale_seconds=STALE)
+    key = unique_key()
+    cache.set(key, {"longitude": 1})
+    assert cache.get(key) == (False, None)
+    assert cache.get_stale(key) == (False, None)
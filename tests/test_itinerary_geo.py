@@ -0,0 +1,125 @@
+"""
+行程坐标补全 - 修改行程时沿用未变化地点的坐标，只重新解析新增或改动过的地点
+"""
+from types import SimpleNamespace
+import pytest
+from backend.services.itinerary_geo import ItineraryGeo
+from backend.services.map_service import MapService
+from .conftest import make_plan
+
+
+@pytest.fixture
+def amap(monkeypatch):
+    """替换高德批量接口：名称以"找不到"开头的地点搜索不到 POI，地理编码总是成功"""
+    calls = SimpleNamespace(keywords=[], addresses=[])
+
+    def poi(keyword: str) -> dict:
+        code = sum(map(ord, keyword))
+        return {"id": f"B{code}", "location": {"longitude": 104.0 + code % 997 / 1000, "latitude": 30.6}}
+
+    async def search_poi_batch(keywords, city):
+        calls.keywords.extend(keywords)
+        return [[] if keyword.startswith("找不到") else [poi(keyword)] for keyword in keywords]
+
+    async def geocode_batch(addresses, city):
+        calls.addresses.extend(addresses)
+        return [{"longitude": 104.5, "latitude": 30.5} for _ in addresses]
+
+    monkeypatch.setattr(MapService, "search_poi_batch", search_poi_batch)
+    monkeypatch.setattr(MapService, "geocode_batch", geocode_batch)
+    return calls
+
+
+def one_day_plan() -> dict:
+    plan = make_plan(1)
+    plan["daily_itinerary"][0]["activities"].append(
+        {"time": "14:00", "activity": "参观找不到的小店", "location": "锦里古街"}
+    )
+    return plan
+
+
+def coordinates(plan: dict) -> list:
+    return [entry.get(ItineraryGeo.COORDINATES_KEY) for entry, _, _ in ItineraryGeo.places(plan)]
+
+
+@pytest.mark.anyio
+async def test_enrich_resolves_pois_then_geocodes_the_rest(amap):
+    geo = ItineraryGeo(enabled=True)
+    plan = one_day_plan()
+
+    result = await geo.enrich(plan, "四川成都")
+
+    # 宽窄巷子、找不到的小店（动词前缀已去掉）、餐厅、每日住宿与 accommodation_summary 中同名的酒店只搜索一次
+    assert amap.keywords == ["宽窄巷子", "找不到的小店", "陈麻婆豆腐", "成都香格里拉"]
+    assert amap.addresses == ["成都锦里古街"]
+    assert all(coordinates(result))
+    assert result["daily_itinerary"][0]["activities"][1][ItineraryGeo.AMAP_ID_KEY] is None
+    assert ItineraryGeo.COORDINATES_KEY not in plan["daily_itinerary"][0]["activities"][0]
+
+
+@pytest.mark.anyio
+async def test_unchanged_places_reuse_previous_coordinates(amap):
+    geo = ItineraryGeo(enabled=True)
+    previous = await geo.enrich(one_day_plan(), "成都")
+    amap.keywords.clear()
+    amap.addresses.clear()
+
+    # 模型修改的是去掉坐标的副本：只改了一个活动，其余地点原样返回
+    modified = ItineraryGeo.strip(previous)
+    modified["daily_itinerary"][0]["activities"][0]["poi_name"] = "人民公园"
+
+    result = await geo.enrich(modified, "成都", previous)
+
+    assert amap.keywords == ["人民公园"]
+    assert amap.addresses == []
+    previous_places = ItineraryGeo.places(previous)
+    for index, (entry, keyword, _) in enumerate(ItineraryGeo.places(result)):
+        if keyword == "人民公园":
+            assert entry[ItineraryGeo.COORDINATES_KEY] != previous_places[index][0][ItineraryGeo.COORDINATES_KEY]
+        else:
+            assert entry[ItineraryGeo.COORDINATES_KEY] == previous_places[index][0][ItineraryGeo.COORDINATES_KEY]
+            assert entry[ItineraryGeo.AMAP_ID_KEY] == previous_places[index][0][ItineraryGeo.AMAP_ID_KEY]
+    assert geo.stats()["reused"] == 4
+
+
+@pytest.mark.anyio
+async def test_changed_address_is_resolved_again_and_copied_coordinates_are_dropped(amap):
+    geo = ItineraryGeo(enabled=True)
+    previous = await geo.enrich(one_day_plan(), "成都")
+    amap.keywords.clear()
+    amap.addresses.clear()
+
+    # 模型照抄了坐标，但地址变了：不能沿用
+    modified = ItineraryGeo.strip(previous)
+    shop = modified["daily_itinerary"][0]["activities"][1]
+    shop["location"] = "春熙路"
+    shop[ItineraryGeo.COORDINATES_KEY] = {"longitude": 1.0, "latitude": 1.0}
+
+    result = await geo.enrich(modified, "成都", previous)
+
+    assert amap.keywords == ["找不到的小店"]
+    assert amap.addresses == ["成都春熙路"]
+    assert result["daily_itinerary"][0]["activities"][1][ItineraryGeo.COORDINATES_KEY] == {
+        "longitude": 104.5, "latitude": 30.5
+    }
+
+
+@pytest.mark.anyio
+async def test_failed_lookup_leaves_places_without_coordinates(amap, monkeypatch):
+    async def unavailable(keywords, city):
+        raise ConnectionError("高德不可用")
+
+    monkeypatch.setattr(MapService, "search_poi_batch", unavailable)
+    geo = ItineraryGeo(enabled=True)
+
+    result = await geo.enrich(one_day_plan(), "成都")
+
+    assert coordinates(result) == [None] * 5
+    assert geo.stats()["errors"] == 1
+
+
+@pytest.mark.anyio
+async def test_disabled_returns_itinerary_unchanged(amap):
+    plan = one_day_plan()
+    assert await ItineraryGeo(enabled=False).enrich(plan, "成都") is plan
+    assert amap.keywords == []
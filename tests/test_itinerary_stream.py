@@ -0,0 +1,102 @@
+"""
+行程流式解析 - 跨分片的单日事件、字符串中的转义引号和括号，以及截断时使用已解析的片段
+"""
+import json
+import pytest
+from backend.services import itinerary_stream
+from backend.services.itinerary_stream import ItineraryStreamParser
+from .conftest import make_plan
+
+
+def feed_in_chunks(parser: ItineraryStreamParser, text: str, size: int):
+    events = []
+    for start in range(0, len(text), size):
+        events.extend(parser.feed(text[start:start + size]))
+    return events
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 64])
+def test_days_split_across_chunks(size):
+    plan = make_plan(3)
+    parser = ItineraryStreamParser()
+
+    events = feed_in_chunks(parser, json.dumps(plan, ensure_ascii=False), size)
+
+    days = [data for kind, data in events if kind == "day"]
+    assert [day["index"] for day in days] == [0, 1, 2]
+    assert [day["day"] for day in days] == plan["daily_itinerary"]
+    sections = {data["key"]: data["value"] for kind, data in events if kind == "section"}
+    assert sections["overview"] == plan["overview"]
+    assert sections["budget_breakdown"] == plan["budget_breakdown"]
+    assert parser.result() == plan
+
+
+def test_day_event_is_emitted_as_soon_as_the_day_closes():
+    parser = ItineraryStreamParser()
+    assert parser.feed('{"overview": "概览", "daily_itinerary": [{"day": 1, "title": "第一') == [
+        ("section", {"key": "overview", "value": "概览"})
+    ]
+    assert parser.feed('天"}') == [("day", {"index": 0, "day": {"day": 1, "title": "第一天"}})]
+    assert parser.feed(', {"day": 2') == []
+
+
+def test_escaped_quotes_and_braces_inside_strings():
+    plan = {
+        "overview": '去"宽窄巷子"看看 {不是对象} [也不是数组]',
+        "daily_itinerary": [
+            {"day": 1, "title": '引号\\"和}括号]', "activities": [{"name": '反斜杠 \\ 结尾\\'}]},
+            {"day": 2, "title": "第二天"}
+        ],
+        "tips": ["{", "}", '"]'],
+    }
+    parser = ItineraryStreamParser()
+
+    events = feed_in_chunks(parser, json.dumps(plan, ensure_ascii=False), 2)
+
+    assert [data["day"] for kind, data in events if kind == "day"] == plan["daily_itinerary"]
+    sections = {data["key"]: data["value"] for kind, data in events if kind == "section"}
+    assert sections == {"overview": plan["overview"], "tips": plan["tips"]}
+    assert parser.result() == plan
+
+
+def test_primitive_sections_and_text_around_the_object():
+    parser = ItineraryStreamParser()
+    events = parser.feed('好的，行程如下：\n{"days": 2, "ok": true, "note": null, "daily_itinerary": []}\n以上')
+
+    assert events == [
+        ("section", {"key": "days", "value": 2}),
+        ("section", {"key": "ok", "value": True}),
+        ("section", {"key": "note", "value": None}),
+    ]
+    assert parser.feed('{"ignored": 1}') == []
+
+
+def test_result_falls_back_to_parsed_sections_after_truncation(monkeypatch):
+    plan = make_plan(3)
+    text = json.dumps(plan, ensure_ascii=False)
+    truncated = text[:text.index('"day": 3')]
+    parser = ItineraryStreamParser()
+    parser.feed(truncated)
+
+    # 整体解析（包括修复）失败时，使用流式过程中已经完整的片段
+    def broken(text):
+        raise json.JSONDecodeError("无法修复", text, 0)
+
+    monkeypatch.setattr(itinerary_stream, "loads_tolerant", broken)
+    result = parser.result()
+
+    assert result["overview"] == plan["overview"]
+    assert result["daily_itinerary"] == plan["daily_itinerary"][:2]
+    assert "budget_breakdown" not in result
+
+
+def test_result_without_any_day_raises(monkeypatch):
+    parser = ItineraryStreamParser()
+    parser.feed('{"overview": "只有概览", "daily_itinerary": [{"day": 1, "ti')
+
+    def broken(text):
+        raise json.JSONDecodeError("无法修复", text, 0)
+
+    monkeypatch.setattr(itinerary_stream, "loads_tolerant", broken)
+    with pytest.raises(Exception, match="未找到可用的行程数据"):
+        parser.result()
@@ -0,0 +1,150 @@
+"""
+JSON Patch（RFC 6902）- 各操作、失败的 test、越界下标，以及增量修改失败时回退到完整重新生成
+"""
+import json
+import pytest
+from backend.services.ai_service import AIService
+from backend.services.json_patch import JsonPatchError, apply_patch
+from .conftest import make_plan
+
+
+@pytest.fixture
+def document():
+    return {"title": "行程", "days": [{"name": "a"}, {"name": "b"}], "a/b": 1, "m~n": 2}
+
+
+@pytest.mark.parametrize("operation, expected", [
+    ({"op": "add", "path": "/note", "value": "新"}, {"note": "新"}),
+    ({"op": "add", "path": "/days/1", "value": {"name": "x"}}, {"days": [{"name": "a"}, {"name": "x"}, {"name": "b"}]}),
+    ({"op": "add", "path": "/days/-", "value": {"name": "c"}}, {"days": [{"name": "a"}, {"name": "b"}, {"name": "c"}]}),
+    ({"op": "replace", "path": "/days/0/name", "value": "z"}, {"days": [{"name": "z"}, {"name": "b"}]}),
+    ({"op": "replace", "path": "/a~1b", "value": 3}, {"a/b": 3}),
+    ({"op": "replace", "path": "/m~0n", "value": 4}, {"m~n": 4}),
+    ({"op": "move", "path": "/days/0", "from": "/days/1"}, {"days": [{"name": "b"}, {"name": "a"}]}),
+    ({"op": "move", "path": "/renamed", "from": "/title"}, {"renamed": "行程"}),
+    ({"op": "copy", "path": "/days/-", "from": "/days/0"}, {"days": [{"name": "a"}, {"name": "b"}, {"name": "a"}]}),
+    ({"op": "test", "path": "/days/1/name", "value": "b"}, {}),
+])
+def test_operations(document, operation, expected):
+    result = apply_patch(document, [operation])
+
+    for key, value in expected.items():
+        assert result[key] == value
+    if operation["op"] == "move" and operation["from"] == "/title":
+        assert "title" not in result
+
+
+def test_remove(document):
+    result = apply_patch(document, [
+        {"op": "remove", "path": "/days/0"},
+        {"op": "remove", "path": "/a~1b"}
+    ])
+    assert result["days"] == [{"name": "b"}]
+    assert "a/b" not in result
+
+
+def test_original_document_is_not_modified(document):
+    original = json.loads(json.dumps(document))
+    result = apply_patch(document, [{"op": "add", "path": "/days/0/extra", "value": [1]}])
+    result["days"][1]["name"] = "changed"
+    assert document == original
+
+
+def test_copied_value_is_independent(document):
+    result = apply_patch(document, [{"op": "copy", "path": "/days/-", "from": "/days/0"}])
+    result["days"][2]["name"] = "changed"
+    assert result["days"][0]["name"] == "a"
+
+
+@pytest.mark.parametrize("operations", [
+    [{"op": "test", "path": "/days/0/name", "value": "不对"}],
+    [{"op": "replace", "path": "/title", "value": "新"}, {"op": "test", "path": "/title", "value": "行程"}],
+    [{"op": "test", "path": "/missing", "value": 1}],
+])
+def test_failing_test_operation(document, operations):
+    with pytest.raises(JsonPatchError):
+        apply_patch(document, operations)
+
+
+@pytest.mark.parametrize("operation", [
+    {"op": "replace", "path": "/days/2/name", "value": "x"},
+    {"op": "remove", "path": "/days/2"},
+    {"op": "add", "path": "/days/3", "value": {}},
+    {"op": "remove", "path": "/days/-"},
+    {"op": "replace", "path": "/days/01/name", "value": "x"},
+    {"op": "replace", "path": "/days/first/name", "value": "x"},
+    {"op": "copy", "path": "/days/-", "from": "/days/5"},
+])
+def test_out_of_range_or_invalid_index(document, operation):
+    with pytest.raises(JsonPatchError):
+        apply_patch(document, [operation])
+
+
+@pytest.mark.parametrize("operations", [
+    {"op": "add", "path": "/x", "value": 1},
+    [{"op": "add", "path": "/x"}],
+    [{"op": "move", "path": "/x"}],
+    [{"op": "add", "path": "x", "value": 1}],
+    [{"op": "remove", "path": ""}],
+    [{"op": "move", "path": "/days/0/inner", "from": "/days"}],
+    [{"op": "rename", "path": "/title"}],
+    [{"op": "remove", "path": "/nothing/here"}],
+])
+def test_invalid_patch(document, operations):
+    with pytest.raises(JsonPatchError):
+        apply_patch(document, operations)
+
+
+def test_itinerary_patch_replaces_days_then_applies_operations():
+    plan = make_plan(3)
+    new_day = dict(plan["daily_itinerary"][1], title="换一天")
+    patch = {
+        "replace_days": [new_day],
+        "operations": [{"op": "replace", "path": "/budget_breakdown/total", "value": 2000}]
+    }
+
+    result = AIService._apply_itinerary_patch(plan, patch, 3)
+
+    assert result["daily_itinerary"][1]["title"] == "换一天"
+    assert result["budget_breakdown"]["total"] == 2000
+    assert plan["budget_breakdown"]["total"] == 1800
+
+
+@pytest.mark.parametrize("patch", [
+    {},
+    {"replace_days": [{"day": 9, "activities": []}]},
+    {"operations": [{"op": "remove", "path": "/daily_itinerary/2"}]},
+    {"operations": [{"op": "replace", "path": "/daily_itinerary/5/title", "value": "x"}]},
+])
+def test_itinerary_patch_rejects_invalid_changes(patch):
+    with pytest.raises(ValueError):
+        AIService._apply_itinerary_patch(make_plan(3), patch, 3)
+
+
+@pytest.mark.anyio
+async def test_invalid_patch_falls_back_to_full_regeneration(fake_llm):
+    plan = make_plan(3)
+    regenerated = make_plan(3)
+    regenerated["overview"] = "完整重新生成"
+    invalid_patch = json.dumps({
+        "operations": [{"op": "replace", "path": "/daily_itinerary/7/title", "value": "越界"}]
+    })
+    llm = fake_llm(lambda prompt: invalid_patch if "replace_days" in prompt else json.dumps(regenerated, ensure_ascii=False))
+
+    result = await AIService.modify_itinerary_async(plan, "成都", 3, 3000, 2, "第八天改一下")
+
+    assert result["overview"] == "完整重新生成"
+    assert len(llm.prompts) == 2
+    assert "replace_days" in llm.prompts[0]
+    assert "replace_days" not in llm.prompts[1]
+
+
+@pytest.mark.anyio
+async def test_valid_patch_does_not_regenerate(fake_llm):
+    patch = json.dumps({"operations": [{"op": "replace", "path": "/daily_itinerary/0/title", "value": "新标题"}]})
+    llm = fake_llm(patch)
+
+    result = await AIService.modify_itinerary_async(make_plan(3), "成都", 3, 3000, 2, "改第一天标题")
+
+    assert result["daily_itinerary"][0]["title"] == "新标题"
+    assert len(llm.prompts) == 1
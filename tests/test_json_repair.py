@@ -0,0 +1,164 @@
+"""
+JSON 修复 - 模型实际返回过的不规范 JSON
+
+每个用例为 (名称, 模型输出, 期望的解析结果, 期望触发的修复规则)。
+"""
+import json
+import pytest
+from backend.services.json_repair import JsonRepairer, loads_tolerant, repair_json
+
+CORPUS = [
+    (
+        "markdown_fence",
+        '好的，以下是您的行程：\n```json\n{"overview": "成都3日游", "tips": ["带伞"]}\n```\n祝您旅途愉快！',
+        {"overview": "成都3日游", "tips": ["带伞"]},
+        set()
+    ),
+    (
+        "cost_prose",
+        '{"activities": [{"activity": "宽窄巷子", "estimated_cost": 交通+门票 约100}]}',
+        {"activities": [{"activity": "宽窄巷子", "estimated_cost": 100}]},
+        {"cost_prose"}
+    ),
+    (
+        "cost_prose_without_number",
+        '{"activity": "锦里", "estimated_cost": 视个人消费而定}',
+        {"activity": "锦里", "estimated_cost": 0},
+        {"cost_prose"}
+    ),
+    (
+        "cost_arithmetic_with_result",
+        '{"estimated_cost": 1000 + 100 = 1100, "tips": []}',
+        {"estimated_cost": 1100, "tips": []},
+        {"cost_arithmetic"}
+    ),
+    (
+        "cost_arithmetic",
+        '{"budget_breakdown": {"meals": 3 * 150 + 80, "total": 2000}}',
+        {"budget_breakdown": {"meals": 530, "total": 2000}},
+        {"cost_arithmetic"}
+    ),
+    (
+        "valid_cost_untouched",
+        '{"estimated_cost": 500, "avg_cost": 0}',
+        {"estimated_cost": 500, "avg_cost": 0},
+        set()
+    ),
+    (
+        "comments",
+        '{\n  "overview": "行程", // 概述\n  /* 预算 */ "budget": 3000\n}',
+        {"overview": "行程", "budget": 3000},
+        {"comment"}
+    ),
+    (
+        "comment_after_number",
+        '{\n  "day": 1 // 第一天\n}',
+        {"day": 1},
+        {"comment"}
+    ),
+    (
+        "trailing_commas",
+        '{"tips": ["带伞", "防晒",], "day": 1,}',
+        {"tips": ["带伞", "防晒"], "day": 1},
+        {"trailing_comma"}
+    ),
+    (
+        "missing_comma_between_pairs",
+        '{"a": 1 "b": 2}',
+        {"a": 1, "b": 2},
+        {"missing_comma"}
+    ),
+    (
+        "missing_comma_across_lines",
+        '{\n  "time": "09:00"\n  "activity": "杜甫草堂"\n}',
+        {"time": "09:00", "activity": "杜甫草堂"},
+        {"missing_comma"}
+    ),
+    (
+        "missing_comma_after_unquoted_value",
+        '{"transport": 地铁2号线 "duration": 30}',
+        {"transport": "地铁2号线", "duration": 30},
+        {"unquoted_string", "missing_comma"}
+    ),
+    (
+        "unquoted_url",
+        '{"website": http://www.chengdu.gov.cn, "tel": 028-12345678}',
+        {"website": "http://www.chengdu.gov.cn", "tel": "028-12345678"},
+        {"unquoted_string"}
+    ),
+    (
+        "unquoted_url_then_comment",
+        '{"website": https://example.com/path // 官网\n}',
+        {"website": "https://example.com/path"},
+        {"unquoted_string", "comment"}
+    ),
+    (
+        "url_in_string",
+        '{"website": "http://example.com//a"}',
+        {"website": "http://example.com//a"},
+        set()
+    ),
+    (
+        "newline_in_string",
+        '{"description": "第一行\n第二行"}',
+        {"description": "第一行\n第二行"},
+        {"control_char"}
+    ),
+    (
+        "missing_value",
+        '{"hotel": , "price_per_night": }',
+        {"hotel": None, "price_per_night": None},
+        {"missing_value"}
+    ),
+    (
+        "truncated_in_string",
+        '{"overview": "成都", "tips": ["带伞", "注意防',
+        {"overview": "成都", "tips": ["带伞", "注意防"]},
+        {"truncated"}
+    ),
+    (
+        "truncated_after_key",
+        '{"overview": "成都", "daily_itinerary": [{"day": 1, "title"',
+        {"overview": "成都", "daily_itinerary": [{"day": 1}]},
+        {"truncated"}
+    ),
+    (
+        "truncated_after_colon",
+        '{"overview": "成都", "budget_breakdown": {"total": ',
+        {"overview": "成都", "budget_breakdown": {}},
+        {"truncated"}
+    ),
+    (
+        "trailing_text",
+        '{"day": 1}\n以上行程仅供参考。{"extra": true}',
+        {"day": 1},
+        set()
+    ),
+]
+
+
+@pytest.mark.parametrize("text, expected, rules", [case[1:] for case in CORPUS], ids=[case[0] for case in CORPUS])
+def test_corpus(text, expected, rules):
+    result, repairs = loads_tolerant(text)
+    assert result == expected
+    assert rules <= set(repairs)
+
+
+@pytest.mark.parametrize("text", [case[1] for case in CORPUS], ids=[case[0] for case in CORPUS])
+def test_streaming_matches_single_pass(text):
+    body = text[text.find("{"):]
+    expected, _ = repair_json(body)
+    for size in (1, 2, 3, 7):
+        repairer = JsonRepairer()
+        for start in range(0, len(body), size):
+            repairer.feed(body[start:start + size])
+        assert repairer.finish() == expected, f"分段大小 {size}"
+
+
+def test_valid_json_skips_repair():
+    text = json.dumps({"overview": "行程", "daily_itinerary": [{"day": 1, "activities": []}]}, ensure_ascii=False)
+    timings = {}
+    result, repairs = loads_tolerant(text, timings)
+    assert result["daily_itinerary"][0]["day"] == 1
+    assert repairs == {}
+    assert timings["repair"] == 0.0
@@ -0,0 +1,62 @@
+"""
+大模型提供方 - 接口约束和 DashScope 的单次调用配置
+"""
+import dashscope
+import pytest
+from backend.config import settings
+from backend.services.llm_provider import (
+    DashScopeProvider, LLMProvider, LLMResponse, get_llm_provider, set_llm_provider
+)
+
+
+class _RecordingGeneration:
+    """记录调用参数"""
+
+    def __init__(self):
+        self.calls = []
+
+    def call(self, **params):
+        self.calls.append(params)
+        if params["stream"]:
+            return iter([LLMResponse.from_text("部分"), LLMResponse.from_text("内容")])
+        return LLMResponse.from_text("完整内容")
+
+
+def test_provider_interface_is_abstract():
+    with pytest.raises(TypeError):
+        LLMProvider()
+
+    class CallOnly(LLMProvider):
+        def call(self, model, prompt, **kwargs):
+            return LLMResponse.from_text("")
+
+    with pytest.raises(TypeError):
+        CallOnly()
+
+
+def test_dashscope_call_is_a_single_non_stream_request():
+    default_url = dashscope.base_http_api_url
+    provider = DashScopeProvider("key", timeout=30)
+    provider._generation = generation = _RecordingGeneration()
+
+    assert provider.call("qwen-max", "你好").output.choices[0].message.content == "完整内容"
+    assert len(list(provider.stream("qwen-max", "你好"))) == 2
+
+    call_params, stream_params = generation.calls
+    assert call_params["request_timeout"] == stream_params["request_timeout"] == 30
+    assert call_params["stream"] is False
+    assert "incremental_output" not in call_params
+    assert stream_params["stream"] is True
+    assert stream_params["incremental_output"] is True
+    assert dashscope.base_http_api_url == default_url
+
+
+def test_dashscope_rejects_custom_base_url(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_PROVIDER", "dashscope")
+    monkeypatch.setattr(settings, "LLM_BASE_URL", "http://127.0.0.1:9000/api/v1")
+    set_llm_provider(None)
+    try:
+        with pytest.raises(ValueError, match="LLM_PROVIDER=openai"):
+            get_llm_provider()
+    finally:
+        set_llm_provider(None)
@@ -0,0 +1,156 @@
+"""
+大模型调用调度 - 优先级排队、截止时间拒绝、Token 用量修正和释放后唤醒等待者
+"""
+import time
+import threading
+import pytest
+from backend.services.llm_scheduler import LLMOverloadedError, LLMScheduler
+
+INTERACTIVE = LLMScheduler.PRIORITY_INTERACTIVE
+MODIFY = LLMScheduler.PRIORITY_MODIFY
+BACKGROUND = LLMScheduler.PRIORITY_BACKGROUND
+
+
+def make_scheduler(max_concurrency=1, requests_per_minute=0, tokens_per_minute=0, max_queue=10, timeout=10.0):
+    return LLMScheduler(
+        max_concurrency=max_concurrency,
+        requests_per_minute=requests_per_minute,
+        tokens_per_minute=tokens_per_minute,
+        max_queue=max_queue,
+        queue_timeouts={INTERACTIVE: timeout, MODIFY: timeout, BACKGROUND: timeout}
+    )
+
+
+def wait_for_queue(scheduler: LLMScheduler, depth: int):
+    deadline = time.monotonic() + 5
+    while scheduler.stats()["queue_depth"] != depth:
+        assert time.monotonic() < deadline, "等待者没有进入队列"
+        time.sleep(0.005)
+
+
+def start_waiter(scheduler: LLMScheduler, priority: int, label: str, admitted: list, errors: list, tokens=0):
+    def run():
+        try:
+            with scheduler.slot(priority, tokens):
+                admitted.append(label)
+        except LLMOverloadedError as e:
+            errors.append((label, e))
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_waiters_are_admitted_by_priority_then_arrival():
+    scheduler = make_scheduler()
+    admitted, errors, threads = [], [], []
+    with scheduler.slot(INTERACTIVE, 0):
+        for priority, label in [
+            (BACKGROUND, "background"), (MODIFY, "modify-1"), (INTERACTIVE, "interactive"), (MODIFY, "modify-2")
+        ]:
+            threads.append(start_waiter(scheduler, priority, label, admitted, errors))
+            wait_for_queue(scheduler, len(threads))
+    for thread in threads:
+        thread.join(5)
+
+    assert not errors
+    assert admitted == ["interactive", "modify-1", "modify-2", "background"]
+    assert scheduler.stats()["max_queue_depth"] == 4
+
+
+def test_release_wakes_waiter_promptly():
+    scheduler = make_scheduler(timeout=10)
+    admitted, errors = [], []
+    with scheduler.slot(INTERACTIVE, 0):
+        thread = start_waiter(scheduler, INTERACTIVE, "waiter", admitted, errors)
+        wait_for_queue(scheduler, 1)
+        released = time.monotonic()
+    thread.join(5)
+
+    assert admitted == ["waiter"]
+    assert time.monotonic() - released < 1
+    assert scheduler.stats()["active"] == 0
+
+
+def test_queue_full_is_rejected():
+    scheduler = make_scheduler(max_queue=1)
+    admitted, errors = [], []
+    with scheduler.slot(INTERACTIVE, 0):
+        thread = start_waiter(scheduler, INTERACTIVE, "queued", admitted, errors)
+        wait_for_queue(scheduler, 1)
+        with pytest.raises(LLMOverloadedError, match="排队已满"):
+            with scheduler.slot(INTERACTIVE, 0):
+                pass
+    thread.join(5)
+
+    assert admitted == ["queued"]
+    assert scheduler.stats()["by_priority"]["interactive"]["rejected_queue_full"] == 1
+
+
+def test_queue_deadline_expires():
+    scheduler = make_scheduler(timeout=0.2)
+    with scheduler.slot(INTERACTIVE, 0):
+        started = time.monotonic()
+        with pytest.raises(LLMOverloadedError, match="排队超时"):
+            with scheduler.slot(BACKGROUND, 0):
+                pass
+        elapsed = time.monotonic() - started
+
+    assert 0.15 < elapsed < 2
+    stats = scheduler.stats()
+    assert stats["queue_depth"] == 0
+    assert stats["by_priority"]["background"]["rejected_deadline"] == 1
+
+
+def test_rejected_up_front_when_rate_limit_exceeds_deadline():
+    # 每秒补充 1 个 Token
+    scheduler = make_scheduler(max_concurrency=5, tokens_per_minute=60, timeout=5)
+    with scheduler.slot(INTERACTIVE, 60):
+        pass
+
+    started = time.monotonic()
+    with pytest.raises(LLMOverloadedError, match="调用频率"):
+        with scheduler.slot(INTERACTIVE, 30):
+            pass
+    assert time.monotonic() - started < 0.5
+    assert scheduler.stats()["queue_depth"] == 0
+
+
+def test_settle_refunds_and_charges_actual_usage():
+    scheduler = make_scheduler(max_concurrency=5, tokens_per_minute=60)
+    with scheduler.slot(INTERACTIVE, 40) as ticket:
+        assert scheduler.stats()["llm_tokens_available"] == pytest.approx(20, abs=1)
+    scheduler.settle(ticket, 10)
+    assert scheduler.stats()["llm_tokens_available"] == pytest.approx(50, abs=1)
+
+    with scheduler.slot(INTERACTIVE, 20) as ticket:
+        pass
+    scheduler.settle(ticket, 50)
+    assert scheduler.stats()["llm_tokens_available"] == pytest.approx(0, abs=1)
+
+    # 没有实际用量时保留估算值
+    scheduler.settle(ticket, None)
+    assert scheduler.stats()["llm_tokens_available"] == pytest.approx(0, abs=1)
+
+
+def test_estimate_is_clamped_to_bucket_capacity():
+    scheduler = make_scheduler(max_concurrency=5, tokens_per_minute=60)
+    with scheduler.slot(INTERACTIVE, 10000) as ticket:
+        assert ticket["estimated_tokens"] == 60
+
+
+def test_settle_refund_wakes_token_waiter():
+    scheduler = make_scheduler(max_concurrency=5, tokens_per_minute=60, timeout=60)
+    with scheduler.slot(INTERACTIVE, 60) as ticket:
+        pass
+
+    admitted, errors = [], []
+    thread = start_waiter(scheduler, INTERACTIVE, "waiter", admitted, errors, tokens=30)
+    wait_for_queue(scheduler, 1)
+    refunded = time.monotonic()
+    scheduler.settle(ticket, 10)
+    thread.join(5)
+
+    assert not errors
+    assert admitted == ["waiter"]
+    assert time.monotonic() - refunded < 1
@@ -0,0 +1,39 @@
+"""
+运行指标 - 与 /travel/cache/stats 一样仅限管理员访问
+"""
+import httpx
+import pytest
+from backend.config import settings
+from backend.main import app
+
+ENDPOINTS = ["/api/metrics", "/api/metrics/llm", "/travel/cache/stats"]
+
+
+@pytest.fixture
+async def client():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+        yield client
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("path", ENDPOINTS)
+async def test_requires_login(client, path):
+    response = await client.get(path)
+    assert response.status_code in (401, 403)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("path", ENDPOINTS)
+async def test_rejects_non_admin(client, auth_headers, monkeypatch, path):
+    monkeypatch.setattr(settings, "ADMIN_USERNAMES", "someone-else")
+    response = await client.get(path, headers=auth_headers)
+    assert response.status_code == 403
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("path", ENDPOINTS)
+async def test_admin_can_read(client, user, auth_headers, monkeypatch, path):
+    monkeypatch.setattr(settings, "ADMIN_USERNAMES", user.username)
+    response = await client.get(path, headers=auth_headers)
+    assert response.status_code == 200
@@ -0,0 +1,42 @@
+"""
+模型档位路由 - 主档位失败时改用备用档位
+"""
+import pytest
+from backend.config import settings
+from backend.services.model_router import ModelRouter
+
+
+@pytest.fixture
+def router():
+    router = ModelRouter(max_workers=2)
+    yield router
+    router.shutdown()
+
+
+@pytest.mark.parametrize("hedge_enabled", [False, True])
+def test_falls_back_to_other_tier_on_error(router, monkeypatch, hedge_enabled):
+    monkeypatch.setattr(settings, "AI_HEDGE_ENABLED", hedge_enabled)
+    calls = []
+
+    def attempt(model):
+        calls.append(model)
+        if model == settings.AI_MODEL_MAX:
+            raise ValueError("无法解析")
+        return "ok"
+
+    assert router.call("travel_plan", attempt) == "ok"
+    assert calls == [settings.AI_MODEL_MAX, settings.AI_MODEL_FAST]
+    stats = router.stats()["tasks"]["travel_plan"]
+    assert stats["fallback_on_error"] == 1
+    assert stats["served_fast"] == 1
+
+
+def test_raises_when_both_tiers_fail(router, monkeypatch):
+    monkeypatch.setattr(settings, "AI_HEDGE_ENABLED", False)
+
+    def attempt(model):
+        raise ValueError(model)
+
+    with pytest.raises(ValueError, match=settings.AI_MODEL_FAST):
+        router.call("travel_plan", attempt)
+    assert router.stats()["tasks"]["travel_plan"]["failed"] == 1
@@ -0,0 +1,96 @@
+"""
+优化景点游览顺序 - 只有顺序变化才算优化，较早计划补全的坐标单独保存
+"""
+import copy
+from datetime import datetime
+import httpx
+import pytest
+from backend.main import app
+from backend.database import SessionLocal
+from backend.models import TravelPlan
+from backend.services.itinerary_geo import itinerary_geo
+
+# 沿经线排列，原顺序已经最短
+POSITIONS = [(104.00, 30.0), (104.01, 30.0), (104.02, 30.0)]
+
+
+def _itinerary(positions, with_coordinates: bool) -> dict:
+    activities = []
+    for index, (longitude, latitude) in enumerate(positions):
+        activity = {"time": f"0{8 + index}:00", "activity": f"景点{index}", "poi_name": f"景点{index}"}
+        if with_coordinates:
+            activity["coordinates"] = {"longitude": longitude, "latitude": latitude}
+        activities.append(activity)
+    return {"overview": "成都1日游", "daily_itinerary": [{"day": 1, "activities": activities}]}
+
+
+def _create_plan(user, itinerary: dict) -> int:
+    db = SessionLocal()
+    try:
+        plan = TravelPlan(
+            user_id=user.id, title="成都1日游", destination="成都",
+            start_date=datetime(2030, 5, 1), end_date=datetime(2030, 5, 1),
+            days=1, budget=1000, itinerary=itinerary
+        )
+        db.add(plan)
+        db.commit()
+        return plan.id
+    finally:
+        db.close()
+
+
+def _saved_itinerary(plan_id: int) -> dict:
+    db = SessionLocal()
+    try:
+        return db.get(TravelPlan, plan_id).itinerary
+    finally:
+        db.close()
+
+
+async def _optimize(plan_id: int, auth_headers: dict, apply: bool) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+        response = await client.post(
+            f"/travel/plans/{plan_id}/optimize-route", headers=auth_headers, json={"apply": apply}
+        )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.mark.anyio
+async def test_optimal_plan_is_not_reported_as_changed(user, auth_headers):
+    plan_id = _create_plan(user, _itinerary(POSITIONS, with_coordinates=True))
+
+    result = await _optimize(plan_id, auth_headers, apply=True)
+
+    assert result["applied"] is False
+    assert result["coordinates_saved"] is False
+    assert result["days"][0]["reordered"] is False
+
+
+@pytest.mark.anyio
+async def test_enriched_coordinates_are_saved_without_apply(user, auth_headers, monkeypatch):
+    plan_id = _create_plan(user, _itinerary(POSITIONS, with_coordinates=False))
+
+    async def enrich(itinerary, destination, previous=None):
+        return _itinerary(POSITIONS, with_coordinates=True)
+
+    monkeypatch.setattr(itinerary_geo, "enrich", enrich)
+    result = await _optimize(plan_id, auth_headers, apply=False)
+
+    assert result["applied"] is False
+    assert result["coordinates_saved"] is True
+    assert _saved_itinerary(plan_id) == _itinerary(POSITIONS, with_coordinates=True)
+
+
+@pytest.mark.anyio
+async def test_reordered_plan_is_applied(user, auth_headers):
+    shuffled = [POSITIONS[0], POSITIONS[2], POSITIONS[1]]
+    original = _itinerary(shuffled, with_coordinates=True)
+    plan_id = _create_plan(user, copy.deepcopy(original))
+
+    result = await _optimize(plan_id, auth_headers, apply=True)
+
+    assert result["applied"] is True
+    assert result["days"][0]["reordered"] is True
+    assert _saved_itinerary(plan_id) != original
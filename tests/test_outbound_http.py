@@ -0,0 +1,29 @@
+"""
+出站 HTTP - 事件循环变化时关闭原来的客户端
+"""
+import asyncio
+from backend.services.outbound_http import OutboundHTTP
+
+
+def test_client_is_replaced_and_closed_when_event_loop_changes():
+    http = OutboundHTTP()
+
+    first = asyncio.run(http._get_client())
+    assert asyncio.run(http._get_client()) is not first
+    assert first.is_closed
+
+    asyncio.run(http.stop())
+
+
+def test_client_is_reused_within_event_loop():
+    http = OutboundHTTP()
+
+    async def run():
+        first = await http._get_client()
+        second = await http._get_client()
+        await http.stop()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first is second
+    assert first.is_closed
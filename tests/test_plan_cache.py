@@ -0,0 +1,113 @@
+"""
+旅行计划结果缓存 - 缓存键归一化、TTL 过期、LRU 淘汰，以及读写之间互不影响的深拷贝
+"""
+from types import SimpleNamespace
+import pytest
+from backend.services import plan_cache as plan_cache_module
+from backend.services.plan_cache import PlanCache
+from .conftest import make_plan
+
+TTL = 3600
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(plan_cache_module, "time", SimpleNamespace(time=clock.time))
+    return clock
+
+
+@pytest.fixture
+def cache(clock):
+    return PlanCache(max_entries=2, ttl_seconds=TTL, budget_bucket=500)
+
+
+@pytest.mark.parametrize("first, second", [
+    (("成都", 3, 3000, 2, "美食"), ("成都市", 3, 3100, 2, "美食")),
+    ((" 成 都 ", 3, 3000, 2, None), ("成都", 3, 3499, 2, "")),
+    (("Chengdu", 3, 3000, 2, "美食,购物"), ("chengdu", 3, 3000, 2, "购物、美食")),
+    (("成都", 3, 3000, 2, "美食和购物"), ("成都", 3, 3000, 2, "购物 / 美食；美食")),
+])
+def test_equivalent_requests_share_a_key(cache, first, second):
+    assert cache.make_key(*first) == cache.make_key(*second)
+
+
+@pytest.mark.parametrize("other", [
+    ("重庆", 3, 3000, 2, "美食"),
+    ("成都", 4, 3000, 2, "美食"),
+    ("成都", 3, 3500, 2, "美食"),
+    ("成都", 3, 3000, 3, "美食"),
+    ("成都", 3, 3000, 2, "购物"),
+])
+def test_different_requests_get_different_keys(cache, other):
+    assert cache.make_key("成都", 3, 3000, 2, "美食") != cache.make_key(*other)
+
+
+def test_short_city_name_keeps_its_suffix():
+    assert PlanCache.normalize_destination("沙市") == "沙市"
+    assert PlanCache.normalize_destination("上海市") == "上海"
+
+
+def test_entries_expire_after_ttl(cache, clock):
+    key = cache.make_key("成都", 3, 3000, 2, None)
+    cache.set(key, make_plan(3))
+
+    clock.advance(TTL - 1)
+    assert cache.get(key) is not None
+    clock.advance(2)
+    assert cache.get(key) is None
+
+    stats = cache.stats()
+    assert stats["entries"] == 0
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted(cache):
+    first, second, third = (cache.make_key(city, 3, 3000, 2, None) for city in ("成都", "重庆", "西安"))
+    cache.set(first, make_plan(3, "成都"))
+    cache.set(second, make_plan(3, "重庆"))
+
+    # 读取后 first 变为最近使用，写入 third 时淘汰 second
+    assert cache.get(first) is not None
+    cache.set(third, make_plan(3, "西安"))
+
+    assert cache.get(second) is None
+    assert cache.get(first)["overview"] == "成都3日游"
+    assert cache.get(third)["overview"] == "西安3日游"
+    assert cache.stats()["entries"] == 2
+
+
+def test_get_and_set_use_independent_copies(cache):
+    key = cache.make_key("成都", 3, 3000, 2, None)
+    plan = make_plan(3)
+    cache.set(key, plan)
+
+    # 写入后修改原对象不影响缓存
+    plan["daily_itinerary"][0]["title"] = "改过的标题"
+    cached = cache.get(key)
+    assert cached["daily_itinerary"][0]["title"] == "第1天"
+
+    # 修改读取结果不影响缓存，也不影响其他读取者
+    cached["daily_itinerary"].clear()
+    assert len(cache.get(key)["daily_itinerary"]) == 3
+
+
+def test_invalidate_by_destination(cache):
+    cache.set(cache.make_key("成都市", 3, 3000, 2, None), make_plan(3))
+    cache.set(cache.make_key("重庆", 3, 3000, 2, None), make_plan(3, "重庆"))
+
+    assert cache.invalidate("成都") == 1
+    assert cache.stats()["entries"] == 1
+    assert cache.invalidate() == 1
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,35 @@
+"""
+预生成行程目录 - 截取天数时费用和文字一起调整
+"""
+from backend.models import DestinationPlan
+from backend.services.ai_service import AIService
+from backend.services.plan_catalog import PlanCatalog
+from .conftest import make_plan
+
+
+def _entry(days: int) -> DestinationPlan:
+    itinerary = make_plan(days)
+    itinerary["overview"] = "成都五日深度游（5天4晚）：第一天宽窄巷子，第二天大熊猫基地，第五天都江堰，兼顾美食与文化。"
+    itinerary["tips"] = ["第五天需要早起", "带好雨伞"]
+    return DestinationPlan(destination="成都", days=days, budget=5000, travelers_count=1, itinerary=itinerary)
+
+
+def test_rescale_rewrites_day_counts():
+    result = PlanCatalog.rescale(_entry(5), 3, 3000, 1)
+
+    AIService.validate_itinerary(result, 3)
+    assert result["overview"] == "成都三日深度游（3天2晚）：第一天宽窄巷子，第二天大熊猫基地，兼顾美食与文化。"
+    assert result["tips"] == ["带好雨伞"]
+    assert result["accommodation_summary"]["total_nights"] == 2
+
+
+def test_rescale_keeps_text_when_days_match():
+    entry = _entry(5)
+    result = PlanCatalog.rescale(entry, 5, 5000, 1)
+    assert result["overview"] == entry.itinerary["overview"]
+    assert result["tips"] == entry.itinerary["tips"]
+
+
+def test_rescale_to_one_day_drops_nights():
+    result = PlanCatalog.rescale(_entry(5), 1, 1000, 1)
+    assert result["overview"].startswith("成都一日深度游（1天）：第一天宽窄巷子，")
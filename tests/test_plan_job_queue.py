@@ -0,0 +1,125 @@
+"""
+旅行计划任务队列 - 进程内 worker 配合大模型替身完成 queued → running → succeeded / failed
+"""
+import asyncio
+import pytest
+from backend.database import SessionLocal
+from backend.models import PlanJob, TravelPlan
+from backend.routers.travel_router import _process_plan_job
+from backend.schemas import TravelPlanRequest
+from backend.services.llm_provider import LLMResponse
+from backend.services.plan_job_queue import PlanJobQueue
+from .conftest import plan_json
+
+
+def _request(destination: str) -> dict:
+    return TravelPlanRequest(
+        destination=destination,
+        start_date="2030-05-01",
+        end_date="2030-05-03",
+        budget=5000,
+        travelers_count=2,
+        use_cache=False,
+        generation_mode="single"
+    ).model_dump()
+
+
+def _job(job_id: int) -> PlanJob:
+    db = SessionLocal()
+    try:
+        return db.query(PlanJob).filter(PlanJob.id == job_id).first()
+    finally:
+        db.close()
+
+
+async def _wait_finished(job_id: int, timeout: float = 10) -> PlanJob:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        job = _job(job_id)
+        if job.status in PlanJobQueue.FINISHED_STATUSES:
+            return job
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"任务 {job_id} 未在 {timeout} 秒内完成")
+
+
+@pytest.fixture
+async def queue():
+    queue = PlanJobQueue(workers=1)
+    statuses = []
+
+    async def handler(job_id, user_id, request):
+        # 处理过程中任务应为 running
+        statuses.append(_job(job_id).status)
+        return await _process_plan_job(job_id, user_id, request)
+
+    queue.set_handler(handler)
+    queue.statuses = statuses
+    yield queue
+    await queue.stop()
+
+
+@pytest.mark.anyio
+async def test_job_succeeds(queue, fake_llm, user):
+    fake_llm(plan_json(3))
+    db = SessionLocal()
+    try:
+        job = queue.enqueue(db, user.id, _request("成都"))
+    finally:
+        db.close()
+    assert job.status == PlanJobQueue.STATUS_QUEUED
+
+    await queue.start()
+    job = await _wait_finished(job.id)
+
+    assert queue.statuses == [PlanJobQueue.STATUS_RUNNING]
+    assert job.status == PlanJobQueue.STATUS_SUCCEEDED
+    assert job.attempts == 1
+    assert job.error is None
+    db = SessionLocal()
+    try:
+        plan = db.query(TravelPlan).filter(TravelPlan.id == job.travel_plan_id).first()
+        assert plan.user_id == user.id
+        assert len(plan.itinerary["daily_itinerary"]) == 3
+    finally:
+        db.close()
+
+
+@pytest.mark.anyio
+async def test_job_fails(queue, fake_llm, user):
+    fake_llm(lambda prompt: LLMResponse.from_error(400, "invalid request"))
+    await queue.start()
+    db = SessionLocal()
+    try:
+        job = queue.enqueue(db, user.id, _request("西安"))
+    finally:
+        db.close()
+
+    job = await _wait_finished(job.id)
+    assert job.status == PlanJobQueue.STATUS_FAILED
+    assert job.error
+    assert job.travel_plan_id is None
+    assert job.finished_at is not None
+
+
+@pytest.mark.anyio
+async def test_unfinished_jobs_are_recovered_on_start(queue, fake_llm, user):
+    fake_llm(plan_json(3))
+    db = SessionLocal()
+    try:
+        # 上次运行时中断的任务（running）和尚未处理的任务（queued）
+        interrupted = PlanJob(user_id=user.id, status=PlanJobQueue.STATUS_RUNNING, request=_request("杭州"), attempts=1)
+        waiting = PlanJob(user_id=user.id, status=PlanJobQueue.STATUS_QUEUED, request=_request("厦门"), attempts=0)
+        db.add_all([interrupted, waiting])
+        db.commit()
+        interrupted_id, waiting_id = interrupted.id, waiting.id
+    finally:
+        db.close()
+
+    await queue.start()
+    interrupted = await _wait_finished(interrupted_id)
+    waiting = await _wait_finished(waiting_id)
+
+    assert interrupted.status == waiting.status == PlanJobQueue.STATUS_SUCCEEDED
+    assert interrupted.attempts == 2
+    assert waiting.attempts == 1
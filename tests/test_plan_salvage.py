@@ -0,0 +1,59 @@
+"""
+行程分段补全 - 只要求前端必需的字段，类型问题就地修复，只补全缺失的部分
+"""
+import json
+from backend.services.ai_service import AIService
+from backend.services.plan_salvage import PlanSalvage
+from .conftest import make_plan
+
+REQUIRED = list(PlanSalvage.REQUIRED_SECTIONS)
+
+
+def test_optional_sections_are_not_required():
+    plan = make_plan(3)
+    del plan["restaurant_recommendations"]
+    del plan["transportation"]
+    assert PlanSalvage.is_complete(plan, 3, REQUIRED)
+
+
+def test_type_mismatches_are_repaired_in_place():
+    plan = make_plan(3)
+    plan["tips"] = "带好雨伞\n提前预约熊猫基地"
+    plan["restaurant_recommendations"] = {"name": "陈麻婆豆腐"}
+    plan["transportation"] = "高铁"
+    plan["daily_itinerary"][1]["activities"] = []
+    del plan["daily_itinerary"][2]["activities"]
+
+    assert PlanSalvage.is_complete(plan, 3, REQUIRED)
+    assert plan["tips"] == ["带好雨伞", "提前预约熊猫基地"]
+    assert plan["restaurant_recommendations"] == [{"name": "陈麻婆豆腐"}]
+    assert "transportation" not in plan
+    assert plan["daily_itinerary"][2]["activities"] == []
+
+
+def test_missing_required_section_or_day_is_incomplete():
+    plan = make_plan(3)
+    del plan["budget_breakdown"]
+    assert not PlanSalvage.is_complete(plan, 3, REQUIRED)
+
+    plan = make_plan(3)
+    plan["daily_itinerary"].pop()
+    assert not PlanSalvage.is_complete(plan, 3, REQUIRED)
+
+
+def test_truncated_plan_only_regenerates_missing_day(fake_llm):
+    full = json.dumps(make_plan(3), ensure_ascii=False)
+    truncated = full[:full.index('{"day": 3')]
+    completion = json.dumps({
+        "daily_itinerary": [make_plan(3)["daily_itinerary"][2]],
+        "budget_breakdown": make_plan(3)["budget_breakdown"]
+    }, ensure_ascii=False)
+    llm = fake_llm(lambda prompt: completion if "需要补全" in prompt else truncated)
+
+    result = AIService.generate_travel_plan("成都", 3, 3000, 2, "美食")
+
+    assert [day["day"] for day in result["daily_itinerary"]] == [1, 2, 3]
+    assert result["budget_breakdown"]["total"] == 1800
+    assert len(llm.prompts) == 2
+    assert "第3天的完整行程" in llm.prompts[1]
+    assert "restaurant_recommendations" not in llm.prompts[1].split("需要补全：")[1].split("\n")[0]
@@ -0,0 +1,128 @@
+"""
+POI 空间索引 - 半径过滤、类型筛选、按距离排序和数量限制，以及重复 POI 的去重
+"""
+import math
+import random
+import pytest
+from backend.services.poi_index import METERS_PER_DEGREE, POIIndex, distance_meters
+
+CENTER = (104.0657, 30.6595)
+
+
+def make_poi(poi_id: str, longitude: float, latitude: float, type_name="餐饮服务;中餐厅;四川菜", typecode="050102"):
+    return {
+        "id": poi_id,
+        "name": f"地点{poi_id}",
+        "type": type_name,
+        "typecode": typecode,
+        "address": "人民南路",
+        "location": {"longitude": longitude, "latitude": latitude},
+        "tel": []
+    }
+
+
+def offset(meters_east: float, meters_north: float):
+    """距离中心点向东、向北若干米的坐标"""
+    longitude = CENTER[0] + meters_east / (METERS_PER_DEGREE * math.cos(math.radians(CENTER[1])))
+    return longitude, CENTER[1] + meters_north / METERS_PER_DEGREE
+
+
+@pytest.fixture
+def index():
+    # 网格约 1 公里，查询会跨越多个桶
+    return POIIndex(enabled=True, cell_degrees=0.01, max_pois=1000)
+
+
+@pytest.fixture
+def scattered(index):
+    """中心点周围 3 公里内随机分布的 300 个 POI，一半为酒店"""
+    rng = random.Random(3)
+    pois = []
+    for i in range(300):
+        poi = make_poi(f"B{i:04d}", *offset(rng.uniform(-3000, 3000), rng.uniform(-3000, 3000)))
+        if i % 2:
+            poi.update(type="住宿服务;宾馆酒店;四星级宾馆", typecode="100102")
+        pois.append(poi)
+    assert index.add_many(pois) == 300
+    return pois
+
+
+def _brute_force(pois, radius, predicate=lambda poi: True):
+    distances = {
+        poi["id"]: distance_meters(*CENTER, poi["location"]["longitude"], poi["location"]["latitude"])
+        for poi in pois if predicate(poi)
+    }
+    return {poi_id for poi_id, distance in distances.items() if distance <= radius}
+
+
+@pytest.mark.parametrize("radius", [300, 1000, 2500])
+def test_nearby_returns_exactly_the_pois_inside_the_radius(index, scattered, radius):
+    results = index.nearby(*CENTER, radius, limit=1000)
+
+    assert {poi["id"] for poi in results} == _brute_force(scattered, radius)
+    assert all(int(poi["distance"]) <= radius for poi in results)
+
+
+def test_nearby_is_sorted_by_distance_and_limited(index, scattered):
+    everything = index.nearby(*CENTER, 2000, limit=1000)
+    nearest = index.nearby(*CENTER, 2000, limit=10)
+
+    assert [poi["id"] for poi in nearest] == [poi["id"] for poi in everything[:10]]
+    distances = [int(poi["distance"]) for poi in everything]
+    assert distances == sorted(distances)
+
+
+@pytest.mark.parametrize("types, expected_code", [
+    ("050000", "05"),
+    ("100102", "100102"),
+    ("宾馆酒店", "10"),
+    ("050000|100000", ""),
+])
+def test_nearby_filters_by_type(index, scattered, types, expected_code):
+    results = index.nearby(*CENTER, 2000, types=types, limit=1000)
+
+    assert {poi["id"] for poi in results} == _brute_force(
+        scattered, 2000, lambda poi: poi["typecode"].startswith(expected_code)
+    )
+    assert index.nearby(*CENTER, 2000, types="不存在的类型") == []
+
+
+def test_record_round_trips_the_poi_fields(index):
+    poi = make_poi("B001", *offset(100, 0))
+    index.add(poi)
+
+    (result,) = index.nearby(*CENTER, 500)
+
+    assert result["distance"] == "100"
+    result.pop("distance")
+    assert result == dict(poi, tel="")
+
+
+def test_duplicate_ids_are_rejected(index):
+    assert index.add(make_poi("B001", *offset(100, 0)))
+    assert not index.add(make_poi("B001", *offset(100, 0)))
+    assert index.add_many([make_poi("B001", *offset(100, 0)), make_poi("B002", *offset(200, 0))]) == 1
+
+    assert len(index) == 2
+    assert index.stats()["duplicates"] == 2
+    assert [poi["id"] for poi in index.nearby(*CENTER, 500)] == ["B001", "B002"]
+
+
+def test_invalid_pois_are_skipped_and_capacity_is_enforced():
+    index = POIIndex(enabled=True, cell_degrees=0.01, max_pois=2)
+    invalid = [
+        None,
+        make_poi("", *CENTER),
+        {"id": "B100", "location": {"longitude": CENTER[0]}},
+    ]
+    assert index.add_many(invalid) == 0
+
+    pois = [make_poi(f"B{i}", *offset(i * 10, 0)) for i in range(3)]
+    assert index.add_many(pois) == 2
+    assert index.stats()["dropped"] == 1
+
+
+def test_disabled_index_is_empty():
+    index = POIIndex(enabled=False, cell_degrees=0.01, max_pois=10)
+    assert index.add(make_poi("B001", *CENTER)) is False
+    assert index.nearby(*CENTER, 1000) == []
@@ -0,0 +1,93 @@
+"""
+路线折线 - 编码与解码互逆、与 Google 参考实现一致，以及 Douglas-Peucker 按容差抽稀
+"""
+import math
+import random
+import pytest
+from backend.services.polyline import (
+    decode, encode, join_paths, parse_amap_polyline, simplify, tolerance_for_zoom
+)
+
+# Google Encoded Polyline 文档中的示例（坐标为 (经度, 纬度)）
+GOOGLE_POINTS = [(-120.2, 38.5), (-120.95, 40.7), (-126.453, 43.252)]
+GOOGLE_ENCODED = "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+
+def test_matches_reference_encoding():
+    assert encode(GOOGLE_POINTS) == GOOGLE_ENCODED
+    assert decode(GOOGLE_ENCODED) == GOOGLE_POINTS
+
+
+def test_round_trip_keeps_five_decimal_places():
+    rng = random.Random(7)
+    points = [(round(rng.uniform(73, 135), 6), round(rng.uniform(18, 53), 6)) for _ in range(500)]
+
+    decoded = decode(encode(points))
+
+    assert len(decoded) == len(points)
+    for (lng, lat), (decoded_lng, decoded_lat) in zip(points, decoded):
+        assert decoded_lng == pytest.approx(lng, abs=0.51e-5)
+        assert decoded_lat == pytest.approx(lat, abs=0.51e-5)
+    assert encode(decoded) == encode(points)
+
+
+def test_empty_and_repeated_points():
+    assert encode([]) == ""
+    assert decode("") == []
+    assert decode(encode([(104.06, 30.66)] * 3)) == [(104.06, 30.66)] * 3
+
+
+def test_parse_amap_polyline_skips_malformed_pairs():
+    assert parse_amap_polyline("104.1,30.6;bad;104.2,x;104.3,30.7;") == [(104.1, 30.6), (104.3, 30.7)]
+    assert parse_amap_polyline(None) == []
+
+
+def test_join_paths_drops_duplicated_joints():
+    assert join_paths([[(1, 1), (2, 2)], [(2, 2), (3, 3)], []]) == [(1, 1), (2, 2), (3, 3)]
+
+
+def _distance_to_segment(point, start, end, scale):
+    px, py = (point[0] - start[0]) * scale, point[1] - start[1]
+    dx, dy = (end[0] - start[0]) * scale, end[1] - start[1]
+    length_sq = dx * dx + dy * dy
+    t = max(0.0, min(1.0, (px * dx + py * dy) / length_sq)) if length_sq else 0.0
+    return math.hypot(px - t * dx, py - t * dy) / scale
+
+
+def test_simplify_stays_within_tolerance():
+    # 沿纬线的锯齿路线，振幅在两个容差之间
+    points = [(104.0 + i * 0.001, 30.6 + (0.0002 if i % 2 else 0.0)) for i in range(200)]
+    scale = math.cos(math.radians(30.6001))
+
+    coarse = simplify(points, 0.001)
+    assert coarse == [points[0], points[-1]]
+
+    fine = simplify(points, 0.0001)
+    assert len(fine) > 100
+
+    for tolerance in (0.001, 0.0001, 0.00005):
+        kept = simplify(points, tolerance)
+        assert kept[0] == points[0] and kept[-1] == points[-1]
+        # 被去掉的点到抽稀后对应线段的距离不超过容差
+        kept_indexes = [points.index(point) for point in kept]
+        for first, last in zip(kept_indexes, kept_indexes[1:]):
+            for point in points[first + 1:last]:
+                assert _distance_to_segment(point, points[first], points[last], scale) <= tolerance * (1 + 1e-9)
+
+
+def test_simplify_keeps_the_turn_of_a_round_trip():
+    # 首尾重合的往返路线：到直线的距离为 0，按线段距离计算才会保留折返点
+    points = [(104.0, 30.6), (104.01, 30.6), (104.02, 30.6), (104.01, 30.6), (104.0, 30.6)]
+    assert (104.02, 30.6) in simplify(points, 0.001)
+
+
+def test_simplify_keeps_short_or_untolerated_input():
+    assert simplify([(1, 1), (2, 2)], 10) == [(1, 1), (2, 2)]
+    points = [(104.0, 30.6), (104.001, 30.6001), (104.002, 30.6)]
+    assert simplify(points, 0) == points
+
+
+def test_tolerance_halves_per_zoom_level():
+    assert tolerance_for_zoom(0) == pytest.approx(360 / 256)
+    assert tolerance_for_zoom(13) == pytest.approx(tolerance_for_zoom(12) / 2)
+    assert tolerance_for_zoom(12, pixels=2) == pytest.approx(tolerance_for_zoom(11))
@@ -0,0 +1,113 @@
+"""
+请求合并 - 相同的并发调用只执行一次、各等待者拿到独立的深拷贝，以及异常传给所有等待者
+"""
+import asyncio
+import pytest
+from backend.services.single_flight import SingleFlight
+
+WAITERS = 5
+
+
+class Call:
+    """记录执行次数的调用，在 release 之前一直挂起"""
+
+    def __init__(self, result=None, error: Exception = None):
+        self.result = result
+        self.error = error
+        self.executed = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.executed += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+async def start(flight: SingleFlight, call: Call, key="成都", count: int = WAITERS):
+    tasks = [asyncio.create_task(flight.do("generate_travel_plan", key, call)) for _ in range(count)]
+    await asyncio.sleep(0)
+    return tasks
+
+
+@pytest.mark.anyio
+async def test_concurrent_identical_calls_execute_once():
+    flight = SingleFlight()
+    call = Call({"overview": "成都3日游"})
+    tasks = await start(flight, call)
+    assert flight.stats()["in_flight"] == 1
+
+    call.release.set()
+    results = await asyncio.gather(*tasks)
+
+    assert call.executed == 1
+    assert results == [{"overview": "成都3日游"}] * WAITERS
+    stats = flight.stats()
+    assert stats["in_flight"] == 0
+    assert stats["calls"]["generate_travel_plan"] == {
+        "calls": WAITERS, "executed": 1, "coalesced": WAITERS - 1,
+        "coalesced_ratio": round((WAITERS - 1) / WAITERS, 4)
+    }
+
+
+@pytest.mark.anyio
+async def test_different_keys_are_not_coalesced():
+    flight = SingleFlight()
+    call = Call({})
+    tasks = await start(flight, call, "成都", 1) + await start(flight, call, "重庆", 1)
+    call.release.set()
+    await asyncio.gather(*tasks)
+    assert call.executed == 2
+
+
+@pytest.mark.anyio
+async def test_each_waiter_gets_an_independent_copy():
+    flight = SingleFlight()
+    shared = {"daily_itinerary": [{"day": 1, "title": "第1天"}]}
+    call = Call(shared)
+    tasks = await start(flight, call)
+    call.release.set()
+    results = await asyncio.gather(*tasks)
+
+    results[0]["daily_itinerary"][0]["title"] = "改过的标题"
+    results[1]["daily_itinerary"].clear()
+
+    assert all(result["daily_itinerary"][0]["title"] == "第1天" for result in results[2:])
+    assert shared == {"daily_itinerary": [{"day": 1, "title": "第1天"}]}
+    assert len({id(result) for result in results}) == WAITERS
+
+
+@pytest.mark.anyio
+async def test_exception_reaches_every_waiter_and_clears_the_key():
+    flight = SingleFlight()
+    failing = Call(error=RuntimeError("模型调用失败"))
+    tasks = await start(flight, failing)
+    failing.release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert failing.executed == 1
+    assert all(isinstance(result, RuntimeError) and str(result) == "模型调用失败" for result in results)
+    assert flight.stats()["in_flight"] == 0
+
+    # 失败后相同的调用重新执行，而不是复用失败的结果
+    retry = Call({"overview": "重试成功"})
+    tasks = await start(flight, retry, count=1)
+    retry.release.set()
+    assert await tasks[0] == {"overview": "重试成功"}
+    assert retry.executed == 1
+
+
+@pytest.mark.anyio
+async def test_cancelled_initiator_does_not_cancel_other_waiters():
+    flight = SingleFlight()
+    call = Call({"overview": "成都3日游"})
+    initiator, *others = await start(flight, call, count=3)
+
+    initiator.cancel()
+    await asyncio.sleep(0)
+    call.release.set()
+
+    assert await asyncio.gather(*others) == [{"overview": "成都3日游"}] * 2
+    assert initiator.cancelled()
+    assert call.executed == 1
@@ -0,0 +1,55 @@
+"""
+行程天气 - 行程完全在预报范围外（尚未开始或已经结束）时不请求高德
+"""
+from datetime import datetime, timedelta
+import pytest
+from backend.services.map_service import MapService
+
+TODAY = datetime.now(MapService.WEATHER_TIMEZONE).date()
+
+
+@pytest.fixture
+def weather_calls(monkeypatch):
+    calls = []
+
+    async def get_weather(city):
+        calls.append(city)
+        return {
+            "city": city,
+            "reporttime": "2026-10-18 08:00:00",
+            "casts": [{"date": TODAY.isoformat(), "dayweather": "晴"}]
+        }
+
+    monkeypatch.setattr(MapService, "get_weather", get_weather)
+    return calls
+
+
+@pytest.mark.parametrize("start_offset, end_offset, expected", [
+    (-10, -3, False),   # 已经结束
+    (-3, -1, False),    # 昨天结束
+    (-2, 2, True),      # 正在进行
+    (0, 0, True),
+    (3, 5, True),       # 预报范围的最后一天开始
+    (4, 6, False),      # 尚未进入预报范围
+])
+def test_in_forecast_range(start_offset, end_offset, expected):
+    start_date, end_date = TODAY + timedelta(days=start_offset), TODAY + timedelta(days=end_offset)
+    assert MapService.in_forecast_range(start_date, end_date) is expected
+
+
+@pytest.mark.anyio
+async def test_past_trip_does_not_request_amap(weather_calls):
+    weather = await MapService.get_trip_weather("成都", TODAY - timedelta(days=7), TODAY - timedelta(days=5))
+
+    assert weather_calls == []
+    assert weather["available"] is False
+    assert [day["weather"] for day in weather["days"]] == [None, None, None]
+
+
+@pytest.mark.anyio
+async def test_current_trip_requests_amap(weather_calls):
+    weather = await MapService.get_trip_weather("成都", TODAY - timedelta(days=1), TODAY + timedelta(days=1))
+
+    assert weather_calls == ["成都"]
+    assert weather["available"] is True
+    assert weather["days"][1]["weather"]["dayweather"] == "晴"
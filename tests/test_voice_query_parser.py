@@ -0,0 +1,132 @@
+"""
+语音查询规则解析 - 标注语料上的准确率、覆盖率和延迟
+
+规则解析器只在有把握时回答，回答错误比交给大模型代价更高，因此要求准确率为 100%。
+期望结果为 None 的语句应当交给大模型处理。
+"""
+import time
+from datetime import date
+import pytest
+from backend.services.voice_query_parser import VoiceQueryRuleParser
+
+# 2026-10-14 是星期三
+TODAY = date(2026, 10, 14)
+
+
+def expense(category, amount, description):
+    return {"query_type": "expense", "category": category, "amount": amount, "description": description}
+
+
+def travel(destination, start_date=None, end_date=None, days=None, budget=None, travelers_count=None, preferences=None):
+    return {
+        "query_type": "travel_plan",
+        "destination": destination,
+        "start_date": start_date,
+        "end_date": end_date,
+        "days": days,
+        "budget": budget,
+        "travelers_count": travelers_count,
+        "preferences": preferences
+    }
+
+
+CORPUS = [
+    # 费用：中文数字、金额单位、类别关键词
+    ("午饭花了35元", expense("餐饮", 35, "午饭花了35元")),
+    ("打车花了二十八块", expense("交通", 28, "打车花了二十八块")),
+    ("酒店住了两晚花了六百元", expense("住宿", 600, "酒店住了两晚花了六百元")),
+    ("门票一共一百二十元", expense("景点", 120, "门票一共一百二十元")),
+    ("买了纪念品花了1.5千", expense("购物", 1500, "买了纪念品花了1.5千")),
+    ("晚饭火锅消费三百五十块", expense("餐饮", 350, "晚饭火锅消费三百五十块")),
+    ("今天早餐花了十五元。", expense("餐饮", 15, "今天早餐花了十五元")),
+    ("高铁票花了五百五十三元", expense("交通", 553, "高铁票花了五百五十三元")),
+    ("机票支付了一千二", expense("交通", 1200, "机票支付了一千二")),
+    ("奶茶18块", expense("餐饮", 18, "奶茶18块")),
+    ("民宿房费一千零五元", expense("住宿", 1005, "民宿房费一千零五元")),
+    # 行程：相对日期、星期、具体日期、天数/晚数/周数、人数、预算单位、偏好
+    ("下周五去杭州玩三天预算两千", travel("杭州", "2026-10-23", "2026-10-25", 3, 2000)),
+    ("明天去成都玩五天，两个人，预算一万", travel("成都", "2026-10-15", "2026-10-19", 5, 10000, 2)),
+    ("后天去北京旅行三天预算1.5万", travel("北京", "2026-10-16", "2026-10-18", 3, 15000)),
+    ("大后天去苏州玩一天", travel("苏州", "2026-10-17", "2026-10-17", 1)),
+    ("周五出发去大理，三天，想去古镇拍照", travel("大理", "2026-10-16", "2026-10-18", 3, preferences="拍照、古镇")),
+    ("这周六去桂林玩三天", travel("桂林", "2026-10-17", "2026-10-19", 3)),
+    ("下下周六去厦门玩两天预算三千块", travel("厦门", "2026-10-31", "2026-11-01", 2, 3000)),
+    ("周末去南京玩两天", travel("南京", "2026-10-17", "2026-10-18", 2)),
+    ("下周末去青岛玩两天，三个人", travel("青岛", "2026-10-24", "2026-10-25", 2, travelers_count=3)),
+    ("国庆10月1号去西安旅游四天", travel("西安", "2027-10-01", "2027-10-04", 4)),
+    ("十一月三号去上海玩三天预算五千", travel("上海", "2026-11-03", "2026-11-05", 3, 5000)),
+    ("2026-12-20去三亚玩一周", travel("三亚", "2026-12-20", "2026-12-26", 7)),
+    ("去重庆玩两晚，一家三口", travel("重庆", days=3, travelers_count=3)),
+    ("预算三千人民币去成都玩三天", travel("成都", days=3, budget=3000)),
+    ("十一月一号去三亚玩十一天", travel("三亚", "2026-11-01", "2026-11-11", 11)),
+    ("下周末去北海道玩五天", travel("北海道", "2026-10-24", "2026-10-28", 5)),
+    ("想去丽江玩四天，预算大概八千，喜欢美食和拍照", travel("丽江", days=4, budget=8000, preferences="美食、拍照")),
+    # 没有把握：交给大模型
+    ("帮我看看上次的行程", None),
+    ("花了好多钱", None),
+    ("花了三百", None),
+    ("我想去旅游", None),
+    ("去杭州", None),
+    ("下个月去云南玩", None),
+    # 多个城市
+    ("去北京和上海玩五天", None),
+    ("去大理丽江玩六天", None),
+    # 规则无法换算的日期说法
+    ("国庆去三亚玩五天", None),
+    ("五一去杭州玩三天", None),
+    ("十一去厦门玩四天", None),
+    ("春节去哈尔滨玩三天", None),
+    ("月底去成都玩两天", None),
+    ("今天天气怎么样", None),
+    ("给我推荐点吃的", None),
+    ("我们去哪里玩比较好", None),
+    ("昨天打车了", None),
+    ("", None),
+]
+
+
+def _evaluate():
+    answered = correct = expected_answers = 0
+    wrong = []
+    for text, expected in CORPUS:
+        result = VoiceQueryRuleParser.parse(text, TODAY)
+        expected_answers += expected is not None
+        if result is None:
+            if expected is not None:
+                wrong.append((text, "交给了大模型", expected))
+            continue
+        answered += 1
+        if result == expected:
+            correct += 1
+        else:
+            wrong.append((text, result, expected))
+    return answered, correct, expected_answers, wrong
+
+
+def test_corpus_precision_and_coverage():
+    answered, correct, expected_answers, wrong = _evaluate()
+    precision = correct / answered
+    coverage = correct / expected_answers
+    print(f"\n规则解析: 回答 {answered}/{len(CORPUS)} 条，准确率 {precision:.1%}，覆盖率 {coverage:.1%}")
+    assert not wrong, wrong
+    assert precision == 1.0
+
+
+def test_latency():
+    rounds = 200
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for text, _ in CORPUS:
+            VoiceQueryRuleParser.parse(text, TODAY)
+    per_call_ms = (time.perf_counter() - started) * 1000 / (rounds * len(CORPUS))
+    print(f"\n规则解析: 平均 {per_call_ms:.3f} ms/条")
+    # 大模型调用通常需要 1 秒以上
+    assert per_call_ms < 1
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("三十五", 35), ("两千", 2000), ("一千五", 1500), ("一千零五", 1005),
+    ("3千", 3000), ("1.5万", 15000), ("十", 10), ("两万三千", 23000)
+])
+def test_chinese_numerals(text, expected):
+    assert VoiceQueryRuleParser.chinese_to_number(text) == expected